@@ -8,6 +8,8 @@ CONFIG_DIR = os.path.join(DATA_DIR, "config")
 # Pliki konfiguracyjne i danych
 USER_ID_FILE = os.path.join(DATA_DIR, "user_id.json")
 SYMBOLS_CACHE_FILE = os.path.join(DATA_DIR, "symbols_cache.json")
+MARKETS_CACHE_DIR = os.path.join(DATA_DIR, "markets_cache")
+REPLAY_FIXTURES_DIR = os.path.join(DATA_DIR, "replay_fixtures")
 LOG_FILE = os.path.join(LOGS_DIR, "trading_bot.log")
 USER_SETTINGS_FILE = os.path.join(CONFIG_DIR, "user_settings.json")
 COOLDOWN_CACHE_FILE = os.path.join(DATA_DIR, "cooldown_cache.json")
@@ -28,6 +30,8 @@ RAMY_CZASOWE = ['1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '12h', '
 # Czas ważności pamięci podręcznej dla symboli (w sekundach)
 # 24 godziny * 60 minut * 60 sekund = 1 dzień
 CACHE_MAX_AGE_SECONDS = 24 * 60 * 60
+# Po tym czasie metadane rynków wczytane z dysku są odświeżane w tle
+MARKETS_CACHE_MAX_AGE_SECONDS = 6 * 60 * 60
 
 
 # --- DOMYŚLNE USTAWIENIA APLIKACJI ---
@@ -61,13 +65,17 @@ DEFAULT_SETTINGS = {
         "setup_expiration_candles": 12,
         # --- NOWE USTAWIENIA DLA SKANERA S/R ---
         "sr_scanner_prominence_multiplier": 0.5,
-        "sr_scanner_distance": 10
+        "sr_scanner_distance": 10,
+        "sr_cluster_tolerance_pct": 0.3,
+        "context_prefetch_enabled": True,
+        "prefetch_concurrency": 4
     },
     "ai_context_modules": {
         "use_market_regime": True,
         "use_order_flow": True,
         "use_onchain_data": True,
-        "use_performance_insights": False
+        "use_performance_insights": False,
+        "market_regime_refresh_minutes": 0 # 0 = raz po zamknięciu dziennej świecy
     },
     "strategies": {
         "ai_clone": {
@@ -103,6 +111,7 @@ DEFAULT_SETTINGS = {
     },
     "analysis": {
         "default_interval": "1h",
+        "indicator_backend": "pandas_ta",
         "multi_timeframe_intervals": [
             "30m",
             "1h",
@@ -119,10 +128,46 @@ DEFAULT_SETTINGS = {
             "bbands_length": 20,
             "bbands_std": 2.0,
             "atr_length": 14
-        }
+        },
+        "candlestick_patterns": [
+            "doji", "inside", "engulfing", "harami", "hammer", "shooting_star", "morning_star",
+            "evening_star", "three_white_soldiers", "three_black_crows", "marubozu"
+        ]
     },
     "cryptopanic": {
         "api_token": ""
+    },
+    "cache": {
+        "ohlcv_max_mb": 64,
+        "ohlcv_forming_ttl_seconds": 10,
+        "tickers_ttl_seconds": 10,
+        "indicator_max_entries": 128,
+        "swing_index_max_series": 256,
+        "fvg_tracker_max_series": 128,
+        "volume_profile_max_series": 128,
+        "volume_profile_max_sessions": 90,
+        "squeeze_tracker_max_series": 128
+    },
+    "network": {
+        "request_burst": 5,
+        "critical_reserved_share": 0.2
+    },
+    "backtester": {
+        "download_concurrency": 4
+    },
+    "replay": {
+        "latency_ms": 80,
+        "jitter_ms": 20,
+        "rate_limit_ms": 50,
+        "burst": 10,
+        "seed": 42,
+        "record_session": False # Nagrywa odpowiedzi prawdziwych giełd do fixture 'replay_<giełda>.json'
+    },
+    "streaming": {
+        "enabled": False,
+        "source": "exchange", # "exchange" (ccxt.pro) lub "replay" (lokalny serwer powtórek)
+        "replay_url": "ws://127.0.0.1:8765/ws",
+        "paper_trader_min_eval_seconds": 5
     }
 }
 
@@ -161,4 +206,27 @@ BACKTESTER_MAX_CANDLES = 500
 
 # Czas ważności pamięci podręcznej dla danych dashboardu (w sekundach)
 # 15 minut * 60 sekund = 900 sekund
-DASHBOARD_CACHE_LIFETIME_SECONDS = 15 * 60
\ No newline at end of file
+DASHBOARD_CACHE_LIFETIME_SECONDS = 15 * 60
+
+# Domyślny budżet pamięci wspólnego cache'a świec OHLCV (w bajtach)
+OHLCV_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Domyślna liczba ramek z policzonymi wskaźnikami trzymanych w cache'u IndicatorService
+INDICATOR_CACHE_MAX_ENTRIES = 128
+# Domyślna liczba serii (symbol, interwał, kolumna) z indeksem punktów zwrotnych trzymanych przez PatternService
+SWING_INDEX_MAX_SERIES = 256
+# Domyślna liczba serii (giełda, symbol, interwał) z przyrostowo śledzonymi lukami FVG
+FVG_TRACKER_MAX_SERIES = 128
+# Dzienne poziomy S/R bliższe sobie niż ten procent ceny są łączone w jeden poziom
+SR_CLUSTER_TOLERANCE_PCT = 0.3
+# Domyślna liczba serii (giełda, symbol) z zapamiętanymi profilami wolumenowymi sesji
+VOLUME_PROFILE_MAX_SERIES = 128
+# Domyślna liczba serii (giełda, symbol, interwał) z przyrostowo śledzonym stanem Bollinger Band Squeeze
+SQUEEZE_TRACKER_MAX_SERIES = 128
+# Co ile minut przeliczać migawkę reżimu rynkowego (0 = raz na dobę, po zamknięciu dziennej świecy)
+MARKET_REGIME_REFRESH_MINUTES = 0
+# Liczba symboli, dla których prefetcher kontekstu Ssnedam pobiera dane równocześnie
+CONTEXT_PREFETCH_CONCURRENCY = 4
+# Najwięcej zapamiętanych zamkniętych sesji (dób) profilu wolumenowego na serię
+VOLUME_PROFILE_MAX_SESSIONS = 90
+# Po ilu sekundach trwająca (niezamknięta) świeca w cache OHLCV jest dociągana z giełdy
+OHLCV_FORMING_TTL_SECONDS = 10
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Mikrobenchmark formacji świecowych: ocena pełnej historii (tak działa df.ta.cdl_pattern(name="all"); bez pandas_ta
+te same reguły są liczone dla każdej świecy historii) vs CandlePatternEngine liczący tylko ostatnią świecę,
+dla pojedynczych ramek i dla wszystkich symboli jednym przebiegiem.
+Uruchomienie: python -m benchmarks.bench_candle_patterns
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from core.candle_patterns import CandlePatternEngine, CandleWindow
+from core.utils import suppress_stdout
+
+ROWS, SYMBOLS = 500, 100
+
+def make_frames(rng: np.random.Generator):
+    frames = {}
+    for i in range(SYMBOLS):
+        close = 100 + np.cumsum(rng.normal(0, 1, ROWS))
+        open_ = close + rng.normal(0, 0.5, ROWS)
+        frames[f"COIN{i}/USDT"] = pd.DataFrame(
+            {'Open': open_, 'High': np.maximum(open_, close) + rng.random(ROWS), 'Low': np.minimum(open_, close) - rng.random(ROWS), 'Close': close, 'Volume': 1.0},
+            index=pd.date_range('2024-01-01', periods=ROWS, freq='1h', name='timestamp')
+        )
+    return frames
+
+def full_history_pandas_ta(frames):
+    import pandas_ta  # noqa: F401
+    for df in frames.values():
+        with suppress_stdout():
+            df.ta.cdl_pattern(name="all").iloc[-1]
+
+def full_history_engine(frames, engine: CandlePatternEngine):
+    for df in frames.values():
+        arrays = [sliding_window_view(df[col].to_numpy(dtype=np.float64), engine.bars) for col in ('Open', 'High', 'Low', 'Close')]
+        engine.evaluate(CandleWindow(*arrays))
+
+def last_bar_per_frame(frames, engine: CandlePatternEngine):
+    for key, df in frames.items(): engine.scan({key: df})
+
+def last_bar_batch(frames, engine: CandlePatternEngine):
+    engine.scan(frames)
+
+def best_of(func, *args, repeats: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best / SYMBOLS
+
+def main():
+    frames, engine = make_frames(np.random.default_rng(0)), CandlePatternEngine()
+    try:
+        reference = best_of(full_history_pandas_ta, frames, repeats=1)
+        print(f"pandas_ta cdl_pattern('all'): {reference * 1e6:9.1f} us / symbol")
+    except ImportError:
+        reference = best_of(full_history_engine, frames, engine)
+        print(f"pełna historia (te same reguły): {reference * 1e6:9.1f} us / symbol")
+    for name, func in (("ostatnia świeca, osobno", last_bar_per_frame), ("ostatnia świeca, wsadowo", last_bar_batch)):
+        elapsed = best_of(func, frames, engine)
+        print(f"{name:>31}: {elapsed * 1e6:9.1f} us / symbol | x{reference / elapsed:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Mikrobenchmark wykrywania luk FVG: pierwotna pętla po świecach (iloc) vs wersja wektorowa vs tracker przyrostowy,
+dla przesuwanego okna (nowa zamknięta świeca przy każdym skanie).
+Uruchomienie: python -m benchmarks.bench_fair_value_gaps
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.fair_value_gaps import FairValueGapTracker, find_fair_value_gaps
+
+ROWS, SCANS = 500, 200
+
+def make_windows(rng: np.random.Generator):
+    close = 100 + np.cumsum(rng.normal(0, 1, ROWS + SCANS))
+    candles = pd.DataFrame(
+        {'High': close + rng.random(len(close)), 'Low': close - rng.random(len(close))},
+        index=pd.date_range('2024-01-01', periods=len(close), freq='15min', name='timestamp')
+    )
+    return [candles.iloc[i:i + ROWS] for i in range(SCANS)]
+
+def scan_with_loop(windows):
+    for df in windows:
+        avg_interval_seconds = df.index.to_series().diff().dt.total_seconds().median()
+        for i in range(1, len(df) - 1):
+            prev_candle, next_candle = df.iloc[i-1], df.iloc[i+1]
+            if prev_candle['High'] < next_candle['Low'] or prev_candle['Low'] > next_candle['High']:
+                df.iloc[i].name.timestamp() - avg_interval_seconds / 2
+
+def scan_vectorized(windows):
+    for df in windows: find_fair_value_gaps(df)
+
+def scan_with_tracker(windows):
+    tracker = FairValueGapTracker()
+    for df in windows:
+        tracker.sync(df)
+        tracker.gaps()
+
+def best_of(func, windows, repeats: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(windows)
+        best = min(best, time.perf_counter() - started)
+    return best / len(windows)
+
+def main():
+    windows = make_windows(np.random.default_rng(0))
+    for name, func in (("pętla iloc", scan_with_loop), ("wektorowo", scan_vectorized), ("tracker", scan_with_tracker)):
+        print(f"{name:>12}: {best_of(func, windows) * 1e6:9.1f} us / skan")
+
+if __name__ == "__main__":
+    main()
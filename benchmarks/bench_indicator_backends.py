@@ -0,0 +1,57 @@
+"""
+Mikrobenchmark IndicatorService.calculate_all: silnik NumPy vs pandas_ta (jeśli jest zainstalowany).
+Cache wyników jest wyłączony, aby mierzyć samo liczenie.
+Uruchomienie: python -m benchmarks.bench_indicator_backends
+"""
+import importlib.util
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from core.indicator_service import IndicatorService
+from core.settings_manager import SettingsManager
+
+def make_ohlcv(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    index = pd.date_range('2024-01-01', periods=rows, freq='1h', name='timestamp')
+    return pd.DataFrame({'Open': close, 'High': close * 1.003, 'Low': close * 0.997, 'Close': close, 'Volume': rng.uniform(10, 500, rows)}, index=index)
+
+def make_service(backend: str) -> IndicatorService:
+    settings = SettingsManager()
+    settings.set('analysis.indicator_backend', backend)
+    settings.set('cache.indicator_max_entries', 0)
+    return IndicatorService(settings, analyzer=None)
+
+def import_time(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+
+def main():
+    backends = ['numpy'] + (['pandas_ta'] if importlib.util.find_spec('pandas_ta') else [])
+    if len(backends) == 1:
+        print("pandas_ta nie jest zainstalowany - mierzę tylko silnik NumPy.")
+    for rows in (500, 1000, 5000):
+        df = make_ohlcv(rows)
+        timings = {}
+        for backend in backends:
+            service = make_service(backend)
+            timings[backend] = min(timeit.repeat(lambda: service.calculate_all(df), number=20, repeat=5)) / 20
+        line = " | ".join(f"{name}: {t * 1e3:7.3f} ms" for name, t in timings.items())
+        if 'pandas_ta' in timings:
+            line += f" (x{timings['pandas_ta'] / timings['numpy']:4.1f})"
+        print(f"{rows:>5} świec: {line}")
+    service = make_service('numpy')
+    watchlist = {f"COIN{i}/USDT": make_ohlcv(500) * (1 + i / 300) for i in range(300)}
+    loop = min(timeit.repeat(lambda: [service.calculate_all(df) for df in watchlist.values()], number=1, repeat=3))
+    batch = min(timeit.repeat(lambda: service.calculate_batch(watchlist), number=1, repeat=3))
+    print(f"300 symboli x 500 świec: pętla calculate_all: {loop * 1e3:7.1f} ms | calculate_batch: {batch * 1e3:7.1f} ms (x{loop / batch:4.1f})")
+    if 'pandas_ta' in backends:
+        # Silnik NumPy nie importuje pandas_ta - to koszt oszczędzany przy starcie wdrożeń z samym skanerem
+        print(f"Import pandas_ta: {import_time('pandas_ta') * 1e3:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Mikrobenchmark konwersji surowych świec ccxt do DataFrame.
+Uruchomienie: python -m benchmarks.bench_ohlcv_frame
+"""
+import random
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from core.ohlcv_frame import ohlcv_to_frame
+
+def make_raw(rows: int, shuffled: bool = False) -> list:
+    raw = [[1704067200000 + i * 60_000, 100.0 + random.random(), 101.0, 99.0, 100.5, 10.0 * random.random()] for i in range(rows)]
+    if shuffled:
+        raw += raw[-10:] # Duplikaty, jak przy nakładających się stronach
+        random.shuffle(raw)
+    return raw
+
+def legacy_to_frame(raw: list) -> pd.DataFrame:
+    """Dotychczasowa ścieżka: DataFrame z listy list, konwersja kolumny czasu, set_index i sort_index."""
+    df = pd.DataFrame(raw, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df = df.set_index('timestamp').sort_index()
+    return df[~df.index.duplicated(keep='last')]
+
+def main():
+    for rows in (500, 1000, 100_000):
+        for shuffled in (False, True):
+            raw = make_raw(rows, shuffled)
+            number = max(1, 20_000 // rows)
+            legacy = min(timeit.repeat(lambda: legacy_to_frame(raw), number=number, repeat=5)) / number
+            fast = min(timeit.repeat(lambda: ohlcv_to_frame(raw), number=number, repeat=5)) / number
+            fast32 = min(timeit.repeat(lambda: ohlcv_to_frame(raw, np.float32), number=number, repeat=5)) / number
+            label = "nieposortowane+duplikaty" if shuffled else "posortowane"
+            print(f"{rows:>7} świec ({label:<24}) legacy: {legacy * 1e3:8.3f} ms | ohlcv_to_frame: {fast * 1e3:8.3f} ms "
+                  f"(x{legacy / fast:4.1f}) | float32: {fast32 * 1e3:8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Deterministyczny benchmark warstwy danych na giełdzie odtwarzającej nagranie (bez sieci).
+Uruchomienie: python -m benchmarks.bench_replay_exchange [--symbols 100] [--latency-ms 80] [--analyzer]
+
+Domyślnie mierzy ExchangeService (skan świec wielu symboli i interwałów, snapshot tickerów).
+Z flagą --analyzer dodatkowo przepuszcza skan Ssnedam (find_potential_setups) i kontekst rynkowy
+przez pełny TechnicalAnalyzer - wymaga kompletnego środowiska (pandas_ta).
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from core.exchange_service import ExchangeService
+from core.ohlcv_cache import OHLCVCache
+from core.replay_exchange import build_synthetic_fixture, fixture_path
+
+EXCHANGE_ID = 'REPLAY_BENCH'
+INTERVALS = ['1h', '4h', '1d']
+
+async def bench_exchange_service(fixtures_dir: str, symbols: list, latency_ms: float):
+    options = {'fixtures_dir': fixtures_dir, 'latency_ms': latency_ms, 'jitter_ms': latency_ms / 4, 'rate_limit_ms': 50, 'burst': 10}
+    for label, cache in (("bez cache", None), ("z OHLCVCache", OHLCVCache())):
+        service = ExchangeService(ohlcv_cache=cache, replay_options=options)
+        exchange = await service.get_exchange_instance(EXCHANGE_ID)
+        for run in (1, 2):
+            started = time.perf_counter()
+            await asyncio.gather(*[service.fetch_ohlcv(exchange, s, i) for s in symbols for i in INTERVALS])
+            elapsed = time.perf_counter() - started
+            print(f"Skan świec ({label}, przebieg {run}): {len(symbols) * len(INTERVALS)} zapytań w {elapsed:.2f} s, "
+                  f"zapytania do giełdy: {exchange.request_counts.get('fetch_ohlcv', 0)}, przekroczenia limitu: {exchange.rate_limit_violations}")
+        started = time.perf_counter()
+        await service.fetch_tickers_snapshot(exchange, symbols)
+        print(f"Snapshot tickerów ({label}): {(time.perf_counter() - started) * 1000:.1f} ms")
+        stats = service.scheduler.stats().get(EXCHANGE_ID, {})
+        print(f"Planista ({label}): " + ", ".join(f"{name}: śr. {s['avg_wait_ms']:.0f} ms" for name, s in stats.items() if s['dispatched']))
+        await service.close_all_exchanges()
+
+async def bench_analyzer(fixtures_dir: str, symbols: list, latency_ms: float):
+    from core.analyzer import TechnicalAnalyzer
+    from core.database_manager import DatabaseManager
+    from core.settings_manager import SettingsManager
+
+    settings = SettingsManager(settings_file=os.path.join(fixtures_dir, 'settings.json'))
+    settings.settings['replay'] = {'fixtures_dir': fixtures_dir, 'latency_ms': latency_ms, 'rate_limit_ms': 50}
+    analyzer = TechnicalAnalyzer(settings, DatabaseManager(db_name=':memory:'), None)
+    started = time.perf_counter()
+    for symbol in symbols: # Sekwencyjnie, jak Ssnedam.scan_for_alerts
+        await analyzer.find_potential_setups(symbol, EXCHANGE_ID, '1h')
+    print(f"Skan Ssnedam (find_potential_setups): {len(symbols)} symboli w {time.perf_counter() - started:.2f} s")
+    started = time.perf_counter()
+    await analyzer.get_market_regime(EXCHANGE_ID)
+    print(f"Reżim rynku: {(time.perf_counter() - started) * 1000:.1f} ms")
+    await analyzer.close_all_exchanges()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--candles', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--analyzer', action='store_true')
+    args = parser.parse_args()
+
+    symbols = [f"C{i:03d}/USDT" for i in range(args.symbols)] + ['BTC/USDT', 'ETH/USDT']
+    with tempfile.TemporaryDirectory() as fixtures_dir:
+        with open(fixture_path(fixtures_dir, EXCHANGE_ID), 'w') as f:
+            json.dump(build_synthetic_fixture(symbols, INTERVALS, candles=args.candles), f)
+        asyncio.run(bench_exchange_service(fixtures_dir, symbols, args.latency_ms))
+        if args.analyzer:
+            asyncio.run(bench_analyzer(fixtures_dir, symbols, args.latency_ms))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Mikrobenchmark Bollinger Band Squeeze: pierwotna wersja (calculate_all na kopii ramki, kolumna bb_width i 100-świecowe
+minimum kroczące) vs wstęgi z gotowych kolumn vs tracker przyrostowy, dla przesuwanego okna (nowa świeca przy każdym skanie).
+Uruchomienie: python -m benchmarks.bench_squeeze
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.indicator_kernels import bbands
+from core.setup_detectors import is_bollinger_squeeze
+from core.squeeze_tracker import SqueezeTracker
+
+ROWS, SCANS, LOOKBACK = 500, 200, 100
+
+def make_windows(rng: np.random.Generator):
+    close = 100 + np.cumsum(rng.normal(0, 1, ROWS + SCANS))
+    candles = pd.DataFrame({'Close': close}, index=pd.date_range('2024-01-01', periods=len(close), freq='15min', name='timestamp'))
+    return [candles.iloc[i:i + ROWS] for i in range(SCANS)]
+
+def scan_original(windows):
+    for df in windows:
+        df = df.copy()
+        lower, mid, upper = bbands(df['Close'].to_numpy(), 20, 2.0)[:3]
+        df['BBL_20_2.0'], df['BBM_20_2.0'], df['BBU_20_2.0'] = lower, mid, upper
+        df['bb_width'] = (df['BBU_20_2.0'] - df['BBL_20_2.0']) / df['BBM_20_2.0']
+        df['bb_width_min'] = df['bb_width'].rolling(window=LOOKBACK).min()
+        bool(df['bb_width'].iloc[-1] <= df['bb_width_min'].iloc[-1] * 1.1)
+
+def scan_arrays(windows):
+    for df in windows:
+        lower, mid, upper = bbands(df['Close'].to_numpy()[-(LOOKBACK + 19):], 20, 2.0)[:3]
+        is_bollinger_squeeze(upper, lower, mid, LOOKBACK)
+
+def scan_with_tracker(windows):
+    tracker = SqueezeTracker(20, 2.0, LOOKBACK)
+    for df in windows:
+        tracker.sync(df)
+        tracker.is_squeeze()
+
+def best_of(func, windows, repeats: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(windows)
+        best = min(best, time.perf_counter() - started)
+    return best / len(windows)
+
+def main():
+    windows = make_windows(np.random.default_rng(0))
+    for name, func in (("pierwotnie", scan_original), ("końcówka", scan_arrays), ("tracker", scan_with_tracker)):
+        print(f"{name:>12}: {best_of(func, windows) * 1e6:9.1f} us / skan")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Mikrobenchmark wyszukiwania szczytów i dołków: find_peaks na pełnej ramce (z odchyleniem liczonym od nowa)
+vs indeks punktów zwrotnych (SwingIndex), dla trzech typowych sytuacji kolejnego skanu tej samej serii:
+nowa zamknięta świeca, zmiana tylko trwającej świecy i ramka bez zmian.
+Uruchomienie: python -m benchmarks.bench_swing_index
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+
+from core.swing_index import SwingIndex
+
+ROWS, SCANS, DISTANCE, MULTIPLIER = 500, 1500, 10, 0.5
+
+def make_windows(rng: np.random.Generator):
+    close = 100 + np.cumsum(rng.normal(0, 1, ROWS + SCANS))
+    series = pd.Series(close, index=pd.date_range('2024-01-01', periods=len(close), freq='1h', name='timestamp'))
+    sliding = [series.iloc[i:i + ROWS] for i in range(SCANS)]
+    live = []
+    for _ in range(SCANS):
+        window = series.iloc[:ROWS].copy()
+        window.iloc[-1] += rng.normal()
+        live.append(window)
+    return {"nowa świeca": sliding, "trwająca świeca": live, "bez zmian": [sliding[0]] * SCANS}
+
+def scan_with_find_peaks(windows):
+    for window in windows:
+        prominence = window.std() * MULTIPLIER
+        find_peaks(window, distance=DISTANCE, prominence=prominence)
+        find_peaks(-window, distance=DISTANCE, prominence=prominence)
+
+def scan_with_index(windows):
+    highs, lows = SwingIndex(), SwingIndex(invert=True)
+    for window in windows:
+        highs.sync(window); lows.sync(window)
+        prominence = highs.std() * MULTIPLIER
+        highs.peaks(DISTANCE, prominence)
+        lows.peaks(DISTANCE, prominence)
+
+def best_of(func, windows, repeats: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(windows)
+        best = min(best, time.perf_counter() - started)
+    return best / len(windows)
+
+def main():
+    for name, windows in make_windows(np.random.default_rng(0)).items():
+        reference, indexed = best_of(scan_with_find_peaks, windows), best_of(scan_with_index, windows)
+        print(f"{name:>16}: find_peaks {reference * 1e6:7.1f} us | SwingIndex {indexed * 1e6:7.1f} us | x{reference / indexed:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Mikrobenchmark profilu wolumenowego: dawna wersja (pd.cut + groupby na cenie zamknięcia) vs histogram NumPy
+z rozkładem wolumenu na zakres High-Low - dla jednej ramki, wielu symboli naraz i profilu złożonego z sesji.
+Uruchomienie: python -m benchmarks.bench_volume_profile
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.volume_profile import VolumeProfileEngine, fixed_range_profiles
+
+ROWS, SYMBOLS, BINS = 500, 100, 50
+
+def make_frames(rng: np.random.Generator):
+    frames = []
+    for _ in range(SYMBOLS):
+        close = 100 + np.cumsum(rng.normal(0, 1, ROWS))
+        frames.append(pd.DataFrame(
+            {'High': close + rng.random(ROWS), 'Low': close - rng.random(ROWS), 'Close': close, 'Volume': rng.random(ROWS) * 100},
+            index=pd.date_range('2024-01-01', periods=ROWS, freq='1h', name='timestamp')
+        ))
+    return frames
+
+def profile_with_pandas(frames):
+    for df in frames:
+        volume_by_price = df.groupby(pd.cut(df['Close'], bins=BINS), observed=False)['Volume'].sum()
+        ranked = volume_by_price.sort_values(ascending=False)
+        value_area_bins = ranked[ranked.cumsum() <= volume_by_price.sum() * 0.7]
+        volume_by_price.idxmax().mid, value_area_bins.index.min().left, value_area_bins.index.max().right
+
+def profile_per_frame(frames):
+    for df in frames: fixed_range_profiles([df], BINS)[0].levels()
+
+def profile_batch(frames):
+    for profile in fixed_range_profiles(frames, BINS): profile.levels()
+
+def session_composites(frames, engine: VolumeProfileEngine):
+    for i, df in enumerate(frames): engine.composite(i, df, sessions=5).levels()
+
+def best_of(func, *args, repeats: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best / SYMBOLS
+
+def main():
+    frames = make_frames(np.random.default_rng(0))
+    reference = best_of(profile_with_pandas, frames)
+    print(f"{'pd.cut + groupby':>28}: {reference * 1e6:8.1f} us / symbol")
+    engine = VolumeProfileEngine(BINS)
+    session_composites(frames, engine) # Zamknięte sesje trafiają do pamięci
+    cases = (("histogram, osobno", profile_per_frame, (frames,)), ("histogram, wsadowo", profile_batch, (frames,)),
+             ("złożony z 5 sesji (cache)", session_composites, (frames, engine)))
+    for name, func, args in cases:
+        elapsed = best_of(func, *args)
+        print(f"{name:>28}: {elapsed * 1e6:8.1f} us / symbol | x{reference / elapsed:.1f}")
+
+if __name__ == "__main__":
+    main()
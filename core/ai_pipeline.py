@@ -75,7 +75,7 @@ class AIPipeline:
     async def _step_3_get_full_context(self, symbol: str, exchange: str, ar: AnalysisResult, timeframe: str) -> Tuple[Optional[ContextData], Dict]:
         best_df = ar.all_ohlcv_dfs.get(timeframe)
         if best_df is None: return None, {}
-        context = await self.analyzer.get_full_context(symbol, exchange, best_df)
+        context = await self.analyzer.get_full_context(symbol, exchange, best_df, timeframe)
         base_inputs = await self.analyzer.prepare_tactician_inputs(ar, timeframe, symbol, exchange)
         return context, base_inputs
 
@@ -136,7 +136,8 @@ class AIPipeline:
 
         # Sprawdzamy, czy tryb dynamiczny jest włączony
         if self.analyzer.settings.get('ai.dynamic_rr.enabled', False):
-            daily_metrics = await self.analyzer.get_daily_metrics(symbol, exchange)
+            prefetched = self.analyzer.get_prefetched_context(symbol, exchange)
+            daily_metrics = prefetched.daily_metrics if prefetched else await self.analyzer.get_daily_metrics(symbol, exchange)
             current_atr_pct = daily_metrics.get('atr_percent')
 
             # --- NOWY BLOK ZABEZPIECZAJĄCY ---
@@ -9,9 +9,15 @@ from dataclasses import dataclass, field
 from core.settings_manager import SettingsManager
 from core.database_manager import DatabaseManager
 from core.exchange_service import ExchangeService
+from core.candle_store import CandleStore
+from core.history_downloader import HistoryDownloader
+from core.markets_cache import MarketsCache
+from core.ohlcv_cache import get_shared_ohlcv_cache
+from core.request_scheduler import RequestScheduler
 from core.indicator_service import IndicatorService
 from core.pattern_service import PatternService
 from core.context_service import ContextService
+from core.context_prefetcher import PrefetchedContext
 from core.ai_client import AIClient, ParsedAIResponse
 from core.data_models import ContextData
 import ccxt.async_support as ccxt
@@ -40,10 +46,26 @@ class TechnicalAnalyzer:
         
         # ZMIANA: Wszystkie serwisy są teraz "prywatne" (zaczynają się od _)
         # i nie powinny być wywoływane bezpośrednio spoza tej klasy.
-        self._exchange_service = ExchangeService() 
+        ohlcv_cache = get_shared_ohlcv_cache()
+        ohlcv_cache.max_bytes = int(settings_manager.get('cache.ohlcv_max_mb', 64) * 1024 * 1024)
+        ohlcv_cache.forming_ttl_seconds = settings_manager.get('cache.ohlcv_forming_ttl_seconds', 10)
+        scheduler = RequestScheduler(
+            burst=settings_manager.get('network.request_burst', 5),
+            reserved_share=settings_manager.get('network.critical_reserved_share', 0.2)
+        )
+        self._exchange_service = ExchangeService(
+            candle_store=CandleStore(db_manager) if db_manager else None, ohlcv_cache=ohlcv_cache, scheduler=scheduler,
+            tickers_ttl_seconds=settings_manager.get('cache.tickers_ttl_seconds', 10), markets_cache=MarketsCache(),
+            replay_options=settings_manager.get('replay', {})
+        )
         self._indicator_service = IndicatorService(settings_manager, self)
-        self._pattern_service = PatternService(settings_manager, self._indicator_service, self._exchange_service)
+        self._pattern_service = PatternService(settings_manager, self._indicator_service, self._exchange_service, db_manager)
         self._context_service = ContextService(settings_manager, self._exchange_service, self._indicator_service, db_manager)
+        self.market_regime = self._context_service.market_regime
+        self.context_prefetcher = self._context_service.prefetcher
+        self._history_downloader = HistoryDownloader(
+            self._exchange_service, db_manager, max_concurrency=settings_manager.get('backtester.download_concurrency', 4)
+        ) if db_manager else None
 
     async def get_analysis_data(self, symbol: str, main_interval: str, exchange_id: str = "BINANCE") -> AnalysisResult:
         # ZMIANA: Używamy wewnętrznego serwisu
@@ -67,18 +89,19 @@ class TechnicalAnalyzer:
         current_price = main_ohlcv_df['Close'].iloc[-1]
         # ZMIANA: Używamy wewnętrznego serwisu
         main_df_with_indicators = self._indicator_service.calculate_all(main_ohlcv_df.copy())
-        found_fvgs = self._pattern_service.find_fair_value_gaps(main_df_with_indicators)
+        found_fvgs = self._pattern_service.track_fair_value_gaps(main_ohlcv_df, exchange_id, symbol)
 
-        all_timeframe_data = {}
+        indicator_frames = {}
         for interval in intervals_to_analyze: 
             df = ohlcv_results.get(interval)
             if not isinstance(df, pd.DataFrame) or df.empty or len(df) < 2:
                 continue
             
             # ZMIANA: Używamy wewnętrznego serwisu
-            indicators_df = self._indicator_service.calculate_all(df.copy())
-            interpreted_data = self._indicator_service.interpret_all(indicators_df)
-            all_timeframe_data[interval] = {"interpreted": interpreted_data}
+            indicator_frames[interval] = self._indicator_service.calculate_all(df.copy())
+        # Reguły interpretacji dla wszystkich interwałów oceniane są jednym przebiegiem
+        interpreted = self._indicator_service.interpret_many(indicator_frames)
+        all_timeframe_data = {interval: {"interpreted": interpreted[interval]} for interval in indicator_frames}
         
         return AnalysisResult(
             exchange_id=exchange_id, current_price=current_price,
@@ -123,6 +146,32 @@ class TechnicalAnalyzer:
     async def get_exchange_instance(self, exchange_id: str) -> Optional[ccxt.Exchange]:
         """Pobiera lub tworzy instancję ccxt dla danej giełdy."""
         return await self._exchange_service.get_exchange_instance(exchange_id)
+
+    async def fetch_ticker(self, exchange: ccxt.Exchange, symbol: str) -> Dict:
+        """Pobiera ticker dla symbolu (przez planistę zapytań)."""
+        return await self._exchange_service.fetch_ticker(exchange, symbol)
+
+    async def download_history(self, exchange: ccxt.Exchange, symbol: str, interval: str, start_ms: int, end_ms: int) -> int:
+        """Uzupełnia lokalną bazę o brakującą historię świec z podanego zakresu (dla Backtestera)."""
+        if self._history_downloader is None: return 0
+        return await self._history_downloader.download(exchange, symbol, interval, start_ms, end_ms)
+
+    def count_missing_history(self, exchange_id: str, symbol: str, interval: str, start_ms: int, end_ms: int) -> int:
+        """Liczba świec z zakresu, których wciąż brakuje w lokalnej bazie (0 bez downloadera)."""
+        if self._history_downloader is None: return 0
+        return self._history_downloader.missing_candles(symbol, interval, exchange_id, start_ms, end_ms)
+
+    async def fetch_tickers_snapshot(self, exchange: ccxt.Exchange, symbols: List[str]) -> Dict[str, dict]:
+        """Pobiera tickery wielu symboli jednym zbiorczym zapytaniem (z krótkim cache)."""
+        return await self._exchange_service.fetch_tickers_snapshot(exchange, symbols)
+
+    def get_request_scheduler_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Zwraca statystyki kolejek planisty zapytań (głębokość i czas oczekiwania per klasa)."""
+        return self._exchange_service.scheduler.stats()
+
+    def get_indicator_cache_stats(self) -> Dict[str, float]:
+        """Zwraca statystyki cache'a wyników obliczeń wskaźników (trafienia, chybienia, zajętość)."""
+        return self._indicator_service.get_cache_stats()
     
 
     async def get_long_short_ratio(self, symbol: str, exchange_id: str) -> Optional[float]:
@@ -135,15 +184,23 @@ class TechnicalAnalyzer:
         # Ten import może być potrzebny na górze pliku: from typing import Optional
         # Ten import może być potrzebny na górze pliku: import pandas as pd
         return self._pattern_service.find_divergence(price_series, indicator_series)
+
+    def find_divergences(self, pairs: List[Tuple[pd.Series, pd.Series]]) -> List[Optional[str]]:
+        """Sprawdza dywergencje dla wielu par (cena, wskaźnik) jednym przebiegiem."""
+        return self._pattern_service.find_divergences(pairs)
     
     def find_fair_value_gaps(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """Znajduje i zwraca listę luk cenowych (Fair Value Gaps)."""
         return self._pattern_service.find_fair_value_gaps(df)
 
-    async def get_full_context(self, symbol: str, exchange_id: str, df_with_indicators: pd.DataFrame) -> 'ContextData':
+    async def get_full_context(self, symbol: str, exchange_id: str, df_with_indicators: pd.DataFrame, timeframe: Optional[str] = None) -> 'ContextData':
         """Zbiera wszystkie dane kontekstowe i zwraca je jako pojedynczy obiekt."""
         # Dodaj import na górze pliku analyzer.py: from core.data_models import ContextData
-        return await self._context_service.get_full_context(symbol, exchange_id, df_with_indicators)
+        return await self._context_service.get_full_context(symbol, exchange_id, df_with_indicators, timeframe)
+
+    def get_prefetched_context(self, symbol: str, exchange_id: str) -> Optional[PrefetchedContext]:
+        """Kontekst symbolu przygotowany w tle po ostatnim zamknięciu świecy (None, jeśli go nie ma lub wygasł)."""
+        return self.context_prefetcher.get(exchange_id, symbol)
 
     async def get_simple_recommendation(self, symbol: str, exchange: str) -> str:
         """Pobiera prostą rekomendację (KUPUJ/SPRZEDAJ/NEUTRALNIE) dla dashboardu."""
@@ -153,10 +210,18 @@ class TechnicalAnalyzer:
         """Znajduje potencjalne setupy 'trap' dla skanera Ssnedam."""
         return await self._pattern_service.find_potential_setups(symbol, exchange, interval)
 
+    def scan_setups(self, df: pd.DataFrame, symbol: str, exchange: str, interval: str) -> List[Dict[str, Any]]:
+        """Szuka setupów w gotowej ramce (np. ze strumienia, z policzonymi już wskaźnikami) bez pobierania świec."""
+        return self._pattern_service.scan_setups(df, symbol, exchange, interval)
+
     async def get_daily_metrics(self, symbol: str, exchange: str) -> Dict[str, Any]:
         """Pobiera kluczowe metryki dzienne (ATR%, dystans od EMA200) dla dashboardu."""
         return await self._context_service.get_daily_metrics(symbol, exchange)
 
+    async def get_dashboard_metrics_batch(self, coins: List[Dict[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Rekomendacje i metryki dzienne dla całej listy coinów dashboardu, z wskaźnikami liczonymi wsadowo."""
+        return await self._context_service.get_dashboard_metrics_batch(coins)
+
     async def get_relative_strength(self, symbol: str, exchange: str) -> Optional[float]:
         """Pobiera wskaźnik siły względnej w stosunku do BTC dla dashboardu."""
         return await self._context_service.get_relative_strength(symbol, exchange)
@@ -185,11 +250,19 @@ class TechnicalAnalyzer:
         """Oblicza pełen zestaw wskaźników technicznych dla danego DataFrame."""
         return self._indicator_service.calculate_all(df)
 
+    def create_incremental_indicator_engine(self, df: Optional[pd.DataFrame] = None):
+        """Tworzy przyrostowy silnik wskaźników dla danych strumieniowych (z bieżącymi parametrami wskaźników)."""
+        return self._indicator_service.create_incremental_engine(df)
+
     
     async def find_programmatic_sr_levels(self, df: pd.DataFrame, symbol: str, exchange_id: str) -> dict:
         # ZMIANA: Metoda jest teraz asynchroniczna i przyjmuje 'symbol' oraz 'exchange_id'
         """Znajduje programistycznie poziomy S/R."""
         return await self._pattern_service.find_programmatic_sr_levels(df, symbol, exchange_id)
+
+    def find_local_sr_levels(self, df: pd.DataFrame, symbol: str, exchange_id: str, indexed: bool = True) -> dict:
+        """Poziomy S/R wyznaczone wyłącznie z przekazanej ramki (bez pobierania historii 1D)."""
+        return self._pattern_service.find_local_sr_levels(df, symbol, exchange_id, indexed=indexed)
     
     async def close_all_exchanges(self):
         """Deleguje zadanie zamknięcia wszystkich połączeń do serwisu giełd."""
@@ -2,7 +2,6 @@ import logging
 import pandas as pd
 import numpy as np
 import asyncio
-import ccxt.async_support as ccxt
 
 from core.settings_manager import SettingsManager
 from core.database_manager import DatabaseManager
@@ -20,12 +19,12 @@ class Backtester:
         self.fee_pct = self.settings.get('default_fee_pct', 0.1) / 100
         self.db_manager = DatabaseManager()
         # --- NOWOŚĆ: Tworzymy instancję analizatora do symulacji ---
-        self.analyzer = TechnicalAnalyzer(self.settings_manager, self.db_manager)
+        self.analyzer = TechnicalAnalyzer(self.settings_manager, self.db_manager, None)
         self._reset_state()
 
     def _reset_state(self):
         # ... (ta metoda pozostaje bez zmian) ...
-        self._data: pd.DataFrame = None; self._strategy: Strategy = None; self.trades = []; self.equity_curve = []
+        self._data: pd.DataFrame = None; self._symbol: str = ''; self._strategy: Strategy = None; self.trades = []; self.equity_curve = []
         self.initial_capital = 10000.0; self.equity = 10000.0; self.position_size = 0.0; self.entry_price = 0.0
         self.entry_date = None; self.position_type = 0; self.sl_price = 0.0; self.tp_price = 0.0
         self.tp1_price = 0.0; self.is_partially_closed = False; self.is_free_ride = False
@@ -35,8 +34,10 @@ class Backtester:
         i = self._strategy.i
         entry_price = self._data['Close'].iloc[i]
         
-        # Pobieramy "kandydatów" na TP - czyli poziomy oporu
-        sr_data = self.analyzer.pattern_service.find_programmatic_sr_levels(self._data.iloc[:i+1], self.analyzer.indicator_service)
+        # Pobieramy "kandydatów" na TP - czyli poziomy oporu. Tylko z danych do bieżącej świecy: dzisiejsze
+        # poziomy dzienne byłyby zajrzeniem w przyszłość, a ich pobieranie kosztowałoby zapytanie na transakcję.
+        # Każdy wycinek ma inną długość, więc indeks szczytów nie zostałby nigdy użyty ponownie - liczymy bez rejestru
+        sr_data = self.analyzer.find_local_sr_levels(self._data.iloc[:i+1], self._symbol, 'BINANCE', indexed=False)
         resistance_levels = sorted([r for r in sr_data.get('resistance', []) if r > entry_price])
         
         # Prosta logika wyboru:
@@ -113,45 +114,33 @@ class Backtester:
         self.position_type = 0; self.is_partially_closed = False; self.is_free_ride = False
     
     async def _fetch_data(self, symbol, timeframe, start_date, end_date):
-        local_data = self.db_manager.get_ohlcv(symbol, timeframe, start_date, end_date)
-        if local_data is not None and not local_data.empty:
-            start_dt, end_dt = pd.to_datetime(start_date), pd.to_datetime(end_date)
-            if local_data.index.min() <= start_dt and local_data.index.max() >= end_dt:
-                self._data = local_data
-                logger.info(f"Załadowano dane dla {symbol} z lokalnej bazy danych.")
-                return True
-
+        exchange_id = 'BINANCE' # Można tu dodać logikę wyboru giełdy
+        since = int(pd.Timestamp(f"{start_date}T00:00:00Z").value // 10**6)
+        end_ts = int(pd.Timestamp(f"{end_date}T23:59:59Z").value // 10**6)
         try:
             # ZMIANA: Pobieramy instancję giełdy z centralnego serwisu
-            exchange = await self.analyzer.get_exchange_instance('BINANCE') # Można tu dodać logikę wyboru giełdy
-            if not exchange:
+            exchange = await self.analyzer.get_exchange_instance(exchange_id)
+            if exchange:
+                # Dociągamy tylko brakujące fragmenty historii - równolegle, prosto do lokalnej bazy
+                await self.analyzer.download_history(exchange, symbol, timeframe, since, end_ts)
+            else:
                 logger.error("Nie udało się uzyskać instancji giełdy w Backtesterze.")
-                return False
-
-            since = exchange.parse8601(f"{start_date}T00:00:00Z")
-            end_ts = exchange.parse8601(f"{end_date}T23:59:59Z")
-            all_ohlcv = []
-
-            while since < end_ts:
-                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=1000)
-                if not ohlcv: break
-                all_ohlcv.extend(ohlcv)
-                since = ohlcv[-1][0] + 1
-                if len(ohlcv) < 1000: break
-
-            if not all_ohlcv: return False
-
-            df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df.columns = [c.capitalize() for c in df.columns]
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='ms')
-            df.set_index('Timestamp', inplace=True)
-            df.drop_duplicates(inplace=True)
-            self.db_manager.save_ohlcv(df, symbol, timeframe)
-            self._data = df[start_date:end_date]
-            return True
         except Exception as e:
             logger.error(f"Błąd pobierania danych z giełdy w Backtesterze: {e}")
+
+        # Nieudane pobieranie zostawia dziury - backtest na niepełnej historii dałby mylące wyniki.
+        # Kompletna historia w lokalnej bazie wystarcza nawet wtedy, gdy giełda jest niedostępna.
+        missing = self.analyzer.count_missing_history(exchange_id, symbol, timeframe, since, end_ts)
+        if missing:
+            logger.error(f"Historia {symbol} ({timeframe}) jest niepełna - brakuje {missing} świec. Przerywam backtest.")
+            return False
+
+        local_data = self.db_manager.get_ohlcv(symbol, timeframe, start_date, end_date)
+        if local_data is None or local_data.empty:
             return False
+        self._data = local_data
+        logger.info(f"Załadowano {len(local_data)} świec dla {symbol} z lokalnej bazy danych.")
+        return True
         
     def _calculate_results(self):
         if not self.trades: return {"Wiadomość": "Strategia nie wygenerowała żadnych transakcji."}, pd.DataFrame(), pd.Series()
@@ -167,7 +156,7 @@ class Backtester:
     @property
     def in_position(self): return self.position_type != 0
     async def run(self, strategy_class: type[Strategy], symbol, timeframe, start_date, end_date, initial_capital=10000.0):
-        self._reset_state(); self.initial_capital = initial_capital
+        self._reset_state(); self.initial_capital = initial_capital; self._symbol = symbol
         if not await self._fetch_data(symbol, timeframe, start_date, end_date): return {"Wiadomość": "Nie udało się pobrać danych."}, pd.DataFrame(), pd.Series()
         self._strategy = strategy_class(broker=self, data=self._data, settings_manager=self.settings_manager); self._strategy.init()
         loop = asyncio.get_event_loop(); await loop.run_in_executor(None, self._execute_loop)
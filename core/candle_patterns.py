@@ -0,0 +1,150 @@
+"""
+Silnik formacji świecowych liczący wyłącznie ostatnią świecę. Każda formacja deklaruje, ile świec wstecz potrzebuje,
+więc zamiast oceniać całą historię (jak df.ta.cdl_pattern(name="all")) silnik wycina tylko końcówki ramek
+- wszystkich symboli naraz, jako tablice (symbole x świece) - i ocenia każdą formację jednym wyrażeniem NumPy.
+Wynik formacji jak w TA-Lib: 100 (bycza), -100 (niedźwiedzia) albo 0.
+Reguły są uproszczonymi odpowiednikami formacji TA-Lib (bez średnich długości korpusów z wielu świec).
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class CandlePattern:
+    """Formacja: nazwa w ustawieniach, etykieta dla AI/UI, liczba potrzebnych świec i reguła dla ostatniej świecy."""
+    name: str
+    label: str
+    bars: int
+    detect: Callable[['CandleWindow'], np.ndarray]
+
+class CandleWindow:
+    """Końcówki świec wielu symboli jako tablice (symbole x świece); kolumna -1 to ostatnia świeca."""
+
+    def __init__(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        self.open, self.high, self.low, self.close = open_, high, low, close
+        self.body = np.abs(close - open_)
+        self.range = high - low
+        self.upper = high - np.maximum(open_, close)
+        self.lower = np.minimum(open_, close) - low
+        self.bullish = close > open_
+        self.bearish = close < open_
+
+def _signal(bullish: np.ndarray, bearish: Optional[np.ndarray] = None) -> np.ndarray:
+    result = np.where(bullish, 100, 0)
+    return result if bearish is None else np.where(bearish, -100, result)
+
+def _doji(w: CandleWindow) -> np.ndarray:
+    # Korpus poniżej 10% średniego zakresu ostatnich 10 świec (jak cdl_doji w pandas_ta)
+    return _signal(w.body[:, -1] < 0.1 * w.range[:, -10:].mean(axis=1))
+
+def _inside(w: CandleWindow) -> np.ndarray:
+    inside = (w.high[:, -1] < w.high[:, -2]) & (w.low[:, -1] > w.low[:, -2])
+    return _signal(inside & w.bullish[:, -1], inside & ~w.bullish[:, -1])
+
+def _engulfing(w: CandleWindow) -> np.ndarray:
+    larger = w.body[:, -1] > w.body[:, -2]
+    bullish = w.bearish[:, -2] & w.bullish[:, -1] & (w.open[:, -1] <= w.close[:, -2]) & (w.close[:, -1] >= w.open[:, -2]) & larger
+    bearish = w.bullish[:, -2] & w.bearish[:, -1] & (w.open[:, -1] >= w.close[:, -2]) & (w.close[:, -1] <= w.open[:, -2]) & larger
+    return _signal(bullish, bearish)
+
+def _harami(w: CandleWindow) -> np.ndarray:
+    smaller = w.body[:, -1] < w.body[:, -2]
+    bullish = w.bearish[:, -2] & w.bullish[:, -1] & (w.open[:, -1] >= w.close[:, -2]) & (w.close[:, -1] <= w.open[:, -2]) & smaller
+    bearish = w.bullish[:, -2] & w.bearish[:, -1] & (w.open[:, -1] <= w.close[:, -2]) & (w.close[:, -1] >= w.open[:, -2]) & smaller
+    return _signal(bullish, bearish)
+
+def _pin_bar(w: CandleWindow, long_shadow: np.ndarray, short_shadow: np.ndarray) -> np.ndarray:
+    """Mały korpus, cień co najmniej dwa razy dłuższy od korpusu i prawie brak cienia z drugiej strony."""
+    body, candle_range = w.body[:, -1], w.range[:, -1]
+    return (candle_range > 0) & (body <= 0.3 * candle_range) & (long_shadow >= 2 * body) & (short_shadow <= 0.1 * candle_range)
+
+def _hammer(w: CandleWindow) -> np.ndarray:
+    return _signal(_pin_bar(w, w.lower[:, -1], w.upper[:, -1]) & w.bearish[:, -2])
+
+def _shooting_star(w: CandleWindow) -> np.ndarray:
+    return _signal(np.zeros(len(w.close), dtype=bool), _pin_bar(w, w.upper[:, -1], w.lower[:, -1]) & w.bullish[:, -2])
+
+def _star(w: CandleWindow, morning: bool) -> np.ndarray:
+    first_long = w.body[:, -3] > 0.5 * w.range[:, -3]
+    small_middle = w.body[:, -2] <= 0.3 * w.body[:, -3]
+    midpoint = (w.open[:, -3] + w.close[:, -3]) / 2
+    if morning:
+        found = first_long & w.bearish[:, -3] & small_middle & (np.maximum(w.open[:, -2], w.close[:, -2]) < w.close[:, -3]) \
+            & w.bullish[:, -1] & (w.close[:, -1] > midpoint)
+        return _signal(found)
+    found = first_long & w.bullish[:, -3] & small_middle & (np.minimum(w.open[:, -2], w.close[:, -2]) > w.close[:, -3]) \
+        & w.bearish[:, -1] & (w.close[:, -1] < midpoint)
+    return _signal(np.zeros(len(found), dtype=bool), found)
+
+def _three_in_a_row(w: CandleWindow, soldiers: bool) -> np.ndarray:
+    o, c = w.open[:, -3:], w.close[:, -3:]
+    if soldiers:
+        # Trzy wzrostowe świece, każda otwiera się w korpusie poprzedniej i zamyka wyżej
+        found = w.bullish[:, -3:].all(axis=1) & (np.diff(c, axis=1) > 0).all(axis=1) \
+            & (o[:, 1:] > o[:, :-1]).all(axis=1) & (o[:, 1:] <= c[:, :-1]).all(axis=1)
+        return _signal(found)
+    found = w.bearish[:, -3:].all(axis=1) & (np.diff(c, axis=1) < 0).all(axis=1) \
+        & (o[:, 1:] < o[:, :-1]).all(axis=1) & (o[:, 1:] >= c[:, :-1]).all(axis=1)
+    return _signal(np.zeros(len(found), dtype=bool), found)
+
+def _marubozu(w: CandleWindow) -> np.ndarray:
+    full = (w.range[:, -1] > 0) & (w.body[:, -1] >= 0.95 * w.range[:, -1])
+    return _signal(full & w.bullish[:, -1], full & w.bearish[:, -1])
+
+CANDLE_PATTERNS: Dict[str, CandlePattern] = {pattern.name: pattern for pattern in (
+    CandlePattern('doji', 'Doji', 10, _doji),
+    CandlePattern('inside', 'Inside Bar', 2, _inside),
+    CandlePattern('engulfing', 'Engulfing', 2, _engulfing),
+    CandlePattern('harami', 'Harami', 2, _harami),
+    CandlePattern('hammer', 'Hammer', 2, _hammer),
+    CandlePattern('shooting_star', 'Shooting Star', 2, _shooting_star),
+    CandlePattern('morning_star', 'Morning Star', 3, lambda w: _star(w, morning=True)),
+    CandlePattern('evening_star', 'Evening Star', 3, lambda w: _star(w, morning=False)),
+    CandlePattern('three_white_soldiers', 'Three White Soldiers', 3, lambda w: _three_in_a_row(w, soldiers=True)),
+    CandlePattern('three_black_crows', 'Three Black Crows', 3, lambda w: _three_in_a_row(w, soldiers=False)),
+    CandlePattern('marubozu', 'Marubozu', 1, _marubozu),
+)}
+
+class CandlePatternEngine:
+    """Ocenia formacje z białej listy na ostatniej świecy jednej lub wielu ramek."""
+
+    def __init__(self, patterns: Optional[Iterable[str]] = None):
+        names = list(CANDLE_PATTERNS) if patterns is None else list(patterns)
+        unknown = [name for name in names if name not in CANDLE_PATTERNS]
+        for name in unknown: logger.warning(f"Nieznana formacja świecowa '{name}' - pomijam.")
+        self.patterns: List[CandlePattern] = [CANDLE_PATTERNS[name] for name in names if name in CANDLE_PATTERNS]
+        self.bars = max((pattern.bars for pattern in self.patterns), default=0)
+
+    def window(self, frames: Iterable[pd.DataFrame]) -> CandleWindow:
+        """Ostatnie 'bars' świec każdej ramki; krótsze ramki są dopełniane z przodu NaN (formacja wtedy nie występuje)."""
+        frames = list(frames)
+        arrays = {col: np.full((len(frames), self.bars), np.nan) for col in ('Open', 'High', 'Low', 'Close')}
+        for row, df in enumerate(frames):
+            count = min(self.bars, len(df))
+            if not count: continue
+            for col, array in arrays.items(): array[row, self.bars - count:] = df[col].to_numpy(dtype=np.float64)[-count:]
+        return CandleWindow(arrays['Open'], arrays['High'], arrays['Low'], arrays['Close'])
+
+    def evaluate(self, window: CandleWindow) -> Dict[str, np.ndarray]:
+        """Sygnał każdej formacji (100 / -100 / 0) dla każdego wiersza okna."""
+        with np.errstate(invalid='ignore'):
+            return {pattern.name: pattern.detect(window) for pattern in self.patterns}
+
+    def scan(self, frames: Dict[Hashable, pd.DataFrame]) -> Dict[Hashable, Dict[str, int]]:
+        """Niezerowe sygnały formacji na ostatniej świecy każdej ramki, w kolejności białej listy."""
+        keys = list(frames)
+        if not keys or not self.patterns: return {key: {} for key in keys}
+        signals = self.evaluate(self.window(frames[key] for key in keys))
+        found = {key: {} for key in keys}
+        for name, values in signals.items():
+            for row in np.flatnonzero(values):
+                found[keys[row]][name] = int(values[row])
+        return found
+
+    def labels(self, signals: Dict[str, int]) -> List[str]:
+        return [CANDLE_PATTERNS[name].label for name in signals]
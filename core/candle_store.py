@@ -0,0 +1,34 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+from core.database_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+class CandleStore:
+    """
+    Lokalny magazyn świec typu read-through, oparty o tabelę 'ohlcv' w DatabaseManager.
+    ExchangeService czyta z niego historię i dopytuje giełdę tylko o świece
+    nowsze niż ostatnia zapisana.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    def load_recent(self, exchange_id: str, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        """Zwraca 'limit' najnowszych zapisanych świec lub None, gdy magazyn jest pusty."""
+        return self.db_manager.get_latest_ohlcv(symbol, interval, exchange_id, limit)
+
+    def save(self, exchange_id: str, symbol: str, interval: str, df: pd.DataFrame):
+        """Zapisuje (nadpisując) świece - ostatnia z nich mogła nie być jeszcze zamknięta."""
+        if df is None or df.empty: return
+        self.db_manager.save_ohlcv(df, symbol, interval, exchange=exchange_id, replace=True)
+
+    @staticmethod
+    def is_contiguous(df: pd.DataFrame, timeframe_ms: int) -> bool:
+        """Sprawdza, czy w zapisanej historii nie ma dziur (kolejne świece co dokładnie jeden interwał)."""
+        if df is None or len(df) < 2: return True
+        timestamps_ms = df.index.values.astype('datetime64[ms]').astype('int64')
+        return bool((np.diff(timestamps_ms) == timeframe_ms).all())
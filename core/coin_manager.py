@@ -61,7 +61,7 @@ class CoinManager:
         async def fetch_from(exchange_id: str):
             try:
                 # Pobieramy instancję giełdy z naszego centralnego Analyzera
-                exchange = await self.analyzer.exchange_service.get_exchange_instance(exchange_id)
+                exchange = await self.analyzer.get_exchange_instance(exchange_id)
                 if not exchange: return
 
                 markets = await exchange.load_markets()
@@ -0,0 +1,132 @@
+"""
+Prefetcher kontekstu rynkowego dla listy obserwowanej skanera Ssnedam. Przy każdym zamknięciu świecy interwału
+alertów liczy w tle - równolegle dla wszystkich symboli aktywnej grupy - status pędu, metryki dzienne, dane on-chain
+i trend średnioterminowy, więc pipeline AI po trafieniu skanera bierze kontekst z pamięci zamiast
+czekać na zapytania do giełdy. Wpis jest ważny do zamknięcia następnej świecy interwału.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.indicator_service import IndicatorKeyGenerator
+from core.ohlcv_cache import next_candle_close_ms
+from app_config import CONTEXT_PREFETCH_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PrefetchedContext:
+    """Kontekst symbolu policzony po zamknięciu świecy 'interval'; ważny do 'expires_at_ms'."""
+    symbol: str
+    exchange: str
+    interval: str
+    expires_at_ms: int
+    market_momentum_status: str = "NEUTRALNY"
+    daily_metrics: Dict[str, Any] = field(default_factory=lambda: {'atr_percent': None, 'dist_from_ema200': None})
+    onchain_data: Dict[str, Any] = field(default_factory=dict)
+    intermediate_trend: str = "BRAK_DANYCH"
+    trend_candle_ms: Optional[int] = None # Otwarcie ostatniej świecy ramki, z której wyznaczono trend
+
+    def trend_matches(self, df) -> bool:
+        """Czy trend policzono na ramce kończącej się tą samą świecą co 'df' (inaczej jest nieaktualny)."""
+        return self.trend_candle_ms is not None and df is not None and not df.empty and int(df.index[-1].value // 10**6) == self.trend_candle_ms
+
+class ContextPrefetcher:
+    """Pamięć kontekstów (giełda, symbol) odświeżana przy zamknięciu świecy interwału alertów."""
+
+    def __init__(self, context_service, max_concurrency: int = CONTEXT_PREFETCH_CONCURRENCY):
+        self.context_service = context_service
+        self.max_concurrency = max(1, max_concurrency)
+        self._contexts: Dict[Tuple[str, str], PrefetchedContext] = {}
+        self.is_running = False
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+    def get(self, exchange_id: str, symbol: str, now_ms: Optional[int] = None) -> Optional[PrefetchedContext]:
+        """Kontekst z ostatniego zamknięcia świecy albo None, gdy go nie ma lub wygasł."""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        context = self._contexts.get((exchange_id, symbol))
+        if context is None or now_ms >= context.expires_at_ms:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return context
+
+    async def prefetch(self, coins: List[Dict[str, str]], interval: str, now_ms: Optional[int] = None) -> int:
+        """Liczy kontekst wszystkich coinów (najwyżej 'max_concurrency' naraz) i zwraca liczbę zapisanych wpisów."""
+        expires_at_ms = next_candle_close_ms(interval, now_ms)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def prefetch_one(coin: Dict[str, str]) -> bool:
+            async with semaphore:
+                try:
+                    context = await self._build(coin['symbol'], coin['exchange'], interval, expires_at_ms)
+                except Exception as e:
+                    logger.warning(f"[Prefetch] Nie udało się przygotować kontekstu dla {coin.get('symbol')}: {e}")
+                    return False
+                self._contexts[(coin['exchange'], coin['symbol'])] = context
+                return True
+
+        stored = sum(await asyncio.gather(*[prefetch_one(coin) for coin in coins]))
+        self.prefetched += stored
+        logger.info(f"[Prefetch] Przygotowano kontekst dla {stored}/{len(coins)} coinów (interwał {interval}).")
+        return stored
+
+    async def _build(self, symbol: str, exchange_id: str, interval: str, expires_at_ms: int) -> PrefetchedContext:
+        service = self.context_service
+        results = await asyncio.gather(
+            service.get_market_momentum_status(symbol, exchange_id),
+            service.get_daily_metrics(symbol, exchange_id),
+            service.get_onchain_context(symbol, exchange_id),
+            self._intermediate_trend(symbol, exchange_id, interval),
+            return_exceptions=True
+        )
+        context = PrefetchedContext(symbol=symbol, exchange=exchange_id, interval=interval, expires_at_ms=expires_at_ms)
+        if not isinstance(results[-1], Exception):
+            results[-1], context.trend_candle_ms = results[-1]
+        names = ('market_momentum_status', 'daily_metrics', 'onchain_data', 'intermediate_trend')
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.warning(f"[Prefetch] {symbol}: '{name}' niedostępne ({result}).")
+            elif result is not None:
+                setattr(context, name, result)
+        return context
+
+    async def _intermediate_trend(self, symbol: str, exchange_id: str, interval: str) -> Tuple[str, Optional[int]]:
+        """Trend średnioterminowy i otwarcie (ms) ostatniej świecy ramki, z której go wyznaczono."""
+        service = self.context_service
+        exchange = await service.exchange_service.get_exchange_instance(exchange_id)
+        if not exchange: return "BRAK_DANYCH", None
+        df = await service.exchange_service.fetch_ohlcv(exchange, symbol, interval)
+        if df is None or df.empty: return "BRAK_DANYCH", None
+        keys = IndicatorKeyGenerator(service.settings.get('analysis.indicator_params', {}))
+        df = service.indicator_service.calculate_all(df, indicators=[keys.ema(fast=True), keys.macd(), keys.macd_signal()])
+        return service.get_intermediate_trend_status(df), int(df.index[-1].value // 10**6)
+
+    async def start(self, coins_provider: Callable[[], List[Dict[str, str]]]):
+        """Pętla w tle: prefetch od razu, a potem po każdym zamknięciu świecy interwału alertów Ssnedam."""
+        if self.is_running: return
+        self.is_running = True
+        logger.info("[Prefetch] Uruchamianie pętli prefetchu kontekstu...")
+        while self.is_running:
+            interval = self.context_service.settings.get('ssnedam.alert_interval', '1h')
+            try:
+                coins = coins_provider()
+                if coins: await self.prefetch(coins, interval)
+            except Exception as e:
+                logger.error(f"[Prefetch] Niespodziewany błąd w pętli: {e}", exc_info=True)
+            # Kilka sekund po zamknięciu świecy, żeby giełda zdążyła ją domknąć
+            now_ms = int(time.time() * 1000)
+            await asyncio.sleep((next_candle_close_ms(interval, now_ms) - now_ms) / 1000 + 5)
+
+    def stop(self):
+        self.is_running = False
+
+    def clear(self):
+        self._contexts.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"symbols": len(self._contexts), "hits": self.hits, "misses": self.misses, "prefetched": self.prefetched}
@@ -3,15 +3,16 @@ import logging
 import pandas as pd
 import httpx
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
 from core.settings_manager import SettingsManager
 from core.exchange_service import ExchangeService
 from core.indicator_service import IndicatorService, IndicatorKeyGenerator
 from core.database_manager import DatabaseManager
 from core.data_models import ContextData
-from app_config import MARKET_REGIME_SYMBOLS
-from app_config import RELATIVE_STRENGTH_BASE_SYMBOL, RELATIVE_STRENGTH_LOOKBACK_DAYS
+from core.regime_service import MarketRegimeService
+from core.context_prefetcher import ContextPrefetcher
+from app_config import RELATIVE_STRENGTH_BASE_SYMBOL, RELATIVE_STRENGTH_LOOKBACK_DAYS, CONTEXT_PREFETCH_CONCURRENCY
 
 logger = logging.getLogger(__name__)
 
@@ -23,47 +24,12 @@ class ContextService:
         self.exchange_service = exchange_service
         self.indicator_service = indicator_service
         self.db_manager = db_manager
+        self.market_regime = MarketRegimeService(settings_manager, exchange_service, indicator_service, db_manager)
+        self.prefetcher = ContextPrefetcher(self, settings_manager.get('ssnedam.prefetch_concurrency', CONTEXT_PREFETCH_CONCURRENCY))
 
     async def get_market_regime(self, exchange_id: str = "BINANCE") -> str:
-        try:
-            exchange = await self.exchange_service.get_exchange_instance(exchange_id)
-            if not exchange: return "KONSOLIDACJA"
-            
-            assets = MARKET_REGIME_SYMBOLS
-            tasks = [self.exchange_service.fetch_ohlcv(exchange, asset, '1d', limit=51) for asset in assets]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            scores = []
-            for df in results:
-                if isinstance(df, Exception) or df is None or df.empty or len(df) < 50:
-                    scores.append(0); continue
-                
-                df = self.indicator_service.calculate_all(df)
-                df.dropna(inplace=True)
-                if df.empty:
-                    scores.append(0); continue
-
-                last_candle = df.iloc[-1]
-                price = last_candle['Close']
-                ema_fast_key = next((col for col in df.columns if 'EMA_50' in col), None) # Używamy standardowej szybkiej
-                ema_slow_key = next((col for col in df.columns if 'EMA_200' in col), None)# Używamy standardowej wolnej
-
-                if not ema_fast_key or not ema_slow_key or ema_fast_key not in last_candle or ema_slow_key not in last_candle:
-                    scores.append(0); continue
-                
-                ema_fast, ema_slow = last_candle[ema_fast_key], last_candle[ema_slow_key]
-                
-                if price > ema_fast and ema_fast > ema_slow: scores.append(1)
-                elif price < ema_fast and ema_fast < ema_slow: scores.append(-1)
-                else: scores.append(0)
-            
-            total_score = sum(scores)
-            if total_score >= 2: return "RYNEK_BYKA"
-            elif total_score <= -2: return "RYNEK_NIEDZWIEDZIA"
-            else: return "KONSOLIDACJA"
-        except Exception as e:
-            logger.error(f"Błąd podczas analizy reżimu rynkowego: {e}")
-            return "KONSOLIDACJA"
+        """Reżim rynkowy z migawki bieżącego okresu (liczonej raz na dzienne zamknięcie, wspólnej dla wszystkich konsumentów)."""
+        return await self.market_regime.get_regime(exchange_id)
 
     async def get_market_momentum_status(self, symbol: str, exchange: str) -> str:
         try:
@@ -73,14 +39,14 @@ class ContextService:
             df_daily = await self.exchange_service.fetch_ohlcv(exchange_instance, symbol, '1d')
             if df_daily is None or df_daily.empty or len(df_daily) < 21: return "NEUTRALNY"
 
-            df_daily = self.indicator_service.calculate_all(df_daily)
+            params = self.settings.get('analysis.indicator_params', {})
+            keys = IndicatorKeyGenerator(params)
+            df_daily = self.indicator_service.calculate_all(df_daily, indicators=[keys.ema(fast=True), keys.rsi(), keys.bbands_upper()])
             df_daily.dropna(inplace=True)
             if df_daily.empty: return "NEUTRALNY"
 
             last_candle = df_daily.iloc[-1]
             price = last_candle['Close']
-            params = self.settings.get('analysis.indicator_params', {})
-            keys = IndicatorKeyGenerator(params)
             
             ema_fast_key = keys.ema(fast=True)
             if ema_fast_key not in last_candle: return "NEUTRALNY"
@@ -145,8 +111,8 @@ class ContextService:
                 return "BRAK_DANYCH"
             
             order_book, trades = await asyncio.gather(
-                exchange.fetch_l2_order_book(symbol, limit=100),
-                exchange.fetch_trades(symbol, limit=100),
+                self.exchange_service.fetch_order_book(exchange, symbol, limit=100),
+                self.exchange_service.fetch_trades(exchange, symbol, limit=100),
                 return_exceptions=True
             )
             if isinstance(order_book, Exception) or isinstance(trades, Exception): return "BRAK_DANYCH"
@@ -195,8 +161,8 @@ class ContextService:
 
             exchange.options['defaultType'] = 'swap'
             
-            oi_task = exchange.fetch_open_interest(symbol)
-            fr_task = exchange.fetch_funding_rate(symbol)
+            oi_task = self.exchange_service.fetch_open_interest(exchange, symbol)
+            fr_task = self.exchange_service.fetch_funding_rate(exchange, symbol)
             results = await asyncio.gather(oi_task, fr_task, return_exceptions=True)
 
             if not isinstance(results[0], Exception):
@@ -240,8 +206,8 @@ class ContextService:
 
             exchange_instance.options['defaultType'] = 'swap'
             oi_data, funding_data = await asyncio.gather(
-                exchange_instance.fetch_open_interest(symbol),
-                exchange_instance.fetch_funding_rate(symbol),
+                self.exchange_service.fetch_open_interest(exchange_instance, symbol),
+                self.exchange_service.fetch_funding_rate(exchange_instance, symbol),
                 return_exceptions=True
             )
             
@@ -287,24 +253,33 @@ class ContextService:
             ohlcv_4h = await self.exchange_service.fetch_ohlcv(exchange_instance, symbol, '4h')
             if ohlcv_4h is None or ohlcv_4h.empty: return "B/D"
 
-            self.indicator_service.calculate_all(ohlcv_1h)
-            self.indicator_service.calculate_all(ohlcv_4h)
+            needed = self._recommendation_indicators()
+            return self._recommendation_from_frames(self.indicator_service.calculate_all(ohlcv_1h, needed), self.indicator_service.calculate_all(ohlcv_4h, needed))
+        except Exception as e:
+            logger.warning(f"Nie udało się wygenerować prostej rekomendacji dla {symbol}: {e}", exc_info=True)
+            return "Błąd"
 
-            keys = IndicatorKeyGenerator(self.settings.get('analysis.indicator_params', {}))
-            ema_key = keys.ema(fast=True)
+    def _recommendation_indicators(self) -> List[str]:
+        return [IndicatorKeyGenerator(self.settings.get('analysis.indicator_params', {})).ema(fast=True)]
 
-            if ema_key not in ohlcv_1h.columns or ema_key not in ohlcv_4h.columns: return "Błąd"
+    def _daily_metrics_indicators(self) -> List[str]:
+        keys = IndicatorKeyGenerator(self.settings.get('analysis.indicator_params', {}))
+        return [keys.atr(), keys.ema(fast=False)]
 
-            last_close_1h, last_ema_1h = ohlcv_1h['Close'].iloc[-1], ohlcv_1h[ema_key].iloc[-1]
-            last_close_4h, last_ema_4h = ohlcv_4h['Close'].iloc[-1], ohlcv_4h[ema_key].iloc[-1]
+    def _recommendation_from_frames(self, ohlcv_1h: pd.DataFrame, ohlcv_4h: pd.DataFrame) -> str:
+        """Rekomendacja na podstawie położenia ceny względem szybkiej EMA na 1h i 4h (ramki z policzonymi wskaźnikami)."""
+        keys = IndicatorKeyGenerator(self.settings.get('analysis.indicator_params', {}))
+        ema_key = keys.ema(fast=True)
+
+        if ema_key not in ohlcv_1h.columns or ema_key not in ohlcv_4h.columns: return "Błąd"
+
+        last_close_1h, last_ema_1h = ohlcv_1h['Close'].iloc[-1], ohlcv_1h[ema_key].iloc[-1]
+        last_close_4h, last_ema_4h = ohlcv_4h['Close'].iloc[-1], ohlcv_4h[ema_key].iloc[-1]
+
+        if last_close_1h > last_ema_1h and last_close_4h > last_ema_4h: return "KUPUJ"
+        elif last_close_1h < last_ema_1h and last_close_4h < last_ema_4h: return "SPRZEDAJ"
+        else: return "NEUTRALNIE"
 
-            if last_close_1h > last_ema_1h and last_close_4h > last_ema_4h: return "KUPUJ"
-            elif last_close_1h < last_ema_1h and last_close_4h < last_ema_4h: return "SPRZEDAJ"
-            else: return "NEUTRALNIE"
-        except Exception as e:
-            logger.warning(f"Nie udało się wygenerować prostej rekomendacji dla {symbol}: {e}", exc_info=True)
-            return "Błąd"
-        
     async def get_daily_metrics(self, symbol: str, exchange: str) -> Dict[str, Any]:
         metrics = {'atr_percent': None, 'dist_from_ema200': None}
         try:
@@ -314,25 +289,61 @@ class ContextService:
             df_daily = await self.exchange_service.fetch_ohlcv(exchange_instance, symbol, '1d')
             if df_daily is None or df_daily.empty or len(df_daily) < 200: return metrics
 
-            df_daily = self.indicator_service.calculate_all(df_daily)
-            last_candle = df_daily.iloc[-1]
-            price = last_candle['Close']
-            keys = IndicatorKeyGenerator(self.settings.get('analysis.indicator_params', {}))
-
-            atr_key = keys.atr()
-            if atr_key in last_candle and pd.notna(last_candle[atr_key]):
-                atr_value = last_candle[atr_key]
-                if price > 0: metrics['atr_percent'] = (atr_value / price) * 100
-
-            ema_key = keys.ema(fast=False)
-            if ema_key in last_candle and pd.notna(last_candle[ema_key]):
-                ema200 = last_candle[ema_key]
-                if ema200 > 0: metrics['dist_from_ema200'] = ((price - ema200) / ema200) * 100
-            return metrics
+            return self._daily_metrics_from_frame(self.indicator_service.calculate_all(df_daily, self._daily_metrics_indicators()))
         except Exception as e:
             logger.warning(f"Nie udało się obliczyć metryk dziennych dla {symbol}: {e}")
             return metrics
-        
+
+    def _daily_metrics_from_frame(self, df_daily: pd.DataFrame) -> Dict[str, Any]:
+        """ATR% i dystans od wolnej EMA liczone z ostatniej świecy dziennej ramki z wskaźnikami."""
+        metrics = {'atr_percent': None, 'dist_from_ema200': None}
+        last_candle = df_daily.iloc[-1]
+        price = last_candle['Close']
+        keys = IndicatorKeyGenerator(self.settings.get('analysis.indicator_params', {}))
+
+        atr_key = keys.atr()
+        if atr_key in last_candle and pd.notna(last_candle[atr_key]):
+            atr_value = last_candle[atr_key]
+            if price > 0: metrics['atr_percent'] = (atr_value / price) * 100
+
+        ema_key = keys.ema(fast=False)
+        if ema_key in last_candle and pd.notna(last_candle[ema_key]):
+            ema200 = last_candle[ema_key]
+            if ema200 > 0: metrics['dist_from_ema200'] = ((price - ema200) / ema200) * 100
+        return metrics
+
+    async def get_dashboard_metrics_batch(self, coins: List[Dict[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Prosta rekomendacja i metryki dzienne dla całej listy coinów. Świece są pobierane równolegle,
+        a wskaźniki liczone wsadowo (po jednym przebiegu na interwał) zamiast osobno dla każdego symbolu.
+        Zwraca słownik (giełda, symbol) -> {'bot_reco': ..., 'daily_metrics': ...}.
+        """
+        async def fetch_frames(coin: Dict[str, str]) -> Dict[str, Optional[pd.DataFrame]]:
+            exchange_instance = await self.exchange_service.get_exchange_instance(coin['exchange'])
+            if not exchange_instance: return {}
+            frames = await asyncio.gather(*[self.exchange_service.fetch_ohlcv(exchange_instance, coin['symbol'], interval) for interval in ('1h', '4h', '1d')], return_exceptions=True)
+            return {interval: (None if isinstance(df, Exception) else df) for interval, df in zip(('1h', '4h', '1d'), frames)}
+
+        coin_keys = [(coin['exchange'], coin['symbol']) for coin in coins]
+        fetched = await asyncio.gather(*[fetch_frames(coin) for coin in coins], return_exceptions=True)
+        frames_by_interval: Dict[str, Dict[Tuple[str, str], pd.DataFrame]] = {'1h': {}, '4h': {}, '1d': {}}
+        for coin_key, frames in zip(coin_keys, fetched):
+            if isinstance(frames, Exception):
+                logger.warning(f"Nie udało się pobrać świec dla {coin_key[1]}: {frames}"); continue
+            for interval, df in frames.items():
+                if df is not None and not df.empty: frames_by_interval[interval][coin_key] = df
+
+        needed = {'1h': self._recommendation_indicators(), '4h': self._recommendation_indicators(), '1d': self._daily_metrics_indicators()}
+        with_indicators = {interval: self.indicator_service.calculate_batch(frames, needed[interval]) for interval, frames in frames_by_interval.items()}
+
+        results = {}
+        for coin_key in coin_keys:
+            df_1h, df_4h, df_1d = (with_indicators[interval].get(coin_key) for interval in ('1h', '4h', '1d'))
+            bot_reco = "B/D" if df_1h is None or df_4h is None else self._recommendation_from_frames(df_1h, df_4h)
+            daily_metrics = self._daily_metrics_from_frame(df_1d) if df_1d is not None and len(df_1d) >= 200 else {'atr_percent': None, 'dist_from_ema200': None}
+            results[coin_key] = {'bot_reco': bot_reco, 'daily_metrics': daily_metrics}
+        return results
+
     def get_mean_reversion_status(self, df_with_indicators: pd.DataFrame) -> str:
         """Analizuje DF pod kątem potencjału do powrotu do średniej na podstawie RSI."""
         if df_with_indicators is None or df_with_indicators.empty:
@@ -356,17 +367,22 @@ class ContextService:
         else:
             return "Brak sygnału powrotu do średniej"
         
-    async def get_full_context(self, symbol: str, exchange_id: str, df_with_indicators: pd.DataFrame) -> ContextData:
+    async def get_full_context(self, symbol: str, exchange_id: str, df_with_indicators: pd.DataFrame, timeframe: Optional[str] = None) -> ContextData:
         """
         Zbiera wszystkie dane kontekstowe i zwraca je jako pojedynczy obiekt.
+        Dla symboli z kontekstem przygotowanym przez prefetcher (lista obserwowana Ssnedam) pęd i dane on-chain
+        pochodzą z pamięci, a trend średnioterminowy także - jeśli 'timeframe' to interwał prefetchu, a ramka kończy się
+        tą samą świecą co ramka prefetchu (nowsza świeca oznacza, że trend z prefetchu jest już nieaktualny).
         """
+        prefetched = self.prefetcher.get(exchange_id, symbol)
         # Uruchamiamy zadania, które mogą działać równolegle
         tasks = {
             "market_regime": self.get_market_regime(exchange_id),
-            "order_flow": self.analyze_order_flow_strength(symbol, exchange_id),
-            "market_momentum": self.get_market_momentum_status(symbol, exchange_id),
-            "onchain": self.get_onchain_context(symbol, exchange_id)
+            "order_flow": self.analyze_order_flow_strength(symbol, exchange_id)
         }
+        if prefetched is None:
+            tasks["market_momentum"] = self.get_market_momentum_status(symbol, exchange_id)
+            tasks["onchain"] = self.get_onchain_context(symbol, exchange_id)
         results = await asyncio.gather(*tasks.values(), return_exceptions=True)
         
         # Przypisujemy wyniki, obsługując ewentualne błędy
@@ -376,7 +392,10 @@ class ContextService:
             return res if not isinstance(res, Exception) else default
 
         # Obliczenia, które zależą od DataFrame, wykonujemy synchronicznie
-        intermediate_trend = self.get_intermediate_trend_status(df_with_indicators)
+        if prefetched is not None and timeframe == prefetched.interval and prefetched.trend_matches(df_with_indicators):
+            intermediate_trend = prefetched.intermediate_trend
+        else:
+            intermediate_trend = self.get_intermediate_trend_status(df_with_indicators)
         approach_momentum = self.analyze_approach_momentum(df_with_indicators)
         mean_reversion = self.get_mean_reversion_status(df_with_indicators)
         
@@ -384,8 +403,8 @@ class ContextService:
         return ContextData(
             market_regime=get_res("market_regime", "KONSOLIDACJA"),
             order_flow_status=get_res("order_flow", "BRAK_DANYCH"),
-            market_momentum_status=get_res("market_momentum", "NEUTRALNY"),
-            onchain_data=get_res("onchain", {}),
+            market_momentum_status=prefetched.market_momentum_status if prefetched else get_res("market_momentum", "NEUTRALNY"),
+            onchain_data=prefetched.onchain_data if prefetched else get_res("onchain", {}),
             intermediate_trend=intermediate_trend,
             approach_momentum_status=approach_momentum,
             mean_reversion_status=mean_reversion,
@@ -403,7 +422,7 @@ class ContextService:
 
             # Upewniamy się, że pytamy o kontrakty (swap)
             exchange.options['defaultType'] = 'swap'
-            ratio_data = await exchange.fetch_long_short_ratio(symbol)
+            ratio_data = await self.exchange_service.fetch_long_short_ratio(exchange, symbol)
             
             # 'longShortRatio' to klucz używany przez ccxt
             if ratio_data and 'longShortRatio' in ratio_data:
@@ -19,6 +19,7 @@ from core.ai_pipeline import AIPipeline
 from core.ssnedam import Ssnedam
 from core.dashboard_handler import DashboardHandler
 from core.paper_trader import PaperTrader
+from core.market_stream import MarketStream, ReplayFeed
 
 logger = logging.getLogger(__name__)
 
@@ -56,16 +57,30 @@ class CoreServices:
         # ZMIANA: Przekazujemy pulę wątków do CoinManagera
         self.coin_manager = CoinManager(db_client=self.db, auth_admin_client=self.auth_admin_client, analyzer=self.analyzer, thread_pool=self.thread_pool)
         self.ai_pipeline = AIPipeline(analyzer=self.analyzer, ai_client=self.ai_client, db_manager=self.db_manager, performance_analyzer=self.performance_analyzer)
-        self.ssnedam = Ssnedam(analyzer=self.analyzer, ai_client=self.ai_client, performance_analyzer=self.performance_analyzer, news_client=self.news_client, db_manager=self.db_manager, ai_pipeline=self.ai_pipeline, global_analysis_lock=self.global_analysis_lock, queue_update_callback=lambda size: None, status_update_callback=lambda text, busy: None)
+        self.market_stream = self._create_market_stream()
+        self.ssnedam = Ssnedam(analyzer=self.analyzer, ai_client=self.ai_client, performance_analyzer=self.performance_analyzer, news_client=self.news_client, db_manager=self.db_manager, ai_pipeline=self.ai_pipeline, global_analysis_lock=self.global_analysis_lock, queue_update_callback=lambda size: None, status_update_callback=lambda text, busy: None, market_stream=self.market_stream)
         self.dashboard_handler = DashboardHandler(self.analyzer, self.thread_pool)
-        self.paper_trader = PaperTrader(self.db_manager, self.analyzer, self.global_analysis_lock)
+        self.paper_trader = PaperTrader(self.db_manager, self.analyzer, self.global_analysis_lock, market_stream=self.market_stream)
         
         logger.info("Wszystkie serwisy rdzenia zostały pomyślnie zainicjalizowane.")
 
+    def _create_market_stream(self):
+        """Tworzy podsystem strumieniowy, jeśli został włączony w ustawieniach."""
+        if not self.settings_manager.get('streaming.enabled', False):
+            return None
+        if self.settings_manager.get('streaming.source', 'exchange') == 'replay':
+            replay_url = self.settings_manager.get('streaming.replay_url', 'ws://127.0.0.1:8765/ws')
+            logger.info(f"Strumień danych rynkowych z serwera powtórek: {replay_url}")
+            return MarketStream(feed_factory=lambda exchange_id: ReplayFeed(replay_url), indicator_engine_factory=self.analyzer.create_incremental_indicator_engine)
+        return MarketStream(indicator_engine_factory=self.analyzer.create_incremental_indicator_engine)
+
     async def shutdown(self):
         logger.info("Rozpoczynanie sekwencji zamykania serwisów rdzenia...")
         self.paper_trader.stop()
+        self.analyzer.market_regime.stop()
+        self.analyzer.context_prefetcher.stop()
         shutdown_tasks = [ self.ssnedam.close(), self.analyzer.close_all_exchanges() ]
+        if self.market_stream is not None: shutdown_tasks.append(self.market_stream.close())
         await asyncio.gather(*shutdown_tasks, return_exceptions=True)
         self.db_manager.close()
         
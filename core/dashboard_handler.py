@@ -1,12 +1,13 @@
 import asyncio
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
 import json
 from app_config import DASHBOARD_CACHE_LIFETIME_SECONDS
 # Upewnij się, że biblioteka jest zainstalowana: pip install tradingview_ta
 from tradingview_ta import TA_Handler, Interval
 from core.analyzer import TechnicalAnalyzer
+from core.request_scheduler import RequestPriority, request_priority
 from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
@@ -31,12 +32,24 @@ class DashboardHandler:
         semaphore = asyncio.Semaphore(3)
 
         # Tworzymy funkcję pomocniczą, która "opakowuje" nasze zadanie w semafor
-        async def fetch_with_semaphore(coin):
+        async def fetch_with_semaphore(coin, tickers, metrics):
             async with semaphore:
-                return await self._get_single_coin_summary(coin)
+                return await self._get_single_coin_summary(coin, tickers.get(coin['symbol']), metrics)
 
-        tasks = [fetch_with_semaphore(coin) for coin in coins]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Odświeżenie dashboardu ustępuje pierwszeństwa PaperTraderowi i skanerowi alertów
+        with request_priority(RequestPriority.DASHBOARD):
+            ticker_snapshots = await self._fetch_ticker_snapshots(coins)
+            try:
+                # Rekomendacje i metryki dzienne dla wszystkich coinów - wskaźniki liczone wsadowo
+                batch_metrics = await self.analyzer.get_dashboard_metrics_batch(coins)
+            except Exception as e:
+                logger.warning(f"Nie udało się policzyć metryk dashboardu wsadowo: {e}. Liczę osobno dla każdego coina.")
+                batch_metrics = {}
+            tasks = [
+                fetch_with_semaphore(coin, ticker_snapshots.get(coin['exchange'], {}), batch_metrics.get((coin['exchange'], coin['symbol'])))
+                for coin in coins
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
 
         valid_results = []
         for i, res in enumerate(results):
@@ -46,9 +59,32 @@ class DashboardHandler:
                 valid_results.append(res)
         return valid_results
 
-    async def _get_single_coin_summary(self, coin: Dict[str, str]) -> Dict[str, Any]:
+    async def _fetch_ticker_snapshots(self, coins: List[Dict[str, str]]) -> Dict[str, Dict[str, dict]]:
+        """Pobiera jeden zbiorczy snapshot tickerów na giełdę zamiast osobnego zapytania dla każdego coina."""
+        symbols_by_exchange: Dict[str, List[str]] = {}
+        for coin in coins:
+            symbols_by_exchange.setdefault(coin['exchange'], []).append(coin['symbol'])
+
+        async def fetch_snapshot(exchange_id: str, symbols: List[str]) -> Dict[str, dict]:
+            exchange_instance = await self.analyzer.get_exchange_instance(exchange_id)
+            if not exchange_instance: return {}
+            return await self.analyzer.fetch_tickers_snapshot(exchange_instance, symbols)
+
+        exchange_ids = list(symbols_by_exchange)
+        results = await asyncio.gather(*[fetch_snapshot(ex_id, symbols_by_exchange[ex_id]) for ex_id in exchange_ids], return_exceptions=True)
+        snapshots = {}
+        for exchange_id, result in zip(exchange_ids, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Nie udało się pobrać snapshotu tickerów z {exchange_id}: {result}")
+                result = {}
+            snapshots[exchange_id] = result
+        return snapshots
+
+    async def _get_single_coin_summary(self, coin: Dict[str, str], prefetched_ticker: Optional[dict] = None, prefetched_metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Orkiestruje pobieraniem danych dla coina, pomijając już dane z TradingView.
+        Ticker z zbiorczego snapshotu oraz wsadowo policzone rekomendacja i metryki dzienne
+        są używane bez dodatkowych zapytań i obliczeń.
         """
         symbol = coin['symbol']
         exchange_id = coin['exchange']
@@ -56,19 +92,28 @@ class DashboardHandler:
         # --- Definicje zadań asynchronicznych ---
 
         async def fetch_ticker_task():
+            if prefetched_ticker is not None: return prefetched_ticker
             exchange_instance = await self.analyzer.get_exchange_instance(exchange_id)
             if not exchange_instance: return None
             try:
-                return await exchange_instance.fetch_ticker(symbol)
+                return await self.analyzer.fetch_ticker(exchange_instance, symbol)
             except Exception as e:
                 logger.warning(f"Nie udało się pobrać tickera dla {symbol}: {e}")
                 return None
 
+        async def recommendation_task():
+            if prefetched_metrics is not None: return prefetched_metrics['bot_reco']
+            return await self.analyzer.get_simple_recommendation(symbol, exchange_id)
+
+        async def daily_metrics_task():
+            if prefetched_metrics is not None: return prefetched_metrics['daily_metrics']
+            return await self.analyzer.get_daily_metrics(symbol, exchange_id)
+
         # Tworzymy listę wszystkich zadań do równoległego uruchomienia (bez TradingView)
         tasks = [
             fetch_ticker_task(),
-            self.analyzer.get_simple_recommendation(symbol, exchange_id),
-            self.analyzer.get_daily_metrics(symbol, exchange_id),
+            recommendation_task(),
+            daily_metrics_task(),
             self.analyzer.get_relative_strength(symbol, exchange_id),
             self.analyzer.get_long_short_ratio(symbol, exchange_id),
         ]
@@ -76,7 +121,7 @@ class DashboardHandler:
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Rozpakowujemy wyniki
-        ticker = results[0] if not isinstance(results[0], Exception) else {}
+        ticker = (results[0] if not isinstance(results[0], Exception) else None) or {}
         bot_reco = results[1] if not isinstance(results[1], Exception) else "Błąd"
         daily_metrics = results[2] if not isinstance(results[2], Exception) else {}
         rel_strength = results[3] if not isinstance(results[3], Exception) else None
@@ -1,11 +1,12 @@
 import sqlite3
 import pandas as pd
+import numpy as np
 import logging
 import time
 import json
 from datetime import datetime
 from core.data_models import TradeData
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 from app_config import DATA_DIR
 
@@ -22,6 +23,7 @@ class DatabaseManager:
         self._connect()
         self._create_tables()
         self._migrate_status_column()
+        self._migrate_ohlcv_exchange_column()
         
         logger.info(f"Połączono z bazą danych i zweryfikowano wszystkie tabele: {self.db_path}")
 
@@ -64,10 +66,13 @@ class DatabaseManager:
                 data_json TEXT NOT NULL
             )""")
 
-            cursor.execute("""CREATE TABLE IF NOT EXISTS ohlcv (symbol TEXT NOT NULL, timeframe TEXT NOT NULL, timestamp INTEGER NOT NULL, open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL, volume REAL NOT NULL, PRIMARY KEY (symbol, timeframe, timestamp))""")
+            cursor.execute("""CREATE TABLE IF NOT EXISTS ohlcv (exchange TEXT NOT NULL DEFAULT 'BINANCE', symbol TEXT NOT NULL, timeframe TEXT NOT NULL, timestamp INTEGER NOT NULL, open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL, volume REAL NOT NULL, PRIMARY KEY (exchange, symbol, timeframe, timestamp))""")
+            cursor.execute("""CREATE TABLE IF NOT EXISTS ohlcv_empty_ranges (exchange TEXT NOT NULL, symbol TEXT NOT NULL, timeframe TEXT NOT NULL, start_ts INTEGER NOT NULL, end_ts INTEGER NOT NULL, PRIMARY KEY (exchange, symbol, timeframe, start_ts))""")
             cursor.execute("""CREATE TABLE IF NOT EXISTS onchain_metrics (symbol TEXT NOT NULL, date TEXT NOT NULL, funding_rate REAL, open_interest_usd REAL, PRIMARY KEY (symbol, date))""")
             cursor.execute("""CREATE TABLE IF NOT EXISTS saved_analyses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_notes TEXT, status TEXT DEFAULT 'Obserwowane', analysis_data_json TEXT NOT NULL, ohlcv_df_json TEXT NOT NULL, save_timestamp REAL NOT NULL)""")
             cursor.execute("""CREATE TABLE IF NOT EXISTS chart_annotations (id INTEGER PRIMARY KEY AUTOINCREMENT, analysis_id INTEGER NOT NULL, item_type TEXT NOT NULL, properties_json TEXT NOT NULL, FOREIGN KEY (analysis_id) REFERENCES saved_analyses (id) ON DELETE CASCADE)""")
+            cursor.execute("""CREATE TABLE IF NOT EXISTS sr_levels (exchange TEXT NOT NULL, symbol TEXT NOT NULL, session_ts INTEGER NOT NULL, levels_json TEXT NOT NULL, PRIMARY KEY (exchange, symbol))""")
+            cursor.execute("""CREATE TABLE IF NOT EXISTS market_regime_snapshots (exchange TEXT NOT NULL, period_ts INTEGER NOT NULL, regime TEXT NOT NULL, score INTEGER NOT NULL, computed_at INTEGER NOT NULL, inputs_json TEXT NOT NULL, PRIMARY KEY (exchange, period_ts))""")
             
             self.conn.commit()
         except sqlite3.Error as e:
@@ -123,6 +128,27 @@ class DatabaseManager:
             logger.error(f"Błąd podczas migracji danych do nowej kolumny 'status': {e}")
             self.conn.rollback()
 
+    def _migrate_ohlcv_exchange_column(self):
+        """
+        Jednorazowa migracja tabeli 'ohlcv' do klucza (exchange, symbol, timeframe, timestamp).
+        Stare świece pochodziły wyłącznie z Backtestera, który używa giełdy BINANCE.
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("PRAGMA table_info(ohlcv)")
+            columns = [info[1] for info in cursor.fetchall()]
+            if 'exchange' in columns: return
+
+            cursor.execute("ALTER TABLE ohlcv RENAME TO ohlcv_old")
+            cursor.execute("""CREATE TABLE ohlcv (exchange TEXT NOT NULL DEFAULT 'BINANCE', symbol TEXT NOT NULL, timeframe TEXT NOT NULL, timestamp INTEGER NOT NULL, open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL, volume REAL NOT NULL, PRIMARY KEY (exchange, symbol, timeframe, timestamp))""")
+            cursor.execute("INSERT OR IGNORE INTO ohlcv (exchange, symbol, timeframe, timestamp, open, high, low, close, volume) SELECT 'BINANCE', symbol, timeframe, timestamp, open, high, low, close, volume FROM ohlcv_old")
+            cursor.execute("DROP TABLE ohlcv_old")
+            self.conn.commit()
+            logger.info("Migracja OHLCV: Dodano kolumnę 'exchange' do tabeli ohlcv.")
+        except sqlite3.Error as e:
+            logger.error(f"Błąd podczas migracji tabeli 'ohlcv': {e}")
+            self.conn.rollback()
+
     # --- Poniżej wklej wszystkie pozostałe metody z Twojego pliku database_manager.py ---
     # np. add_log_entry, log_trade, get_trade_by_id, itd.
     
@@ -267,27 +293,71 @@ class DatabaseManager:
         except sqlite3.Error as e:
             logger.error(f"Błąd aktualizacji SL dla transakcji ID {trade_id}: {e}")
 
-    def save_ohlcv(self, df: pd.DataFrame, symbol: str, timeframe: str):
+    def save_ohlcv(self, df: pd.DataFrame, symbol: str, timeframe: str, exchange: str = "BINANCE", replace: bool = False):
+        """Zapisuje świece do tabeli 'ohlcv'. Z 'replace=True' nadpisuje istniejące (np. niezamkniętą świecę)."""
         if df.empty or self.conn is None: return
-        df_to_save = df.copy(); df_to_save.rename(columns=str.lower, inplace=True); df_to_save['symbol'] = symbol; df_to_save['timeframe'] = timeframe
-        df_to_save['timestamp'] = df_to_save.index.astype(int) // 10**9
+        df_to_save = df[['Open', 'High', 'Low', 'Close', 'Volume']].copy() if 'Open' in df.columns else df.copy()
+        df_to_save.rename(columns=str.lower, inplace=True); df_to_save['symbol'] = symbol; df_to_save['timeframe'] = timeframe; df_to_save['exchange'] = exchange
+        df_to_save['timestamp'] = df_to_save.index.astype('int64') // 10**9
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
         try:
-            df_to_save.to_sql('ohlcv', self.conn, if_exists='append', index=False, method=lambda table, conn, keys, data_iter: conn.executemany(f"INSERT OR IGNORE INTO {table.name} ({', '.join(keys)}) VALUES ({', '.join(['?'] * len(keys))})", data_iter))
+            df_to_save.to_sql('ohlcv', self.conn, if_exists='append', index=False, method=lambda table, conn, keys, data_iter: conn.executemany(f"{verb} INTO {table.name} ({', '.join(keys)}) VALUES ({', '.join(['?'] * len(keys))})", data_iter))
             self.conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Błąd zapisu danych OHLCV do bazy: {e}")
             
-    def get_ohlcv(self, symbol, timeframe, start_date, end_date):
+    def get_ohlcv(self, symbol, timeframe, start_date, end_date, exchange: str = "BINANCE"):
         if self.conn is None: return None
         start_ts = int(pd.to_datetime(start_date).timestamp()); end_ts = int(pd.to_datetime(f"{end_date} 23:59:59").timestamp())
-        query = "SELECT * FROM ohlcv WHERE symbol = ? AND timeframe = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp ASC"
+        query = "SELECT timestamp, open, high, low, close, volume FROM ohlcv WHERE exchange = ? AND symbol = ? AND timeframe = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp ASC"
         try:
-            df = pd.read_sql_query(query, self.conn, params=(symbol, timeframe, start_ts, end_ts))
+            df = pd.read_sql_query(query, self.conn, params=(exchange, symbol, timeframe, start_ts, end_ts))
             if df.empty: return None
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s'); df.set_index('timestamp', inplace=True); df.rename(columns=str.capitalize, inplace=True)
             return df
         except Exception as e:
             logger.error(f"Błąd odczytu danych OHLCV z bazy: {e}"); return None
+
+    def get_ohlcv_timestamps(self, symbol: str, timeframe: str, exchange: str, start_ts: int, end_ts: int) -> np.ndarray:
+        """Zwraca posortowane znaczniki czasu (w sekundach) zapisanych świec z zakresu [start_ts, end_ts]."""
+        if self.conn is None: return np.empty(0, dtype=np.int64)
+        query = "SELECT timestamp FROM ohlcv WHERE exchange = ? AND symbol = ? AND timeframe = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp ASC"
+        try:
+            rows = self.conn.execute(query, (exchange, symbol, timeframe, start_ts, end_ts)).fetchall()
+            return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu znaczników czasu OHLCV z bazy: {e}"); return np.empty(0, dtype=np.int64)
+
+    def save_ohlcv_empty_ranges(self, symbol: str, timeframe: str, exchange: str, ranges: List[Tuple[int, int]]):
+        """Zapisuje zakresy [start_ts, end_ts] (w sekundach), dla których giełda nie ma świec (np. przed notowaniem symbolu)."""
+        if not ranges or self.conn is None: return
+        query = "INSERT OR REPLACE INTO ohlcv_empty_ranges (exchange, symbol, timeframe, start_ts, end_ts) VALUES (?, ?, ?, ?, ?)"
+        try:
+            self.conn.executemany(query, [(exchange, symbol, timeframe, int(start), int(end)) for start, end in ranges]); self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu pustych zakresów OHLCV: {e}")
+
+    def get_ohlcv_empty_ranges(self, symbol: str, timeframe: str, exchange: str, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+        """Zwraca zapisane puste zakresy (w sekundach) nachodzące na [start_ts, end_ts]."""
+        if self.conn is None: return []
+        query = "SELECT start_ts, end_ts FROM ohlcv_empty_ranges WHERE exchange = ? AND symbol = ? AND timeframe = ? AND start_ts <= ? AND end_ts >= ? ORDER BY start_ts ASC"
+        try:
+            return [(row[0], row[1]) for row in self.conn.execute(query, (exchange, symbol, timeframe, end_ts, start_ts)).fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu pustych zakresów OHLCV: {e}"); return []
+
+    def get_latest_ohlcv(self, symbol: str, timeframe: str, exchange: str, limit: int) -> Optional[pd.DataFrame]:
+        """Zwraca 'limit' najnowszych zapisanych świec (rosnąco po czasie) lub None, gdy brak danych."""
+        if self.conn is None: return None
+        query = "SELECT timestamp, open, high, low, close, volume FROM ohlcv WHERE exchange = ? AND symbol = ? AND timeframe = ? ORDER BY timestamp DESC LIMIT ?"
+        try:
+            cursor = self.conn.cursor(); cursor.execute(query, (exchange, symbol, timeframe, int(limit))); rows = cursor.fetchall()
+            if not rows: return None
+            df = pd.DataFrame(rows[::-1], columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+            return df.set_index('timestamp')
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu najnowszych danych OHLCV z bazy: {e}"); return None
         
     def get_open_trades(self) -> list:
         """Pobiera wszystkie transakcje, które nie są w stanie końcowym (do monitorowania przez PaperTradera)."""
@@ -345,6 +415,47 @@ class DatabaseManager:
             logger.error(f"Błąd podczas wyszukiwania złotych setupów: {e}"); return []
         finally: self.conn.row_factory = None
 
+    def save_sr_levels(self, exchange: str, symbol: str, session_ts: int, levels: List[float]):
+        """Zapisuje dzienne poziomy S/R symbolu wyznaczone w dobie zaczynającej się w 'session_ts' (ms)."""
+        if not self.conn: return
+        query = "INSERT OR REPLACE INTO sr_levels (exchange, symbol, session_ts, levels_json) VALUES (?, ?, ?, ?)"
+        try:
+            cursor = self.conn.cursor(); cursor.execute(query, (exchange, symbol, int(session_ts), json.dumps(levels))); self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu poziomów S/R: {e}")
+
+    def get_sr_levels(self, exchange: str, symbol: str) -> Optional[Dict[str, Any]]:
+        """Zwraca {'session_ts', 'levels'} ostatnio zapisanych dziennych poziomów S/R symbolu lub None."""
+        if not self.conn: return None
+        query = "SELECT session_ts, levels_json FROM sr_levels WHERE exchange = ? AND symbol = ?"
+        try:
+            row = self.conn.execute(query, (exchange, symbol)).fetchone()
+            return {"session_ts": row[0], "levels": json.loads(row[1])} if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu poziomów S/R: {e}"); return None
+
+    def save_market_regime(self, snapshot: Dict[str, Any]):
+        """Zapisuje migawkę reżimu rynkowego razem z danymi wejściowymi; kolejne okresy zostają w historii (audyt)."""
+        if not self.conn: return
+        query = "INSERT OR REPLACE INTO market_regime_snapshots (exchange, period_ts, regime, score, computed_at, inputs_json) VALUES (?, ?, ?, ?, ?, ?)"
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query, (snapshot['exchange'], int(snapshot['period_ts']), snapshot['regime'], int(snapshot['score']), int(snapshot['computed_at']), json.dumps(snapshot.get('inputs', {}))))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu migawki reżimu rynkowego: {e}")
+
+    def get_latest_market_regime(self, exchange: str) -> Optional[Dict[str, Any]]:
+        """Zwraca najnowszą migawkę reżimu rynkowego giełdy ({'exchange', 'period_ts', 'regime', 'score', 'computed_at', 'inputs'}) lub None."""
+        if not self.conn: return None
+        query = "SELECT exchange, period_ts, regime, score, computed_at, inputs_json FROM market_regime_snapshots WHERE exchange = ? ORDER BY period_ts DESC LIMIT 1"
+        try:
+            row = self.conn.execute(query, (exchange,)).fetchone()
+            if not row: return None
+            return {"exchange": row[0], "period_ts": row[1], "regime": row[2], "score": row[3], "computed_at": row[4], "inputs": json.loads(row[5])}
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu migawki reżimu rynkowego: {e}"); return None
+
     def save_onchain_metrics(self, data: dict):
         if not self.conn: return
         query = "INSERT OR REPLACE INTO onchain_metrics (symbol, date, funding_rate, open_interest_usd) VALUES (?, ?, ?, ?)"
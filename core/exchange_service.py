@@ -2,48 +2,302 @@
 
 import asyncio
 import logging
+import os
+import time
 import pandas as pd
-from typing import Dict, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
 import ccxt.async_support as ccxt
 
+from core.candle_store import CandleStore
+from core.ohlcv_cache import OHLCVCache
+from core.ohlcv_frame import ohlcv_to_frame
+from core.markets_cache import MarketsCache
+from core.replay_exchange import REPLAY_EXCHANGE_PREFIX, RecordingExchange, ReplayExchange, fixture_path
+from app_config import REPLAY_FIXTURES_DIR
+from core.request_scheduler import RequestPriority, RequestScheduler, get_current_priority, request_priority
+
 logger = logging.getLogger(__name__)
 
 class ExchangeService:
     """Zarządza połączeniami z giełdami i pobieraniem danych OHLCV."""
 
-    def __init__(self):
+    def __init__(self, candle_store: Optional[CandleStore] = None, ohlcv_cache: Optional[OHLCVCache] = None, scheduler: Optional[RequestScheduler] = None, tickers_ttl_seconds: float = 10.0, markets_cache: Optional[MarketsCache] = None, replay_options: Optional[Dict] = None):
         self.exchange_instances: Dict[str, ccxt.Exchange] = {}
         self.max_candles = 500 # Możemy przenieść to do ustawień w przyszłości
+        self.candle_store = candle_store
+        self.ohlcv_cache = ohlcv_cache
+        # Wszystkie zapytania do giełd przechodzą przez planistę z klasami priorytetu
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        # Single-flight: identyczne, nakładające się w czasie zapytania współdzielą jedno zadanie (i klasę priorytetu)
+        self._inflight_requests: Dict[Tuple, Tuple[asyncio.Task, RequestPriority]] = {}
+        self.coalesced_requests = 0
+        # Krótkotrwały cache zbiorczych tickerów: exchange_id -> (czas pobrania, tickery, czy to pełny rynek)
+        self.tickers_ttl_seconds = tickers_ttl_seconds
+        self._tickers_cache: Dict[str, Tuple[float, Dict[str, dict], bool]] = {}
+        self.markets_cache = markets_cache
+        self._markets_ready: Dict[str, asyncio.Future] = {}
+        # Ustawienia giełd 'REPLAY_*' (opóźnienie, limit zapytań) i trybu nagrywania sesji
+        self.replay_options = replay_options or {}
+        self._markets_refresh_tasks: Dict[str, asyncio.Task] = {}
 
     async def get_exchange_instance(self, exchange_id: str) -> Optional[ccxt.Exchange]:
         """Pobiera lub tworzy instancję ccxt dla danej giełdy."""
         if exchange_id not in self.exchange_instances:
+            if exchange_id.upper().startswith(REPLAY_EXCHANGE_PREFIX):
+                return self._create_replay_instance(exchange_id)
             try:
                 exchange_class = getattr(ccxt, exchange_id.lower())
-                config = {'enableRateLimit': True, 'timeout': 40000}
-                self.exchange_instances[exchange_id] = exchange_class(config)
+                # Limit zapytań egzekwuje planista (na podstawie rateLimit giełdy) - wbudowany dławik ccxt dublowałby oczekiwanie
+                config = {'enableRateLimit': False, 'timeout': 40000}
+                instance = exchange_class(config)
+                if self.replay_options.get('record_session'):
+                    instance = RecordingExchange(instance)
+                self.exchange_instances[exchange_id] = instance
                 logger.info(f"Utworzono nową instancję dla giełdy: {exchange_id}")
             except AttributeError:
                 logger.error(f"Nieznana giełda: {exchange_id}")
                 return None
+            if self.markets_cache is not None:
+                self._markets_ready[exchange_id] = asyncio.ensure_future(self._inject_cached_markets(exchange_id, self.exchange_instances[exchange_id]))
+        # Równolegli wywołujący czekają, aż rynki z dysku zostaną wstrzyknięte, by nie wywołać load_markets przez sieć
+        markets_ready = self._markets_ready.get(exchange_id)
+        if markets_ready is not None and not markets_ready.done():
+            await asyncio.shield(markets_ready)
+        return self.exchange_instances[exchange_id]
+
+    def _create_replay_instance(self, exchange_id: str) -> Optional[ccxt.Exchange]:
+        """Tworzy giełdę odtwarzającą nagranie z pliku fixture (bez połączenia z siecią)."""
+        path = fixture_path(self.replay_options.get('fixtures_dir', REPLAY_FIXTURES_DIR), exchange_id)
+        if not os.path.exists(path):
+            logger.error(f"Brak pliku z nagraniem dla giełdy {exchange_id}: {path}")
+            return None
+        options = {k: v for k, v in self.replay_options.items() if k in ('latency_ms', 'jitter_ms', 'rate_limit_ms', 'burst', 'seed', 'align_to_now')}
+        self.exchange_instances[exchange_id] = ReplayExchange.from_file(path, exchange_id=exchange_id, **options)
+        logger.info(f"Utworzono giełdę odtwarzającą nagranie: {exchange_id} ({path})")
         return self.exchange_instances[exchange_id]
 
+    async def _inject_cached_markets(self, exchange_id: str, exchange: ccxt.Exchange):
+        """
+        Wstrzykuje rynki z dysku; przestarzałe odświeża w tle zamiast blokować start.
+        Gdy na dysku nic nie ma, wywołujący czekają na pobranie - inaczej pierwsze fetch_* wywołałoby równoległe load_markets.
+        """
+        age = await asyncio.to_thread(self.markets_cache.apply, exchange_id, exchange)
+        if age is not None:
+            logger.info(f"Wczytano rynki {exchange_id} z cache (wiek: {age / 3600:.1f} h).")
+        if not self.markets_cache.is_fresh(age):
+            # Zimny start blokuje pierwszego wywołującego, więc pobranie dostaje jego klasę priorytetu
+            priority = get_current_priority() if age is None else RequestPriority.CHART
+            refresh = asyncio.create_task(self._refresh_markets(exchange_id, exchange, priority))
+            self._markets_refresh_tasks[exchange_id] = refresh
+            if age is None:
+                await refresh
+
+    async def _refresh_markets(self, exchange_id: str, exchange: ccxt.Exchange, priority: RequestPriority = RequestPriority.CHART):
+        try:
+            with request_priority(priority): # Domyślnie odświeżenie w tle ma najniższy priorytet
+                await self._acquire_request_slot(exchange)
+                await exchange.load_markets(reload=True)
+            await asyncio.to_thread(self.markets_cache.save, exchange_id, exchange.markets, exchange.currencies)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Nie udało się odświeżyć rynków dla {exchange_id}: {e}")
+
     async def fetch_ohlcv(self, exchange: ccxt.Exchange, symbol: str, interval: str, limit: int = None, since: int = None) -> Optional[pd.DataFrame]:
-        """Pobiera świece OHLCV z danej giełdy."""
+        """
+        Pobiera świece OHLCV z danej giełdy (najnowsze okno - przez lokalny magazyn świec).
+        Równoległe wywołania z tymi samymi parametrami czekają na jedno wspólne zapytanie.
+        """
+        fetch_limit = limit if limit is not None else self.max_candles
+        exchange_id = self._get_exchange_id(exchange)
+        if self.ohlcv_cache is not None and since is None:
+            cached = self.ohlcv_cache.get(exchange_id, symbol, interval, fetch_limit)
+            if cached is not None: return cached
+
+        key = (exchange_id, symbol, interval, fetch_limit, since)
+        task, is_leader = self._join_inflight(key, lambda: self._fetch_ohlcv_uncoalesced(exchange, symbol, interval, fetch_limit, since))
+        if not is_leader:
+            logger.debug(f"Dołączono do trwającego zapytania o świece {symbol} ({interval}).")
+
         try:
-            fetch_limit = limit if limit is not None else self.max_candles
-            raw_ohlcv = await exchange.fetch_ohlcv(symbol, interval, limit=fetch_limit, since=since)
-            if not raw_ohlcv: 
-                return None
-            df = pd.DataFrame(raw_ohlcv, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df.set_index('timestamp').sort_index()
+            # shield: anulowanie jednego z oczekujących nie przerywa zapytania pozostałym
+            df = await asyncio.shield(task)
         except Exception as e:
             logger.error(f"Błąd podczas pobierania świec dla {symbol} ({interval}): {e}")
             raise
+        # Współdzielący dostają kopię, aby modyfikacje u jednego wywołującego nie wpływały na innych
+        return df if is_leader or df is None else df.copy()
+
+    def _join_inflight(self, key: Tuple, start: Callable[[], Awaitable]) -> Tuple[asyncio.Task, bool]:
+        """
+        Zwraca (zadanie, czy_nowe) dla klucza. Trwające zapytanie jest współdzielone tylko wtedy, gdy czeka w kolejce
+        planisty z priorytetem co najmniej takim jak wywołujący - inaczej np. PaperTrader czekałby na slot wykresu.
+        Nowe zadanie wyższej klasy zastępuje wpis, więc kolejni wywołujący dołączają już do niego.
+        """
+        priority = get_current_priority()
+        entry = self._inflight_requests.get(key)
+        if entry is not None and entry[1] <= priority:
+            self.coalesced_requests += 1
+            return entry[0], False
+        task = asyncio.ensure_future(start())
+        self._inflight_requests[key] = (task, priority)
+        task.add_done_callback(lambda t, k=key: self._on_inflight_request_done(k, t))
+        return task, True
+
+    def _on_inflight_request_done(self, key: Tuple, task: asyncio.Task):
+        entry = self._inflight_requests.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight_requests[key]
+        if not task.cancelled():
+            task.exception() # Oznacza wyjątek jako odebrany, nawet jeśli wszyscy oczekujący zrezygnowali
+
+    async def _fetch_ohlcv_uncoalesced(self, exchange: ccxt.Exchange, symbol: str, interval: str, limit: int, since: Optional[int]) -> Optional[pd.DataFrame]:
+        if since is not None:
+            return await self._fetch_ohlcv_from_exchange(exchange, symbol, interval, limit, since)
+        if self.ohlcv_cache is not None:
+            df = await self._refresh_cached_forming_candle(exchange, symbol, interval, limit)
+            if df is not None: return df
+        if self.candle_store is not None:
+            df = await self._fetch_ohlcv_read_through(exchange, symbol, interval, limit)
+        else:
+            df = await self._fetch_ohlcv_from_exchange(exchange, symbol, interval, limit, None)
+        if self.ohlcv_cache is not None:
+            self.ohlcv_cache.put(self._get_exchange_id(exchange), symbol, interval, limit, df)
+        return df
+
+    async def _refresh_cached_forming_candle(self, exchange: ccxt.Exchange, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        """Okno z cache z dociągniętą trwającą świecą - jedno zapytanie o jedną świecę zamiast pełnego okna."""
+        exchange_id = self._get_exchange_id(exchange)
+        window = self.ohlcv_cache.get_closed_window(exchange_id, symbol, interval, limit)
+        if window is None or window.empty: return None
+        fresh = await self._fetch_ohlcv_from_exchange(exchange, symbol, interval, 1, int(window.index[-1].value // 10**6))
+        if fresh is None or fresh.empty: return None
+        if self.candle_store is not None:
+            self.candle_store.save(exchange_id, symbol, interval, fresh)
+        return self.ohlcv_cache.refresh_forming(exchange_id, symbol, interval, limit, fresh)
+
+    async def fetch_ticker(self, exchange: ccxt.Exchange, symbol: str) -> Dict:
+        """Pobiera ticker dla symbolu z zachowaniem priorytetów planisty zapytań."""
+        await self._acquire_request_slot(exchange)
+        return await exchange.fetch_ticker(symbol)
+
+    async def fetch_funding_rate(self, exchange: ccxt.Exchange, symbol: str) -> Dict:
+        await self._acquire_request_slot(exchange)
+        return await exchange.fetch_funding_rate(symbol)
+
+    async def fetch_open_interest(self, exchange: ccxt.Exchange, symbol: str) -> Dict:
+        await self._acquire_request_slot(exchange)
+        return await exchange.fetch_open_interest(symbol)
+
+    async def fetch_long_short_ratio(self, exchange: ccxt.Exchange, symbol: str) -> Dict:
+        await self._acquire_request_slot(exchange)
+        return await exchange.fetch_long_short_ratio(symbol)
+
+    async def fetch_order_book(self, exchange: ccxt.Exchange, symbol: str, limit: int = 100) -> Dict:
+        await self._acquire_request_slot(exchange)
+        return await exchange.fetch_l2_order_book(symbol, limit=limit)
+
+    async def fetch_trades(self, exchange: ccxt.Exchange, symbol: str, limit: int = 100) -> List[Dict]:
+        await self._acquire_request_slot(exchange)
+        return await exchange.fetch_trades(symbol, limit=limit)
+
+    async def fetch_tickers_snapshot(self, exchange: ccxt.Exchange, symbols: List[str]) -> Dict[str, dict]:
+        """
+        Zwraca tickery dla listy symboli z jednego zbiorczego zapytania fetch_tickers (wynik trzymany krótko w cache).
+        Giełdy bez endpointu zbiorczego są obsługiwane równoległymi zapytaniami fetch_ticker.
+        """
+        exchange_id = self._get_exchange_id(exchange)
+        cached = self._tickers_cache.get(exchange_id)
+        if cached is None or time.monotonic() - cached[0] > self.tickers_ttl_seconds:
+            cached = None
+
+        if exchange.has.get('fetchTickers'):
+            if cached is None or not cached[2]:
+                task, _ = self._join_inflight(('tickers', exchange_id), lambda: self._fetch_all_tickers(exchange))
+                try:
+                    tickers = await asyncio.shield(task)
+                except Exception as e:
+                    logger.warning(f"Zbiorcze pobranie tickerów z {exchange_id} nie powiodło się ({e}). Przechodzę na pojedyncze zapytania.")
+                    return await self._fetch_tickers_individually(exchange, symbols)
+                cached = self._tickers_cache[exchange_id] = (time.monotonic(), tickers, True)
+            return {symbol: cached[1][symbol] for symbol in symbols if symbol in cached[1]}
+
+        return await self._fetch_tickers_individually(exchange, symbols)
+
+    async def _fetch_all_tickers(self, exchange: ccxt.Exchange) -> Dict[str, dict]:
+        await self._acquire_request_slot(exchange)
+        return await exchange.fetch_tickers()
+
+    async def _fetch_tickers_individually(self, exchange: ccxt.Exchange, symbols: List[str]) -> Dict[str, dict]:
+        """Zastępcza ścieżka dla giełd bez fetch_tickers - pobiera tylko tickery, których nie ma w cache."""
+        exchange_id = self._get_exchange_id(exchange)
+        cached = self._tickers_cache.get(exchange_id)
+        if cached is None or time.monotonic() - cached[0] > self.tickers_ttl_seconds:
+            cached = (time.monotonic(), {}, False)
+        tickers = dict(cached[1])
+        missing = [symbol for symbol in symbols if symbol not in tickers]
+        results = await asyncio.gather(*[self.fetch_ticker(exchange, symbol) for symbol in missing], return_exceptions=True)
+        for symbol, result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Nie udało się pobrać tickera dla {symbol}: {result}")
+            else:
+                tickers[symbol] = result
+        if missing:
+            # Zachowujemy czas pierwszego pobrania, by dołożone tickery nie przedłużały życia starszych
+            self._tickers_cache[exchange_id] = (cached[0], tickers, False)
+        return {symbol: tickers[symbol] for symbol in symbols if symbol in tickers}
+
+    async def _acquire_request_slot(self, exchange: ccxt.Exchange):
+        await self.scheduler.acquire(self._get_exchange_id(exchange), getattr(exchange, 'rateLimit', 0))
+
+    async def _fetch_ohlcv_from_exchange(self, exchange: ccxt.Exchange, symbol: str, interval: str, limit: int, since: Optional[int]) -> Optional[pd.DataFrame]:
+        await self._acquire_request_slot(exchange)
+        raw_ohlcv = await exchange.fetch_ohlcv(symbol, interval, limit=limit, since=since)
+        return ohlcv_to_frame(raw_ohlcv)
+
+    async def _fetch_ohlcv_read_through(self, exchange: ccxt.Exchange, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        """
+        Serwuje historię z lokalnego magazynu i pobiera z giełdy tylko świece od ostatniej zapisanej
+        (włącznie - mogła być jeszcze niezamknięta). Gdy magazyn nie pokrywa okna, pobiera całość.
+        """
+        exchange_id = self._get_exchange_id(exchange)
+        timeframe_ms = ccxt.Exchange.parse_timeframe(interval) * 1000
+        stored = self.candle_store.load_recent(exchange_id, symbol, interval, limit)
+
+        if stored is not None and self.candle_store.is_contiguous(stored, timeframe_ms):
+            last_stored_ms = int(stored.index[-1].value // 10**6)
+            current_open_ms = (int(time.time() * 1000) // timeframe_ms) * timeframe_ms
+            missing_candles = max(0, (current_open_ms - last_stored_ms) // timeframe_ms)
+            # Okno jest pokryte, jeśli zapisana historia + brakujące świece dają co najmniej 'limit'
+            if missing_candles < limit and len(stored) + missing_candles >= limit:
+                fresh = await self._fetch_ohlcv_from_exchange(exchange, symbol, interval, missing_candles + 1, last_stored_ms)
+                if fresh is None or fresh.empty:
+                    return stored.tail(limit)
+                self.candle_store.save(exchange_id, symbol, interval, fresh)
+                merged = pd.concat([stored, fresh])
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                if self.candle_store.is_contiguous(merged, timeframe_ms):
+                    logger.debug(f"Magazyn świec: {symbol} ({interval}) - dociągnięto {len(fresh)} świec zamiast {limit}.")
+                    return merged.tail(limit)
+
+        df = await self._fetch_ohlcv_from_exchange(exchange, symbol, interval, limit, None)
+        if df is not None and not df.empty:
+            self.candle_store.save(exchange_id, symbol, interval, df)
+        return df
+
+    @staticmethod
+    def _get_exchange_id(exchange: ccxt.Exchange) -> str:
+        """Zwraca identyfikator giełdy w formacie używanym w aplikacji (np. 'BINANCE')."""
+        return str(getattr(exchange, 'id', '')).upper()
 
     async def close_all_exchanges(self):
         """Zamyka wszystkie aktywne połączenia z giełdami."""
+        for task in self._markets_refresh_tasks.values(): task.cancel()
+        await asyncio.gather(*self._markets_refresh_tasks.values(), return_exceptions=True)
+        fixtures_dir = self.replay_options.get('fixtures_dir', REPLAY_FIXTURES_DIR)
+        for exchange_id, exchange in self.exchange_instances.items():
+            if isinstance(exchange, RecordingExchange):
+                exchange.save(fixture_path(fixtures_dir, f"{REPLAY_EXCHANGE_PREFIX}_{exchange_id}"))
         await asyncio.gather(*[ex.close() for ex in self.exchange_instances.values()], return_exceptions=True)
-        logger.info("Połączenia ExchangeService z giełdami zostały zamknięte.")
\ No newline at end of file
+        logger.info("Połączenia ExchangeService z giełdami zostały zamknięte.")
@@ -0,0 +1,210 @@
+"""
+Wykrywanie luk cenowych (Fair Value Gaps) na tablicach NumPy. Luka istnieje na świecy 'i', gdy High świecy i-1
+jest poniżej Low świecy i+1 (bycza) albo Low świecy i-1 jest powyżej High świecy i+1 (niedźwiedzia) - wszystkie
+trójki świec są porównywane jednocześnie przesuniętymi tablicami.
+FairValueGapTracker utrzymuje listę luk przyrostowo: każda zamknięta świeca sprawdza tylko nową trójkę
+i aktualizuje stan wypełnienia otwartych luk.
+"""
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app_config import FVG_TRACKER_MAX_SERIES
+
+# Stan luki: cena jeszcze do niej nie wróciła, weszła w nią częściowo albo przeszła ją całą (luka unieważniona)
+FVG_OPEN, FVG_PARTIAL, FVG_FILLED = 'open', 'partial', 'filled'
+
+def detect_gaps(high: np.ndarray, low: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Zwraca (pozycje środkowych świec, czy bycza, dolna granica, górna granica) wszystkich luk w kolejności świec.
+    Bycza luka ma priorytet, gdy obie reguły są spełnione (jak w pierwotnej pętli).
+    """
+    prev_high, prev_low = high[:-2], low[:-2]
+    next_high, next_low = high[2:], low[2:]
+    bullish = prev_high < next_low
+    bearish = ~bullish & (prev_low > next_high)
+    found = np.flatnonzero(bullish | bearish)
+    is_bullish = bullish[found]
+    bottom = np.where(is_bullish, prev_high[found], next_high[found])
+    top = np.where(is_bullish, next_low[found], prev_low[found])
+    return found + 1, is_bullish, bottom, top
+
+def timestamps_in_seconds(index: pd.DatetimeIndex) -> np.ndarray:
+    """Znaczniki czasu w sekundach - z tym samym zaokrągleniem do mikrosekund co Timestamp.timestamp()."""
+    return np.round(index.asi8 / 1e9, 6)
+
+def median_interval_seconds(seconds: np.ndarray) -> float:
+    """Mediana odstępu między świecami (jak diff().dt.total_seconds().median())."""
+    return float(np.median(np.diff(seconds))) if len(seconds) > 1 else math.nan
+
+def gaps_to_dicts(seconds: np.ndarray, centers: np.ndarray, is_bullish: np.ndarray, bottom: np.ndarray, top: np.ndarray,
+                  status: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Buduje słowniki luk w formacie używanym przez wykresy ('start_time' to połowa interwału przed środkową świecą)."""
+    interval = median_interval_seconds(seconds)
+    width = interval * 10
+    start_times = (seconds[centers] - interval / 2).tolist()
+    gaps = [
+        {'type': 'bullish' if bull else 'bearish', 'start_price': start, 'end_price': end, 'start_time': start_time, 'width_seconds': width}
+        for bull, start, end, start_time in zip(is_bullish.tolist(), bottom.tolist(), top.tolist(), start_times)
+    ]
+    if status is not None:
+        for gap, gap_status in zip(gaps, status): gap['status'] = gap_status
+    return gaps
+
+def find_fair_value_gaps(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Wszystkie luki FVG ramki jednym przebiegiem wektorowym."""
+    if df is None or len(df) < 3: return []
+    centers, is_bullish, bottom, top = detect_gaps(df['High'].to_numpy(dtype=np.float64), df['Low'].to_numpy(dtype=np.float64))
+    return gaps_to_dicts(timestamps_in_seconds(df.index), centers, is_bullish, bottom, top)
+
+class FairValueGapTracker:
+    """
+    Luki FVG jednej serii ze stanem wypełnienia. Zamknięte świece są przetwarzane raz (nowa trójka świec + aktualizacja
+    otwartych luk), a ostatnia, trwająca świeca jest uwzględniana dopiero w gaps(). Wynik odpowiada
+    find_fair_value_gaps na bieżącym oknie, uzupełnionemu o klucz 'status'.
+    """
+
+    def __init__(self):
+        self._seconds = np.empty(0)
+        self._high, self._low = np.empty(0), np.empty(0)
+        self._origin = 0 # Bezwzględna pozycja pierwszej świecy okna
+        self._live: Optional[Tuple[float, float, float]] = None # (czas, High, Low) trwającej świecy
+        # Luki zamkniętych świec: bezwzględna pozycja środka, kierunek, granice i najgłębsza cena po powstaniu luki
+        self._centers = np.empty(0, dtype=np.int64)
+        self._bullish = np.empty(0, dtype=bool)
+        self._bottom, self._top, self._deepest = np.empty(0), np.empty(0), np.empty(0)
+        self.loads = 0
+
+    def sync(self, df: pd.DataFrame) -> bool:
+        """
+        Dopasowuje tracker do ramki świec. Kontynuacja poprzedniej ramki (przesunięte okno, nowe świece) przetwarza tylko
+        nowe zamknięte świece; inna historia ładuje luki od nowa. Zwraca True, gdy zawartość okna się zmieniła.
+        """
+        if df is None or df.empty:
+            changed = len(self._seconds) > 0 or self._live is not None
+            self._clear()
+            return changed
+        seconds = timestamps_in_seconds(df.index)
+        high, low = df['High'].to_numpy(dtype=np.float64), df['Low'].to_numpy(dtype=np.float64)
+        closed = len(df) - 1
+        offset = self._find_offset(seconds[:closed], high[:closed], low[:closed])
+        if offset is None:
+            self._load(seconds[:closed], high[:closed], low[:closed])
+            changed = True
+        else:
+            overlap = len(self._seconds) - offset
+            changed = offset > 0 or closed > overlap
+            if offset: self._trim(offset)
+            for i in range(overlap, closed): self._append(seconds[i], high[i], low[i])
+        live = (float(seconds[-1]), float(high[-1]), float(low[-1]))
+        changed = changed or live != self._live
+        self._live = live
+        return changed
+
+    def _clear(self):
+        loads = self.loads
+        self.__init__()
+        self.loads = loads
+
+    def _find_offset(self, seconds: np.ndarray, high: np.ndarray, low: np.ndarray) -> Optional[int]:
+        if not len(self._seconds) or not len(seconds): return None
+        offset = int(np.searchsorted(self._seconds, seconds[0]))
+        if offset >= len(self._seconds) or self._seconds[offset] != seconds[0]: return None
+        overlap = len(self._seconds) - offset
+        if len(seconds) < overlap or seconds[overlap - 1] != self._seconds[-1]: return None
+        # Zamknięte świece się nie zmieniają - porównujemy tylko krańce wspólnego fragmentu
+        if high[overlap - 1] != self._high[-1] or low[overlap - 1] != self._low[-1]: return None
+        return offset
+
+    def _load(self, seconds: np.ndarray, high: np.ndarray, low: np.ndarray):
+        """Wykrywa luki i ich stan dla całej historii naraz (minimum/maksimum cen po powstaniu każdej luki)."""
+        self._clear()
+        self.loads += 1
+        self._seconds, self._high, self._low = seconds.copy(), high.copy(), low.copy()
+        if len(seconds) < 3: return
+        centers, self._bullish, self._bottom, self._top = detect_gaps(high, low)
+        self._centers = centers.astype(np.int64)
+        # Najgłębsze wejście w lukę: dla byczej najniższy Low, dla niedźwiedziej najwyższy High po świecy i+1
+        later_low = np.append(np.fmin.accumulate(low[::-1])[::-1], np.inf)
+        later_high = np.append(np.fmax.accumulate(high[::-1])[::-1], -np.inf)
+        self._deepest = np.where(self._bullish, later_low[centers + 2], later_high[centers + 2])
+
+    def _append(self, second: float, high: float, low: float):
+        """Dopisuje zamkniętą świecę: aktualizuje otwarte luki i sprawdza trójkę świec, którą ta świeca kończy."""
+        self._deepest = np.where(self._bullish, np.fmin(self._deepest, low), np.fmax(self._deepest, high))
+        self._seconds = np.append(self._seconds, second)
+        self._high, self._low = np.append(self._high, high), np.append(self._low, low)
+        if len(self._seconds) < 3: return
+        centers, is_bullish, bottom, top = detect_gaps(self._high[-3:], self._low[-3:])
+        if len(centers):
+            self._centers = np.append(self._centers, self._origin + len(self._seconds) - 2)
+            self._bullish = np.append(self._bullish, is_bullish)
+            self._bottom, self._top = np.append(self._bottom, bottom), np.append(self._top, top)
+            self._deepest = np.append(self._deepest, np.inf if is_bullish[0] else -np.inf)
+
+    def _trim(self, count: int):
+        """Usuwa najstarsze świece; znikają luki, których pierwsza świeca wypadła z okna."""
+        self._origin += count
+        self._seconds, self._high, self._low = self._seconds[count:], self._high[count:], self._low[count:]
+        keep = self._centers - 1 >= self._origin
+        self._centers, self._bullish = self._centers[keep], self._bullish[keep]
+        self._bottom, self._top, self._deepest = self._bottom[keep], self._top[keep], self._deepest[keep]
+
+    def gaps(self) -> List[Dict[str, Any]]:
+        """Luki bieżącego okna (zamknięte świece + trwająca) ze stanem: 'open', 'partial' albo 'filled'."""
+        if self._live is None or len(self._seconds) < 2: return []
+        live_second, live_high, live_low = self._live
+        seconds = np.append(self._seconds, live_second)
+        centers, is_bullish = self._centers - self._origin, self._bullish
+        bottom, top = self._bottom, self._top
+        deepest = np.where(is_bullish, np.fmin(self._deepest, live_low), np.fmax(self._deepest, live_high))
+        # Trójka kończąca się na trwającej świecy
+        live_centers, live_bullish, live_bottom, live_top = detect_gaps(np.append(self._high[-2:], live_high), np.append(self._low[-2:], live_low))
+        if len(live_centers):
+            centers = np.append(centers, len(seconds) - 2)
+            is_bullish = np.append(is_bullish, live_bullish)
+            bottom, top = np.append(bottom, live_bottom), np.append(top, live_top)
+            deepest = np.append(deepest, np.inf if live_bullish[0] else -np.inf)
+        filled = np.where(is_bullish, deepest <= bottom, deepest >= top)
+        partial = np.where(is_bullish, deepest < top, deepest > bottom)
+        status = np.where(filled, FVG_FILLED, np.where(partial, FVG_PARTIAL, FVG_OPEN)).tolist()
+        return gaps_to_dicts(seconds, centers, is_bullish, bottom, top, status)
+
+class FairValueGapRegistry:
+    """Trackery luk FVG adresowane kluczem serii (np. giełda, symbol, interwał). Rozmiar LRU."""
+
+    def __init__(self, max_series: int = FVG_TRACKER_MAX_SERIES):
+        self.max_series = max_series
+        self._trackers: "OrderedDict[Hashable, FairValueGapTracker]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.updates = 0
+
+    def gaps(self, key: Hashable, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Dopasowuje tracker serii do 'df' i zwraca jej luki ze stanem wypełnienia."""
+        with self._lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = FairValueGapTracker()
+                if self.max_series > 0:
+                    self._trackers[key] = tracker
+                    while len(self._trackers) > self.max_series: self._trackers.popitem(last=False)
+            else:
+                self._trackers.move_to_end(key)
+            loads = tracker.loads
+            if tracker.sync(df):
+                if tracker.loads > loads: self.loads += 1
+                else: self.updates += 1
+            return tracker.gaps()
+
+    def clear(self):
+        with self._lock:
+            self._trackers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"series": len(self._trackers), "max_series": self.max_series, "loads": self.loads, "updates": self.updates}
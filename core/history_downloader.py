@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+import numpy as np
+from typing import List, Tuple
+
+import ccxt.async_support as ccxt
+
+from core.database_manager import DatabaseManager
+from core.exchange_service import ExchangeService
+
+logger = logging.getLogger(__name__)
+
+class HistoryDownloader:
+    """
+    Pobiera długą historię świec do tabeli 'ohlcv' bez ponownego ściągania tego, co już jest w bazie.
+    Brakujące zakresy są dzielone na strony pobierane równolegle (w ramach limitów planisty zapytań),
+    a każda strona trafia do bazy od razu po pobraniu - przerwane pobieranie wznawia się od brakujących stron.
+    Świece, których giełda nie ma (przed notowaniem symbolu, przerwy w notowaniach), są zapamiętywane jako puste
+    zakresy i nie są pobierane ponownie.
+    """
+
+    def __init__(self, exchange_service: ExchangeService, db_manager: DatabaseManager, page_size: int = 1000, max_concurrency: int = 4):
+        self.exchange_service = exchange_service
+        self.db_manager = db_manager
+        self.page_size = page_size
+        self.max_concurrency = max_concurrency
+
+    async def download(self, exchange: ccxt.Exchange, symbol: str, timeframe: str, start_ms: int, end_ms: int) -> int:
+        """Uzupełnia bazę o brakujące świece z zakresu [start_ms, end_ms]; zwraca liczbę zapisanych świec."""
+        exchange_id = self.exchange_service._get_exchange_id(exchange)
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        missing_ranges = self.find_missing_ranges(symbol, timeframe, exchange_id, start_ms, end_ms, timeframe_ms)
+        pages = self.split_into_pages(missing_ranges, timeframe_ms, self.page_size)
+        if not pages:
+            logger.info(f"[HistoryDownloader] Historia {symbol} ({timeframe}) jest kompletna w lokalnej bazie.")
+            return 0
+
+        logger.info(f"[HistoryDownloader] {symbol} ({timeframe}): {len(missing_ranges)} brakujących zakresów, {len(pages)} stron do pobrania.")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_page(page_start: int, page_end: int) -> int:
+            async with semaphore:
+                limit = (page_end - page_start) // timeframe_ms + 1
+                df = await self.exchange_service.fetch_ohlcv(exchange, symbol, timeframe, limit=limit, since=page_start)
+            if df is None or df.empty: return 0
+            timestamps_ms = df.index.values.astype('datetime64[ms]').astype('int64')
+            # Świece strony sprzed ostatniej zwróconej, których giełda nie oddała, nie istnieją. Końca strony za ostatnią
+            # zwróconą świecą nie oznaczamy - giełda mogła po prostu przyciąć odpowiedź do swojego limitu
+            expected = np.arange(page_start, min(page_end, int(timestamps_ms.max())) + 1, timeframe_ms, dtype=np.int64)
+            empty_ranges = self._to_ranges(expected[~np.isin(expected, timestamps_ms)], timeframe_ms)
+            self.db_manager.save_ohlcv_empty_ranges(symbol, timeframe, exchange_id, [(s // 1000, e // 1000) for s, e in empty_ranges])
+            # Trwająca świeca nie trafia do bazy - zapisana uchodziłaby za kompletną i nigdy nie zostałaby pobrana ponownie
+            closed = timestamps_ms + timeframe_ms <= int(time.time() * 1000)
+            df = df[(timestamps_ms >= page_start) & (timestamps_ms <= page_end) & closed]
+            self.db_manager.save_ohlcv(df, symbol, timeframe, exchange=exchange_id, replace=True)
+            return len(df)
+
+        results = await asyncio.gather(*[fetch_page(*page) for page in pages], return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        saved = sum(r for r in results if not isinstance(r, Exception))
+        if failed:
+            logger.warning(f"[HistoryDownloader] {len(failed)} z {len(pages)} stron {symbol} nie udało się pobrać (np. {failed[0]}). Zostaną pobrane przy kolejnym uruchomieniu.")
+        logger.info(f"[HistoryDownloader] {symbol} ({timeframe}): zapisano {saved} świec.")
+        return saved
+
+    def missing_candles(self, symbol: str, timeframe: str, exchange_id: str, start_ms: int, end_ms: int) -> int:
+        """Liczba świec z zakresu, których nie ma w bazie ani w zapamiętanych pustych zakresach."""
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        ranges = self.find_missing_ranges(symbol, timeframe, exchange_id, start_ms, end_ms, timeframe_ms)
+        return sum((end - start) // timeframe_ms + 1 for start, end in ranges)
+
+    def find_missing_ranges(self, symbol: str, timeframe: str, exchange_id: str, start_ms: int, end_ms: int, timeframe_ms: int) -> List[Tuple[int, int]]:
+        """Porównuje oczekiwaną siatkę zamkniętych świec z tym, co jest w bazie i zwraca brakujące zakresy [od, do] w ms."""
+        first_open = -(-start_ms // timeframe_ms) * timeframe_ms # Pierwsze otwarcie świecy >= start
+        last_closed_open = int(time.time() * 1000) // timeframe_ms * timeframe_ms - timeframe_ms
+        last_open = min(end_ms // timeframe_ms * timeframe_ms, last_closed_open)
+        if last_open < first_open: return []
+        expected = np.arange(first_open, last_open + 1, timeframe_ms, dtype=np.int64)
+        stored = self.db_manager.get_ohlcv_timestamps(symbol, timeframe, exchange_id, first_open // 1000, last_open // 1000) * 1000
+        missing = expected[~np.isin(expected, stored, assume_unique=True)]
+        for empty_start, empty_end in self.db_manager.get_ohlcv_empty_ranges(symbol, timeframe, exchange_id, first_open // 1000, last_open // 1000):
+            missing = missing[(missing < empty_start * 1000) | (missing > empty_end * 1000)]
+        return self._to_ranges(missing, timeframe_ms)
+
+    @staticmethod
+    def _to_ranges(missing: np.ndarray, timeframe_ms: int) -> List[Tuple[int, int]]:
+        """Zamienia posortowane otwarcia świec na ciągłe zakresy [od, do] w ms."""
+        if missing.size == 0: return []
+        # Dzielimy świece na ciągłe zakresy w miejscach, gdzie przerwa jest większa niż jeden interwał
+        breaks = np.flatnonzero(np.diff(missing) != timeframe_ms) + 1
+        starts = np.concatenate(([missing[0]], missing[breaks]))
+        ends = np.concatenate((missing[breaks - 1], [missing[-1]]))
+        return [(int(s), int(e)) for s, e in zip(starts, ends)]
+
+    @staticmethod
+    def split_into_pages(ranges: List[Tuple[int, int]], timeframe_ms: int, page_size: int) -> List[Tuple[int, int]]:
+        """Dzieli zakresy na okna po co najwyżej 'page_size' świec."""
+        pages = []
+        page_span = page_size * timeframe_ms
+        for range_start, range_end in ranges:
+            for page_start in range(range_start, range_end + 1, page_span):
+                pages.append((page_start, min(page_start + page_span - timeframe_ms, range_end)))
+        return pages
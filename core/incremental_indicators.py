@@ -0,0 +1,203 @@
+import copy
+import logging
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.indicator_service import IndicatorKeyGenerator
+from core.ohlcv_frame import OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+_DAY_MS = 86_400_000
+
+class _Ema:
+    """EMA w wariancie pandas_ta: pierwsza wartość to SMA z 'length' obserwacji, dalej ewm(adjust=False)."""
+    __slots__ = ('length', 'alpha', 'count', 'seed_sum', 'value')
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count, self.seed_sum, self.value = 0, 0.0, NAN
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        if self.count < self.length:
+            self.seed_sum += x
+        elif self.count == self.length:
+            self.value = (self.seed_sum + x) / self.length
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+class _Rma:
+    """Średnia Wildera (RMA) liczona tak jak ewm(alpha=1/length, min_periods=length) w pandas."""
+    __slots__ = ('length', 'decay', 'count', 'weighted', 'old_wt')
+
+    def __init__(self, length: int):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.count, self.weighted, self.old_wt = 0, NAN, 1.0
+
+    def update(self, x: float) -> float:
+        if x != x: # NaN przed pierwszą obserwacją nie wpływa na wagi
+            if self.count: self.old_wt *= self.decay
+        elif self.count == 0:
+            self.weighted, self.count = x, 1
+        else:
+            self.old_wt *= self.decay
+            self.weighted = (self.old_wt * self.weighted + x) / (self.old_wt + 1.0)
+            self.old_wt += 1.0
+            self.count += 1
+        return self.weighted if self.count >= self.length else NAN
+
+class _BBands:
+    """Okno ostatnich cen zamknięcia dla wstęg Bollingera (odchylenie populacyjne, ddof=0)."""
+    __slots__ = ('length', 'std', 'window')
+
+    def __init__(self, length: int, std: float):
+        self.length, self.std = length, std
+        self.window: Deque[float] = deque(maxlen=length)
+
+    def __copy__(self):
+        clone = _BBands.__new__(_BBands)
+        clone.length, clone.std, clone.window = self.length, self.std, self.window.copy()
+        return clone
+
+    def update(self, close: float) -> Tuple[float, float, float, float, float]:
+        self.window.append(close)
+        if len(self.window) < self.length: return NAN, NAN, NAN, NAN, NAN
+        mid = math.fsum(self.window) / self.length
+        deviation = self.std * math.sqrt(math.fsum((x - mid) ** 2 for x in self.window) / self.length)
+        lower, upper = mid - deviation, mid + deviation
+        bandwidth = 100 * (upper - lower) / mid if mid else NAN
+        percent = (close - lower) / (upper - lower) if upper != lower else NAN
+        return lower, mid, upper, bandwidth, percent
+
+class _SeriesState:
+    """Pełny stan wskaźników jednej serii świec - kopiowany przed każdą nową świecą."""
+    __slots__ = ('prev_close', 'atr', 'obv', 'rsi_up', 'rsi_down', 'ema_fast', 'ema_slow',
+                 'macd_fast', 'macd_slow', 'macd_signal', 'bbands', 'vwap_day', 'vwap_pv', 'vwap_volume')
+
+    def __init__(self, p: dict):
+        self.prev_close = NAN
+        self.atr = _Rma(p.get('atr_length', 14))
+        self.obv = 0.0
+        self.rsi_up, self.rsi_down = _Rma(p.get('rsi_length', 14)), _Rma(p.get('rsi_length', 14))
+        self.ema_fast, self.ema_slow = _Ema(p.get('ema_fast_length', 50)), _Ema(p.get('ema_slow_length', 200))
+        self.macd_fast, self.macd_slow = _Ema(p.get('macd_fast', 12)), _Ema(p.get('macd_slow', 26))
+        self.macd_signal = _Ema(p.get('macd_signal', 9))
+        self.bbands = _BBands(p.get('bbands_length', 20), p.get('bbands_std', 2.0))
+        self.vwap_day, self.vwap_pv, self.vwap_volume = None, 0.0, 0.0
+
+    def copy(self) -> '_SeriesState':
+        clone = _SeriesState.__new__(_SeriesState)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            setattr(clone, name, copy.copy(value) if isinstance(value, (_Ema, _Rma, _BBands)) else value)
+        return clone
+
+    def apply(self, ts: int, high: float, low: float, close: float, volume: float) -> Tuple[float, ...]:
+        prev_close = self.prev_close
+        first = prev_close != prev_close
+
+        true_range = NAN if first else max(high - low, abs(high - prev_close), abs(prev_close - low))
+        atr = self.atr.update(true_range)
+
+        if first: self.obv = volume
+        elif close > prev_close: self.obv += volume
+        elif close < prev_close: self.obv -= volume
+
+        change = NAN if first else close - prev_close
+        up = self.rsi_up.update(NAN if first else max(change, 0.0))
+        down = self.rsi_down.update(NAN if first else min(change, 0.0))
+        rsi = 100 * up / (up + abs(down)) if (up + abs(down)) else NAN
+
+        ema_fast, ema_slow = self.ema_fast.update(close), self.ema_slow.update(close)
+
+        macd = self.macd_fast.update(close) - self.macd_slow.update(close)
+        signal = self.macd_signal.update(macd) if macd == macd else NAN
+
+        lower, mid, upper, bandwidth, percent = self.bbands.update(close)
+
+        day = ts // _DAY_MS
+        if day != self.vwap_day:
+            self.vwap_day, self.vwap_pv, self.vwap_volume = day, 0.0, 0.0 # Nowa sesja dzienna
+        self.vwap_pv += (high + low + close) / 3 * volume
+        self.vwap_volume += volume
+        vwap = self.vwap_pv / self.vwap_volume if self.vwap_volume else NAN
+
+        self.prev_close = close
+        return (atr, self.obv, rsi, ema_fast, ema_slow, macd, macd - signal, signal,
+                lower, mid, upper, bandwidth, percent, vwap)
+
+class IncrementalIndicatorEngine:
+    """
+    Przyrostowy odpowiednik IndicatorService.calculate_all dla danych strumieniowych.
+    Trzyma stan wskaźników (EMA, średnie Wildera dla RSI i ATR, OBV, okno wstęg, akumulatory VWAP),
+    więc nowa świeca lub aktualizacja bieżącej kosztuje stałą liczbę operacji zamiast przeliczania całej ramki.
+    Kolumny wynikowe mają nazwy z IndicatorKeyGenerator, tak jak w calculate_all.
+    """
+
+    def __init__(self, params: Optional[dict] = None, max_rows: int = 1000):
+        self.params = params or {}
+        keys = IndicatorKeyGenerator(self.params)
+        self.indicator_columns: List[str] = [
+            keys.atr(), 'OBV', keys.rsi(), keys.ema(fast=True), keys.ema(fast=False),
+            keys.macd(), keys.macd_hist(), keys.macd_signal(),
+            keys.bbands_lower(), keys.bbands_mid(), keys.bbands_upper(), keys.bbands_bandwidth(), keys.bbands_percent(),
+            keys.vwap(),
+        ]
+        self._state = _SeriesState(self.params)
+        self._committed: Optional[_SeriesState] = None # Stan sprzed bieżącej (niezamkniętej) świecy
+        self._rows: Deque[tuple] = deque(maxlen=max_rows)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self._rows[-1][0] if self._rows else None
+
+    def load(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Odbudowuje stan od zera na podstawie historii (indeks datetime, kolumny Open..Volume)."""
+        self._state = _SeriesState(self.params)
+        self._committed = None
+        self._rows.clear()
+        if df is not None and not df.empty:
+            timestamps = df.index.values.astype('datetime64[ms]').astype('int64').tolist()
+            values = df[OHLCV_COLUMNS].to_numpy(dtype=float).tolist()
+            for ts, row in zip(timestamps, values):
+                self.update([ts, *row])
+        return self.to_frame()
+
+    def update(self, candle: Sequence[float]) -> Optional[Dict[str, float]]:
+        """
+        Wprowadza świecę [ts, o, h, l, c, v]. Świeca z tym samym znacznikiem czasu co ostatnia
+        zastępuje ją (stan jest odtwarzany sprzed niej); starsze świece są pomijane.
+        Zwraca wartości wskaźników dla tej świecy.
+        """
+        ts = int(candle[0])
+        last_ts = self.last_timestamp
+        if last_ts is not None and ts < last_ts:
+            return None
+        if ts == last_ts:
+            self._state = self._committed.copy()
+            self._rows.pop()
+        else:
+            self._committed = self._state.copy()
+
+        open_, high, low, close, volume = (float(x) for x in candle[1:6])
+        values = self._state.apply(ts, high, low, close, volume)
+        self._rows.append((ts, open_, high, low, close, volume, *values))
+        return dict(zip(self.indicator_columns, values))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Zwraca świece wraz z kolumnami wskaźników w formacie wyniku calculate_all."""
+        columns = OHLCV_COLUMNS + self.indicator_columns
+        if not self._rows:
+            return pd.DataFrame(columns=columns)
+        data = np.array(self._rows, dtype=np.float64)
+        index = pd.DatetimeIndex((data[:, 0].astype(np.int64) * 1_000_000).view('datetime64[ns]'), name='timestamp')
+        return pd.DataFrame(data[:, 1:], index=index, columns=columns)
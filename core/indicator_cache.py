@@ -0,0 +1,62 @@
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app_config import INDICATOR_CACHE_MAX_ENTRIES
+
+def frame_fingerprint(df: pd.DataFrame, params: Dict[str, Any]) -> Tuple[Hashable, ...]:
+    """
+    Tani odcisk ramki świec: długość, pierwszy i ostatni znacznik czasu, kolumny, ostatni wiersz
+    OHLCV oraz parametry wskaźników. Nie czyta całej ramki - koszt jest stały niezależnie od jej długości.
+    """
+    last_row = tuple(df[col].iat[-1] for col in ('Open', 'High', 'Low', 'Close', 'Volume') if col in df.columns)
+    return (len(df), df.index[0], df.index[-1], tuple(df.columns), last_row, tuple(sorted(params.items())))
+
+class IndicatorCache:
+    """
+    Pamięć podręczna wyników IndicatorService.calculate_all adresowana odciskiem ramki wejściowej.
+    Jedna analiza liczy wskaźniki na tych samych danych kilka razy - powtórki są obsługiwane z cache'a.
+    Rozmiar jest ograniczony liczbą wpisów (LRU).
+    """
+
+    def __init__(self, max_entries: int = INDICATOR_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, ...], pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock() # Backtester i UI mogą liczyć wskaźniki z innych wątków
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[Hashable, ...], record_miss: bool = True) -> Optional[pd.DataFrame]:
+        """Zwraca kopię zapamiętanego wyniku; 'record_miss=False' dla zapytań pomocniczych, by nie zawyżać chybień."""
+        with self._lock:
+            df = self._entries.get(key)
+            if df is None:
+                if record_miss: self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return df.copy() # Wywołujący mogą modyfikować wynik - zwracamy kopię
+
+    def put(self, key: Tuple[Hashable, ...], df: pd.DataFrame):
+        if self.max_entries <= 0: return
+        with self._lock:
+            self._entries[key] = df.copy()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False); self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Zwraca liczniki trafień i zajętość cache'a."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "entries": len(self._entries), "max_entries": self.max_entries
+            }
@@ -0,0 +1,139 @@
+"""
+Wektorowe jądra NumPy dla stałego zestawu wskaźników IndicatorService (ATR, OBV, RSI, EMA, MACD,
+wstęgi Bollingera, VWAP). Definicje odpowiadają pandas_ta, a rekurencje (EMA, średnia Wildera) są liczone
+filtrem liniowym scipy.signal.lfilter zamiast pętli w Pythonie.
+Oś czasu jest zawsze ostatnią osią tablicy - te same funkcje działają dla jednej serii (n,)
+i dla wielu serii naraz (symbole, n).
+"""
+import numpy as np
+from scipy.signal import lfilter
+from typing import Dict, Iterable, Optional, Tuple
+
+from core.indicator_service import IndicatorKeyGenerator
+
+def _nan_like(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape, np.nan, dtype=np.float64)
+
+def _diff(x: np.ndarray) -> np.ndarray:
+    """Różnica względem poprzedniej wartości; pierwszy element to NaN (jak Series.diff)."""
+    out = _nan_like(x)
+    out[..., 1:] = x[..., 1:] - x[..., :-1]
+    return out
+
+def ema(close: np.ndarray, length: int) -> np.ndarray:
+    """EMA jak w pandas_ta: wartość startowa to SMA pierwszych 'length' cen, dalej ewm(span=length, adjust=False)."""
+    out = _nan_like(close)
+    if close.shape[-1] < length: return out
+    alpha = 2.0 / (length + 1)
+    seed = close[..., :length].mean(axis=-1)
+    out[..., length - 1] = seed
+    if close.shape[-1] > length:
+        zi = np.asarray((1 - alpha) * seed, dtype=np.float64)[..., None]
+        out[..., length:], _ = lfilter([alpha], [1.0, alpha - 1.0], close[..., length:], axis=-1, zi=zi)
+    return out
+
+def rma(x: np.ndarray, length: int) -> np.ndarray:
+    """
+    Średnia Wildera: ewm(alpha=1/length, min_periods=length) z adjust=True. Licznik i mianownik
+    ważonej średniej to dwa filtry rekurencyjne; NaN nie wnoszą wagi, ale upływ czasu je postarza.
+    """
+    valid = ~np.isnan(x)
+    decay = 1.0 - 1.0 / length
+    numerator = lfilter([1.0], [1.0, -decay], np.where(valid, x, 0.0), axis=-1)
+    denominator = lfilter([1.0], [1.0, -decay], valid.astype(np.float64), axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = numerator / denominator
+    out[np.cumsum(valid, axis=-1) < length] = np.nan
+    return out
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[..., 1:] = close[..., :-1]
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(prev_close - low)))
+    return rma(true_range, length)
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    sign = np.sign(_diff(close))
+    sign[..., 0] = 1.0
+    return np.cumsum(sign * volume, axis=-1)
+
+def rsi(close: np.ndarray, length: int) -> np.ndarray:
+    change = _diff(close)
+    up, down = rma(np.clip(change, 0.0, None), length), rma(np.clip(change, None, 0.0), length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * up / (up + np.abs(down))
+
+def macd(close: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Zwraca (MACD, histogram, linia sygnału); sygnał to EMA liczona od pierwszej poprawnej wartości MACD."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = _nan_like(close)
+    first_valid = max(fast, slow) - 1
+    if close.shape[-1] > first_valid:
+        signal_line[..., first_valid:] = ema(line[..., first_valid:], signal)
+    return line, line - signal_line, signal_line
+
+def bbands(close: np.ndarray, length: int, std: float) -> Tuple[np.ndarray, ...]:
+    """Zwraca (dolna, środkowa, górna, szerokość w %, pozycja ceny) - odchylenie populacyjne jak w pandas_ta."""
+    lower, mid, upper = _nan_like(close), _nan_like(close), _nan_like(close)
+    if close.shape[-1] >= length:
+        windows = np.lib.stride_tricks.sliding_window_view(close, length, axis=-1)
+        mid[..., length - 1:] = windows.mean(axis=-1)
+        deviation = std * windows.std(axis=-1)
+        lower[..., length - 1:] = mid[..., length - 1:] - deviation
+        upper[..., length - 1:] = mid[..., length - 1:] + deviation
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bandwidth = 100 * (upper - lower) / mid
+        percent = (close - lower) / (upper - lower)
+    return lower, mid, upper, bandwidth, percent
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, day_ids: np.ndarray) -> np.ndarray:
+    """VWAP z akumulatorami zerowanymi na początku każdej sesji dziennej ('day_ids' - numer dnia każdej świecy)."""
+    weighted = (high + low + close) / 3 * volume
+    new_day = np.empty(day_ids.shape[-1], dtype=bool)
+    new_day[:1] = True
+    new_day[1:] = day_ids[1:] != day_ids[:-1]
+    session_start = np.maximum.accumulate(np.where(new_day, np.arange(new_day.size), 0))
+    cum_weighted, cum_volume = np.cumsum(weighted, axis=-1), np.cumsum(volume, axis=-1)
+    # Suma skumulowana sprzed początku sesji = wartość w pierwszej świecy sesji minus jej wkład
+    weighted_before = (cum_weighted - weighted)[..., session_start]
+    volume_before = (cum_volume - volume)[..., session_start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (cum_weighted - weighted_before) / (cum_volume - volume_before)
+
+def day_ids_from_index(timestamps_ns: np.ndarray) -> np.ndarray:
+    """Numer dnia (UTC) dla znaczników czasu datetime64[ns] - granice sesji dla VWAP_D."""
+    return timestamps_ns.astype('datetime64[D]').astype(np.int64)
+
+def compute_indicators(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, params: dict,
+                       day_ids: Optional[np.ndarray] = None, selected: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Liczy zestaw wskaźników calculate_all; klucze to nazwy kolumn z IndicatorKeyGenerator w kolejności
+    dodawania ich przez pandas_ta. 'selected' (nazwy z IndicatorKeyGenerator.columns_by_indicator) ogranicza
+    obliczenia do potrzebnych wskaźników. VWAP jest pomijany, gdy nie ma granic sesji.
+    """
+    keys = IndicatorKeyGenerator(params)
+    wanted = set(keys.columns_by_indicator()) if selected is None else set(selected)
+    columns: Dict[str, np.ndarray] = {}
+    if 'atr' in wanted: columns[keys.atr()] = atr(high, low, close, params.get('atr_length', 14))
+    if 'obv' in wanted: columns['OBV'] = obv(close, volume)
+    if 'rsi' in wanted: columns[keys.rsi()] = rsi(close, params.get('rsi_length', 14))
+    if 'ema_fast' in wanted: columns[keys.ema(fast=True)] = ema(close, params.get('ema_fast_length', 50))
+    if 'ema_slow' in wanted: columns[keys.ema(fast=False)] = ema(close, params.get('ema_slow_length', 200))
+    if 'macd' in wanted:
+        macd_line, macd_hist, macd_signal = macd(close, params.get('macd_fast', 12), params.get('macd_slow', 26), params.get('macd_signal', 9))
+        columns.update({keys.macd(): macd_line, keys.macd_hist(): macd_hist, keys.macd_signal(): macd_signal})
+    if 'bbands' in wanted:
+        lower, mid, upper, bandwidth, percent = bbands(close, params.get('bbands_length', 20), params.get('bbands_std', 2.0))
+        columns.update({keys.bbands_lower(): lower, keys.bbands_mid(): mid, keys.bbands_upper(): upper,
+                        keys.bbands_bandwidth(): bandwidth, keys.bbands_percent(): percent})
+    if 'vwap' in wanted and day_ids is not None:
+        columns[keys.vwap()] = vwap(high, low, close, volume, day_ids)
+    return columns
+
+def compute_indicators_batch(ohlcv: np.ndarray, params: dict, day_ids: Optional[np.ndarray] = None, selected: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Wersja wsadowa compute_indicators dla tensora (symbole, czas, pole) z polami w kolejności
+    Open, High, Low, Close, Volume. Wszystkie symbole muszą mieć wspólną oś czasu; wynikiem są tablice (symbole, czas).
+    """
+    high, low, close, volume = (np.ascontiguousarray(ohlcv[..., field], dtype=np.float64) for field in (1, 2, 3, 4))
+    return compute_indicators(high, low, close, volume, params, day_ids, selected)
@@ -1,21 +1,26 @@
+import importlib.util
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
 import logging
 import re
 import os
 import sys
 from contextlib import contextmanager
-from typing import Dict, Any, Optional, TYPE_CHECKING
+from typing import Dict, Any, Hashable, Iterable, List, Optional, Tuple, TYPE_CHECKING
 from scipy.signal import find_peaks
 from core.utils import suppress_stdout
 
 from core.settings_manager import SettingsManager
+from core.indicator_cache import IndicatorCache, frame_fingerprint
 
 if TYPE_CHECKING:
     from core.analyzer import TechnicalAnalyzer
+    from core.incremental_indicators import IncrementalIndicatorEngine
 
 logger = logging.getLogger(__name__)
 
+_OHLCV_RENAME = {'OPEN': 'Open', 'HIGH': 'High', 'LOW': 'Low', 'CLOSE': 'Close', 'VOLUME': 'Volume'}
+
 # Przenosimy tutaj wszystkie powiązane klasy i funkcje
 @contextmanager
 def suppress_stdout():
@@ -38,62 +43,311 @@ class IndicatorKeyGenerator:
         length = self.p.get('ema_fast_length', 50) if fast else self.p.get('ema_slow_length', 200)
         return f"EMA_{length}"
     def macd(self) -> str: return f"MACD_{self.p.get('macd_fast',12)}_{self.p.get('macd_slow',26)}_{self.p.get('macd_signal',9)}"
-    def macd_signal(self) -> str: return f"MACDs_{self.p.get('macd_fast',12)}_{self.p.get('macd_slow',26)}_{self.p.get('macd_signal',9)}"
+    def macd_signal(self) -> str: return f"MACDS_{self.p.get('macd_fast',12)}_{self.p.get('macd_slow',26)}_{self.p.get('macd_signal',9)}"
+    def macd_hist(self) -> str: return f"MACDH_{self.p.get('macd_fast',12)}_{self.p.get('macd_slow',26)}_{self.p.get('macd_signal',9)}"
     def bbands_upper(self) -> str: return f"BBU_{self.p.get('bbands_length', 20)}_{self.p.get('bbands_std', 2.0)}"
+    def bbands_mid(self) -> str: return f"BBM_{self.p.get('bbands_length', 20)}_{self.p.get('bbands_std', 2.0)}"
     def bbands_lower(self) -> str: return f"BBL_{self.p.get('bbands_length', 20)}_{self.p.get('bbands_std', 2.0)}"
+    def bbands_bandwidth(self) -> str: return f"BBB_{self.p.get('bbands_length', 20)}_{self.p.get('bbands_std', 2.0)}"
+    def bbands_percent(self) -> str: return f"BBP_{self.p.get('bbands_length', 20)}_{self.p.get('bbands_std', 2.0)}"
     def vwap(self) -> str: return "VWAP_D"
     def atr(self) -> str: return f"ATRR_{self.p.get('atr_length', 14)}"
 
+    def columns_by_indicator(self) -> Dict[str, List[str]]:
+        """Kolumny wynikowe każdego wskaźnika, w kolejności dodawania ich przez calculate_all."""
+        return {
+            'atr': [self.atr()], 'obv': ['OBV'], 'rsi': [self.rsi()],
+            'ema_fast': [self.ema(fast=True)], 'ema_slow': [self.ema(fast=False)],
+            'macd': [self.macd(), self.macd_hist(), self.macd_signal()],
+            'bbands': [self.bbands_lower(), self.bbands_mid(), self.bbands_upper(), self.bbands_bandwidth(), self.bbands_percent()],
+            'vwap': [self.vwap()],
+        }
+
+    def resolve_indicators(self, requested: Iterable[str]) -> List[str]:
+        """
+        Zamienia żądane kolumny (np. 'MACDS_12_26_9') lub nazwy wskaźników (np. 'macd') na listę wskaźników
+        do policzenia. Kolumna pociąga za sobą cały wskaźnik, więc zależności (sygnał MACD od linii MACD,
+        szerokość wstęg od wstęg) są spełnione automatycznie.
+        """
+        columns = self.columns_by_indicator()
+        owner = {col: name for name, cols in columns.items() for col in cols}
+        needed = set()
+        for item in requested:
+            name = item if item in columns else owner.get(item)
+            if name is None:
+                logger.warning(f"Nieznany wskaźnik lub kolumna '{item}' - pomijam.")
+                continue
+            needed.add(name)
+        return [name for name in columns if name in needed]
+
 class IndicatorService:
     """Oblicza i interpretuje wskaźniki techniczne."""
     def __init__(self, settings_manager: SettingsManager, analyzer: 'TechnicalAnalyzer'):
         self.settings = settings_manager
         self.analyzer = analyzer
+        self.cache = IndicatorCache(settings_manager.get('cache.indicator_max_entries', 128))
+        self._pandas_ta_available: Optional[bool] = None
 
-    def calculate_all(self, df: pd.DataFrame) -> pd.DataFrame:
+    def calculate_all(self, df: pd.DataFrame, indicators: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Dodaje do ramki kolumny wskaźników. 'indicators' ogranicza obliczenia do potrzebnych kolumn
+        lub wskaźników (np. [keys.ema(fast=True), keys.rsi()]); domyślnie liczony jest pełny zestaw.
+        """
         if df is None or df.empty: return pd.DataFrame()
-        
+
+        params = self.settings.get('analysis.indicator_params', {})
+        backend = self.get_backend()
+        selected = IndicatorKeyGenerator(params).resolve_indicators(indicators) if indicators is not None else None
+        cache_key, cached = self._from_cache(df, params, backend, selected)
+        if cached is not None:
+            return cached
+
+        if backend == 'numpy':
+            result, complete = self._calculate_with_numpy(df, params, selected)
+        else:
+            result, complete = self._calculate_with_pandas_ta(df, params, selected)
+
+        if complete:
+            self.cache.put(cache_key, result)
+        return result
+
+    def _from_cache(self, df: pd.DataFrame, params: Dict[str, Any], backend: str, selected: Optional[List[str]]) -> Tuple[Tuple[Hashable, ...], Optional[pd.DataFrame]]:
+        """Klucz wyniku w cache'u i zapamiętany wynik (albo None)."""
+        cache_key = frame_fingerprint(df, {**params, 'backend': backend, 'indicators': tuple(selected) if selected is not None else None})
+        cached = self.cache.get(cache_key, record_miss=selected is None)
+        if cached is None and selected is not None:
+            # Pełny wynik z cache'a zawiera też wszystkie żądane kolumny
+            cached = self.cache.get(frame_fingerprint(df, {**params, 'backend': backend, 'indicators': None}))
+        return cache_key, cached
+
+    def get_backend(self) -> str:
+        """
+        Zwraca silnik obliczeń wskaźników: 'pandas_ta' (domyślny) lub 'numpy' (ustawienie analysis.indicator_backend).
+        Gdy pandas_ta nie jest zainstalowany, używany jest silnik NumPy.
+        """
+        backend = self.settings.get('analysis.indicator_backend', 'pandas_ta')
+        if backend == 'pandas_ta' and not self._is_pandas_ta_available():
+            return 'numpy'
+        return backend
+
+    def _is_pandas_ta_available(self) -> bool:
+        if self._pandas_ta_available is None:
+            self._pandas_ta_available = importlib.util.find_spec('pandas_ta') is not None
+            if not self._pandas_ta_available:
+                logger.warning("Biblioteka pandas_ta nie jest dostępna - wskaźniki będą liczone silnikiem NumPy.")
+        return self._pandas_ta_available
+
+    def _calculate_with_pandas_ta(self, df: pd.DataFrame, params: Dict[str, Any], selected: Optional[List[str]] = None) -> Tuple[pd.DataFrame, bool]:
         df_copy = df.copy()
         rename_map = {col: col.lower() for col in df_copy.columns}
         df_copy.rename(columns=rename_map, inplace=True)
-        
+        complete = True
+
         try:
-            params = self.settings.get('analysis.indicator_params', {})
-            
+            import pandas_ta  # noqa: F401 - rejestruje akcesor DataFrame.ta; import leniwy, aby ścieżka strumieniowa go nie wymagała
+
             if 'close' not in df_copy.columns:
                 logger.error("Brak kolumny 'close' w DataFrame! Przerywam obliczenia wskaźników.")
-                return df
-
-            df_copy.ta.atr(append=True, length=params.get('atr_length', 14))
-            df_copy.ta.obv(append=True)
-            df_copy.ta.rsi(append=True, length=params.get('rsi_length', 14))
-            df_copy.ta.ema(append=True, length=params.get('ema_fast_length', 50))
-            df_copy.ta.ema(append=True, length=params.get('ema_slow_length', 200))
-            df_copy.ta.macd(append=True, fast=params.get('macd_fast', 12), slow=params.get('macd_slow', 26), signal=params.get('macd_signal', 9))
-            df_copy.ta.bbands(append=True, length=params.get('bbands_length', 20), std=params.get('bbands_std', 2.0))
-            df_copy.ta.vwap(append=True)
+                return df, False
+
+            wanted = (lambda name: selected is None or name in selected)
+            if wanted('atr'): df_copy.ta.atr(append=True, length=params.get('atr_length', 14))
+            if wanted('obv'): df_copy.ta.obv(append=True)
+            if wanted('rsi'): df_copy.ta.rsi(append=True, length=params.get('rsi_length', 14))
+            if wanted('ema_fast'): df_copy.ta.ema(append=True, length=params.get('ema_fast_length', 50))
+            if wanted('ema_slow'): df_copy.ta.ema(append=True, length=params.get('ema_slow_length', 200))
+            if wanted('macd'): df_copy.ta.macd(append=True, fast=params.get('macd_fast', 12), slow=params.get('macd_slow', 26), signal=params.get('macd_signal', 9))
+            if wanted('bbands'): df_copy.ta.bbands(append=True, length=params.get('bbands_length', 20), std=params.get('bbands_std', 2.0))
+            if wanted('vwap'): df_copy.ta.vwap(append=True)
         except Exception as e:
             logger.error(f"Błąd podczas obliczania wskaźników w pandas-ta: {e}", exc_info=True)
+            complete = False # Nie zapamiętujemy niepełnego wyniku
         finally:
             df_copy.columns = [col.upper() for col in df_copy.columns]
-            df_copy.rename(columns={'OPEN': 'Open', 'HIGH': 'High', 'LOW': 'Low', 'CLOSE': 'Close', 'VOLUME': 'Volume'}, inplace=True)
-            
-        return df_copy
+            df_copy.rename(columns=_OHLCV_RENAME, inplace=True)
+
+        return df_copy, complete
+
+    def _calculate_with_numpy(self, df: pd.DataFrame, params: Dict[str, Any], selected: Optional[List[str]] = None) -> Tuple[pd.DataFrame, bool]:
+        """Ten sam zestaw kolumn co pandas_ta, liczony wektorowo na ciągłych tablicach (core/indicator_kernels.py)."""
+        from core.indicator_kernels import compute_indicators, day_ids_from_index
+
+        df_copy = df.copy()
+        df_copy.columns = [_OHLCV_RENAME.get(col.upper(), col.upper()) for col in df_copy.columns]
+        if not set(_OHLCV_RENAME.values()).issubset(df_copy.columns):
+            logger.error("Brak kolumn OHLCV w DataFrame! Przerywam obliczenia wskaźników.")
+            return df, False
+
+        high, low, close, volume = (df_copy[col].to_numpy(dtype=np.float64) for col in ('High', 'Low', 'Close', 'Volume'))
+        day_ids = day_ids_from_index(df_copy.index.values) if isinstance(df_copy.index, pd.DatetimeIndex) else None
+        if day_ids is None and (selected is None or 'vwap' in selected):
+            logger.warning("Indeks ramki nie jest typu datetime - pomijam VWAP.")
+        columns = compute_indicators(high, low, close, volume, params, day_ids, selected)
+        indicators = pd.DataFrame(columns, index=df_copy.index)
+        return pd.concat([df_copy.drop(columns=[c for c in columns if c in df_copy.columns]), indicators], axis=1), True
+
+    def get_cache_stats(self) -> Dict[str, float]:
+        """Zwraca statystyki cache'a wyników calculate_all."""
+        return self.cache.stats()
+
+    def calculate_batch(self, frames: Dict[Hashable, pd.DataFrame], indicators: Optional[Iterable[str]] = None) -> Dict[Hashable, pd.DataFrame]:
+        """
+        Liczy wskaźniki dla wielu symboli naraz. Ramki o wspólnej osi czasu są składane w tensor
+        (symbole, czas, pole) i przeliczane jednym wektorowym przebiegiem silnika NumPy; pozostałe trafiają
+        do calculate_all. Wyniki (kolumny Open..Volume i wskaźniki) są widokami jednego wspólnego bloku pamięci.
+        'indicators' działa jak w calculate_all. Wynik każdej ramki jest taki sam jak z calculate_all: przy
+        silniku pandas_ta ramki są liczone pojedynczo, a przy NumPy wyniki trafiają do tego samego cache'a.
+        """
+        from core.indicator_kernels import compute_indicators_batch, day_ids_from_index
+
+        backend = self.get_backend()
+        if backend != 'numpy':
+            return {key: self.calculate_all(df, indicators) for key, df in frames.items()}
+
+        params = self.settings.get('analysis.indicator_params', {})
+        selected = IndicatorKeyGenerator(params).resolve_indicators(indicators) if indicators is not None else None
+        ohlcv_columns = list(_OHLCV_RENAME.values())
+        results: Dict[Hashable, pd.DataFrame] = {}
+        cache_keys: Dict[Hashable, Tuple[Hashable, ...]] = {}
+        groups: Dict[Tuple, List[Hashable]] = {}
+        for key, df in frames.items():
+            # Dodatkowe kolumny zostają w wyniku calculate_all, a blok wsadowy ma tylko OHLCV i wskaźniki
+            if df is None or df.empty or list(df.columns) != ohlcv_columns:
+                results[key] = self.calculate_all(df, indicators)
+                continue
+            cache_keys[key], cached = self._from_cache(df, params, backend, selected)
+            if cached is not None:
+                results[key] = cached
+                continue
+            groups.setdefault((len(df), df.index[0], df.index[-1]), []).append(key)
+
+        for keys_in_group in groups.values():
+            index = frames[keys_in_group[0]].index
+            batch_keys = [k for k in keys_in_group if frames[k].index.equals(index)]
+            for key in keys_in_group:
+                if key not in batch_keys: results[key] = self.calculate_all(frames[key], indicators)
+
+            ohlcv = np.stack([frames[k][list(_OHLCV_RENAME.values())].to_numpy(dtype=np.float64) for k in batch_keys])
+            day_ids = day_ids_from_index(index.values) if isinstance(index, pd.DatetimeIndex) else None
+            computed = compute_indicators_batch(ohlcv, params, day_ids, selected)
+
+            block = np.empty((len(batch_keys), len(index), 5 + len(computed)), dtype=np.float64)
+            block[..., :5] = ohlcv
+            for position, values in enumerate(computed.values(), start=5):
+                block[..., position] = values
+            columns = list(_OHLCV_RENAME.values()) + list(computed)
+            for i, key in enumerate(batch_keys):
+                results[key] = pd.DataFrame(block[i], index=index, columns=columns, copy=False)
+                self.cache.put(cache_keys[key], results[key])
+        return results
+
+    def create_incremental_engine(self, df: Optional[pd.DataFrame] = None) -> 'IncrementalIndicatorEngine':
+        """Tworzy przyrostowy silnik wskaźników (dla danych strumieniowych) z bieżącymi parametrami i opcjonalną historią."""
+        from core.incremental_indicators import IncrementalIndicatorEngine
+        engine = IncrementalIndicatorEngine(self.settings.get('analysis.indicator_params', {}))
+        if df is not None: engine.load(df)
+        return engine
 
     def interpret_all(self, df: pd.DataFrame) -> Dict[str, Any]:
         if len(df) < 2: return {}
-        interpretations = {}
+        return self.interpret_many({0: df})[0]
+
+    def interpret_many(self, frames: Dict[Hashable, pd.DataFrame]) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Interpretuje wskaźniki wielu ramek naraz (interwały jednej analizy lub wiele symboli). Z każdej ramki
+        brane są tylko dwa ostatnie wiersze potrzebnych kolumn, a reguły są oceniane maskami NumPy dla wszystkich
+        ramek jednocześnie. Wynik dla każdej ramki ma tę samą postać co interpret_all.
+        """
+        results: Dict[Hashable, Dict[str, Any]] = {key: {} for key in frames}
+        valid = [key for key, df in frames.items() if len(df) >= 2]
+        if not valid: return results
+
         keys = IndicatorKeyGenerator(self.settings.get('analysis.indicator_params', {}))
-        pivots = self._calculate_pivot_points(df)
-        
-        interpretations.update(self._get_ema_interpretation(df, keys))
-        interpretations.update(self._get_rsi_interpretation(df, keys))
-        interpretations.update(self._get_macd_interpretation(df, keys))
-        interpretations.update(self._get_bbands_interpretation(df, keys))
-        interpretations.update(self._get_volume_interpretation(df, keys))
-        if pivots:
-            interpretations['Pivots'] = {'text': str(pivots), 'sentiment': 'neutral'}
-        return interpretations
+        fields = ['Close', 'High', 'Low', keys.rsi(), keys.ema(fast=True), keys.ema(fast=False), keys.macd(),
+                  keys.macd_signal(), keys.bbands_upper(), keys.bbands_lower(), 'OBV', keys.vwap()]
+        col = {name: i for i, name in enumerate(fields)}
+        # Brakujące kolumny zostają jako NaN - każda reguła i tak pomija wartości NaN
+        tail = np.full((len(valid), 2, len(fields)), np.nan)
+        present = np.zeros((len(valid), len(fields)), dtype=bool)
+        for row, key in enumerate(valid):
+            df = frames[key]
+            available = [i for i, name in enumerate(fields) if name in df.columns]
+            present[row, available] = True
+            tail[row][:, available] = df[[fields[i] for i in available]].iloc[-2:].to_numpy(dtype=np.float64)
+        last, prev = tail[:, 1], tail[:, 0]
+        price = last[:, col['Close']]
+
+        # Trend EMA
+        ema_fast, ema_slow = last[:, col[keys.ema(fast=True)]], last[:, col[keys.ema(fast=False)]]
+        ema_ok = ~np.isnan(ema_fast) & ~np.isnan(ema_slow)
+        ema_trend = np.select([(ema_fast > ema_slow) & (price > ema_fast), (ema_fast < ema_slow) & (price < ema_fast)], [1, -1], 0)
+
+        # RSI i dywergencja z ceną
+        rsi_val = last[:, col[keys.rsi()]]
+        rsi_ok = ~np.isnan(rsi_val)
+        rsi_zone = np.select([rsi_val > 70, rsi_val < 30], [-1, 1], 0)
+        divergences: Dict[int, Optional[str]] = {}
+        rsi_rows = np.flatnonzero(rsi_ok)
+        if self.analyzer is not None and rsi_rows.size:
+            pairs = [(frames[valid[row]]['Close'], frames[valid[row]][keys.rsi()]) for row in rsi_rows]
+            divergences = dict(zip(rsi_rows.tolist(), self.analyzer.find_divergences(pairs)))
+
+        # Przecięcie MACD z linią sygnału
+        macd_last, sig_last = last[:, col[keys.macd()]], last[:, col[keys.macd_signal()]]
+        macd_prev, sig_prev = prev[:, col[keys.macd()]], prev[:, col[keys.macd_signal()]]
+        macd_ok = ~np.isnan(macd_last) & ~np.isnan(sig_last)
+        macd_cross = np.select([(macd_last > sig_last) & (macd_prev <= sig_prev), (macd_last < sig_last) & (macd_prev >= sig_prev)], [1, -1], 0)
+
+        # Wstęgi Bollingera
+        bbu, bbl = last[:, col[keys.bbands_upper()]], last[:, col[keys.bbands_lower()]]
+        bb_ok = present[:, col[keys.bbands_upper()]] & present[:, col[keys.bbands_lower()]] & ~np.isnan(bbu)
+        bb_break = np.select([price > bbu, price < bbl], [-1, 1], 0) # Przebicie górnej - potencjalna korekta, dolnej - odbicie
+
+        # Wolumen (OBV) i pozycja względem VWAP
+        obv_last, obv_prev = last[:, col['OBV']], prev[:, col['OBV']]
+        obv_ok = ~np.isnan(obv_last) & ~np.isnan(obv_prev)
+        vwap_val = last[:, col[keys.vwap()]]
+        vwap_ok = ~np.isnan(vwap_val)
+
+        # Pivoty z poprzedniej świecy
+        pivot_ok = present[:, [col['High'], col['Low'], col['Close']]].all(axis=1)
+        prev_high, prev_low, prev_close = prev[:, col['High']], prev[:, col['Low']], prev[:, col['Close']]
+        pivot = (prev_high + prev_low + prev_close) / 3
+        pivot_levels = np.stack([pivot, 2 * pivot - prev_high, 2 * pivot - prev_low, pivot - (prev_high - prev_low), pivot + (prev_high - prev_low)], axis=1)
+
+        trend_texts = {1: ("Silny trend wzrostowy", 'bullish'), -1: ("Silny trend spadkowy", 'bearish'), 0: ("Konsolidacja lub korekta", 'neutral')}
+        rsi_texts = {-1: ("Wykupienie", 'bearish'), 1: ("Wyprzedanie", 'bullish'), 0: ("Neutralny", 'neutral')}
+        macd_texts = {1: ("Bycze przecięcie", 'bullish'), -1: ("Niedźwiedzie przecięcie", 'bearish')}
+        bb_texts = {-1: ("Przebicie górnej wstęgi", 'bearish'), 1: ("Przebicie dolnej wstęgi", 'bullish')}
+        for row, key in enumerate(valid):
+            interpretations = results[key]
+            if ema_ok[row]:
+                text, sentiment = trend_texts[int(ema_trend[row])]
+                interpretations['EMA_Trend'] = {'text': text, 'sentiment': sentiment}
+            if rsi_ok[row]:
+                label, sentiment = rsi_texts[int(rsi_zone[row])]
+                interpretations['RSI'] = {'text': f"{label} ({rsi_val[row]:.2f})", 'sentiment': sentiment}
+                divergence = divergences.get(row)
+                if divergence:
+                    interpretations['RSI_Divergence'] = {'text': 'Występuje', 'sentiment': 'bullish' if 'Bycza' in divergence else 'bearish'}
+            if macd_ok[row] and macd_cross[row]:
+                text, sentiment = macd_texts[int(macd_cross[row])]
+                interpretations['MACD'] = {'text': text, 'sentiment': sentiment}
+            if bb_ok[row] and bb_break[row]:
+                text, sentiment = bb_texts[int(bb_break[row])]
+                interpretations['Bollinger_Bands'] = {'text': text, 'sentiment': sentiment}
+            if obv_ok[row]:
+                sentiment = 'bullish' if obv_last[row] > obv_prev[row] else 'bearish'
+                interpretations['Volume_Trend_OBV'] = {'text': f"Trend {sentiment}", 'sentiment': sentiment}
+            if vwap_ok[row]:
+                sentiment = 'bullish' if price[row] > vwap_val[row] else 'bearish'
+                interpretations['VWAP_Position'] = {'text': f"Cena {('powyżej' if sentiment == 'bullish' else 'poniżej')} VWAP", 'sentiment': sentiment}
+            if pivot_ok[row]:
+                pivots = dict(zip(('PP', 'S1', 'R1', 'S2', 'R2'), pivot_levels[row].tolist()))
+                interpretations['Pivots'] = {'text': str(pivots), 'sentiment': 'neutral'}
+            else:
+                logger.error("Błąd obliczania pivotów: Brak wymaganej kolumny - High/Low/Close.")
+        return results
 
     def _calculate_pivot_points(self, df: pd.DataFrame) -> Dict[str, float]:
         if len(df) < 2: return {}
@@ -103,99 +357,3 @@ class IndicatorService:
             return {'PP': pivot, 'S1': (2*pivot)-prev['High'], 'R1': (2*pivot)-prev['Low'], 'S2': pivot-(prev['High']-prev['Low']), 'R2': pivot+(prev['High']-prev['Low'])}
         except KeyError as e:
             logger.error(f"Błąd obliczania pivotów: Brak wymaganej kolumny - {e}."); return {}
-
-    
-    def _get_rsi_interpretation(self, df: pd.DataFrame, keys: IndicatorKeyGenerator) -> dict:
-        result = {}
-        last = df.iloc[-1]
-        rsi_key = keys.rsi()
-        
-        if rsi_key in df.columns and pd.notna(last[rsi_key]):
-            rsi_val = last[rsi_key]
-            
-            sentiment = 'neutral'
-            status_text = f"Neutralny ({rsi_val:.2f})"
-            if rsi_val > 70:
-                sentiment = 'bearish'
-                status_text = f"Wykupienie ({rsi_val:.2f})"
-            elif rsi_val < 30:
-                sentiment = 'bullish'
-                status_text = f"Wyprzedanie ({rsi_val:.2f})"
-            
-            result['RSI'] = {'text': status_text, 'sentiment': sentiment}
-            
-            divergence = self.analyzer.find_divergence(df['Close'], df[rsi_key])
-            if divergence:
-                div_sentiment = 'bullish' if 'Bycza' in divergence else 'bearish'
-                result['RSI_Divergence'] = {'text': 'Występuje', 'sentiment': div_sentiment}
-        return result
-
-    def _get_ema_interpretation(self, df: pd.DataFrame, keys: IndicatorKeyGenerator) -> dict:
-        result = {}
-        last = df.iloc[-1]
-        price = last['Close']
-        ema_f_key, ema_s_key = keys.ema(fast=True), keys.ema(fast=False)
-
-        if ema_f_key in df.columns and ema_s_key in df.columns and pd.notna(last[ema_f_key]) and pd.notna(last[ema_s_key]):
-            ema_fast, ema_slow = last[ema_f_key], last[ema_s_key]
-            
-            sentiment = 'neutral'
-            trend_text = "Konsolidacja lub korekta"
-            if ema_fast > ema_slow and price > ema_fast:
-                sentiment = 'bullish'
-                trend_text = "Silny trend wzrostowy"
-            elif ema_fast < ema_slow and price < ema_fast:
-                sentiment = 'bearish'
-                trend_text = "Silny trend spadkowy"
-                
-            result['EMA_Trend'] = {
-                'text': trend_text,
-                'sentiment': sentiment
-            }
-        return result
-    
-    def _get_macd_interpretation(self, df: pd.DataFrame, keys: IndicatorKeyGenerator) -> dict:
-        result = {}
-        last, prev = df.iloc[-1], df.iloc[-2]
-        macd_key, sig_key = keys.macd(), keys.macd_signal()
-        
-        if macd_key in df.columns and sig_key in df.columns and pd.notna(last[macd_key]) and pd.notna(last[sig_key]):
-            text, sentiment = "Brak przecięcia", "neutral"
-            if last[macd_key] > last[sig_key] and prev[macd_key] <= prev[sig_key]:
-                text, sentiment = "Bycze przecięcie", "bullish"
-            elif last[macd_key] < last[sig_key] and prev[macd_key] >= prev[sig_key]:
-                text, sentiment = "Niedźwiedzie przecięcie", "bearish"
-            
-            if sentiment != 'neutral':
-                result['MACD'] = {'text': text, 'sentiment': sentiment}
-        return result
-        
-    def _get_bbands_interpretation(self, df: pd.DataFrame, keys: IndicatorKeyGenerator) -> dict:
-        result = {}
-        last = df.iloc[-1]
-        bbu_key, bbl_key = keys.bbands_upper(), keys.bbands_lower()
-        
-        if bbu_key in df.columns and bbl_key in df.columns and pd.notna(last[bbu_key]):
-            text, sentiment = None, None
-            if last['Close'] > last[bbu_key]:
-                text, sentiment = "Przebicie górnej wstęgi", "bearish" # Potencjalna korekta
-            elif last['Close'] < last[bbl_key]:
-                text, sentiment = "Przebicie dolnej wstęgi", "bullish" # Potencjalne odbicie
-            
-            if text:
-                result['Bollinger_Bands'] = {'text': text, 'sentiment': sentiment}
-        return result
-        
-    def _get_volume_interpretation(self, df: pd.DataFrame, keys: IndicatorKeyGenerator) -> dict:
-        result = {}
-        last, prev = df.iloc[-1], df.iloc[-2]
-
-        if 'OBV' in df.columns and pd.notna(last['OBV']) and pd.notna(prev['OBV']):
-            sentiment = 'bullish' if last['OBV'] > prev['OBV'] else 'bearish'
-            result['Volume_Trend_OBV'] = {'text': f"Trend {sentiment}", 'sentiment': sentiment}
-        
-        vwap_key = keys.vwap()
-        if vwap_key in df.columns and pd.notna(last[vwap_key]):
-            sentiment = 'bullish' if last['Close'] > last[vwap_key] else 'bearish'
-            result['VWAP_Position'] = {'text': f"Cena {('powyżej' if sentiment == 'bullish' else 'poniżej')} VWAP", 'sentiment': sentiment}
-        return result
\ No newline at end of file
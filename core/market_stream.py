@@ -0,0 +1,278 @@
+import asyncio
+import inspect
+import json
+import logging
+import pandas as pd
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from core.ohlcv_frame import OHLCV_COLUMNS, ohlcv_to_frame
+
+logger = logging.getLogger(__name__)
+
+class StreamClosed(Exception):
+    """Źródło danych zakończyło strumień (np. koniec nagrania w serwerze powtórek)."""
+
+@dataclass
+class StreamEvent:
+    """Pojedyncza aktualizacja ze strumienia rynkowego przekazywana subskrybentom."""
+    channel: str # 'kline', 'ticker' lub 'trades'
+    exchange_id: str
+    symbol: str
+    data: Any
+    interval: Optional[str] = None
+    closed_candle: Optional[list] = None # Świeca, która właśnie się zamknęła (tylko 'kline')
+    buffer: Optional['CandleBuffer'] = None
+    indicators: Optional[Any] = None # Przyrostowy silnik wskaźników kanału (IncrementalIndicatorEngine), jeśli zamówiony
+
+class CandleBuffer:
+    """
+    Bufor ostatnich świec jednego rynku, aktualizowany przyrostowo.
+    Aktualizacja bieżącej świecy nadpisuje ostatni wiersz, nowa świeca zamyka poprzednią.
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self.candles: Deque[list] = deque(maxlen=maxlen)
+        self._frame: Optional[pd.DataFrame] = None
+
+    def seed(self, df: pd.DataFrame):
+        """Wypełnia bufor historią pobraną przez REST (indeks datetime, kolumny Open..Volume)."""
+        if df is None or df.empty: return
+        timestamps = df.index.values.astype('datetime64[ms]').astype('int64')
+        values = df[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype=float)
+        self.candles.clear()
+        for ts, row in zip(timestamps, values):
+            self.candles.append([int(ts), *row.tolist()])
+        self._frame = None
+
+    def update(self, candle: list) -> Optional[list]:
+        """Wprowadza świecę [ts, o, h, l, c, v]; zwraca świecę zamkniętą przez tę aktualizację."""
+        candle = [int(candle[0]), *[float(x) for x in candle[1:6]]]
+        if not self.candles or candle[0] > self.candles[-1][0]:
+            closed = self.candles[-1] if self.candles else None
+            self.candles.append(candle)
+            self._frame = None
+            return closed
+        if candle[0] == self.candles[-1][0]:
+            self.candles[-1] = candle
+            self._frame = None
+        return None # Spóźnione aktualizacje starszych świec pomijamy
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self.candles[-1][0] if self.candles else None
+
+    def to_frame(self) -> pd.DataFrame:
+        """Zwraca zawartość bufora w formacie zgodnym z ExchangeService.fetch_ohlcv."""
+        if self._frame is None:
+            self._frame = ohlcv_to_frame(list(self.candles))
+        return self._frame.copy() if self._frame is not None else pd.DataFrame(columns=OHLCV_COLUMNS)
+
+class Subscription:
+    """Uchwyt subskrypcji zwracany przez MarketStream - służy do jej anulowania."""
+
+    def __init__(self, key: Tuple, callback: Callable):
+        self.key = key
+        self.callback = callback
+
+class _Channel:
+    def __init__(self, key: Tuple, buffer: Optional[CandleBuffer] = None):
+        self.key = key
+        self.buffer = buffer
+        self.indicators: Optional[Any] = None
+        self.subscriptions: List[Subscription] = []
+        self.task: Optional[asyncio.Task] = None
+        self.last_data: Any = None
+
+def ccxt_pro_feed(exchange_id: str):
+    """Domyślne źródło: instancja ccxt.pro (watch_ohlcv / watch_ticker / watch_trades)."""
+    import ccxt.pro as ccxtpro
+    return getattr(ccxtpro, exchange_id.lower())({'enableRateLimit': True})
+
+class MarketStream:
+    """
+    Podsystem danych strumieniowych: utrzymuje po jednym połączeniu na kanał (świece, ticker, transakcje)
+    dla każdego rynku i rozsyła aktualizacje do subskrybentów zamiast cyklicznego odpytywania giełdy.
+    Źródłem może być dowolny obiekt z API ccxt.pro (watch_*), np. ReplayFeed podłączony do serwera powtórek.
+    Kanały świec mogą prowadzić przyrostowy silnik wskaźników (z 'indicator_engine_factory'), aktualizowany
+    w czasie stałym przy każdej aktualizacji świecy.
+    """
+
+    def __init__(self, feed_factory: Callable[[str], Any] = ccxt_pro_feed, buffer_size: int = 1000, max_backoff: float = 30.0,
+                 indicator_engine_factory: Optional[Callable[[], Any]] = None):
+        self.feed_factory = feed_factory
+        self.indicator_engine_factory = indicator_engine_factory
+        self.buffer_size = buffer_size
+        self.max_backoff = max_backoff
+        self._feeds: Dict[str, Any] = {}
+        self._channels: Dict[Tuple, _Channel] = {}
+
+    def subscribe_klines(self, exchange_id: str, symbol: str, interval: str, callback: Callable, seed: Optional[pd.DataFrame] = None,
+                         indicators: bool = False) -> Subscription:
+        """Subskrybuje świece rynku; z 'indicators=True' zdarzenia niosą przyrostowo liczone wskaźniki kanału."""
+        key = ('kline', exchange_id, symbol, interval)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = _Channel(key, CandleBuffer(self.buffer_size))
+        reseeded = seed is not None and (channel.buffer.last_timestamp is None or len(seed) > len(channel.buffer.candles))
+        if reseeded:
+            channel.buffer.seed(seed)
+        if indicators and self.indicator_engine_factory is not None and (channel.indicators is None or reseeded):
+            channel.indicators = self.indicator_engine_factory()
+            if channel.buffer.candles: channel.indicators.load(channel.buffer.to_frame())
+        return self._subscribe(channel, callback)
+
+    def subscribe_ticker(self, exchange_id: str, symbol: str, callback: Callable) -> Subscription:
+        key = ('ticker', exchange_id, symbol, None)
+        return self._subscribe(self._channels.get(key) or _Channel(key), callback)
+
+    def subscribe_trades(self, exchange_id: str, symbol: str, callback: Callable) -> Subscription:
+        key = ('trades', exchange_id, symbol, None)
+        return self._subscribe(self._channels.get(key) or _Channel(key), callback)
+
+    def unsubscribe(self, subscription: Subscription):
+        channel = self._channels.get(subscription.key)
+        if channel is None: return
+        if subscription in channel.subscriptions:
+            channel.subscriptions.remove(subscription)
+        if not channel.subscriptions:
+            # Ostatni subskrybent odszedł - zamykamy kanał
+            if channel.task: channel.task.cancel()
+            del self._channels[subscription.key]
+
+    def get_buffer(self, exchange_id: str, symbol: str, interval: str) -> Optional[CandleBuffer]:
+        channel = self._channels.get(('kline', exchange_id, symbol, interval))
+        return channel.buffer if channel else None
+
+    def get_last_ticker(self, exchange_id: str, symbol: str) -> Optional[dict]:
+        channel = self._channels.get(('ticker', exchange_id, symbol, None))
+        return channel.last_data if channel else None
+
+    def _subscribe(self, channel: _Channel, callback: Callable) -> Subscription:
+        subscription = Subscription(channel.key, callback)
+        channel.subscriptions.append(subscription)
+        self._channels[channel.key] = channel
+        if channel.task is None or channel.task.done():
+            channel.task = asyncio.create_task(self._run_channel(channel))
+        return subscription
+
+    def _get_feed(self, exchange_id: str):
+        if exchange_id not in self._feeds:
+            self._feeds[exchange_id] = self.feed_factory(exchange_id)
+        return self._feeds[exchange_id]
+
+    async def _run_channel(self, channel: _Channel):
+        kind, exchange_id, symbol, interval = channel.key
+        backoff = 1.0
+        while channel.subscriptions:
+            try:
+                feed = self._get_feed(exchange_id)
+                if kind == 'kline':
+                    candles = await feed.watch_ohlcv(symbol, interval)
+                    last_ts = channel.buffer.last_timestamp
+                    for candle in candles:
+                        if last_ts is not None and candle[0] < last_ts: continue
+                        closed = channel.buffer.update(candle)
+                        if channel.indicators is not None: channel.indicators.update(candle)
+                        await self._dispatch(channel, StreamEvent(kind, exchange_id, symbol, candle, interval, closed, channel.buffer, channel.indicators))
+                elif kind == 'ticker':
+                    channel.last_data = await feed.watch_ticker(symbol)
+                    await self._dispatch(channel, StreamEvent(kind, exchange_id, symbol, channel.last_data))
+                else:
+                    channel.last_data = await feed.watch_trades(symbol)
+                    await self._dispatch(channel, StreamEvent(kind, exchange_id, symbol, channel.last_data))
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except StreamClosed:
+                logger.info(f"[MarketStream] Strumień {kind} dla {symbol} został zakończony przez źródło.")
+                return
+            except Exception as e:
+                logger.warning(f"[MarketStream] Błąd strumienia {kind} dla {symbol}: {e}. Ponowna próba za {backoff:.0f}s.")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def _dispatch(self, channel: _Channel, event: StreamEvent):
+        for subscription in list(channel.subscriptions):
+            try:
+                result = subscription.callback(event)
+                if inspect.isawaitable(result): await result
+            except Exception as e:
+                logger.error(f"[MarketStream] Błąd w subskrybencie {event.channel} dla {event.symbol}: {e}", exc_info=True)
+
+    async def close(self):
+        """Zamyka wszystkie kanały i połączenia ze źródłami danych."""
+        tasks = [channel.task for channel in self._channels.values() if channel.task]
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._channels.clear()
+        await asyncio.gather(*[feed.close() for feed in self._feeds.values()], return_exceptions=True)
+        self._feeds.clear()
+        logger.info("[MarketStream] Strumienie danych zostały zamknięte.")
+
+class ReplayFeed:
+    """
+    Klient serwera powtórek (core/replay_server.py) z API zgodnym z ccxt.pro.
+    Jedno połączenie WebSocket obsługuje wszystkie subskrybowane kanały.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._queues: Dict[Tuple, asyncio.Queue] = {}
+        self._connect_lock = asyncio.Lock()
+
+    async def watch_ohlcv(self, symbol: str, timeframe: str = '1m', since=None, limit=None, params={}) -> List[list]:
+        return [await self._next(('kline', symbol, timeframe))]
+
+    async def watch_ticker(self, symbol: str, params={}) -> dict:
+        return await self._next(('ticker', symbol, None))
+
+    async def watch_trades(self, symbol: str, since=None, limit=None, params={}) -> List[dict]:
+        return await self._next(('trades', symbol, None))
+
+    async def _next(self, key: Tuple) -> Any:
+        if key not in self._queues:
+            self._queues[key] = asyncio.Queue()
+            await self._send({"op": "subscribe", "channel": key[0], "symbol": key[1], "interval": key[2]})
+        item = await self._queues[key].get()
+        if isinstance(item, Exception): raise item
+        return item
+
+    async def _send(self, message: dict):
+        async with self._connect_lock:
+            if self._ws is None or self._ws.closed:
+                self._session = self._session or aiohttp.ClientSession()
+                self._ws = await self._session.ws_connect(self.url)
+                self._reader = asyncio.create_task(self._read_loop(self._ws))
+            await self._ws.send_str(json.dumps(message))
+
+    async def _read_loop(self, ws: aiohttp.ClientWebSocketResponse):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT: continue
+            payload = json.loads(msg.data)
+            key = (payload.get('channel'), payload.get('symbol'), payload.get('interval'))
+            queue = self._queues.get(key)
+            if queue is None: continue
+            if payload.get('event') == 'end':
+                queue.put_nowait(StreamClosed(f"Koniec nagrania dla {key}"))
+            elif payload.get('event') == 'error':
+                queue.put_nowait(RuntimeError(payload.get('message')))
+            else:
+                queue.put_nowait(payload['data'])
+        # Połączenie zerwane - budzimy oczekujących; kolejne watch_* połączą się i zasubskrybują ponownie
+        for queue in list(self._queues.values()):
+            queue.put_nowait(ConnectionError("Połączenie z serwerem powtórek zostało zamknięte."))
+        self._queues.clear()
+
+    async def close(self):
+        if self._ws is not None: await self._ws.close()
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._session is not None: await self._session.close()
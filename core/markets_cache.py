@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import ccxt.async_support as ccxt
+
+from app_config import MARKETS_CACHE_DIR, MARKETS_CACHE_MAX_AGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class MarketsCache:
+    """
+    Trwały cache metadanych rynków (wynik load_markets) zapisywany jako skompresowany JSON,
+    po jednym pliku na giełdę. Nowe instancje ccxt dostają rynki z dysku przez set_markets,
+    więc zimny start nie czeka na pobranie wielomegabajtowych tabel rynków.
+    """
+
+    def __init__(self, cache_dir: str = MARKETS_CACHE_DIR, max_age_seconds: float = MARKETS_CACHE_MAX_AGE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_age_seconds = max_age_seconds
+
+    def _path(self, exchange_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{exchange_id.lower()}.json.z")
+
+    def load(self, exchange_id: str) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]], float]]:
+        """Zwraca (rynki, waluty, czas zapisu) lub None, gdy pliku nie ma albo jest uszkodzony."""
+        path = self._path(exchange_id)
+        if not os.path.exists(path): return None
+        try:
+            with open(path, 'rb') as f:
+                payload = json.loads(zlib.decompress(f.read()))
+            return payload['markets'], payload.get('currencies'), payload['saved_at']
+        except (IOError, zlib.error, ValueError, KeyError) as e:
+            logger.warning(f"Nie udało się wczytać cache rynków dla {exchange_id}: {e}")
+            return None
+
+    def save(self, exchange_id: str, markets: Dict[str, Any], currencies: Optional[Dict[str, Any]]):
+        """Zapisuje rynki atomowo (plik tymczasowy + podmiana), aby przerwany zapis nie uszkodził cache."""
+        path = self._path(exchange_id)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            payload = json.dumps({"saved_at": time.time(), "markets": markets, "currencies": currencies}, separators=(',', ':'), default=str)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(payload.encode('utf-8'), 6))
+            os.replace(tmp_path, path)
+            logger.info(f"Zapisano cache rynków dla {exchange_id} ({len(markets)} rynków).")
+        except (IOError, TypeError, ValueError) as e:
+            logger.error(f"Nie udało się zapisać cache rynków dla {exchange_id}: {e}")
+
+    def apply(self, exchange_id: str, exchange: ccxt.Exchange) -> Optional[float]:
+        """Wstrzykuje zapisane rynki do instancji giełdy; zwraca wiek cache w sekundach lub None."""
+        cached = self.load(exchange_id)
+        if cached is None: return None
+        markets, currencies, saved_at = cached
+        try:
+            exchange.set_markets(markets, currencies)
+        except Exception as e:
+            logger.warning(f"Cache rynków dla {exchange_id} jest niezgodny z instancją ccxt: {e}")
+            return None
+        return time.time() - saved_at
+
+    def is_fresh(self, age_seconds: Optional[float]) -> bool:
+        return age_seconds is not None and age_seconds < self.max_age_seconds
@@ -0,0 +1,142 @@
+import logging
+import time
+import threading
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import ccxt.async_support as ccxt
+
+from app_config import OHLCV_CACHE_MAX_BYTES, OHLCV_FORMING_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Świece tygodniowe na giełdach otwierają się w poniedziałek, a epoka Unix zaczyna się w czwartek
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60 * 1000
+
+def next_candle_close_ms(interval: str, now_ms: Optional[int] = None) -> int:
+    """Zwraca znacznik czasu (ms) zamknięcia bieżącej świecy dla danego interwału."""
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    if interval.endswith('M'):
+        now = pd.Timestamp(now_ms, unit='ms')
+        return int((now.normalize().replace(day=1) + pd.DateOffset(months=1)).value // 10**6)
+    timeframe_ms = ccxt.Exchange.parse_timeframe(interval) * 1000
+    offset_ms = WEEK_OFFSET_MS if interval.endswith('w') else 0
+    return ((now_ms - offset_ms) // timeframe_ms + 1) * timeframe_ms + offset_ms
+
+@dataclass
+class _CacheEntry:
+    df: pd.DataFrame
+    limit: int
+    expires_at_ms: int
+    size_bytes: int
+    forming_fetched_at: float # Kiedy ostatnio pobrano trwającą (ostatnią) świecę okna
+
+class OHLCVCache:
+    """
+    Wspólna dla całego procesu pamięć podręczna wyników fetch_ohlcv.
+    Zamknięte świece wpisu są ważne do zamknięcia bieżącej świecy interwału, trwająca świeca
+    tylko przez 'forming_ttl_seconds' - potem ExchangeService dociąga ją jednym małym zapytaniem.
+    Przy przekroczeniu budżetu pamięci usuwane są najdawniej używane wpisy (LRU).
+    """
+
+    def __init__(self, max_bytes: int = OHLCV_CACHE_MAX_BYTES, forming_ttl_seconds: float = OHLCV_FORMING_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.forming_ttl_seconds = forming_ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock() # Backtester i UI mogą sięgać do cache z innych wątków
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.forming_refreshes = 0
+
+    def get(self, exchange_id: str, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        """Zwraca kopię ostatnich 'limit' świec, jeśli w cache jest ważne okno tej długości ze świeżą trwającą świecą."""
+        with self._lock:
+            entry = self._valid_entry((exchange_id, symbol, interval), limit)
+            if entry is None or time.time() - entry.forming_fetched_at > self.forming_ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.df.tail(limit).copy()
+
+    def get_closed_window(self, exchange_id: str, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        """Jak get(), ale bez wymogu świeżej trwającej świecy - okno do odświeżenia przez refresh_forming()."""
+        with self._lock:
+            entry = self._valid_entry((exchange_id, symbol, interval), limit)
+            return entry.df.tail(limit).copy() if entry is not None else None
+
+    def refresh_forming(self, exchange_id: str, symbol: str, interval: str, limit: int, fresh: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Podmienia w zapamiętanym oknie trwającą świecę na świeżo pobraną; zwraca ostatnie 'limit' świec."""
+        with self._lock:
+            entry = self._valid_entry((exchange_id, symbol, interval), limit)
+            if entry is None: return None
+            merged = pd.concat([entry.df, fresh])
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index().tail(len(entry.df))
+            size_bytes = int(merged.memory_usage(index=True, deep=False).sum())
+            self.current_bytes += size_bytes - entry.size_bytes
+            entry.df, entry.size_bytes, entry.forming_fetched_at = merged, size_bytes, time.time()
+            self.forming_refreshes += 1
+            return merged.tail(limit).copy()
+
+    def put(self, exchange_id: str, symbol: str, interval: str, limit: int, df: pd.DataFrame):
+        """Zapamiętuje okno świec; krótsze okno nie nadpisuje ważnego, dłuższego wpisu."""
+        if df is None or df.empty: return
+        key = (exchange_id, symbol, interval)
+        expires_at_ms = next_candle_close_ms(interval)
+        size_bytes = int(df.memory_usage(index=True, deep=False).sum())
+        if size_bytes > self.max_bytes: return
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing.limit > limit and existing.expires_at_ms == expires_at_ms:
+                self._entries.move_to_end(key)
+                return
+            if existing is not None:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(df=df.copy(), limit=limit, expires_at_ms=expires_at_ms, size_bytes=size_bytes, forming_fetched_at=time.time())
+            self.current_bytes += size_bytes
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key); self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear(); self.current_bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Zwraca liczniki do strojenia cache'a (trafienia, chybienia, usunięcia, zajętość)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "expirations": self.expirations,
+                "forming_refreshes": self.forming_refreshes,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "entries": len(self._entries), "bytes": self.current_bytes, "max_bytes": self.max_bytes
+            }
+
+    def _valid_entry(self, key: Tuple[str, str, str], limit: int) -> Optional[_CacheEntry]:
+        """Wpis z oknem co najmniej 'limit' świec sprzed zamknięcia bieżącej świecy (wywoływane pod blokadą)."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at_ms <= int(time.time() * 1000):
+            self._remove(key); self.expirations += 1
+            return None
+        if entry is None or entry.limit < limit: return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Tuple[str, str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size_bytes
+
+_shared_cache: Optional[OHLCVCache] = None
+
+def get_shared_ohlcv_cache() -> OHLCVCache:
+    """Zwraca jedną, wspólną dla procesu instancję OHLCVCache."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = OHLCVCache()
+    return _shared_cache
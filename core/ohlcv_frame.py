@@ -0,0 +1,32 @@
+import itertools
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def ohlcv_to_frame(raw: Sequence[Sequence[float]], dtype: np.dtype = np.float64) -> Optional[pd.DataFrame]:
+    """
+    Zamienia surową odpowiedź ccxt ([[ts, o, h, l, c, v], ...]) na DataFrame z indeksem 'timestamp'.
+    Całość przechodzi przez jedną tablicę NumPy: sortowanie i deduplikacja (wygrywa ostatnie wystąpienie
+    znacznika czasu) są wykonywane tylko wtedy, gdy dane nie są już ściśle rosnące.
+    'dtype=np.float32' połowi pamięć kolumn cenowych dla odbiorców, którym wystarcza mniejsza precyzja.
+    """
+    if raw is None or len(raw) == 0: return None
+    try:
+        # Spłaszczenie przez fromiter omija pośrednią tablicę obiektów i jest ok. 2x szybsze od np.asarray
+        data = np.fromiter(itertools.chain.from_iterable(raw), dtype=np.float64, count=len(raw) * 6).reshape(-1, 6)
+    except (TypeError, ValueError):
+        data = np.asarray(raw, dtype=np.float64) # Brakujące wartości (None) stają się NaN
+    timestamps = data[:, 0].astype(np.int64)
+
+    if timestamps.size > 1 and not (np.diff(timestamps) > 0).all():
+        # np.unique na odwróconej tablicy zwraca indeksy ostatnich wystąpień, posortowane po czasie
+        _, reversed_idx = np.unique(timestamps[::-1], return_index=True)
+        order = timestamps.size - 1 - reversed_idx
+        data, timestamps = data[order], timestamps[order]
+
+    index = pd.DatetimeIndex((timestamps * 1_000_000).view('datetime64[ns]'), name='timestamp')
+    # Jedna kopia (5, n) w układzie kolumnowym - każda kolumna jest ciągłym wycinkiem pamięci bloku pandas
+    columns = np.ascontiguousarray(data[:, 1:6].T, dtype=dtype)
+    return pd.DataFrame(columns.T, index=index, columns=OHLCV_COLUMNS, copy=False)
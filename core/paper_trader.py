@@ -1,20 +1,30 @@
 import asyncio
 import logging
+import time
 import pandas as pd
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 from core.database_manager import DatabaseManager
 from core.analyzer import TechnicalAnalyzer
+from core.request_scheduler import RequestPriority, request_priority
+from core.market_stream import MarketStream, StreamEvent, Subscription
 
 logger = logging.getLogger(__name__)
 
 class PaperTrader:
-    def __init__(self, db_manager: DatabaseManager, analyzer: TechnicalAnalyzer, global_analysis_lock: asyncio.Lock):
+    def __init__(self, db_manager: DatabaseManager, analyzer: TechnicalAnalyzer, global_analysis_lock: asyncio.Lock, market_stream: Optional[MarketStream] = None):
         self.db_manager = db_manager
         self.analyzer = analyzer
         self.is_running = False
         self.global_analysis_lock = global_analysis_lock
         self.expiration_limit = self.analyzer.settings.get('ssnedam.setup_expiration_candles', 12)
+        # Tryb strumieniowy: zamiast odpytywać giełdę co minutę, subskrybujemy świece otwartych rynków
+        self.market_stream = market_stream
+        self.stream_min_eval_seconds = self.analyzer.settings.get('streaming.paper_trader_min_eval_seconds', 5)
+        self._stream_subscriptions: Dict[Tuple[str, str, str], Subscription] = {}
+        self._last_stream_eval: Dict[Tuple[str, str, str], float] = {}
+        # Otwarte transakcje per rynek dla zdarzeń strumienia; None = do ponownego wczytania z bazy
+        self._open_trades: Optional[Dict[Tuple[str, str, str], list]] = None
         logger.info("PaperTrader zainicjalizowany w nowym trybie 'status'.")
 
     async def start(self):
@@ -24,13 +34,20 @@ class PaperTrader:
         while self.is_running:
             try:
                 # ZMIANA: Nazwa metody odzwierciedla teraz, że sprawdzamy wszystkie otwarte pozycje
-                await self.check_open_trades()
+                if self.market_stream is not None:
+                    await self.sync_stream_subscriptions()
+                else:
+                    await self.check_open_trades()
             except Exception as e:
                 logger.error(f"[PaperTrader] Niespodziewany błąd w pętli: {e}", exc_info=True)
             await asyncio.sleep(60)
 
     def stop(self):
         self.is_running = False
+        if self.market_stream is not None:
+            for subscription in self._stream_subscriptions.values():
+                self.market_stream.unsubscribe(subscription)
+            self._stream_subscriptions.clear()
         logger.info("[PaperTrader] Zatrzymywanie pętli monitorującej...")
 
     async def check_open_trades(self):
@@ -38,62 +55,112 @@ class PaperTrader:
             logger.info("[PaperTrader] Skanowanie pominięte, trwa inna analiza.")
             return
 
-        # ZMIANA: Używamy nowej metody, która pobiera wszystkie transakcje, które nie są w stanie końcowym
-        open_trades = self.db_manager.get_open_trades()
-        if not open_trades: return
-
-        trades_by_market = {}
-        for trade in open_trades:
-            key = (trade['symbol'], trade['interval'], trade['exchange'])
-            if key not in trades_by_market: trades_by_market[key] = []
-            trades_by_market[key].append(trade)
-
-        for (symbol, interval, exchange_id), trades in trades_by_market.items():
+        for (symbol, interval, exchange_id), trades in self._group_open_trades_by_market().items():
             try:
-                oldest_trade_ts = min(t['timestamp'] for t in trades)
-                exchange_instance = await self.analyzer.get_exchange_instance(exchange_id)
-                if not exchange_instance: continue
-                
-                ohlcv = await self.analyzer.fetch_ohlcv(exchange_instance, symbol, interval, since=int(oldest_trade_ts * 1000))
+                ohlcv = await self._fetch_candles_since_oldest_trade(symbol, interval, exchange_id, trades)
                 if ohlcv is None or ohlcv.empty: continue
-                
-                for trade in trades:
-                    candles_after_setup = ohlcv[ohlcv.index > pd.to_datetime(trade['timestamp'], unit='s')]
-                    if candles_after_setup.empty: continue
-                    
-                    # ZMIANA: Rozbudowana logika oparta na nowym, jednoznacznym statusie
-                    current_status = trade.get('status')
-                    if current_status == 'POTENTIAL':
-                        self._handle_potential_trade(trade, candles_after_setup)
-                    elif current_status in ['ACTIVE', 'PARTIAL_PROFIT']:
-                        self._handle_active_trade(trade, candles_after_setup)
-            
+                self._evaluate_market_trades(trades, ohlcv)
             except Exception as e:
                 logger.warning(f"[PaperTrader] Błąd podczas sprawdzania {symbol} na giełdzie {exchange_id}. Błąd: {e}", exc_info=True)
                 continue
 
+    async def sync_stream_subscriptions(self):
+        """Dopasowuje subskrypcje strumienia do rynków z otwartymi transakcjami (tryb strumieniowy)."""
+        trades_by_market = self._open_trades_by_market(refresh=True)
+        for market in list(self._stream_subscriptions):
+            if market not in trades_by_market:
+                self.market_stream.unsubscribe(self._stream_subscriptions.pop(market))
+                self._last_stream_eval.pop(market, None)
+
+        for (symbol, interval, exchange_id), trades in trades_by_market.items():
+            market = (symbol, interval, exchange_id)
+            if market in self._stream_subscriptions: continue
+            try:
+                # Historię od najstarszej transakcji pobieramy raz przez REST, dalej bufor aktualizuje strumień
+                ohlcv = await self._fetch_candles_since_oldest_trade(symbol, interval, exchange_id, trades)
+                if ohlcv is not None and not ohlcv.empty:
+                    self._evaluate_market_trades(trades, ohlcv)
+                self._stream_subscriptions[market] = self.market_stream.subscribe_klines(exchange_id, symbol, interval, self._on_stream_kline, seed=ohlcv)
+                logger.info(f"[PaperTrader] Subskrybuję świece {symbol} ({interval}) na {exchange_id}.")
+            except Exception as e:
+                logger.warning(f"[PaperTrader] Nie udało się zasubskrybować {symbol} na giełdzie {exchange_id}. Błąd: {e}", exc_info=True)
+
+    def _on_stream_kline(self, event: StreamEvent):
+        """Ocena transakcji po aktualizacji świecy - od razu po zamknięciu, w trakcie świecy z limitem częstotliwości."""
+        if self.global_analysis_lock.locked(): return # Bufor trzyma świece, więc kolejne zdarzenie oceni też tę
+        market = (event.symbol, event.interval, event.exchange_id)
+        now = time.monotonic()
+        if event.closed_candle is None and now - self._last_stream_eval.get(market, 0) < self.stream_min_eval_seconds:
+            return
+        self._last_stream_eval[market] = now
+        trades = self._open_trades_by_market().get(market)
+        if trades:
+            self._evaluate_market_trades(trades, event.buffer.to_frame())
+
+    def _open_trades_by_market(self, refresh: bool = False) -> Dict[Tuple[str, str, str], list]:
+        """Indeks otwartych transakcji w pamięci - baza jest odpytywana tylko po zmianie transakcji lub przy 'refresh'."""
+        if refresh or self._open_trades is None:
+            self._open_trades = self._group_open_trades_by_market()
+        return self._open_trades
+
+    def _update_trade_status(self, trade_id: int, status: str):
+        self.db_manager.update_trade_status(trade_id, status)
+        self._open_trades = None
+
+    def _update_trade_sl(self, trade_id: int, sl_price: float):
+        self.db_manager.update_trade_sl(trade_id, sl_price)
+        self._open_trades = None
+
+    def _group_open_trades_by_market(self) -> Dict[Tuple[str, str, str], list]:
+        # ZMIANA: Używamy nowej metody, która pobiera wszystkie transakcje, które nie są w stanie końcowym
+        trades_by_market = {}
+        for trade in self.db_manager.get_open_trades():
+            key = (trade['symbol'], trade['interval'], trade['exchange'])
+            if key not in trades_by_market: trades_by_market[key] = []
+            trades_by_market[key].append(trade)
+        return trades_by_market
+
+    async def _fetch_candles_since_oldest_trade(self, symbol: str, interval: str, exchange_id: str, trades: list) -> Optional[pd.DataFrame]:
+        oldest_trade_ts = min(t['timestamp'] for t in trades)
+        exchange_instance = await self.analyzer.get_exchange_instance(exchange_id)
+        if not exchange_instance: return None
+        with request_priority(RequestPriority.PAPER_TRADING):
+            return await self.analyzer.fetch_ohlcv(exchange_instance, symbol, interval, since=int(oldest_trade_ts * 1000))
+
+    def _evaluate_market_trades(self, trades: list, ohlcv: pd.DataFrame):
+        for trade in trades:
+            candles_after_setup = ohlcv[ohlcv.index > pd.to_datetime(trade['timestamp'], unit='s')]
+            if candles_after_setup.empty: continue
+
+            # ZMIANA: Rozbudowana logika oparta na nowym, jednoznacznym statusie
+            current_status = trade.get('status')
+            if current_status == 'POTENTIAL':
+                self._handle_potential_trade(trade, candles_after_setup)
+            elif current_status in ['ACTIVE', 'PARTIAL_PROFIT']:
+                self._handle_active_trade(trade, candles_after_setup)
+
     def _handle_potential_trade(self, trade: dict, candles: pd.DataFrame):
         """Obsługuje setupy, które jeszcze nie zostały aktywowane."""
         trade_id = trade['id']
         if len(candles) > self.expiration_limit:
-            self.db_manager.update_trade_status(trade_id, 'EXPIRED'); return
+            self._update_trade_status(trade_id, 'EXPIRED'); return
 
         for _, candle in candles.iterrows():
             entry = float(trade['entry_price']); sl = float(trade['stop_loss'])
             
             if trade['type'] == 'Long':
                 if candle['Low'] <= sl and candle['High'] < entry:
-                    self.db_manager.update_trade_status(trade_id, 'CANCELLED'); return
+                    self._update_trade_status(trade_id, 'CANCELLED'); return
                 elif candle['Low'] <= entry:
-                    self.db_manager.update_trade_status(trade_id, 'ACTIVE')
+                    self._update_trade_status(trade_id, 'ACTIVE')
                     self.db_manager.log_trade_event(trade_id, 'ACTIVATED', {'price': entry})
                     self._handle_active_trade(self.db_manager.get_trade_by_id(trade_id), pd.DataFrame([candle], index=[candle.name]))
                     return
             elif trade['type'] == 'Short':
                 if candle['High'] >= sl and candle['Low'] > entry:
-                    self.db_manager.update_trade_status(trade_id, 'CANCELLED'); return
+                    self._update_trade_status(trade_id, 'CANCELLED'); return
                 elif candle['High'] >= entry:
-                    self.db_manager.update_trade_status(trade_id, 'ACTIVE')
+                    self._update_trade_status(trade_id, 'ACTIVE')
                     self.db_manager.log_trade_event(trade_id, 'ACTIVATED', {'price': entry})
                     self._handle_active_trade(self.db_manager.get_trade_by_id(trade_id), pd.DataFrame([candle], index=[candle.name]))
                     return
@@ -111,8 +178,8 @@ class PaperTrader:
                 tp1_price = float(current_trade_state['take_profit_1'])
                 new_sl_price = float(current_trade_state['entry_price'])
                 
-                self.db_manager.update_trade_status(trade_id, 'PARTIAL_PROFIT')
-                self.db_manager.update_trade_sl(trade_id, new_sl_price)
+                self._update_trade_status(trade_id, 'PARTIAL_PROFIT')
+                self._update_trade_sl(trade_id, new_sl_price)
                 self.db_manager.log_trade_event(trade_id, 'TP1_HIT', {'price': tp1_price})
                 self.db_manager.log_trade_event(trade_id, 'SL_MOVED_TO_BE', {'price': new_sl_price})
                 
@@ -127,7 +194,7 @@ class PaperTrader:
                     final_status = 'CLOSED_TP'
                 
                 if final_status:
-                    self.db_manager.update_trade_status(trade_id, final_status)
+                    self._update_trade_status(trade_id, final_status)
                     return
 
     def _check_tp1_hit(self, trade: dict, candle: pd.Series) -> bool:
@@ -1,13 +1,21 @@
+import numpy as np
 import pandas as pd
-import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Hashable, Optional, List, Tuple
 from scipy.signal import find_peaks
 
-from core.utils import suppress_stdout
 from core.settings_manager import SettingsManager
-from core.indicator_service import IndicatorService
+from core.indicator_service import IndicatorService, IndicatorKeyGenerator
 from core.exchange_service import ExchangeService
-from app_config import FIBONACCI_LOOKBACK_PERIOD
+from core.database_manager import DatabaseManager
+from core.swing_index import SwingIndexRegistry
+from core.fair_value_gaps import FairValueGapRegistry, find_fair_value_gaps
+from core.sr_level_index import SRLevelIndex
+from core.candle_patterns import CandlePatternEngine
+from core.volume_profile import VolumeProfileEngine, fixed_range_profiles
+from core.squeeze_tracker import SqueezeRegistry
+from core.indicator_kernels import bbands
+from core.setup_detectors import DEFAULT_SETUP_DETECTORS, SetupContext, SetupDetector, is_bollinger_squeeze, is_volume_contraction
+from app_config import FIBONACCI_LOOKBACK_PERIOD, SWING_INDEX_MAX_SERIES, FVG_TRACKER_MAX_SERIES, SR_CLUSTER_TOLERANCE_PCT, VOLUME_PROFILE_MAX_SERIES, VOLUME_PROFILE_MAX_SESSIONS, SQUEEZE_TRACKER_MAX_SERIES
 
 import logging
 logger = logging.getLogger(__name__)
@@ -15,10 +23,19 @@ logger = logging.getLogger(__name__)
 class PatternService:
     """Odpowiada za wyszukiwanie formacji i wzorców na wykresie."""
 
-    def __init__(self, settings_manager: SettingsManager, indicator_service: IndicatorService, exchange_service: ExchangeService):
+    def __init__(self, settings_manager: SettingsManager, indicator_service: IndicatorService, exchange_service: ExchangeService, db_manager: Optional[DatabaseManager] = None):
         self.settings = settings_manager
         self.indicator_service = indicator_service
         self.exchange_service = exchange_service
+        self.swing_indexes = SwingIndexRegistry(self.settings.get('cache.swing_index_max_series', SWING_INDEX_MAX_SERIES))
+        self.fvg_trackers = FairValueGapRegistry(self.settings.get('cache.fvg_tracker_max_series', FVG_TRACKER_MAX_SERIES))
+        self.setup_detectors: List[SetupDetector] = list(DEFAULT_SETUP_DETECTORS)
+        self.sr_levels = SRLevelIndex(db_manager)
+        self.volume_profiles = VolumeProfileEngine(max_series=self.settings.get('cache.volume_profile_max_series', VOLUME_PROFILE_MAX_SERIES),
+                                                   max_sessions=self.settings.get('cache.volume_profile_max_sessions', VOLUME_PROFILE_MAX_SESSIONS))
+        self.squeeze_trackers = SqueezeRegistry(self.settings.get('cache.squeeze_tracker_max_series', SQUEEZE_TRACKER_MAX_SERIES))
+        self._candle_engine: Optional[CandlePatternEngine] = None
+        self._candle_whitelist: Optional[Tuple[str, ...]] = None
 
     async def find_potential_setups(self, symbol: str, exchange: str, interval: str) -> List[Dict[str, Any]]:
         exchange_instance = await self.exchange_service.get_exchange_instance(exchange)
@@ -26,152 +43,187 @@ class PatternService:
 
         df = await self.exchange_service.fetch_ohlcv(exchange_instance, symbol, interval)
         if df is None or df.empty or len(df) < 20: return []
-        
+        return self.scan_setups(df, symbol, exchange, interval)
+
+    def scan_setups(self, df: pd.DataFrame, symbol: str, exchange: str, interval: str) -> List[Dict[str, Any]]:
+        """Uruchamia zarejestrowane detektory setupów na wspólnym kontekście ramki (bez kopiowania jej dla każdego z nich)."""
+        series_key = (exchange, symbol, interval)
+        ctx = SetupContext(df, interval, self.settings, self.indicator_service,
+                           swing_points=lambda distance, multiplier: self.find_swing_points(df, exchange, symbol, distance, multiplier),
+                           squeeze=lambda length, std, lookback: self.squeeze_trackers.is_squeeze(series_key, df, length, std, lookback))
         found_setups = []
-        
-        # Sprawdzanie Bollinger Band Squeeze
-        if self.find_bollinger_squeeze(df.copy()):
-            reason = f"Wykryto kompresję zmienności (Bollinger Band Squeeze). Rynek przygotowuje się do potencjalnego wybicia."
-            found_setups.append({'type': 'Potencjalne Wybicie', 'interval': interval, 'details': reason})
-
-        # --- NOWY BLOK: Sprawdzanie Volume Contraction Pattern ---
-        if self.find_volume_contraction(df.copy()):
-            reason = f"Wykryto konsolidację przy malejącym wolumenie (VCP). Podaż 'wysycha', co może poprzedzać silny ruch w górę."
-            found_setups.append({'type': 'Potencjalna Akumulacja', 'interval': interval, 'details': reason})
-        
-        
-        params = self.settings.get('ssnedam', {})
-        prominence_val = df['High'].std() * params.get('scanner_prominence', 0.5)
-        distance_val = params.get('scanner_distance', 10)
-
-        high_peaks, _ = find_peaks(df['High'], distance=distance_val, prominence=prominence_val)
-        low_peaks, _ = find_peaks(-df['Low'], distance=distance_val, prominence=prominence_val)
-        
-        # Ta część pozostaje bez zmian
-        for peak_idx in high_peaks[-3:]:
-            resistance_level = df['High'].iloc[peak_idx]
-            if self._find_recent_breakout_and_reclaim(df, level=resistance_level, is_resistance=True):
-                reason = f"Wykryto potencjalną pułapkę na byki (Bull Trap) na oporze ${resistance_level:,.4f}."
-                found_setups.append({'type': 'Potencjalny Short', 'interval': interval, 'details': reason})
-        
-        for peak_idx in low_peaks[-3:]:
-            support_level = df['Low'].iloc[peak_idx]
-            if self._find_recent_breakout_and_reclaim(df, level=support_level, is_resistance=False):
-                reason = f"Wykryto potencjalną pułapkę na niedźwiedzie (Bear Trap) na wsparciu ${support_level:,.4f}."
-                found_setups.append({'type': 'Potencjalny Long', 'interval': interval, 'details': reason})
-        
+        for detector in self.setup_detectors:
+            try:
+                found_setups.extend(detector(ctx))
+            except Exception as e:
+                logger.error(f"Detektor setupów '{getattr(detector, '__name__', detector)}' zawiódł dla {symbol} ({interval}): {e}", exc_info=True)
         return found_setups
+
+    def register_setup_detector(self, detector: SetupDetector):
+        """Dodaje detektor (SetupContext) -> lista setupów na koniec kolejki skanera."""
+        self.setup_detectors.append(detector)
     
-    def _find_recent_breakout_and_reclaim(self, df: pd.DataFrame, level: float, lookback: int = 5, is_resistance: bool = False) -> bool:
-        if len(df) < lookback: return False
-        recent_candles = df.iloc[-lookback:]
-        crossed_level, reclaimed_level = False, False
-        for i in range(len(recent_candles)):
-            candle, prev_candle = recent_candles.iloc[i], recent_candles.iloc[i-1] if i > 0 else recent_candles.iloc[i]
-            if is_resistance:
-                if not crossed_level and candle['High'] > level and prev_candle['Close'] < level: crossed_level = True
-                if crossed_level and candle['Close'] < level: reclaimed_level = True; break
-            else:
-                if not crossed_level and candle['Low'] < level and prev_candle['Close'] > level: crossed_level = True
-                if crossed_level and candle['Close'] > level: reclaimed_level = True; break
-        return crossed_level and reclaimed_level
+    def find_swing_points(self, df: pd.DataFrame, exchange_id: str, symbol: str, distance: int, prominence_multiplier: float, indexed: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zwraca pozycje szczytów (High) i dołków (Low) ramki - to samo co find_peaks z prominencją równą
+        odchyleniu standardowemu High razy 'prominence_multiplier'. Indeksy serii są trzymane między skanami,
+        więc kolejne wywołania dla tego samego symbolu i interwału tylko dopisują nowe świece.
+        'indexed=False' liczy jednorazowo samym find_peaks, bez rejestru (np. rosnące wycinki historii w Backtesterze,
+        które zajmowałyby rejestr wpisami użytymi tylko raz).
+        """
+        if not indexed:
+            prominence = df['High'].std() * prominence_multiplier
+            high_peaks, _ = find_peaks(df['High'].to_numpy(dtype=np.float64), distance=distance, prominence=prominence)
+            low_peaks, _ = find_peaks(-df['Low'].to_numpy(dtype=np.float64), distance=distance, prominence=prominence)
+            return high_peaks, low_peaks
+        # Interwał nie zawsze jest znany (S/R dostaje gotową ramkę) - rozpoznajemy go po odstępie świec, a długość
+        # okna odróżnia np. dzienne S/R (1000 świec) od analizy na interwale 1d
+        spacing = df.index[-1] - df.index[-2] if len(df) > 1 else None
+        series_key = (exchange_id, symbol, spacing, len(df))
+        highs = self.swing_indexes.get((*series_key, 'High'), df['High'])
+        lows = self.swing_indexes.get((*series_key, 'Low'), df['Low'], invert=True)
+        prominence = highs.std() * prominence_multiplier
+        return highs.peaks(distance, prominence), lows.peaks(distance, prominence)
 
     def find_divergence(self, price_series: pd.Series, indicator_series: pd.Series, lookback: int = 60, dist: int = 5) -> Optional[str]:
-        if price_series.isna().all() or indicator_series.isna().all() or len(price_series) < lookback: return None
-        try:
+        return self.find_divergences([(price_series, indicator_series)], lookback, dist)[0]
+
+    def find_divergences(self, pairs: List[Tuple[pd.Series, pd.Series]], lookback: int = 60, dist: int = 5) -> List[Optional[str]]:
+        """
+        Wsadowa wersja find_divergence dla wielu par (cena, wskaźnik). Okna wszystkich serii są sklejane w jedną
+        tablicę rozdzieloną przerwami NaN dłuższymi niż 'dist', więc szczyty i dołki wszystkich serii wyznaczają
+        tylko dwa wywołania find_peaks. NaN nie tworzy szczytu, a szczyty różnych serii są od siebie dalej niż 'dist',
+        więc wynik jest taki sam jak przy osobnych wywołaniach - poza remisem dwóch równych szczytów bliżej niż 'dist',
+        gdzie find_peaks i tak nie gwarantuje, który z nich zostanie.
+        """
+        results: List[Optional[str]] = [None] * len(pairs)
+        owners, segments = [], []
+        for i, (price_series, indicator_series) in enumerate(pairs):
+            if price_series.isna().all() or indicator_series.isna().all() or len(price_series) < lookback: continue
             price, indicator = price_series.tail(lookback).dropna(), indicator_series.tail(lookback).dropna()
-            if price.empty or indicator.empty: return None
-            price_peaks, _ = find_peaks(price, distance=dist)
-            indicator_peaks, _ = find_peaks(indicator, distance=dist)
-            if len(price_peaks) >= 2 and len(indicator_peaks) >= 2:
-                if price.iloc[price_peaks[-1]] > price.iloc[price_peaks[-2]] and indicator.iloc[indicator_peaks[-1]] < indicator.iloc[indicator_peaks[-2]]:
-                    return "Niedźwiedzia (wyższy szczyt ceny, niższy szczyt wskaźnika)"
-            price_troughs, _ = find_peaks(-price, distance=dist)
-            indicator_troughs, _ = find_peaks(-indicator, distance=dist)
-            if len(price_troughs) >= 2 and len(indicator_troughs) >= 2:
-                if price.iloc[price_troughs[-1]] < price.iloc[price_troughs[-2]] and indicator.iloc[indicator_troughs[-1]] > indicator.iloc[indicator_troughs[-2]]:
-                    return "Bycza (niższy dołek ceny, wyższy dołek wskaźnika)"
+            if price.empty or indicator.empty: continue
+            owners.append(i)
+            segments += [price.to_numpy(dtype=np.float64), indicator.to_numpy(dtype=np.float64)]
+        if not owners: return results
+
+        try:
+            gap = np.full(dist + 1, np.nan)
+            lengths = np.array([len(segment) for segment in segments])
+            starts = np.cumsum(np.concatenate(([len(gap)], lengths[:-1] + len(gap))))
+            ends = starts + lengths
+            data = np.concatenate([part for segment in segments for part in (gap, segment)] + [gap])
+            peaks, _ = find_peaks(data, distance=dist)
+            troughs, _ = find_peaks(-data, distance=dist)
         except Exception:
-            pass # Błędy są logowane w nadrzędnej funkcji
-        return None
+            return results # Błędy są logowane w nadrzędnej funkcji
+
+        def last_two(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            """Dla każdego segmentu: czy ma >= 2 punkty oraz wartości przedostatniego i ostatniego punktu."""
+            left, right = np.searchsorted(points, starts), np.searchsorted(points, ends)
+            enough = (right - left) >= 2
+            padded = np.concatenate((points, [0, 0]))
+            last = data[padded[np.where(enough, right - 1, len(points))]]
+            second = data[padded[np.where(enough, right - 2, len(points))]]
+            return enough.reshape(-1, 2).all(axis=1), second.reshape(-1, 2), last.reshape(-1, 2)
+
+        has_peaks, peak_second, peak_last = last_two(peaks)
+        has_troughs, trough_second, trough_last = last_two(troughs)
+        # Kolumna 0 to cena, kolumna 1 to wskaźnik
+        bearish = has_peaks & (peak_last[:, 0] > peak_second[:, 0]) & (peak_last[:, 1] < peak_second[:, 1])
+        bullish = ~bearish & has_troughs & (trough_last[:, 0] < trough_second[:, 0]) & (trough_last[:, 1] > trough_second[:, 1])
+        for position, i in enumerate(owners):
+            if bearish[position]: results[i] = "Niedźwiedzia (wyższy szczyt ceny, niższy szczyt wskaźnika)"
+            elif bullish[position]: results[i] = "Bycza (niższy dołek ceny, wyższy dołek wskaźnika)"
+        return results
 
     def format_candlestick_patterns(self, df: pd.DataFrame) -> Optional[str]:
         """Znajduje i formatuje nazwy rozpoznanych formacji świecowych."""
-        recognized_patterns = []
-        with suppress_stdout():
-            try:
-                patterns = df.ta.cdl_pattern(name="all")
-                if isinstance(patterns, pd.DataFrame) and not patterns.empty:
-                    last_patterns = patterns.iloc[-1]
-                    found = last_patterns[last_patterns != 0]
-                    if not found.empty:
-                        for name in found.index:
-                            clean_name = re.sub(r'(?<!^)(?=[A-Z])', ' ', name.replace('CDL_', '')).strip()
-                            recognized_patterns.append(clean_name)
-            except Exception:
-                return None
-        return ", ".join(recognized_patterns) if recognized_patterns else None
+        return self.format_candlestick_patterns_many({0: df})[0]
+
+    def format_candlestick_patterns_many(self, frames: Dict[Hashable, pd.DataFrame]) -> Dict[Hashable, Optional[str]]:
+        """
+        Formacje świecowe na ostatniej świecy wielu ramek naraz. Oceniane są tylko formacje z białej listy
+        'analysis.candlestick_patterns' i tylko tyle ostatnich świec, ile potrzebuje najdłuższa z nich.
+        """
+        whitelist = self.settings.get('analysis.candlestick_patterns', None)
+        whitelist = tuple(whitelist) if whitelist is not None else None
+        if self._candle_engine is None or self._candle_whitelist != whitelist:
+            self._candle_engine, self._candle_whitelist = CandlePatternEngine(whitelist), whitelist
+        valid = {key: df for key, df in frames.items() if df is not None and not df.empty}
+        try:
+            found = self._candle_engine.scan(valid)
+        except Exception as e:
+            logger.error(f"Błąd wyszukiwania formacji świecowych: {e}", exc_info=True)
+            found = {}
+        return {key: ", ".join(self._candle_engine.labels(found[key])) or None if key in found else None for key in frames}
 
     def find_fair_value_gaps(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
-        if df is None or len(df) < 3: return []
-        gaps = []
-        avg_interval_seconds = df.index.to_series().diff().dt.total_seconds().median()
-        fvg_width_in_seconds = avg_interval_seconds * 10
+        """Wszystkie luki FVG ramki (porównanie wszystkich trójek świec naraz)."""
+        return find_fair_value_gaps(df)
 
-        for i in range(1, len(df) - 1):
-            prev_candle, curr_candle, next_candle = df.iloc[i-1], df.iloc[i], df.iloc[i+1]
-            gap_info = None
-            if prev_candle['High'] < next_candle['Low']:
-                gap_info = {'type': 'bullish', 'start_price': prev_candle['High'], 'end_price': next_candle['Low'], 'start_time': curr_candle.name.timestamp() - (avg_interval_seconds / 2), 'width_seconds': fvg_width_in_seconds}
-            elif prev_candle['Low'] > next_candle['High']:
-                gap_info = {'type': 'bearish', 'start_price': next_candle['High'], 'end_price': prev_candle['Low'], 'start_time': curr_candle.name.timestamp() - (avg_interval_seconds / 2), 'width_seconds': fvg_width_in_seconds}
-            if gap_info:
-                gaps.append(gap_info)
-        return gaps
+    def track_fair_value_gaps(self, df: pd.DataFrame, exchange_id: str, symbol: str) -> List[Dict[str, Any]]:
+        """
+        Luki FVG ramki ze stanem wypełnienia ('status': open/partial/filled). Tracker serii jest trzymany między
+        analizami, więc kolejne wywołania sprawdzają tylko nowo zamknięte świece.
+        """
+        if df is None or len(df) < 3: return []
+        spacing = df.index[-1] - df.index[-2]
+        return self.fvg_trackers.gaps((exchange_id, symbol, spacing, len(df)), df)
 
     async def find_programmatic_sr_levels(self, df: pd.DataFrame, symbol: str, exchange_id: str) -> dict:
         """ULEPSZONA WERSJA: Automatycznie znajduje poziomy S/R, łącząc dane lokalne z długoterminowymi (1D)."""
         if df.empty or len(df) < 2: return {"support": [], "resistance": []}
+        daily_levels = await self.get_daily_sr_levels(symbol, exchange_id)
+        return self.find_local_sr_levels(df, symbol, exchange_id, extra_levels=daily_levels)
+
+    def find_local_sr_levels(self, df: pd.DataFrame, symbol: str, exchange_id: str, extra_levels: Optional[List[float]] = None, indexed: bool = True) -> dict:
+        """Poziomy S/R z samej ramki (pivoty + szczyty i dołki) i 'extra_levels', podzielone względem ostatniej ceny."""
+        if df.empty or len(df) < 2: return {"support": [], "resistance": []}
         
         last_price = df['Close'].iloc[-1]
-        all_levels = set()
+        all_levels = set(extra_levels or [])
 
         # --- CZĘŚĆ 1: Analiza lokalna (tak jak wcześniej) ---
         params = self.settings.get('ssnedam', {})
-        prominence_val = df['High'].std() * params.get('sr_scanner_prominence_multiplier', 0.5)
-        distance_val = params.get('sr_scanner_distance', 10)
         
         pivots = self.indicator_service._calculate_pivot_points(df)
         for val in pivots.values(): all_levels.add(val)
 
-        high_peaks, _ = find_peaks(df['High'], distance=distance_val, prominence=prominence_val)
-        low_peaks, _ = find_peaks(-df['Low'], distance=distance_val, prominence=prominence_val)
+        high_peaks, low_peaks = self.find_swing_points(df, exchange_id, symbol, params.get('sr_scanner_distance', 10), params.get('sr_scanner_prominence_multiplier', 0.5), indexed)
         for idx in high_peaks: all_levels.add(df['High'].iloc[idx])
         for idx in low_peaks: all_levels.add(df['Low'].iloc[idx])
 
-        # --- NOWA CZĘŚĆ 2: Analiza długoterminowa z interwału 1D ---
-        try:
-            exchange = await self.exchange_service.get_exchange_instance(exchange_id)
-            if exchange:
-                df_daily = await self.exchange_service.fetch_ohlcv(exchange, symbol, '1d', limit=1000)
-                if df_daily is not None and not df_daily.empty:
-                    prom_daily = df_daily['High'].std() * params.get('sr_scanner_prominence_multiplier', 1.0) # Wyższa prominencja dla 1D
-                    dist_daily = params.get('sr_scanner_distance', 20) # Większy dystans dla 1D
-
-                    high_peaks_d, _ = find_peaks(df_daily['High'], distance=dist_daily, prominence=prom_daily)
-                    low_peaks_d, _ = find_peaks(-df_daily['Low'], distance=dist_daily, prominence=prom_daily)
-                    for idx in high_peaks_d: all_levels.add(df_daily['High'].iloc[idx])
-                    for idx in low_peaks_d: all_levels.add(df_daily['Low'].iloc[idx])
-        except Exception as e:
-            logger.warning(f"Nie udało się pobrać długoterminowych poziomów S/R: {e}")
-
-        # --- CZĘŚĆ 3: Klasyfikacja (bez zmian) ---
+        # --- CZĘŚĆ 2: Klasyfikacja (bez zmian) ---
         supports, resistances = set(), set()
         for level in all_levels:
             if level < last_price: supports.add(round(level, 4))
             else: resistances.add(round(level, 4))
         
         return {"support": sorted(list(supports), reverse=True), "resistance": sorted(list(resistances))}
+
+    async def get_daily_sr_levels(self, symbol: str, exchange_id: str) -> List[float]:
+        """
+        Długoterminowe poziomy S/R z interwału 1D. Liczone raz na dobę (z zamkniętych dziennych świec), łączone
+        w klastry i trzymane w SRLevelIndex - kolejne wywołania tego dnia nie pobierają historii z giełdy.
+        """
+        levels = self.sr_levels.get(exchange_id, symbol)
+        if levels is not None: return levels
+        try:
+            exchange = await self.exchange_service.get_exchange_instance(exchange_id)
+            if not exchange: return []
+            df_daily = await self.exchange_service.fetch_ohlcv(exchange, symbol, '1d', limit=1000)
+            if df_daily is None or len(df_daily) < 3: return []
+            df_daily = df_daily.iloc[:-1] # Trwająca świeca zmieniłaby poziomy w ciągu dnia
+            params = self.settings.get('ssnedam', {})
+            prom_daily = params.get('sr_scanner_prominence_multiplier', 1.0) # Wyższa prominencja dla 1D
+            dist_daily = params.get('sr_scanner_distance', 20) # Większy dystans dla 1D
+            high_peaks_d, low_peaks_d = self.find_swing_points(df_daily, exchange_id, symbol, dist_daily, prom_daily)
+            found = df_daily['High'].to_numpy()[high_peaks_d].tolist() + df_daily['Low'].to_numpy()[low_peaks_d].tolist()
+            tolerance = params.get('sr_cluster_tolerance_pct', SR_CLUSTER_TOLERANCE_PCT) / 100
+            return self.sr_levels.put(exchange_id, symbol, found, tolerance)
+        except Exception as e:
+            logger.warning(f"Nie udało się pobrać długoterminowych poziomów S/R: {e}")
+            return []
         
     def find_fibonacci_retracement(self, df: pd.DataFrame, lookback: int = FIBONACCI_LOOKBACK_PERIOD) -> Dict[str, Any]:
         """Znajduje ostatni swing i oblicza poziomy Fibonacciego."""
@@ -199,19 +251,23 @@ class PatternService:
         return {"direction": direction, "start_price": start_price, "end_price": end_price, "levels": retracement_levels, "golden_pocket": {"start": min(gp_start, gp_end), "end": max(gp_start, gp_end)}}
 
     def get_volume_profile_levels(self, df: pd.DataFrame, bins: int = 50) -> Optional[Dict[str, float]]:
-        """Oblicza kluczowe poziomy z profilu wolumenowego (POC, VAH, VAL)."""
-        if df is None or df.empty or 'Volume' not in df.columns or 'Close' not in df.columns: return None
+        """Oblicza kluczowe poziomy z profilu wolumenowego (POC, VAH, VAL) całej ramki."""
+        return self.get_volume_profile_levels_many([df], bins)[0]
+
+    def get_volume_profile_levels_many(self, frames: List[pd.DataFrame], bins: int = 50) -> List[Optional[Dict[str, float]]]:
+        """Poziomy profilu wolumenowego wielu ramek; wolumen świec rozkładany jest na zakres High-Low jednym histogramem."""
+        usable = [df if df is not None and not df.empty and {'High', 'Low', 'Volume'}.issubset(df.columns) else None for df in frames]
         try:
-            volume_by_price = df.groupby(pd.cut(df['Close'], bins=bins, observed=False))['Volume'].sum()
-            poc_level = volume_by_price.idxmax()
-            poc = poc_level.mid
-            
-            value_area_bins = volume_by_price.sort_values(ascending=False)[volume_by_price.sort_values(ascending=False).cumsum() <= volume_by_price.sum() * 0.7]
-            val, vah = value_area_bins.index.min().left, value_area_bins.index.max().right
-            
-            return {"poc": round(poc, 4), "vah": round(vah, 4), "val": round(val, 4)}
-        except Exception:
-            return None
+            return [profile.levels() if profile is not None else None for profile in fixed_range_profiles(usable, bins)]
+        except Exception as e:
+            logger.error(f"Błąd obliczania profilu wolumenowego: {e}", exc_info=True)
+            return [None] * len(frames)
+
+    def get_session_volume_profile_levels(self, df: pd.DataFrame, exchange_id: str, symbol: str, interval: str, sessions: Optional[int] = None) -> Optional[Dict[str, float]]:
+        """Poziomy profilu złożonego z ostatnich 'sessions' dób UTC; zamknięte sesje serii są liczone tylko raz."""
+        if df is None or df.empty or not {'High', 'Low', 'Volume'}.issubset(df.columns): return None
+        profile = self.volume_profiles.composite((exchange_id, symbol, interval), df, sessions)
+        return profile.levels() if profile is not None else None
         
     def find_bollinger_squeeze(self, df: pd.DataFrame, lookback: int = 100, squeeze_threshold: float = 0.9) -> bool:
         """
@@ -220,38 +276,18 @@ class PatternService:
         """
         if df is None or len(df) < lookback:
             return False
-
         params = self.settings.get('analysis.indicator_params', {})
-        bb_len = params.get('bbands_length', 20)
-        bb_std = params.get('bbands_std', 2.0)
-
-        # Klucze do kolumn wstęg
-        upper_key = f"BBU_{bb_len}_{bb_std}"
-        lower_key = f"BBL_{bb_len}_{bb_std}"
-        mid_key = f"BBM_{bb_len}_{bb_std}"
-
-        if not all(k in df.columns for k in [upper_key, lower_key, mid_key]):
-            # Upewnij się, że wskaźniki są obliczone
-            df = self.indicator_service.calculate_all(df.copy())
-            if not all(k in df.columns for k in [upper_key, lower_key, mid_key]):
-                 return False # Jeśli nadal ich nie ma, zrezygnuj
-
-        # Oblicz szerokość wstęg jako procent średniej kroczącej
-        df['bb_width'] = (df[upper_key] - df[lower_key]) / df[mid_key]
-        
-        # Znajdź minimalną szerokość w okresie 'lookback'
-        min_width_in_period = df['bb_width'].rolling(window=lookback).min()
-
-        # Sprawdź, czy aktualna szerokość jest bliska (np. w 90%) historycznemu minimum
-        current_width = df['bb_width'].iloc[-1]
-        historical_min = min_width_in_period.iloc[-1]
-
-        if pd.isna(current_width) or pd.isna(historical_min):
-            return False
+        keys = IndicatorKeyGenerator(params)
+        columns = [keys.bbands_upper(), keys.bbands_lower(), keys.bbands_mid()]
+        if all(k in df.columns for k in columns):
+            upper, lower, mid = (df[k].to_numpy(dtype=np.float64) for k in columns)
+        else:
+            # Bez gotowych wstęg liczymy je tylko dla świec, które wchodzą do okna 'lookback' (zamiast calculate_all całej ramki)
+            length = params.get('bbands_length', 20)
+            tail = df['Close'].to_numpy(dtype=np.float64)[-(lookback + length - 1):]
+            lower, mid, upper = bbands(tail, length, params.get('bbands_std', 2.0))[:3]
+        return is_bollinger_squeeze(upper, lower, mid, lookback)
 
-        # Jeśli aktualna szerokość jest mniejsza niż 110% minimum (blisko dna), mamy ściskanie
-        return current_width <= (historical_min * 1.1)
-    
     def find_volume_contraction(self, df: pd.DataFrame, lookback: int = 20, contraction_threshold: float = 0.4) -> bool:
         """
         Sprawdza, czy na rynku występuje 'Volume Contraction Pattern' (VCP).
@@ -259,23 +295,5 @@ class PatternService:
         """
         if df is None or len(df) < lookback:
             return False
-
-        recent_df = df.iloc[-lookback:].copy()
-
-        # 1. Sprawdzanie spadku zmienności (zakres świec maleje)
-        recent_df['range'] = recent_df['High'] - recent_df['Low']
-        avg_range_first_half = recent_df['range'].iloc[:lookback//2].mean()
-        avg_range_second_half = recent_df['range'].iloc[lookback//2:].mean()
-
-        if avg_range_second_half >= avg_range_first_half:
-            return False # Zmienność nie maleje
-
-        # 2. Sprawdzanie spadku wolumenu (średni wolumen maleje)
-        avg_volume_first_half = recent_df['Volume'].iloc[:lookback//2].mean()
-        avg_volume_second_half = recent_df['Volume'].iloc[lookback//2:].mean()
-
-        # Wolumen w drugiej połowie okresu musi być znacząco niższy (np. o 40%)
-        if avg_volume_second_half > (avg_volume_first_half * (1 - contraction_threshold)):
-            return False # Wolumen nie maleje wystarczająco
-
-        return True
\ No newline at end of file
+        return is_volume_contraction(df['High'].to_numpy(dtype=np.float64), df['Low'].to_numpy(dtype=np.float64),
+                                     df['Volume'].to_numpy(dtype=np.float64), lookback, contraction_threshold)
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Wspólna migawka reżimu rynkowego (BTC/ETH na interwale 1D). Reżim zmienia się najwyżej raz na zamknięcie dziennej
+świecy (albo raz na skonfigurowany okres), więc jest liczony raz na okres, zapisywany w bazie razem z danymi wejściowymi
+(do audytu) i rozsyłany subskrybentom - a odczyt w pipeline to słownik w pamięci zamiast dwóch zapytań do giełdy
+i dwóch przebiegów wskaźników.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from core.settings_manager import SettingsManager
+from core.exchange_service import ExchangeService
+from core.indicator_service import IndicatorService, IndicatorKeyGenerator
+from core.database_manager import DatabaseManager
+from core.sr_level_index import DAY_MS
+from app_config import MARKET_REGIME_SYMBOLS, MARKET_REGIME_REFRESH_MINUTES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGIME = "KONSOLIDACJA"
+
+@dataclass
+class RegimeSnapshot:
+    """Reżim rynkowy wyznaczony w okresie zaczynającym się w 'period_ts' (ms) wraz z danymi, z których powstał."""
+    exchange: str
+    period_ts: int
+    regime: str
+    score: int
+    computed_at: int
+    inputs: Dict[str, Dict[str, Any]] = field(default_factory=dict) # symbol -> ostatnia świeca, EMA i wynik
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def regime_from_scores(scores: List[int]) -> str:
+    total_score = sum(scores)
+    if total_score >= 2: return "RYNEK_BYKA"
+    elif total_score <= -2: return "RYNEK_NIEDZWIEDZIA"
+    else: return DEFAULT_REGIME
+
+class MarketRegimeService:
+    """Migawki reżimu per giełda: pamięć, potem baza, a dopiero po zamknięciu okresu - nowe obliczenie."""
+
+    def __init__(self, settings_manager: SettingsManager, exchange_service: ExchangeService, indicator_service: IndicatorService, db_manager: Optional[DatabaseManager] = None):
+        self.settings = settings_manager
+        self.exchange_service = exchange_service
+        self.indicator_service = indicator_service
+        self.db_manager = db_manager
+        self._snapshots: Dict[str, RegimeSnapshot] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._subscribers: List[Callable[[RegimeSnapshot], None]] = []
+        self.is_running = False
+        self.computations = 0
+
+    def period_ms(self) -> int:
+        """Długość okresu migawki: doba UTC (domyślnie) albo 'market_regime_refresh_minutes' minut."""
+        minutes = self.settings.get('ai_context_modules.market_regime_refresh_minutes', MARKET_REGIME_REFRESH_MINUTES)
+        return int(minutes * 60_000) if minutes and minutes > 0 else DAY_MS
+
+    def period_start(self, now: Optional[float] = None) -> int:
+        """Początek bieżącego okresu w ms (dla doby - moment zamknięcia ostatniej dziennej świecy)."""
+        now_ms = int((time.time() if now is None else now) * 1000)
+        return now_ms - now_ms % self.period_ms()
+
+    def current(self, exchange_id: str = "BINANCE", now: Optional[float] = None) -> Optional[RegimeSnapshot]:
+        """Aktualna migawka z pamięci (lub z bazy po restarcie) albo None, gdy okres się zamknął - bez żadnego I/O giełdy."""
+        period = self.period_start(now)
+        snapshot = self._snapshots.get(exchange_id)
+        if snapshot is not None and snapshot.period_ts == period: return snapshot
+        stored = self.db_manager.get_latest_market_regime(exchange_id) if self.db_manager else None
+        if stored is not None and stored['period_ts'] == period:
+            snapshot = RegimeSnapshot(**stored)
+            self._snapshots[exchange_id] = snapshot
+            return snapshot
+        return None
+
+    async def snapshot(self, exchange_id: str = "BINANCE", now: Optional[float] = None) -> Optional[RegimeSnapshot]:
+        """Migawka bieżącego okresu; liczona najwyżej raz, nawet przy wielu równoczesnych konsumentach."""
+        snapshot = self.current(exchange_id, now)
+        if snapshot is not None: return snapshot
+        lock = self._locks.setdefault(exchange_id, asyncio.Lock())
+        async with lock:
+            snapshot = self.current(exchange_id, now)
+            if snapshot is not None: return snapshot
+            return await self.refresh(exchange_id, now)
+
+    async def get_regime(self, exchange_id: str = "BINANCE") -> str:
+        snapshot = await self.snapshot(exchange_id)
+        return snapshot.regime if snapshot is not None else DEFAULT_REGIME
+
+    async def refresh(self, exchange_id: str = "BINANCE", now: Optional[float] = None) -> Optional[RegimeSnapshot]:
+        """Liczy reżim od nowa, zapisuje migawkę i powiadamia subskrybentów. None, gdy giełda nie dała żadnych danych."""
+        try:
+            exchange = await self.exchange_service.get_exchange_instance(exchange_id)
+            if not exchange: return None
+
+            params = self.settings.get('analysis.indicator_params', {})
+            keys = IndicatorKeyGenerator(params)
+            # Wolna EMA potrzebuje pełnego okna; nadwyżka świec stabilizuje jej wartość
+            min_candles = params.get('ema_slow_length', 200) + 1
+            assets = MARKET_REGIME_SYMBOLS
+            tasks = [self.exchange_service.fetch_ohlcv(exchange, asset, '1d', limit=min_candles + 50) for asset in assets]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            # Odrzucamy trwającą świecę dzienną - migawka ma być tą samą wartością przez cały okres
+            closed_frames = {asset: df.iloc[:-1] for asset, df in zip(assets, results) if not isinstance(df, Exception) and df is not None and not df.empty}
+            valid_frames = {asset: df for asset, df in closed_frames.items() if len(df) >= min_candles}
+            if not valid_frames:
+                logger.warning(f"Za mało zamkniętych świec 1D (potrzeba {min_candles}) do wyznaczenia reżimu rynkowego na {exchange_id}.")
+                return None
+            # Jeden przebieg dla wszystkich aktywów, tylko EMA potrzebne do oceny trendu
+            frames_with_indicators = self.indicator_service.calculate_batch(valid_frames, indicators=[keys.ema(fast=True), keys.ema(fast=False)])
+            inputs = {asset: self._score_asset(frames_with_indicators.get(asset), keys) for asset in assets}
+        except Exception as e:
+            logger.error(f"Błąd podczas analizy reżimu rynkowego: {e}")
+            return None
+
+        scores = [entry['score'] for entry in inputs.values()]
+        snapshot = RegimeSnapshot(exchange=exchange_id, period_ts=self.period_start(now), regime=regime_from_scores(scores),
+                                  score=sum(scores), computed_at=int(time.time() * 1000), inputs=inputs)
+        self._snapshots[exchange_id] = snapshot
+        self.computations += 1
+        if self.db_manager: self.db_manager.save_market_regime(snapshot.to_dict())
+        logger.info(f"Reżim rynkowy ({exchange_id}): {snapshot.regime} (wynik {snapshot.score}).")
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Subskrybent reżimu rynkowego zawiódł: {e}", exc_info=True)
+        return snapshot
+
+    def _score_asset(self, df: Optional[pd.DataFrame], keys: IndicatorKeyGenerator) -> Dict[str, Any]:
+        """Wynik aktywa (1 trend wzrostowy, -1 spadkowy, 0 brak) i wartości z ostatniej zamkniętej świecy, na których się opiera."""
+        ema_fast_key, ema_slow_key = keys.ema(fast=True), keys.ema(fast=False)
+        if df is None or ema_fast_key not in df.columns or ema_slow_key not in df.columns: return {'score': 0}
+        df = df.dropna(subset=['Close', ema_fast_key, ema_slow_key])
+        if df.empty: return {'score': 0}
+
+        last_candle = df.iloc[-1]
+        price = last_candle['Close']
+
+        ema_fast, ema_slow = last_candle[ema_fast_key], last_candle[ema_slow_key]
+        if price > ema_fast and ema_fast > ema_slow: score = 1
+        elif price < ema_fast and ema_fast < ema_slow: score = -1
+        else: score = 0
+        return {'score': score, 'candle_ts': int(df.index[-1].timestamp() * 1000), 'close': float(price),
+                'ema_fast': float(ema_fast), 'ema_slow': float(ema_slow)}
+
+    def subscribe(self, callback: Callable[[RegimeSnapshot], None]):
+        """Rejestruje funkcję wywoływaną z każdą nową migawką."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[RegimeSnapshot], None]):
+        if callback in self._subscribers: self._subscribers.remove(callback)
+
+    async def start(self, exchange_id: str = "BINANCE"):
+        """Pętla w tle odświeżająca migawkę zaraz po zamknięciu każdego okresu."""
+        if self.is_running: return
+        self.is_running = True
+        logger.info("[MarketRegime] Uruchamianie pętli odświeżania reżimu rynkowego...")
+        while self.is_running:
+            snapshot = None
+            try:
+                snapshot = await self.snapshot(exchange_id)
+            except Exception as e:
+                logger.error(f"[MarketRegime] Niespodziewany błąd w pętli: {e}", exc_info=True)
+            # Nieudane obliczenie ponawiamy po minucie, udane - po zamknięciu okresu (+ chwila na domknięcie świecy przez giełdę)
+            now = time.time()
+            await asyncio.sleep(60 if snapshot is None else (self.period_start(now) + self.period_ms()) / 1000 - now + 5)
+
+    def stop(self):
+        self.is_running = False
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import ccxt.async_support as ccxt
+
+from core.request_scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+REPLAY_EXCHANGE_PREFIX = "REPLAY"
+
+def fixture_path(fixtures_dir: str, exchange_id: str) -> str:
+    return os.path.join(fixtures_dir, f"{exchange_id.lower()}.json")
+
+def _series_key(symbol: str, timeframe: str) -> str:
+    return f"{symbol}|{timeframe}"
+
+def empty_fixture() -> Dict[str, Any]:
+    return {"markets": {}, "ohlcv": {}, "tickers": {}, "order_books": {}, "trades": {}, "funding_rates": {}, "open_interest": {}, "long_short_ratio": {}}
+
+class ReplayExchange(ccxt.Exchange):
+    """
+    Zamiennik giełdy ccxt odtwarzający nagrane dane (świece, tickery, arkusze zleceń, transakcje,
+    funding, open interest) z pliku fixture - bez sieci, z konfigurowalnym opóźnieniem i limitem zapytań.
+    Wybierany identyfikatorem giełdy z prefiksem 'REPLAY' (np. 'REPLAY_BINANCE').
+    """
+
+    def __init__(self, fixture: Dict[str, Any], exchange_id: str = "replay", latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 rate_limit_ms: float = 50.0, burst: int = 10, seed: int = 42, align_to_now: bool = True):
+        self._replay_id = exchange_id.lower()
+        self._replay_rate_limit = rate_limit_ms
+        super().__init__({'enableRateLimit': False})
+        self.fixture = {**empty_fixture(), **fixture}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed) # Stałe ziarno - identyczne opóźnienia w każdym przebiegu
+        self._bucket = TokenBucket(rate=1000.0 / rate_limit_ms, capacity=burst) if rate_limit_ms else None
+        self.align_to_now = align_to_now
+        self.request_counts: Dict[str, int] = {}
+        self.rate_limit_violations = 0
+
+    def describe(self):
+        return self.deep_extend(super().describe(), {
+            'id': self._replay_id, 'name': f"Replay ({self._replay_id})", 'rateLimit': self._replay_rate_limit,
+            'has': {
+                'fetchOHLCV': True, 'fetchTicker': True, 'fetchTickers': True, 'fetchOrderBook': True, 'fetchL2OrderBook': True,
+                'fetchTrades': True, 'fetchFundingRate': True, 'fetchOpenInterest': True, 'fetchLongShortRatio': True,
+            },
+            'timeframes': {tf: tf for tf in ['1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '12h', '1d', '1w']},
+        })
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'ReplayExchange':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    async def _simulate_request(self, method: str):
+        """Symuluje opóźnienie sieci i limit zapytań giełdy (przekroczenie = RateLimitExceeded, jak HTTP 429)."""
+        self.request_counts[method] = self.request_counts.get(method, 0) + 1
+        if self._bucket is not None:
+            if self._bucket.time_until(1.0) > 0:
+                self.rate_limit_violations += 1
+                raise ccxt.RateLimitExceeded(f"{self.id} {method}: przekroczono limit zapytań")
+            self._bucket.consume()
+        delay_ms = self.latency_ms + (self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    def _lookup(self, section: str, symbol: str) -> Any:
+        data = self.fixture[section].get(symbol)
+        if data is None:
+            raise ccxt.BadSymbol(f"{self.id}: brak nagranych danych '{section}' dla {symbol}")
+        return data
+
+    async def fetch_markets(self, params={}) -> List[dict]:
+        await self._simulate_request('fetch_markets')
+        return list(self.fixture['markets'].values())
+
+    async def fetch_ohlcv(self, symbol: str, timeframe='1m', since: Optional[int] = None, limit: Optional[int] = None, params={}) -> List[list]:
+        await self._simulate_request('fetch_ohlcv')
+        candles = self.fixture['ohlcv'].get(_series_key(symbol, timeframe))
+        if candles is None:
+            raise ccxt.BadSymbol(f"{self.id}: brak nagranych świec dla {symbol} ({timeframe})")
+        if self.align_to_now and candles:
+            # Przesuwamy nagranie tak, by ostatnia świeca była bieżącą - cache i magazyn świec działają jak na żywo
+            timeframe_ms = self.parse_timeframe(timeframe) * 1000
+            offset = (int(time.time() * 1000) // timeframe_ms) * timeframe_ms - candles[-1][0]
+            candles = [[c[0] + offset, *c[1:]] for c in candles]
+        if since is not None:
+            candles = [c for c in candles if c[0] >= since]
+            return [list(c) for c in candles[:limit or 500]]
+        return [list(c) for c in candles[-(limit or 500):]]
+
+    async def fetch_ticker(self, symbol: str, params={}) -> dict:
+        await self._simulate_request('fetch_ticker')
+        return dict(self._lookup('tickers', symbol))
+
+    async def fetch_tickers(self, symbols: Optional[List[str]] = None, params={}) -> Dict[str, dict]:
+        await self._simulate_request('fetch_tickers')
+        tickers = self.fixture['tickers']
+        return {s: dict(t) for s, t in tickers.items() if symbols is None or s in symbols}
+
+    async def fetch_order_book(self, symbol: str, limit: Optional[int] = None, params={}) -> dict:
+        await self._simulate_request('fetch_order_book')
+        book = self._lookup('order_books', symbol)
+        return {**book, 'bids': book['bids'][:limit], 'asks': book['asks'][:limit]}
+
+    async def fetch_l2_order_book(self, symbol: str, limit: Optional[int] = None, params={}) -> dict:
+        return await self.fetch_order_book(symbol, limit, params)
+
+    async def fetch_trades(self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None, params={}) -> List[dict]:
+        await self._simulate_request('fetch_trades')
+        trades = [t for t in self._lookup('trades', symbol) if since is None or t['timestamp'] >= since]
+        return trades[-limit:] if limit else trades
+
+    async def fetch_funding_rate(self, symbol: str, params={}) -> dict:
+        await self._simulate_request('fetch_funding_rate')
+        return dict(self._lookup('funding_rates', symbol))
+
+    async def fetch_open_interest(self, symbol: str, params={}) -> dict:
+        await self._simulate_request('fetch_open_interest')
+        return dict(self._lookup('open_interest', symbol))
+
+    async def fetch_long_short_ratio(self, symbol: str, params={}) -> dict:
+        await self._simulate_request('fetch_long_short_ratio')
+        return dict(self._lookup('long_short_ratio', symbol))
+
+class RecordingExchange:
+    """
+    Pośrednik nagrywający: przekazuje wywołania do prawdziwej instancji ccxt i zapisuje odpowiedzi
+    w formacie fixture dla ReplayExchange. Pozostałe atrybuty są delegowane bez zmian.
+    """
+
+    _RECORDED_SECTIONS = {
+        'fetch_ticker': 'tickers', 'fetch_order_book': 'order_books', 'fetch_l2_order_book': 'order_books',
+        'fetch_trades': 'trades', 'fetch_funding_rate': 'funding_rates', 'fetch_open_interest': 'open_interest',
+        'fetch_long_short_ratio': 'long_short_ratio',
+    }
+
+    def __init__(self, exchange: ccxt.Exchange):
+        self._exchange = exchange
+        self.fixture = empty_fixture()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._exchange, name)
+        if name in self._RECORDED_SECTIONS:
+            section = self._RECORDED_SECTIONS[name]
+            async def recorded(symbol, *args, **kwargs):
+                result = await attr(symbol, *args, **kwargs)
+                self.fixture[section][symbol] = result
+                return result
+            return recorded
+        if name == 'fetch_ohlcv':
+            return self._record_ohlcv
+        if name == 'fetch_tickers':
+            return self._record_tickers
+        return attr
+
+    async def _record_ohlcv(self, symbol: str, timeframe='1m', since=None, limit=None, params={}):
+        candles = await self._exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit, params=params)
+        series = {c[0]: c for c in self.fixture['ohlcv'].get(_series_key(symbol, timeframe), [])}
+        series.update({c[0]: c for c in candles})
+        self.fixture['ohlcv'][_series_key(symbol, timeframe)] = [series[ts] for ts in sorted(series)]
+        return candles
+
+    async def _record_tickers(self, symbols=None, params={}):
+        tickers = await self._exchange.fetch_tickers(symbols, params=params)
+        self.fixture['tickers'].update(tickers)
+        return tickers
+
+    def save(self, path: str):
+        """Zapisuje nagraną sesję (wraz z rynkami, jeśli zostały załadowane) jako fixture."""
+        if self._exchange.markets:
+            self.fixture['markets'] = self._exchange.markets
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.fixture, f, separators=(',', ':'), default=str)
+        logger.info(f"Zapisano nagranie sesji {self._exchange.id} do {path} ({len(self.fixture['ohlcv'])} serii świec).")
+
+def build_synthetic_fixture(symbols: List[str], timeframes: List[str], candles: int = 1000, seed: int = 42) -> Dict[str, Any]:
+    """Generuje deterministyczne fixture w skali produkcyjnej (losowy spacer ceny) do benchmarków."""
+    rng = random.Random(seed)
+    fixture = empty_fixture()
+    end_ms = 1704067200000
+    for symbol in symbols:
+        base, quote = symbol.split('/')
+        fixture['markets'][symbol] = {'id': f"{base}{quote}", 'symbol': symbol, 'base': base, 'quote': quote, 'spot': True, 'type': 'spot', 'active': True}
+        last_price = rng.uniform(1, 1000)
+        for timeframe in timeframes:
+            timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+            price, series = last_price, []
+            for i in range(candles):
+                open_ = price
+                close = max(open_ * (1 + rng.gauss(0, 0.01)), 1e-8)
+                high, low = max(open_, close) * (1 + abs(rng.gauss(0, 0.004))), min(open_, close) * (1 - abs(rng.gauss(0, 0.004)))
+                series.append([end_ms - (candles - 1 - i) * timeframe_ms, open_, high, low, close, rng.uniform(100, 10000)])
+                price = close
+            fixture['ohlcv'][_series_key(symbol, timeframe)] = series
+        fixture['tickers'][symbol] = {'symbol': symbol, 'timestamp': end_ms, 'last': price, 'bid': price * 0.9999, 'ask': price * 1.0001, 'percentage': rng.uniform(-5, 5), 'baseVolume': rng.uniform(1e4, 1e6)}
+        fixture['order_books'][symbol] = {
+            'symbol': symbol, 'timestamp': end_ms,
+            'bids': [[price * (1 - 0.0005 * (i + 1)), rng.uniform(0.1, 10)] for i in range(100)],
+            'asks': [[price * (1 + 0.0005 * (i + 1)), rng.uniform(0.1, 10)] for i in range(100)],
+        }
+        fixture['trades'][symbol] = [{'symbol': symbol, 'timestamp': end_ms - (100 - i) * 1000, 'price': price, 'amount': rng.uniform(0.01, 5), 'side': rng.choice(['buy', 'sell'])} for i in range(100)]
+        fixture['funding_rates'][symbol] = {'symbol': symbol, 'fundingRate': rng.uniform(-0.0005, 0.0005), 'timestamp': end_ms}
+        fixture['open_interest'][symbol] = {'symbol': symbol, 'openInterestAmount': rng.uniform(1e5, 1e7), 'timestamp': end_ms}
+        fixture['long_short_ratio'][symbol] = {'symbol': symbol, 'longShortRatio': rng.uniform(0.5, 2.0), 'timestamp': end_ms}
+    return fixture
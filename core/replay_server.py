@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+class ReplayServer:
+    """
+    Lokalny zamiennik giełdowego WebSocketu: odtwarza nagrane świece jako strumień aktualizacji.
+    Każda świeca jest wysyłana w kilku krokach (otwarcie, ekstrema, zamknięcie), tak jak rośnie świeca na żywo,
+    a z tych samych kroków powstają wiadomości ticker i trades. Z 'align_to_now' nagranie jest przesuwane tak,
+    by pierwsza wysłana świeca była bieżącą - bufor zasiany historią z REST przyjmuje wtedy kolejne świece.
+
+    Protokół (JSON):
+      klient -> serwer: {"op": "subscribe" | "unsubscribe", "channel": "kline" | "ticker" | "trades", "symbol": ..., "interval": ...}
+      serwer -> klient: {"channel": ..., "symbol": ..., "interval": ..., "data": ...}
+                        {"event": "end" | "error", "channel": ..., "symbol": ..., "interval": ..., "message": ...}
+    """
+
+    def __init__(self, recordings: Dict[Tuple[str, str], pd.DataFrame], host: str = '127.0.0.1', port: int = 8765, message_interval: float = 0.01, align_to_now: bool = True):
+        self.recordings = recordings
+        self.host = host
+        self.port = port
+        self.message_interval = message_interval
+        self.align_to_now = align_to_now
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/ws', self._handle_connection)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0: # Port wybrany przez system - odczytujemy faktyczny
+            self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"[ReplayServer] Serwer powtórek nasłuchuje na {self.url}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("[ReplayServer] Serwer powtórek zatrzymany.")
+
+    async def _handle_connection(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams: Dict[Tuple, asyncio.Task] = {}
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT: continue
+                try:
+                    message = json.loads(msg.data)
+                    key = (message['channel'], message['symbol'], message.get('interval'))
+                except (ValueError, KeyError):
+                    await ws.send_json({"event": "error", "message": "Niepoprawna wiadomość."}); continue
+                if message.get('op') == 'subscribe' and key not in streams:
+                    streams[key] = asyncio.create_task(self._stream(ws, *key))
+                elif message.get('op') == 'unsubscribe' and key in streams:
+                    streams.pop(key).cancel()
+        finally:
+            for task in streams.values(): task.cancel()
+            await asyncio.gather(*streams.values(), return_exceptions=True)
+        return ws
+
+    def _find_recording(self, channel: str, symbol: str, interval: Optional[str]) -> Optional[pd.DataFrame]:
+        if channel == 'kline':
+            return self.recordings.get((symbol, interval))
+        # Ticker i transakcje odtwarzamy z najdrobniejszego dostępnego interwału
+        candidates = [(df.index.to_series().diff().min(), df) for (s, _), df in self.recordings.items() if s == symbol and len(df) > 1]
+        return min(candidates, key=lambda c: c[0])[1] if candidates else None
+
+    async def _stream(self, ws: web.WebSocketResponse, channel: str, symbol: str, interval: Optional[str]):
+        header = {"channel": channel, "symbol": symbol, "interval": interval}
+        df = self._find_recording(channel, symbol, interval)
+        if df is None:
+            await ws.send_json({"event": "error", "message": f"Brak nagrania dla {symbol} ({interval}).", **header}); return
+        try:
+            previous_close = None
+            timestamps = df.index.values.astype('datetime64[ms]').astype('int64')
+            if self.align_to_now:
+                timestamps = timestamps + self.offset_to_now(timestamps)
+            for ts, candle in zip(timestamps, df[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype=float)):
+                for partial in self.build_partial_candles(int(ts), *candle):
+                    await ws.send_json({**header, "data": self._build_payload(channel, symbol, partial, previous_close)})
+                    await asyncio.sleep(self.message_interval)
+                previous_close = candle[3]
+            await ws.send_json({"event": "end", **header})
+        except (ConnectionResetError, RuntimeError):
+            pass # Klient się rozłączył
+
+    @staticmethod
+    def offset_to_now(timestamps) -> int:
+        """Przesunięcie (ms), po którym pierwsza świeca nagrania otwiera się razem z bieżącą świecą jego interwału."""
+        if not len(timestamps): return 0
+        timeframe_ms = max(int(min(timestamps[1:] - timestamps[:-1])), 1) if len(timestamps) > 1 else 1
+        return (int(time.time() * 1000) // timeframe_ms) * timeframe_ms - int(timestamps[0])
+
+    @staticmethod
+    def build_partial_candles(ts: int, open_: float, high: float, low: float, close: float, volume: float) -> List[list]:
+        """Rozkłada świecę na kolejne stany: otwarcie -> pierwsze ekstremum -> drugie ekstremum -> zamknięcie."""
+        path = [open_, low, high, close] if close >= open_ else [open_, high, low, close]
+        partials = []
+        for i in range(1, len(path) + 1):
+            seen = path[:i]
+            partials.append([ts, open_, max(seen), min(seen), seen[-1], volume * i / len(path)])
+        return partials
+
+    @staticmethod
+    def _build_payload(channel: str, symbol: str, partial: list, previous_close: Optional[float]):
+        ts, _, _, _, price, _ = partial
+        if channel == 'kline':
+            return partial
+        if channel == 'ticker':
+            percentage = ((price / previous_close) - 1) * 100 if previous_close else None
+            return {"symbol": symbol, "timestamp": ts, "last": price, "bid": price, "ask": price, "percentage": percentage, "baseVolume": partial[5]}
+        return [{"symbol": symbol, "timestamp": ts, "price": price, "amount": partial[5] / 4, "side": "buy" if partial[4] >= partial[1] else "sell"}]
+
+    @classmethod
+    def from_database(cls, db_manager, symbols: List[str], interval: str, start_date: str, end_date: str, exchange: str = "BINANCE", **kwargs) -> 'ReplayServer':
+        """Tworzy serwer odtwarzający świece zapisane wcześniej w tabeli 'ohlcv'."""
+        recordings = {}
+        for symbol in symbols:
+            df = db_manager.get_ohlcv(symbol, interval, start_date, end_date, exchange=exchange)
+            if df is not None and not df.empty:
+                recordings[(symbol, interval)] = df
+            else:
+                logger.warning(f"[ReplayServer] Brak zapisanych świec dla {symbol} ({interval}).")
+        return cls(recordings, **kwargs)
+
+async def _serve_forever(server: ReplayServer):
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    from core.database_manager import DatabaseManager
+    parser = argparse.ArgumentParser(description="Lokalny serwer powtórek świec (zamiennik WebSocketu giełdy).")
+    parser.add_argument('--symbols', nargs='+', required=True)
+    parser.add_argument('--interval', default='1h')
+    parser.add_argument('--start', required=True)
+    parser.add_argument('--end', required=True)
+    parser.add_argument('--exchange', default='BINANCE')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--message-interval', type=float, default=0.05)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = ReplayServer.from_database(DatabaseManager(), args.symbols, args.interval, args.start, args.end, exchange=args.exchange, port=args.port, message_interval=args.message_interval)
+    asyncio.run(_serve_forever(server))
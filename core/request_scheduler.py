@@ -0,0 +1,154 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class RequestPriority(IntEnum):
+    """Klasy priorytetu zapytań do giełd - mniejsza wartość oznacza wyższy priorytet."""
+    PAPER_TRADING = 0
+    ALERT_SCAN = 1
+    DASHBOARD = 2
+    CHART = 3
+
+# Klasa priorytetu jest przekazywana przez kontekst, więc nie trzeba jej przeciągać przez wszystkie serwisy
+_current_priority: contextvars.ContextVar[RequestPriority] = contextvars.ContextVar('request_priority', default=RequestPriority.DASHBOARD)
+
+@contextmanager
+def request_priority(priority: RequestPriority):
+    """Ustawia klasę priorytetu dla wszystkich zapytań wykonanych wewnątrz bloku (także w zadaniach potomnych)."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def get_current_priority() -> RequestPriority:
+    return _current_priority.get()
+
+class TokenBucket:
+    """Klasyczny kubełek tokenów: 'rate' tokenów na sekundę, maksymalnie 'capacity' w zapasie."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def time_until(self, required: float) -> float:
+        """Zwraca liczbę sekund, po której w kubełku będzie co najmniej 'required' tokenów."""
+        self._refill()
+        if self.tokens >= required: return 0.0
+        return (required - self.tokens) / self.rate
+
+    def consume(self, amount: float = 1.0):
+        self._refill()
+        self.tokens -= amount
+
+class _ClassStats:
+    def __init__(self):
+        self.queued = 0
+        self.max_queued = 0
+        self.dispatched = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+class _ExchangeQueue:
+    """Kolejka priorytetowa i kubełek tokenów jednej giełdy, obsługiwane przez własnego dyspozytora."""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.heap: List[Tuple[int, int, float, asyncio.Future]] = []
+        self.wakeup = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.stats: Dict[RequestPriority, _ClassStats] = {p: _ClassStats() for p in RequestPriority}
+
+class RequestScheduler:
+    """
+    Planista zapytań do giełd: jeden kubełek tokenów na giełdę i ścisła kolejność klas priorytetu.
+    Część pojemności kubełka jest zarezerwowana dla klas krytycznych (PaperTrader, skaner alertów),
+    więc duże odświeżenie dashboardu nie jest w stanie wyczerpać limitu przed nimi.
+    """
+
+    def __init__(self, burst: int = 5, reserved_share: float = 0.2):
+        self.burst = max(1, burst)
+        self.reserved_share = reserved_share
+        self._queues: Dict[str, _ExchangeQueue] = {}
+        self._seq = itertools.count()
+
+    async def acquire(self, exchange_id: str, rate_limit_ms: float, priority: Optional[RequestPriority] = None):
+        """Czeka, aż zapytanie danej klasy priorytetu może zostać wysłane do giełdy."""
+        if not rate_limit_ms: return # Giełda bez limitu - nie ma czego planować
+        priority = priority if priority is not None else get_current_priority()
+        queue = self._get_queue(exchange_id, rate_limit_ms)
+        stats = queue.stats[priority]
+
+        future = asyncio.get_running_loop().create_future()
+        enqueued_at = time.monotonic()
+        heapq.heappush(queue.heap, (int(priority), next(self._seq), enqueued_at, future))
+        stats.queued += 1
+        stats.max_queued = max(stats.max_queued, stats.queued)
+        queue.wakeup.set()
+        if queue.dispatcher is None or queue.dispatcher.done():
+            queue.dispatcher = asyncio.create_task(self._dispatch(queue))
+
+        try:
+            await future
+        finally:
+            stats.queued -= 1
+        wait = time.monotonic() - enqueued_at
+        stats.dispatched += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+
+    def _get_queue(self, exchange_id: str, rate_limit_ms: float) -> _ExchangeQueue:
+        if exchange_id not in self._queues:
+            self._queues[exchange_id] = _ExchangeQueue(TokenBucket(rate=1000.0 / rate_limit_ms, capacity=self.burst))
+        return self._queues[exchange_id]
+
+    def _required_tokens(self, priority: int) -> float:
+        """Klasy niekrytyczne muszą zostawić w kubełku rezerwę dla PaperTradera i skanera."""
+        if priority <= RequestPriority.ALERT_SCAN: return 1.0
+        return 1.0 + self.burst * self.reserved_share
+
+    async def _dispatch(self, queue: _ExchangeQueue):
+        while queue.heap:
+            priority, _, _, future = queue.heap[0]
+            if future.done(): # Wywołujący zrezygnował (np. anulowanie zadania)
+                heapq.heappop(queue.heap); continue
+            delay = queue.bucket.time_until(self._required_tokens(priority))
+            if delay > 0:
+                # Czekamy na tokeny, ale budzimy się wcześniej, jeśli nadejdzie zapytanie o wyższym priorytecie
+                queue.wakeup.clear()
+                try:
+                    await asyncio.wait_for(queue.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(queue.heap)
+            queue.bucket.consume()
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Zwraca głębokość kolejek i czasy oczekiwania dla każdej giełdy i klasy priorytetu."""
+        result = {}
+        for exchange_id, queue in self._queues.items():
+            result[exchange_id] = {
+                priority.name: {
+                    "queued": s.queued, "max_queued": s.max_queued, "dispatched": s.dispatched,
+                    "avg_wait_ms": (s.total_wait / s.dispatched * 1000) if s.dispatched else 0.0,
+                    "max_wait_ms": s.max_wait * 1000
+                } for priority, s in queue.stats.items()
+            }
+        return result
@@ -0,0 +1,71 @@
+"""
+Minimum/maksimum kroczące. RollingExtremum to wersja strumieniowa na kolejce monotonicznej (każda wartość wchodzi
+i wychodzi z kolejki najwyżej raz, więc aktualizacja kosztuje średnio O(1)), a rolling_extremum liczy całą tablicę
+naraz algorytmem van Herka/Gil-Wermana (minima prefiksowe i sufiksowe w blokach długości okna).
+Obie wersje zwracają to samo co Series.rolling(window).min()/max(): NaN, gdy okno jest niepełne lub zawiera NaN.
+"""
+from collections import deque
+from typing import Deque, Tuple
+
+import numpy as np
+
+NAN = float('nan')
+
+class RollingExtremum:
+    """Minimum (mode='min') lub maksimum (mode='max') ostatnich 'window' wartości, aktualizowane wartość po wartości."""
+    __slots__ = ('window', 'is_min', 'count', 'last_nan', '_queue')
+
+    def __init__(self, window: int, mode: str = 'min'):
+        if window < 1: raise ValueError("Okno musi mieć co najmniej jedną wartość.")
+        if mode not in ('min', 'max'): raise ValueError(f"Nieznany tryb '{mode}' - dozwolone 'min' i 'max'.")
+        self.window, self.is_min = window, mode == 'min'
+        self.count = 0 # Liczba wszystkich dodanych wartości (pozycja następnej)
+        self.last_nan = -1 # Pozycja ostatniego NaN
+        self._queue: Deque[Tuple[int, float]] = deque() # (pozycja, wartość), wartości monotoniczne
+
+    def push(self, value: float) -> float:
+        """Dodaje wartość i zwraca ekstremum okna kończącego się na niej."""
+        position = self.count
+        self.count += 1
+        if value != value:
+            self.last_nan = position
+        else:
+            queue = self._queue
+            if self.is_min:
+                while queue and queue[-1][1] >= value: queue.pop()
+            else:
+                while queue and queue[-1][1] <= value: queue.pop()
+            queue.append((position, value))
+        while self._queue and self._queue[0][0] <= position - self.window: self._queue.popleft()
+        return self.value
+
+    @property
+    def value(self) -> float:
+        """Ekstremum ostatnich 'window' wartości albo NaN (okno niepełne lub z NaN)."""
+        if self.count < self.window or self.last_nan > self.count - 1 - self.window: return NAN
+        return self._queue[0][1]
+
+    def peek(self, value: float) -> float:
+        """Ekstremum okna, które powstałoby po dodaniu 'value' - bez zmiany stanu (np. dla trwającej świecy)."""
+        if self.count + 1 < self.window or value != value or self.last_nan > self.count - self.window: return NAN
+        if self.window == 1: return value
+        rest = next((v for p, v in self._queue if p > self.count - self.window), value)
+        return min(rest, value) if self.is_min else max(rest, value)
+
+def rolling_extremum(values: np.ndarray, window: int, mode: str = 'min') -> np.ndarray:
+    """Wektorowe minimum/maksimum kroczące całej tablicy w O(n) niezależnie od długości okna."""
+    if mode not in ('min', 'max'): raise ValueError(f"Nieznany tryb '{mode}' - dozwolone 'min' i 'max'.")
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if window < 1 or len(values) < window: return result
+    ufunc = np.minimum if mode == 'min' else np.maximum
+    blocks = -(-len(values) // window)
+    padded = np.full(blocks * window, np.inf if mode == 'min' else -np.inf)
+    padded[:len(values)] = values
+    padded = padded.reshape(blocks, window)
+    # NaN propaguje się przez minimum/maksimum, więc okno z NaN daje NaN (jak w pandas)
+    prefix = ufunc.accumulate(padded, axis=1).ravel()
+    suffix = ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    ends = np.arange(window - 1, len(values))
+    result[window - 1:] = ufunc(suffix[ends - window + 1], prefix[ends])
+    return result
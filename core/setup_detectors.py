@@ -0,0 +1,138 @@
+"""
+Detektory setupów skanera Ssnedam. Skan jednej ramki buduje SetupContext - wspólne tablice NumPy tylko do odczytu
+(High/Low/Close/Volume) oraz leniwie liczone wskaźniki, punkty zwrotne i stan squeeze - a każdy zarejestrowany detektor
+dostaje ten sam kontekst, więc żaden nie kopiuje ramki ani nie liczy drugi raz tych samych danych.
+Detektor to funkcja (SetupContext) -> lista setupów {'type', 'interval', 'details'}.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.indicator_service import IndicatorKeyGenerator
+
+class SetupContext:
+    """Dane jednej ramki współdzielone przez detektory setupów (jeden skan symbolu na jednym interwale)."""
+
+    def __init__(self, df: pd.DataFrame, interval: str, settings, indicator_service,
+                 swing_points: Optional[Callable[[int, float], Tuple[np.ndarray, np.ndarray]]] = None,
+                 squeeze: Optional[Callable[[int, float, int], bool]] = None):
+        self.df = df
+        self.interval = interval
+        self.settings = settings
+        self.indicator_service = indicator_service
+        self.high, self.low, self.close = (_read_only(df[col]) for col in ('High', 'Low', 'Close'))
+        self.volume = _read_only(df['Volume']) if 'Volume' in df.columns else None
+        self.keys = IndicatorKeyGenerator(settings.get('analysis.indicator_params', {}))
+        self._swing_points = swing_points
+        self._squeeze = squeeze
+        self._indicators: Dict[Tuple[str, ...], pd.DataFrame] = {}
+        self._swings: Dict[Tuple[int, float], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def indicator(self, column: str) -> Optional[np.ndarray]:
+        """Kolumna wskaźnika jako tablica tylko do odczytu; wskaźnik jest liczony raz na skan (calculate_all nie modyfikuje ramki)."""
+        if column in self.df.columns: return _read_only(self.df[column])
+        for frame in self._indicators.values():
+            if column in frame.columns: return _read_only(frame[column])
+        frame = self.indicator_service.calculate_all(self.df, indicators=[column])
+        self._indicators[(column,)] = frame
+        return _read_only(frame[column]) if column in frame.columns else None
+
+    def swing_points(self, distance: int, prominence_multiplier: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Pozycje szczytów i dołków (jak PatternService.find_swing_points), wyznaczane raz na skan."""
+        key = (distance, prominence_multiplier)
+        if key not in self._swings:
+            if self._swing_points is None: raise ValueError("Kontekst setupów nie ma źródła punktów zwrotnych.")
+            self._swings[key] = self._swing_points(distance, prominence_multiplier)
+        return self._swings[key]
+
+    def is_squeeze(self, lookback: int = 100) -> bool:
+        """Bollinger Band Squeeze na ostatniej świecy - ze stanu przyrostowego serii, jeśli skaner go dostarcza."""
+        params = self.settings.get('analysis.indicator_params', {})
+        length, std = params.get('bbands_length', 20), params.get('bbands_std', 2.0)
+        if self._squeeze is not None: return self._squeeze(length, std, lookback)
+        upper, lower, mid = (self.indicator(column) for column in (self.keys.bbands_upper(), self.keys.bbands_lower(), self.keys.bbands_mid()))
+        return upper is not None and lower is not None and mid is not None and is_bollinger_squeeze(upper, lower, mid, lookback)
+
+SetupDetector = Callable[[SetupContext], List[Dict[str, Any]]]
+
+def _read_only(series: pd.Series) -> np.ndarray:
+    """Widok kolumny jako tablica float64 bez prawa zapisu - detektory współdzielą dane i nie mogą ich zmieniać."""
+    # Widok, a nie sama tablica - to_numpy może zwrócić bufor ramki, którego flag nie chcemy zmieniać
+    values = series.to_numpy(dtype=np.float64).view()
+    values.flags.writeable = False
+    return values
+
+def _mean(values: np.ndarray) -> float:
+    """Średnia z pominięciem NaN (jak Series.mean), bez ostrzeżeń dla pustego wycinka."""
+    valid = ~np.isnan(values)
+    count = int(valid.sum())
+    return float(values[valid].sum() / count) if count else float('nan')
+
+def is_bollinger_squeeze(upper: np.ndarray, lower: np.ndarray, mid: np.ndarray, lookback: int = 100) -> bool:
+    """Czy bieżąca szerokość wstęg (w % średniej) jest w 110% minimum z ostatnich 'lookback' świec."""
+    if len(mid) < lookback: return False
+    with np.errstate(divide='ignore', invalid='ignore'):
+        width = (upper[-lookback:] - lower[-lookback:]) / mid[-lookback:]
+    # rolling(lookback).min() daje NaN, jeśli w oknie brakuje którejkolwiek wartości
+    if np.isnan(width).any(): return False
+    return bool(width[-1] <= width.min() * 1.1)
+
+def is_volume_contraction(high: np.ndarray, low: np.ndarray, volume: np.ndarray, lookback: int = 20, contraction_threshold: float = 0.4) -> bool:
+    """Czy w ostatnich 'lookback' świecach maleją jednocześnie zakres świec i (znacząco) wolumen."""
+    if len(high) < lookback: return False
+    half = lookback // 2
+    candle_range = high[-lookback:] - low[-lookback:]
+    recent_volume = volume[-lookback:]
+    if _mean(candle_range[half:]) >= _mean(candle_range[:half]): return False # Zmienność nie maleje
+    # Wolumen w drugiej połowie okresu musi być znacząco niższy (np. o 40%)
+    return not _mean(recent_volume[half:]) > _mean(recent_volume[:half]) * (1 - contraction_threshold)
+
+def find_breakouts_and_reclaims(high: np.ndarray, low: np.ndarray, close: np.ndarray, levels: Iterable[float],
+                                lookback: int = 5, is_resistance: bool = False) -> np.ndarray:
+    """
+    Dla każdego poziomu sprawdza, czy w ostatnich 'lookback' świecach cena wybiła poziom (knot przez poziom przy
+    zamknięciu poprzedniej świecy po drugiej stronie), a potem - na tej samej lub późniejszej świecy - zamknęła
+    się z powrotem po pierwotnej stronie. Wszystkie poziomy są porównywane z oknem jedną operacją na macierzy.
+    """
+    levels = np.asarray(list(levels), dtype=np.float64)[:, None]
+    if len(close) < lookback or not len(levels): return np.zeros(len(levels), dtype=bool)
+    recent_close = close[-lookback:]
+    # Pierwsza świeca okna porównywana jest sama ze sobą (jak w pierwotnej pętli)
+    prev_close = np.concatenate((recent_close[:1], recent_close[:-1]))
+    if is_resistance:
+        crossed = (high[-lookback:] > levels) & (prev_close < levels)
+        reclaimed = recent_close < levels
+    else:
+        crossed = (low[-lookback:] < levels) & (prev_close > levels)
+        reclaimed = recent_close > levels
+    first_cross = np.argmax(crossed, axis=1)
+    last_reclaim = lookback - 1 - np.argmax(reclaimed[:, ::-1], axis=1)
+    return crossed.any(axis=1) & reclaimed.any(axis=1) & (last_reclaim >= first_cross)
+
+def detect_bollinger_squeeze(ctx: SetupContext) -> List[Dict[str, Any]]:
+    if not ctx.is_squeeze(): return []
+    reason = "Wykryto kompresję zmienności (Bollinger Band Squeeze). Rynek przygotowuje się do potencjalnego wybicia."
+    return [{'type': 'Potencjalne Wybicie', 'interval': ctx.interval, 'details': reason}]
+
+def detect_volume_contraction(ctx: SetupContext) -> List[Dict[str, Any]]:
+    if ctx.volume is None or not is_volume_contraction(ctx.high, ctx.low, ctx.volume): return []
+    reason = "Wykryto konsolidację przy malejącym wolumenie (VCP). Podaż 'wysycha', co może poprzedzać silny ruch w górę."
+    return [{'type': 'Potencjalna Akumulacja', 'interval': ctx.interval, 'details': reason}]
+
+def detect_traps(ctx: SetupContext) -> List[Dict[str, Any]]:
+    """Pułapki na byki/niedźwiedzie: fałszywe wybicie ostatnich trzech szczytów i dołków."""
+    params = ctx.settings.get('ssnedam', {})
+    high_peaks, low_peaks = ctx.swing_points(params.get('scanner_distance', 10), params.get('scanner_prominence', 0.5))
+    resistances, supports = ctx.high[high_peaks[-3:]], ctx.low[low_peaks[-3:]]
+    setups = []
+    for level in resistances[find_breakouts_and_reclaims(ctx.high, ctx.low, ctx.close, resistances, is_resistance=True)]:
+        reason = f"Wykryto potencjalną pułapkę na byki (Bull Trap) na oporze ${level:,.4f}."
+        setups.append({'type': 'Potencjalny Short', 'interval': ctx.interval, 'details': reason})
+    for level in supports[find_breakouts_and_reclaims(ctx.high, ctx.low, ctx.close, supports, is_resistance=False)]:
+        reason = f"Wykryto potencjalną pułapkę na niedźwiedzie (Bear Trap) na wsparciu ${level:,.4f}."
+        setups.append({'type': 'Potencjalny Long', 'interval': ctx.interval, 'details': reason})
+    return setups
+
+# Kolejność detektorów wyznacza kolejność setupów w wyniku skanu
+DEFAULT_SETUP_DETECTORS: List[SetupDetector] = [detect_bollinger_squeeze, detect_volume_contraction, detect_traps]
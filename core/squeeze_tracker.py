@@ -0,0 +1,121 @@
+"""
+Przyrostowe śledzenie Bollinger Band Squeeze. Tracker serii trzyma ostatnie zamknięcia (okno wstęg) i minimum
+kroczące szerokości wstęg (RollingExtremum), więc kolejny skan dopisuje tylko nowe zamknięte świece, a trwającą
+świecę ocenia bez zmiany stanu. Wynik odpowiada is_bollinger_squeeze na wstęgach policzonych dla całej ramki.
+"""
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.rolling_extremum import RollingExtremum
+from core.fair_value_gaps import timestamps_in_seconds
+from app_config import SQUEEZE_TRACKER_MAX_SERIES
+
+NAN = float('nan')
+
+def bollinger_width(closes, std: float) -> float:
+    """Szerokość wstęg względem średniej, (górna - dolna) / środkowa, dla jednego okna zamknięć (odchylenie populacyjne)."""
+    count = len(closes)
+    mean = math.fsum(closes) / count
+    if mean != mean or mean == 0: return NAN
+    deviation = math.sqrt(math.fsum((value - mean) ** 2 for value in closes) / count)
+    return 2 * std * deviation / mean
+
+class SqueezeTracker:
+    """Stan squeeze jednej serii: zamknięcia z okna wstęg i minimum szerokości z ostatnich 'lookback' świec."""
+
+    def __init__(self, length: int = 20, std: float = 2.0, lookback: int = 100):
+        self.length, self.std, self.lookback = length, std, lookback
+        self._closes: Deque[float] = deque(maxlen=length)
+        self._widths = RollingExtremum(lookback, 'min')
+        self._last_second: Optional[float] = None # Czas ostatniej zamkniętej świecy
+        self._last_close = NAN
+        self._live_close = NAN
+        self._rows = 0 # Długość ostatniej ramki
+        self.loads = 0
+
+    def sync(self, df: pd.DataFrame):
+        """Dopisuje nowe zamknięte świece ramki; inna historia (luka, zmienione zamknięcie) odbudowuje stan od nowa."""
+        self._rows = 0 if df is None else len(df)
+        if not self._rows:
+            self._live_close = NAN
+            return
+        seconds, close = timestamps_in_seconds(df.index), df['Close'].to_numpy(dtype=np.float64)
+        closed = self._rows - 1
+        start = self._find_start(seconds[:closed], close[:closed])
+        if start is None:
+            self._reset()
+            start = 0
+        for value in close[start:closed]: self._push(float(value))
+        if closed: self._last_second, self._last_close = float(seconds[closed - 1]), float(close[closed - 1])
+        self._live_close = float(close[-1])
+
+    def _find_start(self, seconds: np.ndarray, close: np.ndarray) -> Optional[int]:
+        """Pozycja pierwszej nieprzetworzonej zamkniętej świecy albo None, gdy ramka nie jest kontynuacją stanu."""
+        if self._last_second is None: return None
+        position = int(np.searchsorted(seconds, self._last_second))
+        if position >= len(seconds) or seconds[position] != self._last_second: return None
+        # Zamknięte świece się nie zmieniają - wystarczy porównać ostatnią przetworzoną (NaN traktujemy jak równe)
+        if close[position] != self._last_close and not (math.isnan(close[position]) and math.isnan(self._last_close)): return None
+        return position + 1
+
+    def _reset(self):
+        self._closes.clear()
+        self._widths = RollingExtremum(self.lookback, 'min')
+        self._last_second, self._last_close = None, NAN
+        self.loads += 1
+
+    def _push(self, close: float):
+        self._closes.append(close)
+        self._widths.push(bollinger_width(self._closes, self.std) if len(self._closes) == self.length else NAN)
+
+    def is_squeeze(self) -> bool:
+        """Czy szerokość wstęg z trwającą świecą mieści się w 110% minimum z ostatnich 'lookback' świec ramki."""
+        # Wstęgi liczone na samej ramce mają NaN w pierwszych length - 1 świecach - takie okno nigdy nie daje squeeze
+        if self._rows < self.lookback + self.length - 1: return False
+        closes = list(self._closes)
+        window = closes[max(0, len(closes) - self.length + 1):] + [self._live_close]
+        if len(window) < self.length: return False
+        width = bollinger_width(window, self.std)
+        minimum = self._widths.peek(width)
+        return not math.isnan(minimum) and width <= minimum * 1.1
+
+class SqueezeRegistry:
+    """Trackery squeeze adresowane kluczem serii (np. giełda, symbol, interwał). Rozmiar LRU."""
+
+    def __init__(self, max_series: int = SQUEEZE_TRACKER_MAX_SERIES):
+        self.max_series = max_series
+        self._trackers: "OrderedDict[Hashable, SqueezeTracker]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.updates = 0
+
+    def is_squeeze(self, key: Hashable, df: pd.DataFrame, length: int = 20, std: float = 2.0, lookback: int = 100) -> bool:
+        """Dopasowuje tracker serii do 'df' (tylko nowe świece) i ocenia squeeze na ostatniej świecy."""
+        key = (key, length, std, lookback)
+        with self._lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = SqueezeTracker(length, std, lookback)
+                if self.max_series > 0:
+                    self._trackers[key] = tracker
+                    while len(self._trackers) > self.max_series: self._trackers.popitem(last=False)
+            else:
+                self._trackers.move_to_end(key)
+            loads = tracker.loads
+            tracker.sync(df)
+            if tracker.loads > loads: self.loads += 1
+            else: self.updates += 1
+            return tracker.is_squeeze()
+
+    def clear(self):
+        with self._lock:
+            self._trackers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"series": len(self._trackers), "max_series": self.max_series, "loads": self.loads, "updates": self.updates}
@@ -0,0 +1,83 @@
+"""
+Indeks długoterminowych poziomów wsparcia/oporu (z interwału 1D) dla każdego symbolu. Poziomy dzienne zmieniają się
+najwyżej raz na dobę, więc są wyznaczane raz po zamknięciu dziennej świecy, łączone w klastry (bliskie sobie poziomy
+to jeden poziom), zapisywane w bazie i dalej serwowane z pamięci - także po restarcie aplikacji tego samego dnia.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.database_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+
+def daily_session_start(now: Optional[float] = None) -> int:
+    """Początek bieżącej doby UTC w ms - moment zamknięcia ostatniej dziennej świecy."""
+    now_ms = int((time.time() if now is None else now) * 1000)
+    return now_ms - now_ms % DAY_MS
+
+def cluster_levels(levels: Iterable[float], tolerance: float) -> List[float]:
+    """
+    Łączy poziomy leżące bliżej niż 'tolerance' (ułamek ceny) od najniższego poziomu klastra i zastępuje
+    każdy klaster średnią jego poziomów. Zwraca poziomy rosnąco.
+    """
+    values = np.sort(np.asarray([level for level in levels if level is not None and np.isfinite(level)], dtype=np.float64))
+    if not len(values) or tolerance <= 0: return values.tolist()
+    clusters, start = [], 0
+    for i in range(1, len(values) + 1):
+        if i == len(values) or values[i] > values[start] * (1 + tolerance):
+            clusters.append(float(values[start:i].mean()))
+            start = i
+    return clusters
+
+class SRLevelIndex:
+    """Poziomy dzienne S/R w pamięci, z zapisem w tabeli 'sr_levels'. Wpis jest ważny do końca doby UTC, w której powstał."""
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db_manager = db_manager
+        self._levels: Dict[Tuple[str, str], Tuple[int, List[float]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_loads = 0
+        self.misses = 0
+
+    def get(self, exchange_id: str, symbol: str, now: Optional[float] = None) -> Optional[List[float]]:
+        """Poziomy wyznaczone po ostatnim dziennym zamknięciu albo None, gdy trzeba je policzyć od nowa."""
+        session = daily_session_start(now)
+        key = (exchange_id, symbol)
+        with self._lock:
+            entry = self._levels.get(key)
+            if entry is not None and entry[0] == session:
+                self.hits += 1
+                return entry[1]
+        stored = self.db_manager.get_sr_levels(exchange_id, symbol) if self.db_manager else None
+        with self._lock:
+            if stored is not None and stored['session_ts'] == session:
+                self._levels[key] = (session, stored['levels'])
+                self.db_loads += 1
+                return stored['levels']
+            self.misses += 1
+        return None
+
+    def put(self, exchange_id: str, symbol: str, levels: Iterable[float], tolerance: float, now: Optional[float] = None) -> List[float]:
+        """Zapamiętuje (po sklastrowaniu) poziomy dla bieżącej doby i zwraca je."""
+        session = daily_session_start(now)
+        clustered = cluster_levels(levels, tolerance)
+        with self._lock:
+            self._levels[(exchange_id, symbol)] = (session, clustered)
+        if self.db_manager:
+            self.db_manager.save_sr_levels(exchange_id, symbol, session, clustered)
+        return clustered
+
+    def clear(self):
+        with self._lock:
+            self._levels.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"symbols": len(self._levels), "hits": self.hits, "db_loads": self.db_loads, "misses": self.misses}
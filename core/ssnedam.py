@@ -5,7 +5,7 @@ import io
 import logging
 import time
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import re
 import os
 import json
@@ -34,6 +34,8 @@ from core.ai_client import AIClient, ParsedAIResponse
 from core.analyzer import AnalysisResult, TechnicalAnalyzer
 from core.indicator_service import IndicatorKeyGenerator
 from core.news_client import CryptoPanicClient
+from core.request_scheduler import RequestPriority, request_priority
+from core.market_stream import MarketStream, StreamEvent, Subscription
 
 logger = logging.getLogger(__name__)
 
@@ -51,7 +53,7 @@ class AlertData:
     fib_data: Dict[str, Any] = field(default_factory=dict)
 
 class Ssnedam:
-    def __init__(self, analyzer: TechnicalAnalyzer, ai_client: AIClient, performance_analyzer: PerformanceAnalyzer, news_client: Optional[CryptoPanicClient], db_manager: DatabaseManager, queue_update_callback: Callable[[int], None], global_analysis_lock: asyncio.Lock, status_update_callback: Callable, ai_pipeline: AIPipeline,):
+    def __init__(self, analyzer: TechnicalAnalyzer, ai_client: AIClient, performance_analyzer: PerformanceAnalyzer, news_client: Optional[CryptoPanicClient], db_manager: DatabaseManager, queue_update_callback: Callable[[int], None], global_analysis_lock: asyncio.Lock, status_update_callback: Callable, ai_pipeline: AIPipeline, market_stream: Optional[MarketStream] = None):
         self.analyzer = analyzer
         self.ai_client = ai_client
         self.performance_analyzer = performance_analyzer
@@ -67,6 +69,15 @@ class Ssnedam:
         self.worker_task: Optional[asyncio.Task] = None
         self.queue_update_callback = queue_update_callback
         self.global_analysis_lock = global_analysis_lock
+        # Tryb strumieniowy: skan symbolu po zamknięciu świecy interwału alertów zamiast cyklicznego timera
+        self.market_stream = market_stream
+        self._scan_subscriptions: Dict[Tuple[str, str, str], Subscription] = {}
+        self._scan_seeding: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self._scan_windows: Dict[Tuple[str, str, str], int] = {} # Długość okna skanu (jak przy pobraniu przez REST)
+        self._pending_scans: Dict[Tuple[str, str, str], Tuple[Dict[str, str], Any]] = {}
+        self._candle_close_scan_task: Optional[asyncio.Task] = None
+        self._on_alert_callback: Optional[Callable[[AlertData], None]] = None
+        self._coins_by_market: Dict[Tuple[str, str, str], Dict[str, str]] = {}
         logger.info("Ssnedam (System Powiadomień) zainicjalizowany z pamięcią trwałą.")
 
     def start_worker(self):
@@ -92,12 +103,13 @@ class Ssnedam:
                 
                 async with self.global_analysis_lock:
                     logger.info(f"[Pracownik AI] Zdobyto globalną blokadę dla {symbol}. Rozpoczynam analizę.")
-                    await self._generate_and_trigger_alert(
-                        symbol=symbol, exchange=task_data['exchange'],
-                        interval=interval, on_alert_callback=task_data['on_alert_callback'],
-                        status_callback=self.update_status,
-                        trigger_pattern=task_data.get('trigger_pattern', "Brak")
-                    )
+                    with request_priority(RequestPriority.ALERT_SCAN):
+                        await self._generate_and_trigger_alert(
+                            symbol=symbol, exchange=task_data['exchange'],
+                            interval=interval, on_alert_callback=task_data['on_alert_callback'],
+                            status_callback=self.update_status,
+                            trigger_pattern=task_data.get('trigger_pattern', "Brak")
+                        )
 
                 self.update_status("W gotowości...", False)
                 
@@ -111,13 +123,87 @@ class Ssnedam:
             except Exception as e:
                 logger.error(f"[Pracownik AI] Wystąpił błąd w pętli pracownika: {e}", exc_info=True)
 
+    def sync_candle_close_scans(self, coins_to_scan: List[Dict[str, str]], on_alert_callback: Callable[[AlertData], None]):
+        """Dopasowuje subskrypcje zamkniętych świec (tryb strumieniowy) do listy monet skanera."""
+        if self.market_stream is None: return
+        self._on_alert_callback = on_alert_callback
+        alert_interval = self.analyzer.settings.get('ssnedam.alert_interval', '1h')
+        wanted = {(coin['exchange'], coin['symbol'], alert_interval): coin for coin in coins_to_scan}
+        for market in set(self._scan_subscriptions) | set(self._scan_seeding):
+            if market not in wanted: self._unsubscribe_scan_market(market)
+        for market in wanted:
+            if market not in self._scan_subscriptions and market not in self._scan_seeding:
+                self._scan_seeding[market] = asyncio.create_task(self._subscribe_scan_market(market))
+        self._coins_by_market = wanted
+        logger.info(f"[Ssnedam] Skanowanie po zamknięciu świec {alert_interval}: {len(wanted)} rynków.")
+
+    async def _subscribe_scan_market(self, market: Tuple[str, str, str]):
+        """Zasiewa bufor i wskaźniki kanału historią z REST (raz) - dalej świece i wskaźniki aktualizuje strumień."""
+        exchange_id, symbol, interval = market
+        seed = None
+        try:
+            exchange_instance = await self.analyzer.get_exchange_instance(exchange_id)
+            if exchange_instance:
+                with request_priority(RequestPriority.ALERT_SCAN):
+                    seed = await self.analyzer.fetch_ohlcv(exchange_instance, symbol, interval)
+        except Exception as e:
+            logger.warning(f"[Ssnedam] Nie udało się pobrać historii {symbol} ({interval}) dla strumienia: {e}")
+        finally:
+            self._scan_seeding.pop(market, None)
+        self._scan_windows[market] = len(seed) if seed is not None else 0
+        self._scan_subscriptions[market] = self.market_stream.subscribe_klines(*market, self._on_scan_kline, seed=seed, indicators=True)
+
+    def _unsubscribe_scan_market(self, market: Tuple[str, str, str]):
+        seeding = self._scan_seeding.pop(market, None)
+        if seeding is not None: seeding.cancel()
+        subscription = self._scan_subscriptions.pop(market, None)
+        if subscription is not None: self.market_stream.unsubscribe(subscription)
+        self._scan_windows.pop(market, None)
+        self._pending_scans.pop(market, None)
+
+    def stop_candle_close_scans(self):
+        for market in set(self._scan_subscriptions) | set(self._scan_seeding):
+            self._unsubscribe_scan_market(market)
+        self._coins_by_market.clear()
+        if self._candle_close_scan_task is not None: self._candle_close_scan_task.cancel()
+
+    def _on_scan_kline(self, event: StreamEvent):
+        if event.closed_candle is None: return
+        market = (event.exchange_id, event.symbol, event.interval)
+        coin = self._coins_by_market.get(market)
+        if coin is None: return
+        self._pending_scans[market] = (coin, event.indicators)
+        if self._candle_close_scan_task is None or self._candle_close_scan_task.done():
+            self._candle_close_scan_task = asyncio.create_task(self._scan_pending_markets())
+
+    async def _scan_pending_markets(self):
+        """
+        Skanuje sekwencyjnie rynki, których świeca się zamknęła (także te, które zamkną się w trakcie).
+        Wskaźniki są brane z przyrostowego silnika kanału - bez pobierania świec i przeliczania całej ramki.
+        """
+        while self._pending_scans:
+            while self.global_analysis_lock.locked(): # Jak przy timerze: nie konkurujemy z trwającą analizą
+                await asyncio.sleep(1)
+            pending = list(self._pending_scans.items())
+            self._pending_scans.clear()
+            frames = {}
+            for market, (coin, indicators) in pending:
+                window = self._scan_windows.get(market)
+                if indicators is not None and window: # Bez historii z REST wskaźniki nie są jeszcze rozgrzane
+                    frames[(coin['exchange'], coin['symbol'])] = indicators.to_frame().iloc[-window:]
+            await self.scan_for_alerts([coin for _, (coin, _) in pending], self._on_alert_callback, frames)
+
     def _is_on_cooldown(self, symbol: str) -> bool:
         cooldown_seconds = self.analyzer.settings.get('ssnedam.cooldown_minutes', 20) * 60
         last_alert_time = self.alert_timestamps.get(symbol, 0)
         return (time.time() - last_alert_time) < cooldown_seconds
 
-    async def scan_for_alerts(self, coins_to_scan: List[Dict[str, str]], on_alert_callback: Callable[[AlertData], None]):
-        """Skanuje podaną listę monet jedna po drugiej, aby zapewnić maksymalną stabilność."""
+    async def scan_for_alerts(self, coins_to_scan: List[Dict[str, str]], on_alert_callback: Callable[[AlertData], None],
+                              frames: Optional[Dict[Tuple[str, str], pd.DataFrame]] = None):
+        """
+        Skanuje podaną listę monet jedna po drugiej, aby zapewnić maksymalną stabilność.
+        'frames' (giełda, symbol) -> gotowa ramka ze wskaźnikami (np. ze strumienia) zastępuje pobranie świec.
+        """
         if not coins_to_scan: return
         
         alert_interval = self.analyzer.settings.get('ssnedam.alert_interval', '1h')
@@ -134,7 +220,12 @@ class Ssnedam:
                 continue
 
             try:
-                coin_setups = await self.analyzer.find_potential_setups(coin['symbol'], coin['exchange'], alert_interval)
+                frame = (frames or {}).get((coin['exchange'], symbol))
+                if frame is not None and len(frame) >= 20:
+                    coin_setups = self.analyzer.scan_setups(frame, symbol, coin['exchange'], alert_interval)
+                else:
+                    with request_priority(RequestPriority.ALERT_SCAN):
+                        coin_setups = await self.analyzer.find_potential_setups(coin['symbol'], coin['exchange'], alert_interval)
                 
                 if not coin_setups:
                     continue
@@ -253,6 +344,7 @@ class Ssnedam:
 
     async def close(self):
         """Zamyka workera i anuluje wszystkie zadania w kolejce."""
+        self.stop_candle_close_scans()
         if self.worker_task and not self.worker_task.done():
             logger.info("[Ssnedam] Anulowanie zadania pracownika AI...")
             self.worker_task.cancel()  # Bezpośrednio anuluj zadanie
@@ -0,0 +1,305 @@
+"""
+Indeks punktów zwrotnych (szczytów) serii cenowej utrzymywany przyrostowo. Zapytanie peaks(distance, prominence)
+zwraca to samo co scipy.signal.find_peaks(x, distance=..., prominence=...) dla bieżącego okna serii, ale lokalne
+maksima i podstawy ich prominencji są wyznaczane raz - przy budowie indeksu lub dopisywaniu zamkniętych świec.
+Ostatnia (trwająca) świeca i przesunięcie początku okna są uwzględniane dopiero w zapytaniu.
+Dołki to szczyty serii z przeciwnym znakiem (SwingIndex(invert=True)).
+"""
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks, peak_prominences
+
+from app_config import SWING_INDEX_MAX_SERIES
+
+# Kolumny tabeli szczytów; pozycje są bezwzględne (liczone od pierwszej świecy, z której zbudowano indeks)
+_POS, _HEIGHT, _LEFT_EDGE, _LEFT_MIN, _RIGHT_MIN = range(5)
+
+def _label_array(index: pd.Index) -> Optional[np.ndarray]:
+    """Etykiety serii jako tablica liczb (znaczniki czasu w ns) albo None, gdy indeks nie jest liczbowy."""
+    if isinstance(index, pd.DatetimeIndex): return index.asi8
+    if pd.api.types.is_numeric_dtype(index.dtype): return index.to_numpy()
+    return None
+
+class SwingIndex:
+    """
+    Szczyty jednej serii wraz z minimami po obu stronach (podstawami prominencji jak w scipy.signal.peak_prominences).
+    Szczyt "otwarty" nie ma jeszcze na prawo wyższej wartości - jego prawe minimum zależy od kolejnych świec
+    i jest liczone w zapytaniu. Lewe minimum jest przeliczane w zapytaniu, gdy wyższa wartość po lewej wypadła z okna.
+    """
+
+    def __init__(self, invert: bool = False):
+        self.invert = invert
+        self.builds = 0 # Liczba pełnych przebudów (seria nie była kontynuacją poprzedniej)
+        self._reset()
+
+    def _reset(self):
+        self._values = np.empty(0) # Zamknięte świece okna (ze znakiem odwróconym dla dołków)
+        self._labels: Optional[np.ndarray] = None # Etykiety zamkniętych świec (znaczniki czasu jako liczby)
+        self._origin = 0 # Bezwzględna pozycja self._values[0]
+        self._live = math.nan # Ostatnia, wciąż zmieniająca się świeca
+        self._has_live = False
+        self._peaks = np.empty((0, 5))
+        self._open: List[int] = [] # Wiersze otwartych szczytów; wysokości nierosnące
+        self._pending: Optional[int] = None # Początek plateau po wzroście, które może jeszcze stać się szczytem
+        self._queries: Dict[Tuple, np.ndarray] = {}
+        self._selections: Dict[Tuple, np.ndarray] = {} # Wynik filtra odległości dla danego zestawu szczytów
+        self._committed: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._moments: Optional[Tuple[int, float, float]] = None # Liczność, średnia i suma kwadratów odchyleń zamkniętych świec
+        self._table: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._std: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._values) + int(self._has_live)
+
+    def sync(self, series: pd.Series) -> bool:
+        """
+        Dopasowuje indeks do serii. Jeśli seria jest kontynuacją poprzedniej (to samo zamknięte okno, ewentualnie
+        przesunięte i z nowymi świecami), dopisuje tylko różnicę; w przeciwnym razie buduje indeks od nowa.
+        Zwraca True, gdy zawartość okna się zmieniła.
+        """
+        values = series.to_numpy(dtype=np.float64)
+        if self.invert: values = -values
+        if len(values) == 0:
+            changed = len(self) > 0
+            self._reset()
+            return changed
+        labels = _label_array(series.index)
+        committed = values[:-1]
+        if labels is not None: labels = labels[:-1]
+        offset = self._find_offset(labels, committed)
+        if offset is None:
+            self._build(committed, labels)
+            changed = True
+        else:
+            overlap = len(self._values) - offset
+            changed = offset > 0 or len(committed) > overlap
+            if offset: self._trim(offset)
+            if len(committed) > overlap: self._extend(committed[overlap:], labels[overlap:])
+            if changed: self._committed = None; self._moments = None
+        live = float(values[-1])
+        if not self._has_live or not (live == self._live or (live != live and self._live != self._live)):
+            changed = True
+        self._live, self._has_live = live, True
+        if changed:
+            self._queries.clear(); self._table = None; self._std = None
+        return changed
+
+    def _find_offset(self, labels: Optional[np.ndarray], committed: np.ndarray) -> Optional[int]:
+        """Zwraca liczbę świec do usunięcia z początku okna, jeśli nowa seria je kontynuuje, inaczej None."""
+        if labels is None or self._labels is None or not len(labels) or not len(self._labels): return None
+        offset = int(np.searchsorted(self._labels, labels[0]))
+        if offset >= len(self._labels) or self._labels[offset] != labels[0]: return None
+        overlap = len(self._labels) - offset
+        if len(committed) < overlap or labels[overlap - 1] != self._labels[-1]: return None
+        # Zamknięte świece się nie zmieniają - jak w frame_fingerprint porównujemy tylko krańce wspólnego fragmentu
+        if not np.array_equal(committed[[0, overlap - 1]], self._values[[offset, -1]], equal_nan=True): return None
+        return offset
+
+    def _build(self, values: np.ndarray, labels: Optional[np.ndarray]):
+        """Buduje indeks od zera jednym przebiegiem scipy (find_peaks + peak_prominences)."""
+        self._reset()
+        self.builds += 1
+        self._values = values.copy()
+        # Bez rosnących etykiet nie da się dopasować kolejnej serii - każda synchronizacja przebuduje indeks
+        self._labels = labels if labels is not None and (len(labels) < 2 or bool(np.all(labels[1:] > labels[:-1]))) else None
+        if not len(values): return
+        peaks, props = find_peaks(values, plateau_size=(None, None))
+        if len(peaks):
+            _, left_bases, right_bases = peak_prominences(values, peaks)
+            later_max = np.maximum.accumulate(values[::-1])[::-1] # NaN po szczycie też go zamyka
+            is_open = later_max[peaks] <= values[peaks]
+            table = np.column_stack((peaks, values[peaks], props['left_edges'], values[left_bases], values[right_bases])).astype(np.float64)
+            table[is_open, _RIGHT_MIN] = np.nan
+            self._peaks = table
+            self._open = np.flatnonzero(is_open).tolist()
+        self._pending = self._trailing_plateau_start(values)
+
+    @staticmethod
+    def _trailing_plateau_start(values: np.ndarray) -> Optional[int]:
+        """Początek plateau kończącego serię, jeśli poprzedza je wzrost (kandydat na szczyt po spadku ceny)."""
+        if len(values) < 2 or values[-1] != values[-1]: return None
+        different = np.flatnonzero(values != values[-1])
+        if not len(different) or not values[different[-1]] < values[-1]: return None
+        return int(different[-1]) + 1
+
+    def _extend(self, new_values: np.ndarray, new_labels: np.ndarray):
+        """Dopisuje zamknięte świece: zamyka szczyty przebite przez nową wartość i zatwierdza plateau po spadku."""
+        start = self._origin + len(self._values)
+        self._values = np.concatenate((self._values, new_values))
+        self._labels = np.concatenate((self._labels, new_labels))
+        for t, w in enumerate(new_values.tolist(), start=start):
+            self._close_open_peaks(w, t)
+            if t == self._origin: continue
+            prev = self._values[t - 1 - self._origin]
+            if w > prev: self._pending = t
+            elif w == prev: continue
+            elif w < prev and self._pending is not None:
+                self._add_peak(self._confirm_peak(self._pending, t - 1), track_open=True)
+                self._pending = None
+            else:
+                self._pending = None
+
+    def _close_open_peaks(self, w: float, t: int):
+        """Szczyty niższe od 'w' (lub wszystkie, gdy 'w' to NaN) dostają ostateczne prawe minimum z zakresu przed 't'."""
+        while self._open and (w != w or self._peaks[self._open[-1], _HEIGHT] < w):
+            row = self._open.pop()
+            pos = int(self._peaks[row, _POS]) - self._origin
+            self._peaks[row, _RIGHT_MIN] = self._values[pos:t - self._origin].min()
+
+    def _confirm_peak(self, left_edge: int, right_edge: int) -> np.ndarray:
+        """Wiersz tabeli dla plateau [left_edge, right_edge]; lewe minimum sięga do najbliższej wyższej wartości (lub NaN)."""
+        pos = (left_edge + right_edge) // 2
+        height = self._values[right_edge - self._origin]
+        before = self._values[:left_edge - self._origin]
+        barriers = np.flatnonzero(~(before <= height))
+        lo = int(barriers[-1]) + 1 if len(barriers) else 0
+        left_min = self._values[lo:pos - self._origin + 1].min()
+        return np.array([pos, height, left_edge, left_min, np.nan])
+
+    def _add_peak(self, row: np.ndarray, track_open: bool):
+        self._peaks = np.vstack((self._peaks, row))
+        if track_open: self._open.append(len(self._peaks) - 1)
+
+    def _trim(self, count: int):
+        """Usuwa 'count' najstarszych świec; szczyty, których wzrost zaczynał się przed nowym oknem, przestają istnieć."""
+        self._origin += count
+        self._values, self._labels = self._values[count:], self._labels[count:]
+        keep = self._peaks[:, _LEFT_EDGE] > self._origin
+        dropped = len(keep) - int(keep.sum()) # Lewe krawędzie rosną z kolejnymi wierszami - usuwamy prefiks
+        self._peaks = self._peaks[dropped:]
+        self._open = [row - dropped for row in self._open if row >= dropped]
+        if self._pending is not None and self._pending <= self._origin: self._pending = None
+
+    def _committed_peaks(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tabela szczytów zamkniętej części okna i maska szczytów otwartych. Prawe minima otwartych szczytów sięgają
+        końca zamkniętych świec; lewe minima są przeliczane, gdy wyższa wartość po lewej wypadła z okna.
+        Liczona raz na każdą zmianę zamkniętych świec.
+        """
+        if self._committed is None:
+            table = self._peaks.copy()
+            is_open = np.zeros(len(table), dtype=bool)
+            is_open[self._open] = True
+            if len(table):
+                values = self._values
+                rel = table[:, _POS].astype(np.intp) - self._origin
+                if is_open.any():
+                    table[is_open, _RIGHT_MIN] = np.minimum.accumulate(values[::-1])[::-1][rel[is_open]]
+                left_open = np.maximum.accumulate(values)[rel] <= table[:, _HEIGHT]
+                if left_open.any():
+                    table[left_open, _LEFT_MIN] = np.minimum.accumulate(values)[rel[left_open]]
+            self._committed = (table, is_open)
+        return self._committed
+
+    def _window_peaks(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pozycje w oknie, wysokości i prominencje szczytów z uwzględnieniem ostatniej świecy."""
+        if self._table is None:
+            table, is_open = self._committed_peaks()
+            positions, heights = table[:, _POS], table[:, _HEIGHT]
+            left_min, right_min = table[:, _LEFT_MIN], table[:, _RIGHT_MIN]
+            live = self._live
+            if live == live and is_open.any():
+                # Ostatnia świeca nie wyższa od szczytu przedłuża jego prawy zakres; wyższa (lub NaN) go zamyka
+                right_min = np.where(is_open & (heights >= live), np.minimum(right_min, live), right_min)
+            if self._pending is not None and live < self._values[-1]:
+                extra = self._confirm_peak(self._pending, self._origin + len(self._values) - 1)
+                positions, heights = np.append(positions, extra[_POS]), np.append(heights, extra[_HEIGHT])
+                left_min, right_min = np.append(left_min, extra[_LEFT_MIN]), np.append(right_min, live)
+            self._table = (positions.astype(np.intp) - self._origin, heights, heights - np.maximum(left_min, right_min))
+        return self._table
+
+    def peaks(self, distance: Optional[float] = None, prominence: Optional[float] = None) -> np.ndarray:
+        """Pozycje szczytów w oknie (jak indeksy z find_peaks); wynik jest zapamiętywany do następnej zmiany serii."""
+        key = (distance, prominence)
+        cached = self._queries.get(key)
+        if cached is not None: return cached
+        rel, heights, prominences = self._window_peaks()
+        keep = np.ones(len(rel), dtype=bool)
+        if distance is not None and len(rel) > 1 and np.diff(rel).min() < math.ceil(distance):
+            # Filtr odległości nie zależy od przesunięcia okna - zestaw szczytów o tych samych pozycjach bezwzględnych
+            # (indeks tylko dopisuje szczyty z prawej i usuwa z lewej) ma ten sam wynik
+            selection_key = (distance, int(rel[0]) + self._origin, int(rel[-1]) + self._origin, len(rel))
+            selection = self._selections.get(selection_key)
+            if selection is None:
+                if len(self._selections) >= 16: self._selections.clear()
+                selection = self._selections[selection_key] = self._select_by_distance(rel, heights, distance)
+            keep = selection.copy()
+        if prominence is not None:
+            keep &= prominences >= prominence
+        result = rel[keep]
+        result.flags.writeable = False
+        self._queries[key] = result
+        return result
+
+    def _select_by_distance(self, rel: np.ndarray, heights: np.ndarray, distance: float) -> np.ndarray:
+        """
+        Filtr odległości find_peaks uruchomiony na rzadkim sygnale zawierającym tylko szczyty indeksu - te same
+        pozycje i wysokości dają ten sam wybór (także przy remisach) co wywołanie na pełnej serii.
+        """
+        sparse = np.full(len(self), -np.inf)
+        sparse[rel] = heights
+        selected, _ = find_peaks(sparse, distance=distance)
+        keep = np.zeros(len(rel), dtype=bool)
+        keep[np.searchsorted(rel, selected)] = True
+        return keep
+
+    def std(self) -> float:
+        """
+        Odchylenie standardowe okna (ddof=1, z pominięciem NaN - jak Series.std). Momenty zamkniętych świec są
+        liczone raz, ostatnia świeca jest do nich dołączana wzorem Chana (bez ponownego przejścia po oknie).
+        """
+        if self._std is None:
+            if self._moments is None:
+                valid = self._values[~np.isnan(self._values)]
+                mean = float(valid.mean()) if len(valid) else 0.0
+                self._moments = (len(valid), mean, float(np.square(valid - mean).sum()))
+            count, mean, m2 = self._moments
+            if self._has_live and self._live == self._live:
+                delta = self._live - mean
+                m2 += delta * delta * count / (count + 1)
+                count += 1
+            self._std = math.sqrt(m2 / (count - 1)) if count > 1 else math.nan
+        return self._std
+
+class SwingIndexRegistry:
+    """
+    Indeksy punktów zwrotnych współdzielone przez detektory formacji, adresowane kluczem serii
+    (np. giełda, symbol, interwał, kolumna). Kolejne skany tej samej serii tylko dopisują nowe świece. Rozmiar LRU.
+    """
+
+    def __init__(self, max_series: int = SWING_INDEX_MAX_SERIES):
+        self.max_series = max_series
+        self._indexes: "OrderedDict[Hashable, SwingIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.updates = 0
+
+    def get(self, key: Hashable, series: pd.Series, invert: bool = False) -> SwingIndex:
+        """Zwraca indeks dopasowany do 'series'; 'invert=True' indeksuje dołki."""
+        with self._lock:
+            index = self._indexes.get((key, invert))
+            if index is None:
+                index = SwingIndex(invert=invert)
+                if self.max_series > 0:
+                    self._indexes[(key, invert)] = index
+                    while len(self._indexes) > self.max_series: self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end((key, invert))
+            builds = index.builds
+            if index.sync(series):
+                if index.builds > builds: self.rebuilds += 1
+                else: self.updates += 1
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"series": len(self._indexes), "max_series": self.max_series, "rebuilds": self.rebuilds, "updates": self.updates}
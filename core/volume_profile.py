@@ -0,0 +1,244 @@
+"""
+Profil wolumenowy na histogramach NumPy. Wolumen każdej świecy jest rozkładany równomiernie na cały jej zakres
+High-Low (a nie przypisywany do ceny zamknięcia), a kubełki cenowe wszystkich świec - także wielu symboli
+naraz - są wyznaczane jednym np.bincount.
+Profile sesji (dób UTC) są trzymane w pamięci na wspólnej siatce cenowej serii, więc profil złożony z wielu
+sesji to zwykłe dodawanie kubełków, a kolejne wywołania liczą od nowa tylko bieżącą sesję. Zapamiętana sesja jest
+użyta ponownie tylko wtedy, gdy ramka ma dla niej te same świece (czas pierwszej i ostatniej, liczba, wolumen).
+"""
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app_config import VOLUME_PROFILE_MAX_SERIES, VOLUME_PROFILE_MAX_SESSIONS
+
+DAY_NS = 86_400 * 10**9
+# Kubełek siatki nie jest mniejszy niż ten ułamek ceny (płaska pierwsza ramka nie daje mikroskopijnej siatki)
+MIN_BIN_SIZE_FRACTION = 1e-6
+# Siatka serii jest budowana od nowa, gdy ramka potrzebowałaby więcej niż tyle razy 'bins' kubełków
+MAX_GRID_BINS_FACTOR = 20
+
+def spread_volume(low: np.ndarray, high: np.ndarray, volume: np.ndarray, origin: np.ndarray, bin_size: np.ndarray,
+                  bins: int, rows: Optional[np.ndarray] = None, row_count: int = 1) -> np.ndarray:
+    """
+    Rozkłada wolumen świec na 'bins' kubełków (origin + k * bin_size) i zwraca tablicę (row_count, bins).
+    'rows' przypisuje świece do wierszy (np. symboli lub sesji); origin/bin_size mogą być skalarami albo mieć
+    wartość dla każdej świecy. Suma wolumenów w kubełku to różnica skumulowanego rozkładu na krawędziach kubełka;
+    rozkład każdej świecy jest odcinkowo liniowy, więc wystarczą dwie sumy (bincount) na jej końcach.
+    """
+    rows = np.zeros(len(low), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+    valid = np.isfinite(low) & np.isfinite(high) & np.isfinite(volume) & (volume > 0) & (high >= low)
+    origin, bin_size = np.broadcast_to(origin, low.shape)[valid], np.broadcast_to(bin_size, low.shape)[valid]
+    low, high, volume, rows = low[valid], high[valid], volume[valid], rows[valid]
+    # Pozycje w jednostkach kubełków, przycięte do zakresu siatki
+    start = np.clip((low - origin) / bin_size, 0, bins)
+    end = np.clip((high - origin) / bin_size, 0, bins)
+    width = end - start
+    spread = width > 0
+    result = np.zeros((row_count, bins))
+
+    # Świece z zakresem: skumulowany wolumen na krawędzi k to suma d_i * (ramp(k - start_i) - ramp(k - end_i))
+    density = volume[spread] / width[spread]
+    size = bins + 2
+    cumulative = np.zeros((row_count, size))
+    for edge, sign in ((start[spread], 1.0), (end[spread], -1.0)):
+        index = rows[spread] * size + np.floor(edge).astype(np.int64) + 1 # Pierwsza krawędź na prawo od końca
+        slope = np.bincount(index, weights=sign * density, minlength=row_count * size).reshape(row_count, size).cumsum(axis=1)
+        offset = np.bincount(index, weights=sign * density * edge, minlength=row_count * size).reshape(row_count, size).cumsum(axis=1)
+        cumulative += np.arange(size) * slope - offset
+    result += np.diff(cumulative[:, :bins + 1], axis=1)
+
+    # Świece bez zakresu (High == Low): cały wolumen trafia do jednego kubełka
+    point = ~spread
+    if point.any():
+        index = rows[point] * bins + np.minimum(np.floor(start[point]).astype(np.int64), bins - 1)
+        result += np.bincount(index, weights=volume[point], minlength=row_count * bins).reshape(row_count, bins)
+    return np.maximum(result, 0) # Usuwa błędy zaokrągleń rzędu 1e-12
+
+class VolumeProfile:
+    """Wolumen w kubełkach [origin + k * bin_size, origin + (k + 1) * bin_size) dla k = 0..len(volume)-1."""
+
+    def __init__(self, origin: float, bin_size: float, volume: np.ndarray):
+        self.origin, self.bin_size, self.volume = float(origin), float(bin_size), volume
+
+    @property
+    def edges(self) -> np.ndarray:
+        return self.origin + self.bin_size * np.arange(len(self.volume) + 1)
+
+    def __add__(self, other: 'VolumeProfile') -> 'VolumeProfile':
+        """Profil złożony - wymaga tej samej siatki cenowej (ten sam rozmiar kubełka i wyrównany początek)."""
+        if not math.isclose(self.bin_size, other.bin_size): raise ValueError("Profile mają różne rozmiary kubełków.")
+        shift = round((other.origin - self.origin) / self.bin_size)
+        first, last = min(0, shift), max(len(self.volume), shift + len(other.volume))
+        volume = np.zeros(last - first)
+        volume[-first:-first + len(self.volume)] += self.volume
+        volume[shift - first:shift - first + len(other.volume)] += other.volume
+        return VolumeProfile(self.origin + first * self.bin_size, self.bin_size, volume)
+
+    def levels(self, value_area: float = 0.7) -> Optional[Dict[str, float]]:
+        """
+        POC (środek kubełka z największym wolumenem) oraz VAH/VAL - granice kubełków o największym wolumenie,
+        które razem nie przekraczają 'value_area' całości (kubełek POC zawsze należy do obszaru).
+        """
+        total = self.volume.sum()
+        if not len(self.volume) or total <= 0: return None
+        order = np.argsort(-self.volume, kind='stable')
+        in_area = order[np.cumsum(self.volume[order]) <= total * value_area]
+        in_area = np.append(in_area, order[0])
+        edges = self.edges
+        poc = order[0]
+        return {"poc": round(float((edges[poc] + edges[poc + 1]) / 2), 4), "vah": round(float(edges[in_area.max() + 1]), 4), "val": round(float(edges[in_area.min()]), 4)}
+
+def _columns(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return tuple(df[col].to_numpy(dtype=np.float64) for col in ('Low', 'High', 'Volume'))
+
+def fixed_range_profiles(frames: Sequence[pd.DataFrame], bins: int = 50) -> List[Optional[VolumeProfile]]:
+    """Profile 'bins' równych kubełków od minimum Low do maksimum High każdej ramki - wszystkie jednym bincount."""
+    columns = [_columns(df) if df is not None and not df.empty else None for df in frames]
+    origins, sizes, rows, parts = [], [], [], []
+    for row, arrays in enumerate(columns):
+        low, high, volume = arrays if arrays is not None else (np.empty(0),) * 3
+        bottom, top = (np.nanmin(low), np.nanmax(high)) if len(low) and np.isfinite(low).any() and np.isfinite(high).any() else (np.nan, np.nan)
+        origins.append(bottom); sizes.append((top - bottom) / bins if top > bottom else 1.0)
+        parts.append((low, high, volume)); rows.append(np.full(len(low), row))
+    if not parts: return []
+    low, high, volume = (np.concatenate([part[i] for part in parts]) for i in range(3))
+    rows = np.concatenate(rows)
+    origin, bin_size = np.asarray(origins)[rows], np.asarray(sizes)[rows]
+    volumes = spread_volume(low, high, volume, origin, bin_size, bins, rows, len(frames))
+    return [VolumeProfile(origins[row], sizes[row], volumes[row]) if np.isfinite(origins[row]) else None for row in range(len(frames))]
+
+def nice_bin_size(price_range: float, bins: int, price: float = 0.0) -> float:
+    """
+    Rozmiar kubełka siatki symbolu: 1, 2 lub 5 razy potęga dziesięciu, co najmniej price_range / bins
+    i co najmniej MIN_BIN_SIZE_FRACTION ceny.
+    """
+    raw = max(price_range / bins if price_range > 0 else 0.0, abs(price) * MIN_BIN_SIZE_FRACTION)
+    if not raw > 0: return 1e-8
+    magnitude = 10 ** math.floor(math.log10(raw))
+    return next(step * magnitude for step in (1, 2, 5, 10) if step * magnitude >= raw * (1 - 1e-12))
+
+class _SeriesProfiles:
+    def __init__(self, bin_size: float):
+        self.bin_size = bin_size
+        # Zamknięte, pełne sesje (numer doby UTC) -> (profil, (pierwsza świeca, ostatnia świeca, liczba świec, wolumen))
+        self.sessions: Dict[int, Tuple[VolumeProfile, Tuple[int, int, int, float]]] = {}
+
+    def matches(self, day: int, signature: Tuple[int, int, int, float]) -> bool:
+        """Czy zapamiętana sesja powstała z tych samych świec co sesja ramki."""
+        entry = self.sessions.get(day)
+        if entry is None: return False
+        cached = entry[1]
+        return cached[:3] == signature[:3] and math.isclose(cached[3], signature[3], rel_tol=1e-9, abs_tol=1e-12)
+
+class VolumeProfileEngine:
+    """
+    Profile sesyjne, złożone i kroczące wielu symboli na stałej siatce cenowej każdego z nich.
+    Zamknięte sesje liczone są raz; seria jest adresowana kluczem (np. giełda, symbol, interwał). Rozmiar LRU,
+    a w serii pamiętanych jest najwyżej 'max_sessions' najnowszych sesji.
+    """
+
+    def __init__(self, bins: int = 50, max_series: int = VOLUME_PROFILE_MAX_SERIES, max_sessions: int = VOLUME_PROFILE_MAX_SESSIONS):
+        self.bins = bins
+        self.max_series = max_series
+        self.max_sessions = max_sessions
+        self._series: "OrderedDict[Hashable, _SeriesProfiles]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.session_builds = 0
+
+    def _grid_profile(self, low: np.ndarray, high: np.ndarray, volume: np.ndarray, bin_size: float,
+                      rows: Optional[np.ndarray] = None, row_count: int = 1) -> List[VolumeProfile]:
+        """Profile na siatce k * bin_size (wspólnej dla wszystkich sesji symbolu), po jednym na wiersz."""
+        finite = np.isfinite(low) & np.isfinite(high)
+        if not finite.any(): return [VolumeProfile(0.0, bin_size, np.zeros(0)) for _ in range(row_count)]
+        first = math.floor(np.min(low[finite]) / bin_size)
+        count = max(math.floor(np.max(high[finite]) / bin_size) - first + 1, 1)
+        volumes = spread_volume(low, high, volume, first * bin_size, bin_size, count, rows, row_count)
+        return [VolumeProfile(first * bin_size, bin_size, volumes[row]) for row in range(row_count)]
+
+    def _series_for(self, key: Hashable, low: np.ndarray, high: np.ndarray) -> _SeriesProfiles:
+        """Seria klucza; siatka (i zapamiętane sesje) jest budowana od nowa, gdy ramka nie mieści się w rozsądnej liczbie kubełków."""
+        price_range = float(np.nanmax(high) - np.nanmin(low))
+        series = self._series.get(key)
+        if series is not None and price_range / series.bin_size > self.bins * MAX_GRID_BINS_FACTOR:
+            del self._series[key]
+            series = None
+        if series is None:
+            series = _SeriesProfiles(nice_bin_size(price_range, self.bins, float(np.nanmax(high))))
+            if self.max_series > 0:
+                self._series[key] = series
+                while len(self._series) > self.max_series: self._series.popitem(last=False)
+        else:
+            self._series.move_to_end(key)
+        return series
+
+    def session_profiles(self, key: Hashable, df: pd.DataFrame) -> Dict[int, VolumeProfile]:
+        """
+        Profile kolejnych dób UTC z ramki (klucz: numer doby). Pełne zamknięte sesje są brane z pamięci albo liczone
+        raz (wszystkie brakujące jednym bincount); bieżąca sesja i niepełna pierwsza sesja ramki liczone są na bieżąco.
+        Ramka musi być posortowana rosnąco po czasie.
+        """
+        if df is None or df.empty or not isinstance(df.index, pd.DatetimeIndex): return {}
+        low, high, volume = _columns(df)
+        stamps = df.index.asi8
+        days = stamps // DAY_NS
+        unique_days, starts = np.unique(days, return_index=True)
+        ends = np.append(starts[1:], len(days))
+        session_volume = np.add.reduceat(np.where(np.isfinite(volume), volume, 0.0), starts)
+        signatures = {int(day): (int(stamps[start]), int(stamps[end - 1]), int(end - start), float(total))
+                      for day, start, end, total in zip(unique_days, starts, ends, session_volume)}
+        with self._lock:
+            series = self._series_for(key, low, high)
+            # Sesja jest pełna, gdy nie jest ostatnią w ramce i (dla pierwszej) zaczyna się o północy
+            complete = np.ones(len(unique_days), dtype=bool)
+            complete[-1] = False
+            if stamps[0] != unique_days[0] * DAY_NS: complete[0] = False
+            cached = {int(day) for day in unique_days[complete] if series.matches(int(day), signatures[int(day)])}
+            compute = [i for i, day in enumerate(unique_days) if int(day) not in cached]
+            if compute:
+                wanted = np.isin(days, unique_days[compute])
+                row_of_day = {int(unique_days[i]): row for row, i in enumerate(compute)}
+                rows = np.fromiter((row_of_day[int(day)] for day in days[wanted]), dtype=np.int64, count=int(wanted.sum()))
+                profiles = self._grid_profile(low[wanted], high[wanted], volume[wanted], series.bin_size, rows, len(compute))
+                for row, i in enumerate(compute):
+                    if complete[i]:
+                        day = int(unique_days[i])
+                        series.sessions[day] = (profiles[row], signatures[day])
+                        self.session_builds += 1
+                fresh = {int(unique_days[i]): profiles[row] for row, i in enumerate(compute)}
+            else:
+                fresh = {}
+            result = {int(day): fresh[int(day)] if int(day) in fresh else series.sessions[int(day)][0] for day in unique_days}
+            if len(series.sessions) > self.max_sessions:
+                for day in sorted(series.sessions)[:len(series.sessions) - self.max_sessions]: del series.sessions[day]
+            return result
+
+    def composite(self, key: Hashable, df: pd.DataFrame, sessions: Optional[int] = None) -> Optional[VolumeProfile]:
+        """Profil złożony z ostatnich 'sessions' sesji ramki (wszystkich, gdy None) - suma kubełków profili sesyjnych."""
+        profiles = list(self.session_profiles(key, df).values())
+        if sessions is not None: profiles = profiles[-sessions:]
+        if not profiles: return None
+        result = profiles[0]
+        for profile in profiles[1:]: result = result + profile
+        return result
+
+    def rolling(self, key: Hashable, df: pd.DataFrame, window: int) -> Optional[VolumeProfile]:
+        """Profil ostatnich 'window' świec na siatce symbolu (porównywalny z profilami sesji)."""
+        if df is None or df.empty: return None
+        low, high, volume = (array[-window:] for array in _columns(df))
+        with self._lock:
+            bin_size = self._series_for(key, *_columns(df)[:2]).bin_size
+        return self._grid_profile(low, high, volume, bin_size)[0]
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"series": len(self._series), "max_series": self.max_series, "session_builds": self.session_builds,
+                    "sessions": sum(len(series.sessions) for series in self._series.values())}
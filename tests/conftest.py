@@ -1,5 +1,9 @@
 import sys
 import os
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
 import pytest
 from core.database_manager import DatabaseManager
 
@@ -19,4 +23,24 @@ def db_manager():
     yield manager
     
     # Kod poniżej 'yield' jest wykonywany PO zakończeniu testu (sprzątanie)
-    manager.close()
\ No newline at end of file
+    manager.close()
+
+@pytest.fixture
+def make_candles():
+    """
+    Fabryka ramek OHLCV z indeksem 'timestamp' od 2024-01-01. Bez 'trend' - geometryczne błądzenie losowe
+    (z ziarnem 'seed') z knotami i zmiennym wolumenem; z 'trend' - Close = trend(numer świecy), knoty po 1
+    i stały wolumen 1000, czyli przewidywalny kształt dla testów reżimu i trendu.
+    """
+    def build(rows: int = 400, freq: str = '1h', seed: int = 7, trend: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> pd.DataFrame:
+        index = pd.date_range('2024-01-01', periods=rows, freq=freq, name='timestamp')
+        if trend is not None:
+            close = np.asarray(trend(np.arange(rows, dtype=float)), dtype=float)
+            return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1000.0}, index=index)
+        rng = np.random.default_rng(seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, rows))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, rows))
+        return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': rng.uniform(100, 1000, rows)}, index=index)
+    return build
\ No newline at end of file
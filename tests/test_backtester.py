@@ -211,4 +211,26 @@ async def test_short_trade_closes_on_take_profit(monkeypatch):
     assert trade['type'] == 'SHORT'
     assert trade['entry_price'] == 100.0
     assert trade['exit_price'] == pytest.approx(100.0 * 0.80) # Wyjście na poziomie TP
-    assert trade['profit_usd'] > 0 # To musi być zysk
\ No newline at end of file
+    assert trade['profit_usd'] > 0 # To musi być zysk
+async def test_fetch_data_uses_only_complete_local_history(monkeypatch):
+    """Błąd giełdy nie pozwala na backtest z dziurawej historii, ale kompletna lokalna historia wystarcza."""
+    # 1. Arrange
+    backtester = Backtester(SettingsManager())
+    local_df = pd.DataFrame({'Open': [1.0], 'High': [1.0], 'Low': [1.0], 'Close': [1.0]}, index=pd.to_datetime([datetime(2025, 1, 1)]))
+    missing_candles = {'count': 5}
+
+    async def failing_exchange(*args, **kwargs):
+        raise ConnectionError("giełda niedostępna")
+    monkeypatch.setattr(backtester.analyzer, 'get_exchange_instance', failing_exchange)
+    monkeypatch.setattr(backtester.analyzer, 'count_missing_history', lambda *args: missing_candles['count'])
+    monkeypatch.setattr(backtester.db_manager, 'get_ohlcv', lambda *args: local_df)
+
+    # 2. Act
+    with_gaps = await backtester._fetch_data("TEST/USDT", "1d", "2025-01-01", "2025-01-01")
+    missing_candles['count'] = 0
+    complete = await backtester._fetch_data("TEST/USDT", "1d", "2025-01-01", "2025-01-01")
+
+    # 3. Assert
+    assert with_gaps is False
+    assert complete is True
+    assert backtester._data is local_df
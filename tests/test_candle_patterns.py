@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from core.candle_patterns import CandlePatternEngine
+
+def frame_from_rows(rows) -> pd.DataFrame:
+    """Ramka z listy (Open, High, Low, Close)."""
+    index = pd.date_range('2024-01-01', periods=len(rows), freq='1h', name='timestamp')
+    return pd.DataFrame(rows, columns=['Open', 'High', 'Low', 'Close'], index=index)
+
+def test_engine_detects_patterns_on_last_candle_only():
+    """Formacja wcześniej w historii nie jest zgłaszana - liczy się tylko ostatnia świeca."""
+    # 1. Arrange
+    engulfing = frame_from_rows([(10, 10.5, 8.5, 9), (8.8, 11.2, 8.7, 11), (11, 11.5, 10.5, 11.2)] + [(11.2, 12, 11, 11.8)] * 8 + [(11.8, 12.1, 11.4, 11.6)])
+    engine = CandlePatternEngine(['engulfing', 'doji'])
+
+    # 2. Act
+    found = engine.scan({'old': engulfing, 'last': engulfing.iloc[:2]})
+
+    # 3. Assert
+    assert found['old'] == {}
+    assert found['last'] == {'engulfing': 100} # Krótka ramka: doji nie ma 10 świec historii, objęcie ma 2
+
+def test_engine_batch_matches_single_frame_scans():
+    """Jeden przebieg dla wielu symboli daje te same sygnały co osobne skany."""
+    # 1. Arrange
+    rng = np.random.default_rng(4)
+    frames = {}
+    for i in range(60):
+        close = 100 + np.cumsum(rng.normal(0, 1, 40))
+        open_ = close + rng.normal(0, 0.8, 40)
+        candles = np.column_stack((open_, np.maximum(open_, close) + rng.random(40) * 0.3, np.minimum(open_, close) - rng.random(40) * 0.3, close))
+        frames[f"COIN{i}/USDT"] = frame_from_rows(candles.tolist())
+    engine = CandlePatternEngine()
+
+    # 2. Act
+    batch = engine.scan(frames)
+
+    # 3. Assert
+    assert batch == {key: engine.scan({key: df})[key] for key, df in frames.items()}
+    assert sum(len(signals) for signals in batch.values()) > 0
+
+def test_engine_skips_unknown_patterns_from_whitelist():
+    """Nieznane nazwy z ustawień są pomijane, a długość okna wynika z formacji z białej listy."""
+    # 1. Arrange & 2. Act
+    engine = CandlePatternEngine(['marubozu', 'nie_ma_takiej'])
+
+    # 3. Assert
+    assert [pattern.name for pattern in engine.patterns] == ['marubozu']
+    assert engine.bars == 1
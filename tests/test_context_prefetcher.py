@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from core.analyzer import TechnicalAnalyzer
+from core.context_service import ContextService
+from core.settings_manager import SettingsManager
+
+HOUR_MS = 3_600_000
+
+@pytest.fixture
+def context_service(db_manager):
+    """Fixtura tworząca ContextService (z prefetcherem) na serwisach pełnego analizatora."""
+    settings_manager = SettingsManager()
+    analyzer = TechnicalAnalyzer(settings_manager, db_manager, None)
+    return ContextService(settings_manager, analyzer._exchange_service, analyzer._indicator_service, db_manager)
+
+def accelerating_trend(i):
+    return 100 + 0.01 * i ** 2 # Przyspieszający trend wzrostowy (MACD nad sygnałem)
+
+def patch_sources(service, monkeypatch, calls: list, make_candles):
+    async def get_exchange_instance(exchange_id):
+        return object()
+
+    async def fetch_ohlcv(exchange, symbol, interval, *args, **kwargs):
+        calls.append(('ohlcv', symbol, interval))
+        return make_candles(300, '1D' if interval == '1d' else '1h', trend=accelerating_trend)
+
+    async def get_onchain_context(symbol, exchange_id):
+        calls.append(('onchain', symbol))
+        return {'funding_rate': 0.0001, 'open_interest_usd': 1e6}
+
+    monkeypatch.setattr(service.exchange_service, 'get_exchange_instance', get_exchange_instance)
+    monkeypatch.setattr(service.exchange_service, 'fetch_ohlcv', fetch_ohlcv)
+    monkeypatch.setattr(service, 'get_onchain_context', get_onchain_context)
+
+def test_prefetch_caches_context_until_next_candle_close(context_service, monkeypatch, make_candles):
+    """Kontekst coinów z listy obserwowanej jest liczony raz na zamknięcie świecy i wygasa przy następnym."""
+    # 1. Arrange
+    calls = []
+    patch_sources(context_service, monkeypatch, calls, make_candles)
+    coins = [{'symbol': 'SOL/USDT', 'exchange': 'BINANCE'}, {'symbol': 'ADA/USDT', 'exchange': 'BINANCE'}]
+    now_ms = 1_700_000_000_000 - 1_700_000_000_000 % HOUR_MS + 10_000 # 10 s po zamknięciu świecy 1h
+
+    # 2. Act
+    stored = asyncio.run(context_service.prefetcher.prefetch(coins, '1h', now_ms=now_ms))
+    context = context_service.prefetcher.get('BINANCE', 'SOL/USDT', now_ms=now_ms + HOUR_MS // 2)
+
+    # 3. Assert
+    assert stored == 2
+    assert context.market_momentum_status == 'SILNY_TREND'
+    assert context.intermediate_trend == 'TREND_WZROSTOWY'
+    assert context.onchain_data['funding_rate'] == 0.0001
+    assert context.daily_metrics['atr_percent'] is not None
+    assert context_service.prefetcher.get('BINANCE', 'SOL/USDT', now_ms=now_ms + HOUR_MS) is None
+
+def test_full_context_uses_prefetched_data_without_exchange_calls(context_service, monkeypatch, make_candles):
+    """Dla symbolu z prefetchu pęd, on-chain i trend średnioterminowy nie wymagają zapytań do giełdy."""
+    # 1. Arrange
+    calls = []
+    patch_sources(context_service, monkeypatch, calls, make_candles)
+    asyncio.run(context_service.prefetcher.prefetch([{'symbol': 'SOL/USDT', 'exchange': 'BINANCE'}], '1h'))
+    calls.clear()
+
+    async def no_order_flow(symbol, exchange_id):
+        return "BRAK_DANYCH"
+
+    async def regime(exchange_id="BINANCE"):
+        return "RYNEK_BYKA"
+
+    monkeypatch.setattr(context_service, 'analyze_order_flow_strength', no_order_flow)
+    monkeypatch.setattr(context_service, 'get_market_regime', regime)
+    df = make_candles(300, '1h', trend=accelerating_trend) # Ta sama ostatnia świeca co w prefetchu
+
+    # 2. Act
+    context = asyncio.run(context_service.get_full_context('SOL/USDT', 'BINANCE', df, timeframe='1h'))
+    newer_context = asyncio.run(context_service.get_full_context('SOL/USDT', 'BINANCE', make_candles(301, '1h', trend=accelerating_trend), timeframe='1h'))
+
+    # 3. Assert
+    assert calls == []
+    assert context.market_momentum_status == 'SILNY_TREND'
+    assert context.intermediate_trend == 'TREND_WZROSTOWY' # Z prefetchu - ramka bez wskaźników dałaby BRAK_DANYCH
+    assert newer_context.intermediate_trend == 'BRAK_DANYCH' # Nowsza świeca - trend liczony z ramki pipeline
+    assert context.onchain_data['open_interest_usd'] == 1e6
+    assert context_service.prefetcher.stats()['hits'] == 2
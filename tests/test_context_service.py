@@ -21,18 +21,19 @@ def context_service(db_manager):
 
 def create_mock_df(trend_type: str) -> pd.DataFrame:
     """Tworzy fałszywy DataFrame symulujący określony trend."""
-    base_price = 100
+    # Reżim porównuje cenę z wolną EMA (200), więc historia musi być od niej dłuższa
+    rows, base_price = 260, 1000
     if trend_type == "BULL":
-        prices = [base_price + i for i in range(60)] # Trend wzrostowy
+        prices = [base_price + i for i in range(rows)] # Trend wzrostowy
     elif trend_type == "BEAR":
-        prices = [base_price - i for i in range(60)] # Trend spadkowy
+        prices = [base_price - i for i in range(rows)] # Trend spadkowy
     else: # CONSOLIDATION
-        prices = [base_price + (i % 5) for i in range(60)] # Konsolidacja
+        prices = [base_price + [1, 0, 2][i % 3] for i in range(rows)] # Konsolidacja (cena i średnie bez zgodnego ułożenia)
 
-    index = pd.to_datetime([datetime(2025, 1, 1) + pd.Timedelta(days=i) for i in range(60)])
+    index = pd.to_datetime([datetime(2025, 1, 1) + pd.Timedelta(days=i) for i in range(rows)])
     return pd.DataFrame({
         'Open': prices, 'High': [p + 2 for p in prices],
-        'Low': [p - 2 for p in prices], 'Close': prices, 'Volume': [1000] * 60
+        'Low': [p - 2 for p in prices], 'Close': prices, 'Volume': [1000] * rows
     }, index=index)
 
 @pytest.mark.asyncio
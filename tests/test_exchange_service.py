@@ -0,0 +1,298 @@
+import asyncio
+import time
+import pytest
+
+from core.exchange_service import ExchangeService
+from core.candle_store import CandleStore
+from core.ohlcv_cache import OHLCVCache, next_candle_close_ms
+from core.markets_cache import MarketsCache
+from core.request_scheduler import RequestPriority, request_priority
+import ccxt.async_support as ccxt
+
+HOUR_MS = 60 * 60 * 1000
+
+class FakeExchange:
+    """Fałszywa giełda zwracająca ciągłą serię świec 1h kończącą się na bieżącej świecy."""
+    id = 'binance'
+
+    def __init__(self, total_candles: int = 600):
+        current_open = (int(time.time() * 1000) // HOUR_MS) * HOUR_MS
+        first_open = current_open - (total_candles - 1) * HOUR_MS
+        self.candles = [[first_open + i * HOUR_MS, 100 + i, 101 + i, 99 + i, 100.5 + i, 10.0] for i in range(total_candles)]
+        self.calls = []
+
+    async def fetch_ohlcv(self, symbol, interval, limit=None, since=None):
+        self.calls.append({'limit': limit, 'since': since})
+        candles = [c for c in self.candles if since is None or c[0] >= since]
+        return candles[:limit] if since is not None else candles[-limit:]
+
+@pytest.mark.asyncio
+async def test_read_through_store_fetches_only_delta(db_manager):
+    """Drugie pobranie tego samego okna powinno dociągnąć z giełdy tylko najnowszą świecę."""
+    # 1. Arrange
+    exchange = FakeExchange()
+    service = ExchangeService(candle_store=CandleStore(db_manager))
+
+    # 2. Act
+    first = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=500)
+    second = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=500)
+
+    # 3. Assert
+    assert len(exchange.calls) == 2
+    assert exchange.calls[0] == {'limit': 500, 'since': None}
+    assert exchange.calls[1]['since'] == exchange.candles[-1][0]
+    assert exchange.calls[1]['limit'] == 1
+    assert len(second) == 500
+    assert second.index.equals(first.index)
+    assert second['Close'].iloc[-1] == exchange.candles[-1][4]
+
+@pytest.mark.asyncio
+async def test_read_through_store_falls_back_to_full_fetch_when_history_is_short(db_manager):
+    """Jeśli magazyn nie pokrywa żądanego okna, pobieramy z giełdy pełne okno."""
+    # 1. Arrange
+    exchange = FakeExchange()
+    service = ExchangeService(candle_store=CandleStore(db_manager))
+    await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=50)
+
+    # 2. Act
+    df = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=200)
+
+    # 3. Assert
+    assert exchange.calls[-1] == {'limit': 200, 'since': None}
+    assert len(df) == 200
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_fetch():
+    """Nakładające się identyczne zapytania powinny skutkować jednym wywołaniem giełdy."""
+    # 1. Arrange
+    exchange = FakeExchange()
+    original_fetch = exchange.fetch_ohlcv
+
+    async def slow_fetch(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await original_fetch(*args, **kwargs)
+    exchange.fetch_ohlcv = slow_fetch
+    service = ExchangeService()
+
+    # 2. Act
+    results = await asyncio.gather(*[service.fetch_ohlcv(exchange, 'TEST/USDT', '1d', limit=100) for _ in range(4)])
+    other = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1d', limit=50)
+
+    # 3. Assert
+    assert len(exchange.calls) == 2
+    assert service.coalesced_requests == 3
+    assert all(df.equals(results[0]) for df in results)
+    assert results[1] is not results[0]
+    assert len(other) == 50
+
+@pytest.mark.asyncio
+async def test_ohlcv_cache_serves_shorter_window_until_candle_close():
+    """Krótsze okno tego samego interwału powinno zostać obsłużone z pamięci, bez wywołania giełdy."""
+    # 1. Arrange
+    exchange = FakeExchange()
+    cache = OHLCVCache()
+    service = ExchangeService(ohlcv_cache=cache)
+    await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=300)
+
+    # 2. Act
+    df = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=100)
+    df['Close'] = 0.0
+    again = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=100)
+
+    # 3. Assert
+    assert len(exchange.calls) == 1
+    assert len(df) == 100
+    assert again['Close'].iloc[-1] == exchange.candles[-1][4]
+    assert cache.stats()['hits'] == 2
+
+@pytest.mark.asyncio
+async def test_ohlcv_cache_refreshes_forming_candle_with_single_candle_fetch():
+    """Po upływie TTL trwającej świecy cache dociąga tylko ją - zamknięte świece zostają z pamięci."""
+    # 1. Arrange
+    exchange = FakeExchange()
+    cache = OHLCVCache(forming_ttl_seconds=0)
+    service = ExchangeService(ohlcv_cache=cache)
+    first = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=300)
+    exchange.candles[-1][4] = 150.0 # Cena na giełdzie zmienia się w trakcie świecy
+
+    # 2. Act
+    df = await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=100)
+
+    # 3. Assert
+    assert exchange.calls[1] == {'limit': 1, 'since': exchange.candles[-1][0]}
+    assert df['Close'].iloc[-1] == 150.0
+    assert df.index.equals(first.index[-100:])
+    assert cache.stats()['forming_refreshes'] == 1
+
+def test_ohlcv_cache_expires_at_candle_close_and_evicts_lru(monkeypatch):
+    """Wpis wygasa na granicy świecy, a po przekroczeniu budżetu usuwany jest najdawniej używany."""
+    # 1. Arrange
+    exchange = FakeExchange(total_candles=10)
+    frame = asyncio.run(ExchangeService()._fetch_ohlcv_from_exchange(exchange, 'TEST/USDT', '1h', 10, None))
+    entry_size = int(frame.memory_usage(index=True).sum())
+    cache = OHLCVCache(max_bytes=entry_size * 2)
+    cache.put('BINANCE', 'A/USDT', '1h', 10, frame)
+    cache.put('BINANCE', 'B/USDT', '1h', 10, frame)
+    cache.get('BINANCE', 'A/USDT', '1h', 10)
+
+    # 2. Act
+    cache.put('BINANCE', 'C/USDT', '1h', 10, frame)
+    b_after_eviction = cache.get('BINANCE', 'B/USDT', '1h', 10)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 3600)
+    a_after_close = cache.get('BINANCE', 'A/USDT', '1h', 10)
+
+    # 3. Assert
+    assert b_after_eviction is None
+    assert a_after_close is None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['expirations'] == 1
+    assert next_candle_close_ms('1w', 0) == 4 * 24 * HOUR_MS
+
+class FakeTickerExchange:
+    """Fałszywa giełda z endpointem zbiorczym lub bez niego."""
+    id = 'binance'
+
+    def __init__(self, has_bulk: bool):
+        self.has = {'fetchTickers': has_bulk}
+        self.bulk_calls = 0
+        self.single_calls = []
+
+    async def fetch_tickers(self, symbols=None):
+        self.bulk_calls += 1
+        await asyncio.sleep(0.01)
+        return {f"C{i}/USDT": {'symbol': f"C{i}/USDT", 'last': float(i)} for i in range(100)}
+
+    async def fetch_ticker(self, symbol):
+        self.single_calls.append(symbol)
+        return {'symbol': symbol, 'last': 1.0}
+
+@pytest.mark.asyncio
+async def test_tickers_snapshot_uses_one_bulk_request_for_many_symbols():
+    """Wiele równoległych odświeżeń dashboardu powinno skończyć się jednym zapytaniem fetch_tickers."""
+    # 1. Arrange
+    exchange = FakeTickerExchange(has_bulk=True)
+    service = ExchangeService()
+    symbols = [f"C{i}/USDT" for i in range(50)] + ['NOTLISTED/USDT']
+
+    # 2. Act
+    snapshots = await asyncio.gather(*[service.fetch_tickers_snapshot(exchange, symbols) for _ in range(3)])
+    cached = await service.fetch_tickers_snapshot(exchange, ['C99/USDT'])
+
+    # 3. Assert
+    assert exchange.bulk_calls == 1
+    assert len(snapshots[0]) == 50
+    assert 'NOTLISTED/USDT' not in snapshots[0]
+    assert cached['C99/USDT']['last'] == 99.0
+
+@pytest.mark.asyncio
+async def test_tickers_snapshot_falls_back_to_single_requests_without_bulk_endpoint():
+    """Giełda bez fetch_tickers powinna zostać obsłużona pojedynczymi zapytaniami, tylko dla brakujących symboli."""
+    # 1. Arrange
+    exchange = FakeTickerExchange(has_bulk=False)
+    service = ExchangeService()
+    await service.fetch_tickers_snapshot(exchange, ['A/USDT', 'B/USDT'])
+
+    # 2. Act
+    snapshot = await service.fetch_tickers_snapshot(exchange, ['A/USDT', 'B/USDT', 'C/USDT'])
+
+    # 3. Assert
+    assert exchange.single_calls == ['A/USDT', 'B/USDT', 'C/USDT']
+    assert set(snapshot) == {'A/USDT', 'B/USDT', 'C/USDT'}
+
+@pytest.mark.asyncio
+async def test_cached_markets_are_injected_without_blocking_on_load_markets(tmp_path, monkeypatch):
+    """Nowa instancja giełdy powinna dostać rynki z dysku; świeży cache nie uruchamia pobierania w tle."""
+    # 1. Arrange
+    source = ccxt.binance()
+    source.set_markets([{'id': 'BTCUSDT', 'symbol': 'BTC/USDT', 'base': 'BTC', 'quote': 'USDT', 'baseId': 'BTC', 'quoteId': 'USDT', 'spot': True, 'type': 'spot', 'active': True}])
+    markets_cache = MarketsCache(cache_dir=str(tmp_path))
+    markets_cache.save('BINANCE', source.markets, source.currencies)
+    await source.close()
+    service = ExchangeService(markets_cache=markets_cache)
+
+    async def fail_load_markets(*args, **kwargs):
+        raise AssertionError("load_markets nie powinno być wywołane")
+    monkeypatch.setattr(ccxt.binance, 'load_markets', fail_load_markets)
+
+    # 2. Act
+    exchanges = await asyncio.gather(*[service.get_exchange_instance('BINANCE') for _ in range(3)])
+
+    # 3. Assert
+    assert exchanges[0] is exchanges[1] is exchanges[2]
+    assert exchanges[0].markets['BTC/USDT']['id'] == 'BTCUSDT'
+    assert service._markets_refresh_tasks == {}
+    await service.close_all_exchanges()
+
+@pytest.mark.asyncio
+async def test_stale_markets_cache_is_refreshed_in_background(tmp_path, monkeypatch):
+    """Przestarzały cache powinien zostać użyty od razu i odświeżony w tle."""
+    # 1. Arrange
+    markets_cache = MarketsCache(cache_dir=str(tmp_path), max_age_seconds=0)
+    markets_cache.save('BINANCE', {}, None)
+    service = ExchangeService(markets_cache=markets_cache)
+    refreshed = asyncio.Event()
+
+    async def fake_load_markets(self, reload=False, params={}):
+        self.set_markets([{'id': 'ETHUSDT', 'symbol': 'ETH/USDT', 'base': 'ETH', 'quote': 'USDT', 'spot': True, 'type': 'spot'}])
+        refreshed.set()
+        return self.markets
+    monkeypatch.setattr(ccxt.binance, 'load_markets', fake_load_markets)
+
+    # 2. Act
+    await service.get_exchange_instance('BINANCE')
+    await asyncio.wait_for(refreshed.wait(), timeout=1)
+    await service._markets_refresh_tasks['BINANCE']
+
+    # 3. Assert
+    assert 'ETH/USDT' in markets_cache.load('BINANCE')[0]
+    await service.close_all_exchanges()
+
+@pytest.mark.asyncio
+async def test_cold_start_waits_for_single_markets_download(tmp_path, monkeypatch):
+    """Bez rynków na dysku wywołujący czekają na jedno pobranie, więc późniejsze load_markets nie idzie drugi raz do sieci."""
+    # 1. Arrange
+    service = ExchangeService(markets_cache=MarketsCache(cache_dir=str(tmp_path)))
+    downloads = []
+
+    async def fake_load_markets(self, reload=False, params={}):
+        if self.markets and not reload: return self.markets
+        downloads.append(reload)
+        await asyncio.sleep(0.01)
+        self.set_markets([{'id': 'ETHUSDT', 'symbol': 'ETH/USDT', 'base': 'ETH', 'quote': 'USDT', 'spot': True, 'type': 'spot'}])
+        return self.markets
+    monkeypatch.setattr(ccxt.binance, 'load_markets', fake_load_markets)
+
+    # 2. Act
+    exchanges = await asyncio.gather(*[service.get_exchange_instance('BINANCE') for _ in range(3)])
+    await exchanges[0].load_markets() # Niejawne wczytanie rynków przy pierwszym fetch_*
+
+    # 3. Assert
+    assert downloads == [True]
+    assert 'ETH/USDT' in exchanges[0].markets
+    await service.close_all_exchanges()
+
+@pytest.mark.asyncio
+async def test_higher_priority_caller_does_not_wait_behind_low_priority_request():
+    """PaperTrader nie dołącza do zapytania wykresu czekającego w kolejce, ale wykres dołącza do zapytania PaperTradera."""
+    # 1. Arrange
+    exchange = FakeExchange()
+    original_fetch = exchange.fetch_ohlcv
+
+    async def slow_fetch(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await original_fetch(*args, **kwargs)
+    exchange.fetch_ohlcv = slow_fetch
+    service = ExchangeService()
+
+    async def fetch_with(priority):
+        with request_priority(priority):
+            return await service.fetch_ohlcv(exchange, 'TEST/USDT', '1h', limit=100)
+
+    # 2. Act
+    await asyncio.gather(fetch_with(RequestPriority.CHART), fetch_with(RequestPriority.PAPER_TRADING), fetch_with(RequestPriority.CHART))
+
+    # 3. Assert
+    assert len(exchange.calls) == 2
+    assert service.coalesced_requests == 1
+    assert service._inflight_requests == {}
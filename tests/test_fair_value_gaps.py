@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from core.fair_value_gaps import FairValueGapRegistry, FairValueGapTracker, find_fair_value_gaps
+
+def loop_gaps(df: pd.DataFrame) -> list:
+    """Pierwotna implementacja (pętla po świecach) jako wzorzec."""
+    gaps = []
+    avg_interval_seconds = df.index.to_series().diff().dt.total_seconds().median()
+    for i in range(1, len(df) - 1):
+        prev_candle, curr_candle, next_candle = df.iloc[i-1], df.iloc[i], df.iloc[i+1]
+        start_time = curr_candle.name.timestamp() - (avg_interval_seconds / 2)
+        if prev_candle['High'] < next_candle['Low']:
+            gaps.append({'type': 'bullish', 'start_price': prev_candle['High'], 'end_price': next_candle['Low'], 'start_time': start_time, 'width_seconds': avg_interval_seconds * 10})
+        elif prev_candle['Low'] > next_candle['High']:
+            gaps.append({'type': 'bearish', 'start_price': next_candle['High'], 'end_price': prev_candle['Low'], 'start_time': start_time, 'width_seconds': avg_interval_seconds * 10})
+    return gaps
+
+def test_find_fair_value_gaps_matches_candle_loop(make_candles):
+    """Wersja wektorowa zwraca te same luki co pętla po świecach (również przy brakujących danych)."""
+    # 1. Arrange
+    df = make_candles(400, '15min', seed=1)
+    df.iloc[[30, 31], df.columns.get_loc('High')] = np.nan
+
+    # 2. Act
+    gaps = find_fair_value_gaps(df)
+
+    # 3. Assert
+    assert gaps == loop_gaps(df)
+    assert gaps and {gap['type'] for gap in gaps} == {'bullish', 'bearish'}
+
+def test_tracker_follows_sliding_window_without_reloading(make_candles):
+    """Przesuwane okno z trwającą świecą daje te same luki co pełne wykrywanie, a historia jest ładowana raz."""
+    # 1. Arrange
+    candles = make_candles(600, '15min', seed=3)
+    tracker = FairValueGapTracker()
+    rng = np.random.default_rng(5)
+
+    for step in range(60):
+        window = candles.iloc[step:step + 500].copy()
+        if step % 2: window.iloc[-1, window.columns.get_loc('High')] += abs(rng.normal(0, 2)) # Trwająca świeca jeszcze się zmienia
+
+        # 2. Act
+        tracker.sync(window)
+        gaps = tracker.gaps()
+
+        # 3. Assert
+        assert [{k: v for k, v in gap.items() if k != 'status'} for gap in gaps] == find_fair_value_gaps(window)
+    assert tracker.loads == 1
+
+def test_tracker_marks_filled_and_partial_gaps():
+    """Powrót ceny w lukę oznacza ją jako 'partial', przejście przez całą lukę jako 'filled'."""
+    # 1. Arrange
+    index = pd.date_range('2024-01-01', periods=6, freq='1h', name='timestamp')
+    df = pd.DataFrame({'High': [10.0, 12.0, 14.0, 15.0, 15.0, 15.0], 'Low': [9.0, 11.0, 13.0, 14.0, 14.0, 14.0]}, index=index)
+    registry = FairValueGapRegistry(max_series=4)
+    key = ('BINANCE', 'BTC/USDT', '1h')
+
+    # 2. Act
+    untouched = registry.gaps(key, df)
+    df.iloc[-1, 1] = 12.0 # Trwająca świeca wchodzi w lukę 10-13
+    partial = registry.gaps(key, df)
+    df.iloc[-1, 1] = 9.5 # ... i przechodzi przez nią całą
+    filled = registry.gaps(key, df)
+
+    # 3. Assert
+    assert [(gap['type'], gap['start_price'], gap['end_price']) for gap in untouched] == [('bullish', 10.0, 13.0), ('bullish', 12.0, 14.0)]
+    assert [gap['status'] for gap in untouched] == ['open', 'open']
+    assert [gap['status'] for gap in partial] == ['partial', 'filled']
+    assert [gap['status'] for gap in filled] == ['filled', 'filled']
+    assert registry.stats()['loads'] == 1
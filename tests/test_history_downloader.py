@@ -0,0 +1,104 @@
+import asyncio
+import time
+import pandas as pd
+import pytest
+
+from core.exchange_service import ExchangeService
+from core.history_downloader import HistoryDownloader
+
+HOUR_MS = 60 * 60 * 1000
+START_MS = 1704067200000 # 2024-01-01 00:00 UTC
+
+class FakeHistoryExchange:
+    """Fałszywa giełda z 5000 świecami 1h; zwraca strony od 'since' i liczy równoległe zapytania."""
+    id = 'binance'
+
+    def __init__(self, total_candles: int = 5000):
+        self.candles = [[START_MS + i * HOUR_MS, 100.0, 101.0, 99.0, 100.5, 10.0] for i in range(total_candles)]
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch_ohlcv(self, symbol, interval, limit=None, since=None):
+        self.calls.append(since)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [c for c in self.candles if c[0] >= since][:limit]
+
+@pytest.mark.asyncio
+async def test_downloader_fetches_pages_concurrently_and_saves_them(db_manager):
+    """Brakująca historia powinna zostać pobrana równoległymi stronami i w całości zapisana w bazie."""
+    # 1. Arrange
+    exchange = FakeHistoryExchange()
+    downloader = HistoryDownloader(ExchangeService(), db_manager, page_size=1000, max_concurrency=3)
+    end_ms = START_MS + 4999 * HOUR_MS
+
+    # 2. Act
+    saved = await downloader.download(exchange, 'TEST/USDT', '1h', START_MS, end_ms)
+
+    # 3. Assert
+    assert saved == 5000
+    assert len(exchange.calls) == 5
+    assert exchange.max_in_flight == 3
+    stored = db_manager.get_ohlcv_timestamps('TEST/USDT', '1h', 'BINANCE', START_MS // 1000, end_ms // 1000)
+    assert len(stored) == 5000
+
+@pytest.mark.asyncio
+async def test_downloader_fetches_only_missing_ranges_after_interruption(db_manager):
+    """Po przerwaniu pobierania ponowne uruchomienie powinno dociągnąć tylko brakujące fragmenty."""
+    # 1. Arrange
+    exchange = FakeHistoryExchange()
+    existing = pd.DataFrame(exchange.candles[:1500] + exchange.candles[2000:], columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+    existing['timestamp'] = pd.to_datetime(existing['timestamp'], unit='ms')
+    db_manager.save_ohlcv(existing.set_index('timestamp'), 'TEST/USDT', '1h')
+    downloader = HistoryDownloader(ExchangeService(), db_manager)
+
+    # 2. Act
+    ranges = downloader.find_missing_ranges('TEST/USDT', '1h', 'BINANCE', START_MS, START_MS + 4999 * HOUR_MS, HOUR_MS)
+    saved = await downloader.download(exchange, 'TEST/USDT', '1h', START_MS, START_MS + 4999 * HOUR_MS)
+
+    # 3. Assert
+    assert ranges == [(START_MS + 1500 * HOUR_MS, START_MS + 1999 * HOUR_MS)]
+    assert exchange.calls == [START_MS + 1500 * HOUR_MS]
+    assert saved == 500
+
+@pytest.mark.asyncio
+async def test_candles_the_exchange_does_not_have_are_not_requested_again(db_manager):
+    """Świece sprzed notowania i z przerwy w notowaniach są zapamiętywane jako puste, więc wznowienie się kończy."""
+    # 1. Arrange
+    exchange = FakeHistoryExchange(total_candles=3000)
+    del exchange.candles[2000:2100] # Przerwa w notowaniach
+    del exchange.candles[:1000] # Symbol notowany od 1000. świecy
+    downloader = HistoryDownloader(ExchangeService(), db_manager, page_size=1000)
+    end_ms = START_MS + 2999 * HOUR_MS
+    await downloader.download(exchange, 'TEST/USDT', '1h', START_MS, end_ms)
+    calls = len(exchange.calls)
+
+    # 2. Act
+    saved = await downloader.download(exchange, 'TEST/USDT', '1h', START_MS, end_ms)
+
+    # 3. Assert
+    assert saved == 0
+    assert len(exchange.calls) == calls
+    assert downloader.missing_candles('TEST/USDT', '1h', 'BINANCE', START_MS, end_ms) == 0
+
+@pytest.mark.asyncio
+async def test_forming_candle_is_not_saved_and_not_counted_as_missing(db_manager):
+    """Trwająca świeca nie trafia do bazy ani nie jest brakiem - zostanie pobrana po zamknięciu."""
+    # 1. Arrange
+    current_open = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    exchange = FakeHistoryExchange(total_candles=0)
+    exchange.candles = [[current_open - i * HOUR_MS, 100.0, 101.0, 99.0, 100.5, 10.0] for i in reversed(range(10))]
+    downloader = HistoryDownloader(ExchangeService(), db_manager)
+    start_ms = exchange.candles[0][0]
+
+    # 2. Act
+    saved = await downloader.download(exchange, 'TEST/USDT', '1h', start_ms, current_open + HOUR_MS)
+
+    # 3. Assert
+    assert saved == 9
+    stored = db_manager.get_ohlcv_timestamps('TEST/USDT', '1h', 'BINANCE', start_ms // 1000, current_open // 1000)
+    assert current_open // 1000 not in stored
+    assert downloader.missing_candles('TEST/USDT', '1h', 'BINANCE', start_ms, current_open + HOUR_MS) == 0
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.incremental_indicators import IncrementalIndicatorEngine
+
+def reference_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """Pełne przeliczenie według definicji pandas_ta (domyślne parametry), używane jako wzorzec."""
+    def ema(series: pd.Series, length: int) -> pd.Series:
+        seeded = series.copy()
+        seeded.iloc[:length - 1] = np.nan
+        seeded.iloc[length - 1] = series.iloc[:length].mean()
+        return seeded.ewm(span=length, adjust=False).mean()
+    def rma(series: pd.Series, length: int) -> pd.Series:
+        return series.ewm(alpha=1 / length, min_periods=length).mean()
+
+    close, prev_close = df['Close'], df['Close'].shift(1)
+    true_range = pd.concat([df['High'] - df['Low'], df['High'] - prev_close, prev_close - df['Low']], axis=1).abs().max(axis=1)
+    true_range.iloc[0] = np.nan
+    change = close.diff()
+    up, down = rma(change.clip(lower=0), 14), rma(change.clip(upper=0), 14)
+    macd = ema(close, 12) - ema(close, 26)
+    signal = ema(macd.loc[macd.first_valid_index():], 9)
+    mid, std = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    sign = np.sign(change).fillna(1.0)
+    typical_volume = (df['High'] + df['Low'] + close) / 3 * df['Volume']
+    day = df.index.to_period('D')
+    return pd.DataFrame({
+        'ATRR_14': rma(true_range, 14), 'OBV': (sign * df['Volume']).cumsum(), 'RSI_14': 100 * up / (up + down.abs()),
+        'EMA_50': ema(close, 50), 'EMA_200': ema(close, 200),
+        'MACD_12_26_9': macd, 'MACDH_12_26_9': macd - signal, 'MACDS_12_26_9': signal,
+        'BBL_20_2.0': mid - 2 * std, 'BBM_20_2.0': mid, 'BBU_20_2.0': mid + 2 * std,
+        'BBB_20_2.0': 100 * 4 * std / mid, 'BBP_20_2.0': (close - (mid - 2 * std)) / (4 * std),
+        'VWAP_D': typical_volume.groupby(day).cumsum() / df['Volume'].groupby(day).cumsum(),
+    }, index=df.index)
+
+def test_engine_matches_full_recalculation(make_candles):
+    """Przyrostowo liczone wskaźniki powinny pokrywać się z pełnym przeliczeniem ramki."""
+    # 1. Arrange
+    df = make_candles()
+    engine = IncrementalIndicatorEngine()
+
+    # 2. Act
+    result = engine.load(df)
+
+    # 3. Assert
+    expected = reference_indicators(df)
+    assert list(result.columns) == ['Open', 'High', 'Low', 'Close', 'Volume', *expected.columns]
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_freq=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(result[['Open', 'High', 'Low', 'Close', 'Volume']], df, check_freq=False)
+
+def test_updating_last_candle_replaces_it_without_drift(make_candles):
+    """Kolejne aktualizacje bieżącej świecy nadpisują ją - wynik jak przy wczytaniu ostatecznej wersji."""
+    # 1. Arrange
+    df = make_candles(300)
+    engine = IncrementalIndicatorEngine()
+    engine.load(df.iloc[:-1])
+    last_ts = int(df.index[-1].value // 1_000_000)
+    final = df.iloc[-1]
+
+    # 2. Act
+    for close in (final['Close'] * 1.02, final['Close'] * 0.97, final['Close']):
+        engine.update([last_ts, final['Open'], final['High'], final['Low'], close, final['Volume']])
+    stale = engine.update([last_ts - 3_600_000, 1, 1, 1, 1, 1])
+
+    # 3. Assert
+    assert stale is None
+    pd.testing.assert_frame_equal(engine.to_frame(), IncrementalIndicatorEngine().load(df), check_freq=False)
+
+def test_engine_matches_pandas_ta_calculate_all(make_candles):
+    """Kolumny silnika mają te same nazwy i wartości co IndicatorService.calculate_all (pandas_ta)."""
+    pytest.importorskip("pandas_ta")
+    from core.indicator_service import IndicatorService
+    from core.settings_manager import SettingsManager
+
+    # 1. Arrange
+    df = make_candles()
+    service = IndicatorService(SettingsManager(), analyzer=None)
+
+    # 2. Act
+    expected = service.calculate_all(df)
+    result = service.create_incremental_engine(df).to_frame()
+
+    # 3. Assert
+    assert set(result.columns) <= set(expected.columns)
+    pd.testing.assert_frame_equal(result, expected[result.columns], check_freq=False, rtol=1e-6)
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from core.indicator_cache import IndicatorCache, frame_fingerprint
+
+def test_fingerprint_changes_with_last_candle_and_params(make_candles):
+    """Odcisk zmienia się przy aktualizacji ostatniej świecy i zmianie parametrów, a nie przy kopii ramki."""
+    # 1. Arrange
+    df = make_candles(250, trend=lambda i: 100 + i / 10)
+    updated = df.copy()
+    updated.iloc[-1, updated.columns.get_loc('Close')] += 0.5
+
+    # 2. Act
+    base = frame_fingerprint(df, {'rsi_length': 14})
+
+    # 3. Assert
+    assert frame_fingerprint(df.copy(), {'rsi_length': 14}) == base
+    assert frame_fingerprint(updated, {'rsi_length': 14}) != base
+    assert frame_fingerprint(df, {'rsi_length': 21}) != base
+    assert frame_fingerprint(df.iloc[1:], {'rsi_length': 14}) != base
+
+def test_cache_returns_copies_and_evicts_least_recently_used(make_candles):
+    """Cache zwraca kopie wyników, liczy trafienia i usuwa najdawniej używane wpisy."""
+    # 1. Arrange
+    cache = IndicatorCache(max_entries=2)
+    df = make_candles(250, trend=lambda i: 100 + i / 10)
+
+    # 2. Act
+    cache.put(('a',), df)
+    cache.put(('b',), df)
+    first = cache.get(('a',))
+    first['Close'] = 0.0
+    cache.put(('c',), df) # Wypiera 'b' - 'a' było używane później
+
+    # 3. Assert
+    assert cache.get(('a',))['Close'].iloc[-1] == df['Close'].iloc[-1]
+    assert cache.get(('b',)) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (2, 1, 1, 2)
+
+def test_calculate_all_serves_repeated_calls_from_cache(make_candles):
+    """Powtórne obliczenie wskaźników na niezmienionych danych nie liczy ich ponownie."""
+    pytest.importorskip("pandas_ta")
+    from core.indicator_service import IndicatorService
+    from core.settings_manager import SettingsManager
+
+    # 1. Arrange
+    service = IndicatorService(SettingsManager(), analyzer=None)
+    df = make_candles(250, trend=lambda i: 100 + i / 10)
+
+    # 2. Act
+    first = service.calculate_all(df.copy())
+    second = service.calculate_all(df.copy())
+
+    # 3. Assert
+    pd.testing.assert_frame_equal(first, second)
+    assert service.get_cache_stats()['hits'] == 1
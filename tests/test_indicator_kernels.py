@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from core.incremental_indicators import IncrementalIndicatorEngine
+from core.indicator_service import IndicatorService
+from core.settings_manager import SettingsManager
+
+def numpy_service() -> IndicatorService:
+    settings = SettingsManager()
+    settings.set('analysis.indicator_backend', 'numpy')
+    return IndicatorService(settings, analyzer=None)
+
+def test_numpy_backend_matches_incremental_engine(make_candles):
+    """Silnik NumPy i silnik przyrostowy liczą te same kolumny o tych samych wartościach."""
+    # 1. Arrange
+    df = make_candles(600, seed=11)
+    service = numpy_service()
+
+    # 2. Act
+    result = service.calculate_all(df)
+
+    # 3. Assert
+    expected = IncrementalIndicatorEngine(service.settings.get('analysis.indicator_params', {})).load(df)
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False, rtol=1e-9)
+
+def test_numpy_backend_skips_vwap_without_datetime_index(make_candles):
+    """Bez indeksu datetime nie ma granic sesji - VWAP jest pomijany, reszta wskaźników liczona normalnie."""
+    # 1. Arrange
+    df = make_candles(100, seed=11).reset_index(drop=True)
+
+    # 2. Act
+    result = numpy_service().calculate_all(df)
+
+    # 3. Assert
+    assert 'VWAP_D' not in result.columns
+    assert result['RSI_14'].notna().sum() == 100 - 14
+    assert result['EMA_50'].notna().sum() == 100 - 49
+
+def test_numpy_backend_matches_pandas_ta(make_candles):
+    """Równoważność numeryczna z pandas_ta dla wszystkich kolumn calculate_all."""
+    pytest.importorskip("pandas_ta")
+
+    # 1. Arrange
+    df = make_candles(600, seed=11)
+    reference_service = IndicatorService(SettingsManager(), analyzer=None)
+    reference_service.settings.set('analysis.indicator_backend', 'pandas_ta')
+
+    # 2. Act
+    expected = reference_service.calculate_all(df)
+    result = numpy_service().calculate_all(df)
+
+    # 3. Assert
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False, rtol=1e-6)
+
+def test_calculate_batch_matches_per_symbol_results(make_candles):
+    """Wsadowe liczenie dla wielu symboli daje te same kolumny co calculate_all dla każdego z osobna."""
+    # 1. Arrange
+    service = numpy_service()
+    frames = {f"COIN{i}/USDT": make_candles(300, seed=i) for i in range(5)}
+    frames["SHORT/USDT"] = make_candles(120, seed=99) # Inna oś czasu - liczona osobno
+    frames["EMPTY/USDT"] = pd.DataFrame()
+
+    # 2. Act
+    results = service.calculate_batch(frames)
+
+    # 3. Assert
+    assert results["EMPTY/USDT"].empty
+    reference_service = numpy_service() # Osobny cache - calculate_all nie może oddać wyniku wsadowego
+    for symbol, df in frames.items():
+        if df.empty: continue
+        pd.testing.assert_frame_equal(results[symbol], reference_service.calculate_all(df), check_freq=False, rtol=1e-12)
+
+def test_calculate_batch_shares_cache_with_calculate_all(make_candles):
+    """Wyniki wsadowe trafiają do cache'a calculate_all, a ponowny wsad bierze z niego gotowe ramki."""
+    # 1. Arrange
+    service = numpy_service()
+    frames = {f"COIN{i}/USDT": make_candles(200, seed=i) for i in range(3)}
+    service.calculate_batch(frames)
+    hits = service.cache.hits
+
+    # 2. Act
+    single = service.calculate_all(frames["COIN0/USDT"])
+    repeated = service.calculate_batch(frames)
+
+    # 3. Assert
+    assert service.cache.hits == hits + 1 + len(frames)
+    pd.testing.assert_frame_equal(single, repeated["COIN0/USDT"])
+
+def test_calculate_batch_follows_pandas_ta_backend(monkeypatch, make_candles):
+    """Przy silniku pandas_ta wsad liczy każdą ramkę przez calculate_all, więc wynik nie zależy od ścieżki."""
+    # 1. Arrange
+    service = IndicatorService(SettingsManager(), analyzer=None)
+    monkeypatch.setattr(service, 'get_backend', lambda: 'pandas_ta')
+    calls = []
+    monkeypatch.setattr(service, 'calculate_all', lambda df, indicators=None: calls.append(len(df)) or df)
+    frames = {f"COIN{i}/USDT": make_candles(150, seed=i) for i in range(2)}
+
+    # 2. Act
+    results = service.calculate_batch(frames)
+
+    # 3. Assert
+    assert calls == [150, 150]
+    assert results["COIN1/USDT"] is frames["COIN1/USDT"]
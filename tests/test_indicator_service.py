@@ -35,4 +35,68 @@ def test_calculate_all_adds_indicator_columns():
     assert 'MACD_12_26_9' in result_df.columns
     
     # Sprawdzamy, czy wskaźniki faktycznie zostały obliczone (nie są puste)
-    assert not result_df['RSI_14'].isnull().all()
\ No newline at end of file
+    assert not result_df['RSI_14'].isnull().all()
+
+def test_calculate_all_computes_only_requested_indicators(make_candles):
+    """Żądanie pojedynczej kolumny liczy tylko jej wskaźnik - sygnał MACD pociąga za sobą linię i histogram."""
+    # 1. Arrange
+    indicator_service = IndicatorService(settings_manager=SettingsManager(), analyzer=None)
+    df = make_candles(250, seed=3)
+
+    # 2. Act
+    result = indicator_service.calculate_all(df, indicators=['MACDS_12_26_9', 'RSI_14', 'NIEZNANA_KOLUMNA'])
+
+    # 3. Assert
+    added = [col for col in result.columns if col not in df.columns]
+    assert added == ['RSI_14', 'MACD_12_26_9', 'MACDH_12_26_9', 'MACDS_12_26_9']
+    assert result['MACDS_12_26_9'].notna().any()
+
+def test_selective_request_is_served_from_full_cached_result(make_candles):
+    """Gdy pełny zestaw wskaźników jest już w cache'u, zawężone żądanie nie liczy niczego ponownie."""
+    # 1. Arrange
+    indicator_service = IndicatorService(settings_manager=SettingsManager(), analyzer=None)
+    df = make_candles(250, seed=3)
+    full = indicator_service.calculate_all(df)
+
+    # 2. Act
+    partial = indicator_service.calculate_all(df, indicators=['ema_fast'])
+
+    # 3. Assert
+    pd.testing.assert_series_equal(partial['EMA_50'], full['EMA_50'])
+    assert indicator_service.get_cache_stats()['hits'] == 1
+    assert indicator_service.get_cache_stats()['misses'] == 1
+
+def test_interpret_many_evaluates_rules_for_each_frame():
+    """Reguły interpretacji są oceniane dla wszystkich ramek naraz; brakujące kolumny pomijają tylko swoje reguły."""
+    # 1. Arrange
+    indicator_service = IndicatorService(settings_manager=SettingsManager(), analyzer=None)
+    bullish = pd.DataFrame({
+        'High': [101.0, 106.0], 'Low': [97.0, 99.0], 'Close': [99.0, 94.0],
+        'EMA_50': [96.0, 93.0], 'EMA_200': [95.0, 96.0], 'RSI_14': [35.0, 25.5],
+        'MACD_12_26_9': [-1.0, 0.5], 'MACDS_12_26_9': [0.0, 0.2],
+        'BBU_20_2.0': [110.0, 110.0], 'BBL_20_2.0': [95.0, 95.0], 'OBV': [500.0, 400.0], 'VWAP_D': [98.0, 97.0],
+    })
+    bearish = bullish.assign(Close=[99.0, 112.0], EMA_50=[100.0, 105.0], EMA_200=[95.0, 100.0], RSI_14=[60.0, 75.0],
+                             MACD_12_26_9=[1.0, -0.5], OBV=[400.0, 500.0])
+    frames = {'bullish': bullish, 'bearish': bearish, 'ohlc_only': bullish[['High', 'Low', 'Close']], 'one_row': bullish.iloc[-1:]}
+
+    # 2. Act
+    results = indicator_service.interpret_many(frames)
+
+    # 3. Assert
+    assert results['bullish'] == {
+        'EMA_Trend': {'text': "Konsolidacja lub korekta", 'sentiment': 'neutral'},
+        'RSI': {'text': "Wyprzedanie (25.50)", 'sentiment': 'bullish'},
+        'MACD': {'text': "Bycze przecięcie", 'sentiment': 'bullish'},
+        'Bollinger_Bands': {'text': "Przebicie dolnej wstęgi", 'sentiment': 'bullish'},
+        'Volume_Trend_OBV': {'text': "Trend bearish", 'sentiment': 'bearish'},
+        'VWAP_Position': {'text': "Cena poniżej VWAP", 'sentiment': 'bearish'},
+        'Pivots': {'text': str({'PP': 99.0, 'S1': 97.0, 'R1': 101.0, 'S2': 95.0, 'R2': 103.0}), 'sentiment': 'neutral'},
+    }
+    assert results['bearish']['EMA_Trend'] == {'text': "Silny trend wzrostowy", 'sentiment': 'bullish'}
+    assert results['bearish']['RSI'] == {'text': "Wykupienie (75.00)", 'sentiment': 'bearish'}
+    assert results['bearish']['MACD'] == {'text': "Niedźwiedzie przecięcie", 'sentiment': 'bearish'}
+    assert results['bearish']['Bollinger_Bands'] == {'text': "Przebicie górnej wstęgi", 'sentiment': 'bearish'}
+    assert list(results['ohlc_only']) == ['Pivots']
+    assert results['one_row'] == {}
+    assert indicator_service.interpret_all(bearish) == results['bearish']
@@ -0,0 +1,91 @@
+import asyncio
+import time
+import pandas as pd
+import pytest
+
+from core.market_stream import CandleBuffer, MarketStream, ReplayFeed
+from core.replay_server import ReplayServer
+
+def make_recording(candles: int = 5) -> pd.DataFrame:
+    index = pd.date_range('2024-01-01', periods=candles, freq='1h')
+    return pd.DataFrame({
+        'Open': [100.0 + i for i in range(candles)], 'High': [102.0 + i for i in range(candles)],
+        'Low': [99.0 + i for i in range(candles)], 'Close': [101.0 + i for i in range(candles)],
+        'Volume': [10.0] * candles
+    }, index=index)
+
+def test_candle_buffer_updates_current_candle_and_reports_closed_one():
+    """Aktualizacja tej samej świecy nadpisuje ostatni wiersz, a nowa świeca zamyka poprzednią."""
+    # 1. Arrange
+    buffer = CandleBuffer(maxlen=3)
+
+    # 2. Act
+    first = buffer.update([1000, 1, 2, 0.5, 1.5, 10])
+    same = buffer.update([1000, 1, 3, 0.5, 2.5, 20])
+    closed = buffer.update([2000, 2.5, 3, 2, 2.8, 5])
+    late = buffer.update([1000, 9, 9, 9, 9, 9])
+
+    # 3. Assert
+    assert first is None and same is None and late is None
+    assert closed == [1000, 1.0, 3.0, 0.5, 2.5, 20.0]
+    assert list(buffer.to_frame()['Close']) == [2.5, 2.8]
+
+@pytest.mark.asyncio
+async def test_stream_replays_recorded_candles_from_local_server():
+    """Subskrybent powinien dostać wszystkie świece z nagrania, a bufor odtworzyć je bez odpytywania."""
+    # 1. Arrange
+    recording = make_recording()
+    server = ReplayServer({('TEST/USDT', '1h'): recording}, port=0, message_interval=0, align_to_now=False)
+    await server.start()
+    stream = MarketStream(feed_factory=lambda exchange_id: ReplayFeed(server.url))
+    closed_candles, tickers = [], []
+    finished = asyncio.Event()
+
+    def on_kline(event):
+        if event.closed_candle is not None: closed_candles.append(event.closed_candle)
+        if len(event.buffer.candles) == len(recording) and event.data[4] == recording['Close'].iloc[-1]: finished.set()
+
+    # 2. Act
+    stream.subscribe_klines('BINANCE', 'TEST/USDT', '1h', on_kline)
+    stream.subscribe_ticker('BINANCE', 'TEST/USDT', tickers.append)
+    await asyncio.wait_for(finished.wait(), timeout=5)
+    frame = stream.get_buffer('BINANCE', 'TEST/USDT', '1h').to_frame()
+    await stream.close()
+    await server.stop()
+
+    # 3. Assert
+    assert len(closed_candles) == len(recording) - 1
+    assert [c[4] for c in closed_candles] == list(recording['Close'].iloc[:-1])
+    pd.testing.assert_frame_equal(frame, recording, check_freq=False, check_names=False)
+    assert tickers and tickers[-1].data['symbol'] == 'TEST/USDT'
+
+@pytest.mark.asyncio
+async def test_replayed_candles_continue_buffer_seeded_with_live_history():
+    """Nagranie jest przesunięte do bieżącej świecy, więc bufor zasiany historią z REST przyjmuje odtwarzane świece."""
+    # 1. Arrange
+    recording = make_recording()
+    current_open = pd.Timestamp(int(time.time()) // 3600 * 3600, unit='s')
+    live_history = make_recording(3)
+    live_history.index = pd.date_range(end=current_open, periods=3, freq='1h')
+    server = ReplayServer({('TEST/USDT', '1h'): recording}, port=0, message_interval=0)
+    await server.start()
+    stream = MarketStream(feed_factory=lambda exchange_id: ReplayFeed(server.url))
+    closed_candles = []
+    finished = asyncio.Event()
+
+    def on_kline(event):
+        if event.closed_candle is not None: closed_candles.append(event.closed_candle)
+        if len(event.buffer.candles) == 2 + len(recording) and event.data[4] == recording['Close'].iloc[-1]: finished.set()
+
+    # 2. Act
+    stream.subscribe_klines('BINANCE', 'TEST/USDT', '1h', on_kline, seed=live_history)
+    await asyncio.wait_for(finished.wait(), timeout=5)
+    frame = stream.get_buffer('BINANCE', 'TEST/USDT', '1h').to_frame()
+    await stream.close()
+    await server.stop()
+
+    # 3. Assert
+    assert len(closed_candles) == len(recording) - 1
+    assert frame.index[2] == current_open
+    assert len(frame) == 2 + len(recording)
+    assert list(frame['Close'].iloc[2:]) == list(recording['Close'])
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from core.ohlcv_frame import ohlcv_to_frame
+
+def legacy_to_frame(raw):
+    df = pd.DataFrame(raw, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df = df.set_index('timestamp').sort_index()
+    return df[~df.index.duplicated(keep='last')]
+
+def test_ohlcv_to_frame_matches_legacy_conversion_for_sorted_input():
+    """Dla posortowanych danych wynik powinien być identyczny z dotychczasową konwersją przez pandas."""
+    # 1. Arrange
+    raw = [[1704067200000 + i * 3600000, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0] for i in range(50)]
+
+    # 2. Act
+    df = ohlcv_to_frame(raw)
+
+    # 3. Assert
+    pd.testing.assert_frame_equal(df, legacy_to_frame(raw))
+    assert df['Close'].values.flags['C_CONTIGUOUS']
+
+def test_ohlcv_to_frame_sorts_and_keeps_last_duplicate():
+    """Nieposortowane dane z duplikatami powinny zostać uporządkowane, a duplikat zastąpiony ostatnią wersją."""
+    # 1. Arrange
+    raw = [[3000, 3, 3, 3, 3, 3], [1000, 1, 1, 1, 1, 1], [2000, 2, 2, 2, 2, 2], [1000, 9, 9, 9, 9, None]]
+
+    # 2. Act
+    df = ohlcv_to_frame(raw)
+    df32 = ohlcv_to_frame(raw, dtype=np.float32)
+
+    # 3. Assert
+    assert list(df.index.astype('int64') // 10**6) == [1000, 2000, 3000]
+    assert df['Close'].iloc[0] == 9.0
+    assert np.isnan(df['Volume'].iloc[0])
+    assert (df32.dtypes == np.float32).all()
+    assert ohlcv_to_frame([]) is None
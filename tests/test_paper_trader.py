@@ -5,11 +5,13 @@ import pytest
 import time
 import asyncio
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 
 from core.paper_trader import PaperTrader
 from core.analyzer import TechnicalAnalyzer
 from core.settings_manager import SettingsManager
 from core.database_manager import DatabaseManager # Upewnij się, że ten import jest
+from core.market_stream import CandleBuffer, StreamEvent
 
 @pytest.mark.asyncio
 async def test_pending_trade_is_invalidated_when_sl_hits_first(db_manager, monkeypatch):
@@ -134,4 +136,50 @@ async def test_partially_closed_trade_is_marked_as_break_even(db_manager, monkey
     
     final_trade_state = db_manager.get_trade_by_id(trade_id)
     assert final_trade_state is not None
-    assert final_trade_state['result'] == 'BREAK_EVEN'
\ No newline at end of file
+    assert final_trade_state['result'] == 'BREAK_EVEN'
+
+class CountingTradesDb:
+    """Fałszywa baza z jedną otwartą transakcją, licząca zapytania o otwarte transakcje."""
+
+    def __init__(self):
+        self.open_trades_queries = 0
+        self.trade = {"id": 1, "timestamp": 0, "symbol": "TEST/USDT", "interval": "1h", "exchange": "BINANCE", "status": "ACTIVE",
+                      "type": "Long", "entry_price": 100.0, "stop_loss": 90.0, "take_profit": 120.0, "take_profit_1": None}
+
+    def get_open_trades(self):
+        self.open_trades_queries += 1
+        return [dict(self.trade)] if self.trade['status'] in ('POTENTIAL', 'ACTIVE', 'PARTIAL_PROFIT') else []
+
+    def get_trade_by_id(self, trade_id):
+        return dict(self.trade)
+
+    def update_trade_status(self, trade_id, status):
+        self.trade['status'] = status
+
+def test_stream_events_use_in_memory_open_trades_and_respect_analysis_lock():
+    """Zdarzenia strumienia nie odpytują bazy, dopóki transakcje się nie zmienią, i czekają na zwolnienie blokady analizy."""
+    # 1. Arrange
+    db = CountingTradesDb()
+    lock = asyncio.Lock()
+    paper_trader = PaperTrader(db, SimpleNamespace(settings=SettingsManager()), lock)
+    buffer = CandleBuffer()
+
+    def kline(ts_hours, low):
+        candle = [ts_hours * 3_600_000, 100.0, 105.0, low, 101.0, 1.0]
+        return StreamEvent('kline', 'BINANCE', 'TEST/USDT', candle, interval='1h', closed_candle=buffer.update(candle), buffer=buffer)
+
+    # 2. Act
+    for hour in range(1, 4): paper_trader._on_stream_kline(kline(hour, 95.0))
+    queries_before_close = db.open_trades_queries
+    asyncio.run(lock.acquire())
+    paper_trader._on_stream_kline(kline(4, 85.0))
+    status_while_locked = db.trade['status']
+    lock.release()
+    paper_trader._on_stream_kline(kline(5, 95.0))
+    paper_trader._on_stream_kline(kline(6, 95.0))
+
+    # 3. Assert
+    assert queries_before_close == 1
+    assert status_while_locked == 'ACTIVE'
+    assert db.trade['status'] == 'CLOSED_SL'
+    assert db.open_trades_queries == 2 # Ponowne wczytanie dopiero po zamknięciu transakcji
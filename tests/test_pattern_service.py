@@ -1,6 +1,9 @@
+import asyncio
 import pytest
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from scipy.signal import find_peaks
 
 from core.pattern_service import PatternService
 from core.settings_manager import SettingsManager
@@ -50,3 +53,169 @@ def test_find_programmatic_sr_levels(pattern_service):
     # Sprawdzamy, czy poziomy są poprawnie posortowane
     assert result['support'] == sorted(result['support'], reverse=True)
     assert result['resistance'] == sorted(result['resistance'])
+
+def reference_divergence(price_series: pd.Series, indicator_series: pd.Series, lookback: int = 60, dist: int = 5):
+    """Pierwotna implementacja find_divergence (cztery wywołania find_peaks na parę) - wzorzec dla wersji wsadowej."""
+    if price_series.isna().all() or indicator_series.isna().all() or len(price_series) < lookback: return None
+    price, indicator = price_series.tail(lookback).dropna(), indicator_series.tail(lookback).dropna()
+    if price.empty or indicator.empty: return None
+    price_peaks, _ = find_peaks(price, distance=dist)
+    indicator_peaks, _ = find_peaks(indicator, distance=dist)
+    if len(price_peaks) >= 2 and len(indicator_peaks) >= 2:
+        if price.iloc[price_peaks[-1]] > price.iloc[price_peaks[-2]] and indicator.iloc[indicator_peaks[-1]] < indicator.iloc[indicator_peaks[-2]]:
+            return "Niedźwiedzia (wyższy szczyt ceny, niższy szczyt wskaźnika)"
+    price_troughs, _ = find_peaks(-price, distance=dist)
+    indicator_troughs, _ = find_peaks(-indicator, distance=dist)
+    if len(price_troughs) >= 2 and len(indicator_troughs) >= 2:
+        if price.iloc[price_troughs[-1]] < price.iloc[price_troughs[-2]] and indicator.iloc[indicator_troughs[-1]] > indicator.iloc[indicator_troughs[-2]]:
+            return "Bycza (niższy dołek ceny, wyższy dołek wskaźnika)"
+    return None
+
+def test_find_divergences_matches_single_pair_calls(pattern_service):
+    """Wsadowe wyszukiwanie dywergencji daje te same wyniki co pierwotne wyszukiwanie dla każdej pary z osobna."""
+    # 1. Arrange
+    x = np.arange(60)
+    # Cena robi wyższy szczyt, wskaźnik niższy -> dywergencja niedźwiedzia
+    bearish = (pd.Series(np.sin(x / 3) + x / 30), pd.Series(np.sin(x / 3) - x / 30))
+    # Cena robi niższy dołek, wskaźnik wyższy -> dywergencja bycza
+    bullish = (pd.Series(np.sin(x / 3) - x / 30), pd.Series(np.sin(x / 3) + x / 30))
+    rng = np.random.default_rng(5)
+    noisy = [(pd.Series(rng.normal(size=80).cumsum()), pd.Series(rng.normal(size=80).cumsum())) for _ in range(30)]
+    too_short = (pd.Series(np.sin(x[:20])), pd.Series(np.cos(x[:20])))
+    pairs = [bearish, bullish, too_short] + noisy
+
+    # 2. Act
+    results = pattern_service.find_divergences(pairs)
+
+    # 3. Assert
+    assert results[0].startswith("Niedźwiedzia")
+    assert results[1].startswith("Bycza")
+    assert results[2] is None
+    assert results == [reference_divergence(price, indicator) for price, indicator in pairs]
+    assert pattern_service.find_divergence(*bearish) == results[0]
+
+def test_find_swing_points_matches_find_peaks(pattern_service):
+    """Szczyty i dołki z indeksu punktów zwrotnych są takie same jak z find_peaks na pełnej ramce."""
+    # 1. Arrange
+    rng = np.random.default_rng(12)
+    close = 100 + np.cumsum(rng.normal(0, 1, 400))
+    index = pd.date_range('2025-01-01', periods=400, freq='1h')
+    df = pd.DataFrame({'High': close + 0.5, 'Low': close - 0.5, 'Close': close}, index=index)
+
+    for window in (df.iloc[:300], df.iloc[50:350], df.iloc[100:]):
+        # 2. Act
+        highs, lows = pattern_service.find_swing_points(window, 'BINANCE', 'BTC/USDT', distance=10, prominence_multiplier=0.5)
+
+        # 3. Assert
+        prominence = window['High'].std() * 0.5
+        np.testing.assert_array_equal(highs, find_peaks(window['High'], distance=10, prominence=prominence)[0])
+        np.testing.assert_array_equal(lows, find_peaks(-window['Low'], distance=10, prominence=prominence)[0])
+
+def test_unindexed_swing_points_skip_registry(pattern_service):
+    """Wycinki historii liczone bez indeksu dają te same szczyty i nie zajmują rejestru."""
+    # 1. Arrange
+    rng = np.random.default_rng(14)
+    close = 100 + np.cumsum(rng.normal(0, 1, 300))
+    df = pd.DataFrame({'High': close + 0.5, 'Low': close - 0.5, 'Close': close}, index=pd.date_range('2025-01-01', periods=300, freq='1h'))
+
+    for i in (150, 151, 299):
+        # 2. Act
+        highs, lows = pattern_service.find_swing_points(df.iloc[:i + 1], 'BINANCE', 'BTC/USDT', 10, 0.5, indexed=False)
+
+        # 3. Assert
+        expected_highs, expected_lows = pattern_service.find_swing_points(df.iloc[:i + 1], 'BINANCE', 'BTC/USDT', 10, 0.5)
+        np.testing.assert_array_equal(highs, expected_highs)
+        np.testing.assert_array_equal(lows, expected_lows)
+    assert pattern_service.swing_indexes.stats()['series'] == 6 # Tylko wywołania z indeksem (po dwa na wycinek)
+
+def test_scan_setups_runs_registered_detectors_on_shared_context(pattern_service):
+    """Dodatkowy detektor dostaje ten sam kontekst co wbudowane, a wskaźniki są liczone raz na skan."""
+    # 1. Arrange
+    rng = np.random.default_rng(3)
+    close = 100 + np.cumsum(rng.normal(0, 1, 200))
+    index = pd.date_range('2025-01-01', periods=200, freq='1h')
+    df = pd.DataFrame({'Open': close, 'High': close + 0.5, 'Low': close - 0.5, 'Close': close, 'Volume': np.full(200, 10.0)}, index=index)
+    contexts = []
+
+    def detector(ctx):
+        contexts.append(ctx)
+        width = ctx.indicator(ctx.keys.bbands_bandwidth())
+        return [{'type': 'Test', 'interval': ctx.interval, 'details': f"{width[-1]:.2f}"}]
+
+    pattern_service.register_setup_detector(detector)
+
+    # 2. Act
+    setups = pattern_service.scan_setups(df, 'BTC/USDT', 'BINANCE', '1h')
+
+    # 3. Assert
+    assert setups[-1]['type'] == 'Test' and setups[-1]['interval'] == '1h'
+    assert len(contexts) == 1 and contexts[0].df is df
+    assert len(contexts[0]._indicators) == 1 # Squeeze korzysta ze stanu przyrostowego, wstęgi policzył tylko nowy detektor
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def test_scan_setups_does_not_modify_frame_and_shares_read_only_arrays(pattern_service):
+    """Detektory dostają tablice tylko do odczytu, a skan nie dopisuje kolumn do ramki."""
+    # 1. Arrange
+    rng = np.random.default_rng(2)
+    close = 100 + np.cumsum(rng.normal(0, 1, 200))
+    df = pd.DataFrame({'High': close + 0.5, 'Low': close - 0.5, 'Close': close, 'Volume': np.full(200, 10.0)},
+                      index=pd.date_range('2025-01-01', periods=200, freq='1h'))
+    contexts = []
+    pattern_service.register_setup_detector(lambda ctx: contexts.append(ctx) or [])
+
+    # 2. Act
+    pattern_service.scan_setups(df, 'BTC/USDT', 'BINANCE', '1h')
+
+    # 3. Assert
+    with pytest.raises(ValueError):
+        contexts[0].close[-1] = 0.0
+    assert df['Close'].iloc[-1] == close[-1]
+    assert list(df.columns) == ['High', 'Low', 'Close', 'Volume']
+    assert pattern_service.squeeze_trackers.stats()['series'] == 1
+
+def test_daily_sr_levels_are_fetched_once_per_day(pattern_service, monkeypatch):
+    """Drugie wyznaczenie poziomów S/R tego samego dnia nie pobiera historii 1D z giełdy."""
+    # 1. Arrange
+    rng = np.random.default_rng(21)
+    close = 100 + np.cumsum(rng.normal(0, 2, 300))
+    index = pd.date_range('2024-01-01', periods=300, freq='1D')
+    daily = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1.0}, index=index)
+    fetched = []
+
+    async def get_exchange_instance(exchange_id):
+        return object()
+
+    async def fetch_ohlcv(exchange, symbol, interval, limit=None):
+        fetched.append(interval)
+        return daily
+
+    monkeypatch.setattr(pattern_service.exchange_service, 'get_exchange_instance', get_exchange_instance)
+    monkeypatch.setattr(pattern_service.exchange_service, 'fetch_ohlcv', fetch_ohlcv)
+    local = daily.iloc[-50:].resample('4h').ffill().iloc[-100:]
+
+    # 2. Act
+    first = asyncio.run(pattern_service.find_programmatic_sr_levels(local, 'BTC/USDT', 'BINANCE'))
+    second = asyncio.run(pattern_service.find_programmatic_sr_levels(local, 'BTC/USDT', 'BINANCE'))
+
+    # 3. Assert
+    assert fetched == ['1d']
+    assert first == second
+    daily_levels = pattern_service.sr_levels.get('BINANCE', 'BTC/USDT')
+    assert daily_levels and all(round(level, 4) in first['support'] + first['resistance'] for level in daily_levels)
+
+def test_format_candlestick_patterns_respects_whitelist(pattern_service, monkeypatch):
+    """Formacje spoza białej listy 'analysis.candlestick_patterns' nie trafiają do opisu."""
+    # 1. Arrange
+    index = pd.date_range('2025-01-01', periods=2, freq='1h')
+    df = pd.DataFrame({'Open': [10.0, 8.8], 'High': [10.5, 11.0], 'Low': [8.5, 8.8], 'Close': [9.0, 11.0]}, index=index)
+
+    # 2. Act
+    analysis_settings = pattern_service.settings.get('analysis') # monkeypatch przywraca wartości domyślne po teście
+    monkeypatch.setitem(analysis_settings, 'candlestick_patterns', ['engulfing', 'marubozu'])
+    both = pattern_service.format_candlestick_patterns(df)
+    monkeypatch.setitem(analysis_settings, 'candlestick_patterns', ['doji'])
+    none = pattern_service.format_candlestick_patterns_many({'BTC/USDT': df, 'ETH/USDT': None})
+
+    # 3. Assert
+    assert both == "Engulfing, Marubozu"
+    assert none == {'BTC/USDT': None, 'ETH/USDT': None}
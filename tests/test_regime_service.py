@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from core.analyzer import TechnicalAnalyzer
+from core.regime_service import MarketRegimeService
+from core.settings_manager import SettingsManager
+
+@pytest.fixture
+def regime_service(db_manager):
+    """Fixtura tworząca MarketRegimeService na serwisach pełnego analizatora."""
+    settings_manager = SettingsManager()
+    analyzer = TechnicalAnalyzer(settings_manager, db_manager, None)
+    return MarketRegimeService(settings_manager, analyzer._exchange_service, analyzer._indicator_service, db_manager)
+
+def patch_fetch(service, monkeypatch, fetched: list, make_candles):
+    async def fetch_ohlcv(exchange, symbol, interval, limit=None, *args, **kwargs):
+        fetched.append(symbol)
+        await asyncio.sleep(0)
+        history = make_candles(400, '1D', trend=lambda i: 100 + i)
+        return history.iloc[-limit:] if limit else history # Giełda zwraca najwyżej 'limit' ostatnich świec
+    async def get_exchange_instance(exchange_id):
+        return object()
+    monkeypatch.setattr(service.exchange_service, 'get_exchange_instance', get_exchange_instance)
+    monkeypatch.setattr(service.exchange_service, 'fetch_ohlcv', fetch_ohlcv)
+
+def test_regime_is_computed_once_per_period_for_all_consumers(regime_service, monkeypatch, make_candles):
+    """Równocześni konsumenci dostają tę samą migawkę, a giełda jest odpytywana raz na okres."""
+    # 1. Arrange
+    fetched, published = [], []
+    patch_fetch(regime_service, monkeypatch, fetched, make_candles)
+    regime_service.subscribe(published.append)
+    now = 1_700_000_000.0
+
+    async def consumers():
+        return await asyncio.gather(*[regime_service.snapshot('BINANCE', now=now) for _ in range(5)])
+
+    # 2. Act
+    snapshots = asyncio.run(consumers())
+
+    # 3. Assert
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert snapshots[0].regime == 'RYNEK_BYKA' and snapshots[0].score == 2
+    assert sorted(fetched) == ['BTC/USDT', 'ETH/USDT']
+    assert published == [snapshots[0]]
+    assert regime_service.current('BINANCE', now=now + 3600) is snapshots[0] # Ta sama doba UTC - odczyt z pamięci
+    assert regime_service.current('BINANCE', now=now + 86_400) is None # Po dziennym zamknięciu trzeba przeliczyć
+
+def test_regime_snapshot_is_persisted_with_inputs_and_reused_after_restart(regime_service, db_manager, monkeypatch, make_candles):
+    """Migawka trafia do bazy razem z danymi wejściowymi, a nowa instancja serwisu czyta ją bez zapytań do giełdy."""
+    # 1. Arrange
+    fetched = []
+    patch_fetch(regime_service, monkeypatch, fetched, make_candles)
+    now = 1_700_000_000.0
+    snapshot = asyncio.run(regime_service.snapshot('BINANCE', now=now))
+    restarted = MarketRegimeService(regime_service.settings, regime_service.exchange_service, regime_service.indicator_service, db_manager)
+
+    # 2. Act
+    restored = asyncio.run(restarted.snapshot('BINANCE', now=now))
+
+    # 3. Assert
+    assert len(fetched) == 2
+    assert restored.to_dict() == snapshot.to_dict()
+    assert restored.inputs['BTC/USDT']['score'] == 1
+    assert restored.inputs['BTC/USDT']['close'] == pytest.approx(498.0) # Ostatnia zamknięta świeca, bez trwającej
+    assert restored.inputs['BTC/USDT']['ema_fast'] > restored.inputs['BTC/USDT']['ema_slow']
+    assert db_manager.get_latest_market_regime('BINANCE')['regime'] == 'RYNEK_BYKA'
+
+def test_regime_needs_full_slow_ema_window(regime_service, monkeypatch, make_candles):
+    """Historia krótsza niż okno wolnej EMA nie daje migawki (zamiast zapisać wynik 0 jako konsolidację)."""
+    # 1. Arrange
+    async def get_exchange_instance(exchange_id):
+        return object()
+
+    async def fetch_ohlcv(exchange, symbol, interval, limit=None, *args, **kwargs):
+        return make_candles(60, '1D', trend=lambda i: 100 + i)
+
+    monkeypatch.setattr(regime_service.exchange_service, 'get_exchange_instance', get_exchange_instance)
+    monkeypatch.setattr(regime_service.exchange_service, 'fetch_ohlcv', fetch_ohlcv)
+
+    # 2. Act
+    snapshot = asyncio.run(regime_service.snapshot('BINANCE', now=1_700_000_000.0))
+
+    # 3. Assert
+    assert snapshot is None
+    assert asyncio.run(regime_service.get_regime('BINANCE')) == 'KONSOLIDACJA'
@@ -0,0 +1,70 @@
+import json
+import time
+import pytest
+import ccxt.async_support as ccxt
+
+from core.exchange_service import ExchangeService
+from core.replay_exchange import RecordingExchange, ReplayExchange, build_synthetic_fixture, fixture_path
+
+HOUR_MS = 60 * 60 * 1000
+
+@pytest.mark.asyncio
+async def test_replay_exchange_is_selected_by_id_and_serves_recorded_data(tmp_path):
+    """Giełda 'REPLAY_*' powinna odtwarzać świece, tickery i arkusz zleceń z pliku fixture."""
+    # 1. Arrange
+    fixture = build_synthetic_fixture(['BTC/USDT', 'ETH/USDT'], ['1h'], candles=300)
+    with open(fixture_path(str(tmp_path), 'REPLAY_BINANCE'), 'w') as f: json.dump(fixture, f)
+    service = ExchangeService(replay_options={'fixtures_dir': str(tmp_path), 'latency_ms': 0, 'rate_limit_ms': 0})
+
+    # 2. Act
+    exchange = await service.get_exchange_instance('REPLAY_BINANCE')
+    df = await service.fetch_ohlcv(exchange, 'BTC/USDT', '1h', limit=100)
+    tickers = await service.fetch_tickers_snapshot(exchange, ['BTC/USDT', 'ETH/USDT'])
+    book = await exchange.fetch_l2_order_book('ETH/USDT', limit=10)
+
+    # 3. Assert
+    assert len(df) == 100
+    current_open_ms = (int(time.time() * 1000) // HOUR_MS) * HOUR_MS
+    assert int(df.index[-1].value // 10**6) == current_open_ms
+    assert df['Close'].iloc[-1] == fixture['ohlcv']['BTC/USDT|1h'][-1][4]
+    assert set(tickers) == {'BTC/USDT', 'ETH/USDT'}
+    assert len(book['bids']) == 10
+    with pytest.raises(ccxt.BadSymbol):
+        await exchange.fetch_ticker('XRP/USDT')
+    await service.close_all_exchanges()
+
+@pytest.mark.asyncio
+async def test_replay_exchange_enforces_rate_limit_like_a_real_exchange():
+    """Seria zapytań ponad limit powinna zakończyć się RateLimitExceeded, jak odpowiedź 429."""
+    # 1. Arrange
+    exchange = ReplayExchange(build_synthetic_fixture(['BTC/USDT'], ['1h'], candles=10), rate_limit_ms=1000, burst=2)
+
+    # 2. Act
+    await exchange.fetch_ticker('BTC/USDT')
+    await exchange.fetch_ticker('BTC/USDT')
+    with pytest.raises(ccxt.RateLimitExceeded):
+        await exchange.fetch_ticker('BTC/USDT')
+
+    # 3. Assert
+    assert exchange.rate_limit_violations == 1
+    assert exchange.request_counts['fetch_ticker'] == 3
+    await exchange.close()
+
+@pytest.mark.asyncio
+async def test_recording_exchange_captures_session_into_replayable_fixture(tmp_path):
+    """Nagrana sesja powinna dać się odtworzyć przez ReplayExchange z tymi samymi odpowiedziami."""
+    # 1. Arrange
+    source = ReplayExchange(build_synthetic_fixture(['BTC/USDT'], ['1h'], candles=50), rate_limit_ms=0, align_to_now=False)
+    recorder = RecordingExchange(source)
+    path = fixture_path(str(tmp_path), 'REPLAY_TEST')
+
+    # 2. Act
+    candles = await recorder.fetch_ohlcv('BTC/USDT', '1h', limit=20)
+    ticker = await recorder.fetch_ticker('BTC/USDT')
+    recorder.save(path)
+    replayed = ReplayExchange.from_file(path, rate_limit_ms=0, align_to_now=False)
+
+    # 3. Assert
+    assert await replayed.fetch_ohlcv('BTC/USDT', '1h', limit=20) == candles
+    assert (await replayed.fetch_ticker('BTC/USDT'))['last'] == ticker['last']
+    await source.close(); await replayed.close()
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+
+from core.request_scheduler import RequestPriority, RequestScheduler, request_priority, get_current_priority
+
+@pytest.mark.asyncio
+async def test_scheduler_dispatches_higher_priority_first_under_load():
+    """Gdy kubełek jest pusty, zapytania PaperTradera powinny wyprzedzić wcześniej zakolejkowany dashboard."""
+    # 1. Arrange
+    scheduler = RequestScheduler(burst=1, reserved_share=0.0)
+    order = []
+    await scheduler.acquire('BINANCE', 20, RequestPriority.CHART) # Opróżnia kubełek
+
+    async def request(name, priority):
+        await scheduler.acquire('BINANCE', 20, priority)
+        order.append(name)
+
+    # 2. Act
+    await asyncio.gather(
+        request('dashboard_1', RequestPriority.DASHBOARD), request('dashboard_2', RequestPriority.DASHBOARD),
+        request('chart', RequestPriority.CHART), request('paper', RequestPriority.PAPER_TRADING),
+        request('scan', RequestPriority.ALERT_SCAN)
+    )
+
+    # 3. Assert
+    assert order == ['paper', 'scan', 'dashboard_1', 'dashboard_2', 'chart']
+    stats = scheduler.stats()['BINANCE']
+    assert stats['DASHBOARD']['dispatched'] == 2
+    assert stats['DASHBOARD']['max_queued'] == 2
+    assert stats['CHART']['max_wait_ms'] >= stats['PAPER_TRADING']['max_wait_ms']
+
+@pytest.mark.asyncio
+async def test_reserved_tokens_keep_budget_for_critical_classes():
+    """Klasy niekrytyczne nie mogą zużyć rezerwy kubełka przeznaczonej dla PaperTradera."""
+    # 1. Arrange
+    scheduler = RequestScheduler(burst=5, reserved_share=0.4)
+    for _ in range(3):
+        await scheduler.acquire('BINANCE', 1000, RequestPriority.DASHBOARD)
+
+    # 2. Act
+    dashboard = asyncio.create_task(scheduler.acquire('BINANCE', 1000, RequestPriority.DASHBOARD))
+    await asyncio.wait_for(scheduler.acquire('BINANCE', 1000, RequestPriority.PAPER_TRADING), timeout=0.1)
+    await asyncio.sleep(0.05)
+
+    # 3. Assert
+    assert not dashboard.done()
+    dashboard.cancel()
+
+@pytest.mark.asyncio
+async def test_priority_context_propagates_to_child_tasks():
+    """Klasa ustawiona w bloku request_priority powinna obowiązywać też w zadaniach z gather."""
+    # 1. Arrange
+    async def read_priority():
+        return get_current_priority()
+
+    # 2. Act
+    with request_priority(RequestPriority.ALERT_SCAN):
+        inside = await asyncio.gather(read_priority(), read_priority())
+    outside = get_current_priority()
+
+    # 3. Assert
+    assert inside == [RequestPriority.ALERT_SCAN, RequestPriority.ALERT_SCAN]
+    assert outside == RequestPriority.DASHBOARD
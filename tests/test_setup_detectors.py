@@ -0,0 +1,44 @@
+import numpy as np
+
+from core.setup_detectors import find_breakouts_and_reclaims, is_volume_contraction
+
+def test_find_breakouts_and_reclaims_checks_all_levels_at_once():
+    """Fałszywe wybicie oporu jest wykrywane tylko dla poziomów przebitych knotem i odzyskanych zamknięciem."""
+    # 1. Arrange
+    high = np.array([10.0, 10.2, 11.5, 10.4, 10.1])
+    low = np.array([9.5, 9.6, 9.9, 9.7, 9.6])
+    close = np.array([9.8, 10.0, 10.3, 10.0, 9.9])
+    levels = [10.5, 11.0, 12.0, 10.1]
+
+    # 2. Act
+    traps = find_breakouts_and_reclaims(high, low, close, levels, lookback=5, is_resistance=True)
+
+    # 3. Assert
+    # 12.0 nie został przebity; przy 10.1 wybicie i powrót pod poziom nastąpiły na tej samej świecy
+    assert traps.tolist() == [True, True, False, True]
+
+def test_find_breakouts_and_reclaims_requires_reclaim_after_breakout():
+    """Zamknięcie po właściwej stronie przed wybiciem nie liczy się jako odzyskanie poziomu."""
+    # 1. Arrange
+    high = np.array([10.6, 10.6, 10.6, 10.6, 10.2])
+    low = np.array([10.2, 10.2, 10.2, 9.5, 9.8])
+    close = np.array([10.5, 10.5, 10.5, 9.8, 9.9])
+
+    # 2. Act
+    traps = find_breakouts_and_reclaims(high, low, close, [10.0], lookback=5, is_resistance=False)
+
+    # 3. Assert
+    assert traps.tolist() == [False]
+
+def test_is_volume_contraction_needs_falling_range_and_volume():
+    """VCP wymaga jednoczesnego spadku zakresu świec i wolumenu o co najmniej 40%."""
+    # 1. Arrange
+    high = np.concatenate((np.full(10, 12.0), np.full(10, 11.0)))
+    low = np.full(20, 10.0)
+    dry_volume = np.concatenate((np.full(10, 100.0), np.full(10, 50.0)))
+    steady_volume = np.concatenate((np.full(10, 100.0), np.full(10, 70.0)))
+
+    # 2. Act & 3. Assert
+    assert is_volume_contraction(high, low, dry_volume)
+    assert not is_volume_contraction(high, low, steady_volume)
+    assert not is_volume_contraction(low + 1, low, dry_volume) # Zakres się nie zmienia
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.indicator_kernels import bbands
+from core.rolling_extremum import RollingExtremum, rolling_extremum
+from core.setup_detectors import is_bollinger_squeeze
+from core.squeeze_tracker import SqueezeRegistry
+
+@pytest.mark.parametrize('mode', ['min', 'max'])
+def test_rolling_extremum_matches_pandas_rolling_with_nan(mode):
+    """Kolejka monotoniczna i wersja wektorowa dają to samo co rolling(window).min()/max(), także przy NaN."""
+    # 1. Arrange
+    rng = np.random.default_rng(5)
+    values = rng.normal(size=400)
+    values[[3, 50, 51, 260]] = np.nan
+    expected = getattr(pd.Series(values).rolling(15), mode)().to_numpy()
+    extremum = RollingExtremum(15, mode)
+
+    # 2. Act
+    streamed = [extremum.push(value) for value in values]
+    vectorized = rolling_extremum(values, 15, mode)
+
+    # 3. Assert
+    np.testing.assert_array_equal(streamed, expected)
+    np.testing.assert_array_equal(vectorized, expected)
+
+def test_squeeze_tracker_matches_full_frame_bands_on_sliding_window():
+    """Przyrostowy stan squeeze daje ten sam wynik co wstęgi liczone na całej ramce, a przesunięte okno nie przebudowuje stanu."""
+    # 1. Arrange
+    rng = np.random.default_rng(8)
+    volatility = np.where((np.arange(1200) // 200) % 2 == 0, 1.0, 0.1) # Naprzemienne okresy dużej i małej zmienności
+    close = 100 + np.cumsum(rng.normal(0, 1, 1200) * volatility)
+    candles = pd.DataFrame({'Close': close}, index=pd.date_range('2024-01-01', periods=1200, freq='1h'))
+    registry = SqueezeRegistry()
+    results, expected = [], []
+
+    for end in range(300, 1200):
+        window = candles.iloc[end - 300:end]
+
+        # 2. Act
+        results.append(registry.is_squeeze(('BINANCE', 'BTC/USDT', '1h'), window))
+        lower, mid, upper = bbands(window['Close'].to_numpy(), 20, 2.0)[:3]
+        expected.append(is_bollinger_squeeze(upper, lower, mid))
+
+    # 3. Assert
+    assert results == expected
+    assert any(expected) and not all(expected)
+    assert registry.stats()['loads'] == 1
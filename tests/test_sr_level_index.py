@@ -0,0 +1,32 @@
+import pytest
+
+from core.sr_level_index import DAY_MS, SRLevelIndex, cluster_levels, daily_session_start
+
+def test_cluster_levels_merges_near_duplicates():
+    """Poziomy bliższe niż tolerancja stają się jednym poziomem (średnią klastra)."""
+    # 1. Arrange
+    levels = [100.0, 100.2, 99.9, 105.0, 110.0, 110.3, float('nan')]
+
+    # 2. Act
+    clustered = cluster_levels(levels, tolerance=0.005)
+
+    # 3. Assert
+    assert clustered == pytest.approx([(99.9 + 100.0 + 100.2) / 3, 105.0, 110.15])
+
+def test_sr_level_index_serves_persisted_levels_until_next_daily_close(db_manager):
+    """Poziomy zapisane dziś są czytane z bazy przez nowy indeks, a po północy UTC wymagają przeliczenia."""
+    # 1. Arrange
+    now = 1_750_000_000.0
+    SRLevelIndex(db_manager).put('BINANCE', 'BTC/USDT', [100.0, 100.1, 120.0], tolerance=0.003, now=now)
+    index = SRLevelIndex(db_manager) # Np. po restarcie aplikacji
+
+    # 2. Act
+    same_day = index.get('BINANCE', 'BTC/USDT', now=now + 60)
+    from_memory = index.get('BINANCE', 'BTC/USDT', now=now + 120)
+    next_day = index.get('BINANCE', 'BTC/USDT', now=daily_session_start(now) / 1000 + DAY_MS / 1000)
+
+    # 3. Assert
+    assert same_day == pytest.approx([100.05, 120.0])
+    assert from_memory == same_day
+    assert next_day is None
+    assert index.stats() == {"symbols": 1, "hits": 1, "db_loads": 1, "misses": 1}
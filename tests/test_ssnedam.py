@@ -0,0 +1,78 @@
+import asyncio
+import pandas as pd
+import pytest
+
+from core.incremental_indicators import IncrementalIndicatorEngine
+from core.market_stream import MarketStream, StreamClosed
+from core.ssnedam import Ssnedam
+
+HOUR_MS = 60 * 60 * 1000
+
+class FakeKlineFeed:
+    """Źródło z API ccxt.pro oddające kolejno zadane aktualizacje świec, potem kończące strumień."""
+
+    def __init__(self, updates: list):
+        self.updates = list(updates)
+
+    async def watch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        await asyncio.sleep(0)
+        if not self.updates: raise StreamClosed("koniec")
+        return [self.updates.pop(0)]
+
+    async def close(self):
+        pass
+
+class FakeScanAnalyzer:
+    """Analizator zwracający historię do zasiania strumienia i zapamiętujący ramki przekazane do skanu."""
+
+    def __init__(self, history):
+        self.settings = {'ssnedam.alert_interval': '1h'}
+        self.history = history
+        self.scanned_frames = []
+        self.rest_scans = 0
+
+    async def get_exchange_instance(self, exchange_id):
+        return object()
+
+    async def fetch_ohlcv(self, exchange, symbol, interval, limit=None, since=None):
+        return self.history
+
+    def scan_setups(self, df, symbol, exchange, interval):
+        self.scanned_frames.append(df)
+        return []
+
+    async def find_potential_setups(self, symbol, exchange, interval):
+        self.rest_scans += 1
+        return []
+
+async def settle(steps: int = 30):
+    for _ in range(steps): await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_scanner_scans_stream_indicators_after_candle_close(make_candles):
+    """Symbol jest skanowany po zamknięciu świecy, na wskaźnikach silnika przyrostowego zamiast pobierania świec."""
+    # 1. Arrange
+    history = make_candles(300)
+    last_ts = int(history.index[-1].value // 1_000_000)
+    last = history.iloc[-1]
+    updates = [[last_ts, last['Open'], last['High'] + 1, last['Low'], last['Close'], last['Volume']],
+               [last_ts + HOUR_MS, last['Close'], last['Close'] + 1, last['Close'] - 1, last['Close'], 10.0]]
+    stream = MarketStream(feed_factory=lambda exchange_id: FakeKlineFeed(updates), indicator_engine_factory=IncrementalIndicatorEngine)
+    analyzer = FakeScanAnalyzer(history)
+    ssnedam = Ssnedam(analyzer, None, None, None, None, lambda size: None, asyncio.Lock(), lambda text, busy: None, None, market_stream=stream)
+
+    # 2. Act
+    ssnedam.sync_candle_close_scans([{'symbol': 'TEST/USDT', 'exchange': 'BINANCE'}], lambda alert: None)
+    await settle()
+    ssnedam.sync_candle_close_scans([], lambda alert: None)
+
+    # 3. Assert
+    assert analyzer.rest_scans == 0
+    assert len(analyzer.scanned_frames) == 1
+    frame = analyzer.scanned_frames[0]
+    assert len(frame) == len(history)
+    assert frame.index[-1] == history.index[-1] + pd.Timedelta(hours=1)
+    assert frame['High'].iloc[-2] == last['High'] + 1
+    assert {'RSI_14', 'EMA_200'} <= set(frame.columns) and frame['EMA_200'].notna().iloc[-1]
+    assert ssnedam._scan_subscriptions == {}
+    await stream.close()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import find_peaks
+
+from core.swing_index import SwingIndex, SwingIndexRegistry
+
+def make_series(rows: int, seed: int, decimals: int = 2) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    values = np.round(100 + np.cumsum(rng.normal(0, 1, rows)), decimals) # Zaokrąglenie daje plateau i remisy
+    return pd.Series(values, index=pd.date_range('2024-01-01', periods=rows, freq='1h', name='timestamp'))
+
+def expected_peaks(series: pd.Series, invert: bool, distance: int, prominence: float) -> np.ndarray:
+    values = -series.to_numpy() if invert else series.to_numpy()
+    return find_peaks(values, distance=distance, prominence=prominence)[0]
+
+def test_swing_index_matches_find_peaks_on_sliding_window():
+    """Przesuwane okno z dopisywanymi świecami i zmieniającą się ostatnią świecą daje te same szczyty co find_peaks."""
+    # 1. Arrange
+    series = make_series(700, seed=4, decimals=0)
+    highs, lows = SwingIndex(), SwingIndex(invert=True)
+    rng = np.random.default_rng(8)
+
+    for step in range(150):
+        window = series.iloc[step:step + 500].copy()
+        if step % 3: window.iloc[-1] += rng.normal(0, 2) # Trwająca świeca jeszcze się zmienia
+
+        # 2. Act
+        highs.sync(window); lows.sync(window)
+
+        # 3. Assert
+        for distance, multiplier in ((1, 0.0), (5, 0.5), (10, 1.0)):
+            prominence = window.std() * multiplier
+            np.testing.assert_array_equal(highs.peaks(distance, prominence), expected_peaks(window, False, distance, prominence))
+            np.testing.assert_array_equal(lows.peaks(distance, prominence), expected_peaks(window, True, distance, prominence))
+    assert highs.builds == 1 and lows.builds == 1
+
+def test_swing_index_treats_nan_like_find_peaks():
+    """NaN przerywa plateau i zatrzymuje wyznaczanie podstaw prominencji - tak jak w find_peaks."""
+    # 1. Arrange
+    series = make_series(300, seed=2, decimals=1)
+    series.iloc[[40, 41, 150, 260]] = np.nan
+    index = SwingIndex()
+
+    # 2. Act
+    index.sync(series.iloc[:200])
+    index.sync(series)
+
+    # 3. Assert
+    np.testing.assert_array_equal(index.peaks(3, 1.0), expected_peaks(series, False, 3, 1.0))
+    np.testing.assert_array_equal(index.peaks(), find_peaks(series.to_numpy())[0])
+    assert index.std() == pytest.approx(series.std(), rel=1e-12)
+
+def test_registry_updates_continued_series_and_rebuilds_unrelated():
+    """Kontynuacja serii tylko dopisuje świece; ramka z inną historią przebudowuje indeks."""
+    # 1. Arrange
+    registry = SwingIndexRegistry(max_series=2)
+    series = make_series(600, seed=6)
+
+    # 2. Act
+    registry.get(('BINANCE', 'BTC/USDT', '1h'), series.iloc[:500])
+    registry.get(('BINANCE', 'BTC/USDT', '1h'), series.iloc[1:501])
+    registry.get(('BINANCE', 'BTC/USDT', '1h'), series.iloc[1:501])
+    registry.get(('BINANCE', 'BTC/USDT', '1h'), make_series(500, seed=7))
+
+    # 3. Assert
+    stats = registry.stats()
+    assert stats['rebuilds'] == 2
+    assert stats['updates'] == 1
+    assert stats['series'] == 1
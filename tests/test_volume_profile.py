@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.volume_profile import VolumeProfile, VolumeProfileEngine, fixed_range_profiles, spread_volume
+
+def test_spread_volume_distributes_candle_volume_over_its_range():
+    """Wolumen świecy dzieli się między kubełki proporcjonalnie do części zakresu High-Low, która w nie wpada."""
+    # 1. Arrange
+    low, high, volume = np.array([1.0, 2.5, 3.2]), np.array([3.0, 2.5, 4.0]), np.array([100.0, 10.0, 40.0])
+
+    # 2. Act
+    profile = spread_volume(low, high, volume, origin=0.0, bin_size=1.0, bins=4)[0]
+
+    # 3. Assert
+    # [1, 3] -> po 50 w kubełkach 1 i 2; świeca bez zakresu (2.5) -> kubełek 2; [3.2, 4] -> cały kubełek 3
+    np.testing.assert_allclose(profile, [0.0, 50.0, 60.0, 40.0])
+
+def test_composite_profile_equals_profile_of_all_candles_and_reuses_sessions(make_candles):
+    """Profil złożony z sesji to suma kubełków; przesunięte okno nie przelicza zapamiętanych sesji."""
+    # 1. Arrange
+    candles = make_candles(24 * 12, seed=3)
+    engine = VolumeProfileEngine(bins=40)
+
+    # 2. Act
+    composite = engine.composite(('BINANCE', 'BTC/USDT'), candles.iloc[:24 * 10 + 5])
+    builds = engine.stats()['session_builds']
+    engine.composite(('BINANCE', 'BTC/USDT'), candles.iloc[24:24 * 11 + 5])
+
+    # 3. Assert
+    window = candles.iloc[:24 * 10 + 5]
+    direct = engine.rolling(('BINANCE', 'BTC/USDT'), window, len(window))
+    np.testing.assert_allclose((composite + VolumeProfile(direct.origin, direct.bin_size, -direct.volume)).volume, 0, atol=1e-9)
+    assert composite.volume.sum() == pytest.approx(window['Volume'].sum())
+    assert builds == 10 # Pełne doby; bieżąca sesja nie jest zapamiętywana
+    assert engine.stats()['session_builds'] == 11 # Tylko jedna nowa zamknięta doba
+
+def test_session_is_recomputed_when_frame_has_different_candles(make_candles):
+    """Zapamiętana sesja nie jest użyta dla ramki z innymi świecami tej samej doby (np. inny interwał pod tym samym kluczem)."""
+    # 1. Arrange
+    hourly = make_candles(24 * 3, seed=5)
+    five_minutes = make_candles(12 * 24 * 3, seed=6, freq='5min')
+    five_minutes[['High', 'Low', 'Close']] -= 50
+    engine = VolumeProfileEngine(bins=40)
+    engine.session_profiles(('BINANCE', 'BTC/USDT'), hourly)
+
+    # 2. Act
+    profiles = engine.session_profiles(('BINANCE', 'BTC/USDT'), five_minutes)
+
+    # 3. Assert
+    first_day = five_minutes.index[0].value // 10**9 // 86_400
+    assert profiles[first_day].volume.sum() == pytest.approx(five_minutes['Volume'].iloc[:12 * 24].sum())
+    assert profiles[first_day].origin < hourly['Low'].min()
+
+def test_session_cache_keeps_only_newest_sessions(make_candles):
+    """Seria pamięta najwyżej 'max_sessions' najnowszych zamkniętych dób."""
+    # 1. Arrange
+    engine = VolumeProfileEngine(bins=40, max_sessions=3)
+
+    # 2. Act
+    engine.session_profiles('BTC', make_candles(24 * 10, seed=7))
+
+    # 3. Assert
+    assert engine.stats()['sessions'] == 3
+    assert sorted(engine._series['BTC'].sessions)[-1] == pd.Timestamp('2024-01-09').value // 10**9 // 86_400
+
+def test_fixed_range_profiles_for_many_frames_match_single_frames(make_candles):
+    """Profile wielu symboli liczone jednym histogramem są takie same jak liczone osobno."""
+    # 1. Arrange
+    frames = [make_candles(300, seed=i) for i in range(5)] + [None]
+
+    # 2. Act
+    batch = fixed_range_profiles(frames, bins=30)
+
+    # 3. Assert
+    for df, profile in zip(frames[:-1], batch):
+        single = fixed_range_profiles([df], bins=30)[0]
+        np.testing.assert_allclose(profile.volume, single.volume)
+        assert profile.levels() == single.levels()
+        assert single.levels()['val'] <= single.levels()['poc'] <= single.levels()['vah']
+    assert batch[-1] is None
+
+def test_grid_is_rebuilt_when_first_frame_was_flat(make_candles):
+    """Płaska pierwsza ramka nie narzuca mikroskopijnej siatki - kolejna ramka buduje siatkę od nowa."""
+    # 1. Arrange
+    candles = make_candles(48, seed=2)
+    flat = candles.iloc[:1].copy()
+    flat[['Open', 'High', 'Low', 'Close']] = 100.0
+    engine = VolumeProfileEngine(bins=40)
+    engine.session_profiles('BTC', flat)
+
+    # 2. Act
+    profiles = engine.session_profiles('BTC', candles)
+
+    # 3. Assert
+    assert engine._series['BTC'].bin_size >= 100.0 * 1e-6
+    assert all(len(profile.volume) <= 40 * 20 for profile in profiles.values())
+    assert sum(profile.volume.sum() for profile in profiles.values()) == pytest.approx(candles['Volume'].sum())
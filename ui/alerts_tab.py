@@ -9,6 +9,7 @@ from PyQt6.QtWidgets import (
 )
 
 from core.analyzer import TechnicalAnalyzer
+from core.request_scheduler import RequestPriority, request_priority
 from core.settings_manager import SettingsManager
 from core.ssnedam import AlertData
 from .analysis_tab_helpers import (
@@ -82,7 +83,8 @@ class AlertsTab(QWidget):
         self.alert_details_text.setHtml(generate_html_from_analysis(alert_data.parsed_data))
         
         exchange = await self.analyzer.get_exchange_instance(alert_data.exchange)
-        df = await self.analyzer.fetch_ohlcv(exchange, alert_data.symbol, alert_data.interval)
+        with request_priority(RequestPriority.CHART):
+            df = await self.analyzer.fetch_ohlcv(exchange, alert_data.symbol, alert_data.interval)
         if df is not None:
              df_with_indicators = self.analyzer.calculate_all_indicators(df.copy())
              interpreted = self.analyzer._indicator_service.interpret_all(df_with_indicators)
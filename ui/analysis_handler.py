@@ -68,7 +68,7 @@ class AnalysisHandler:
                 raw_ai_response="",
                 context_text="",
                 visualization_data=[],
-                fvgs=self.analyzer.pattern_service.find_fair_value_gaps(analysis_result.all_ohlcv_dfs.get(best_timeframe)),
+                fvgs=self.analyzer.find_fair_value_gaps(analysis_result.all_ohlcv_dfs.get(best_timeframe)),
                 all_ohlcv_dfs=analysis_result.all_ohlcv_dfs,
                 fib_data=json.loads(tactician_inputs.get('fibonacci_data', '{}'))
             )
@@ -15,6 +15,7 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QColor
 
 from core.analyzer import TechnicalAnalyzer
+from core.request_scheduler import RequestPriority, request_priority
 from core.settings_manager import SettingsManager
 from core.database_manager import DatabaseManager
 from .history_dialog import CandlestickItem, DateAxis
@@ -139,14 +140,16 @@ class UniversalChartWidget(QWidget):
 
     async def _load_and_draw_data(self, timeframe: str):
         if not self.current_symbol or not self.current_exchange: return
-        df = self.data_cache.get(timeframe)
-        if df is None:
-            exchange = await self.analyzer.get_exchange_instance(self.current_exchange)
-            if exchange:
+        # Świece zawsze przez analyzer - wspólny cache OHLCV unieważnia je po zamknięciu świecy,
+        # a data_cache trzyma tylko ostatnio narysowaną ramkę (np. na potrzeby przełączenia skali)
+        df = None
+        exchange = await self.analyzer.get_exchange_instance(self.current_exchange)
+        if exchange:
+            with request_priority(RequestPriority.CHART):
                 raw_df = await self.analyzer.fetch_ohlcv(exchange, self.current_symbol, timeframe, limit=1000)
-                if raw_df is not None and not raw_df.empty:
-                    df = self.analyzer.calculate_all_indicators(raw_df.copy())
-                    self.data_cache[timeframe] = df
+            if raw_df is not None and not raw_df.empty:
+                df = self.analyzer.calculate_all_indicators(raw_df.copy())
+                self.data_cache[timeframe] = df
         
         if df is not None: self._draw_chart(df)
         else:
@@ -77,6 +77,7 @@ class MainWindow(QMainWindow):
         self.settings_manager = settings_manager
         self._analysis_lock = asyncio.Lock()
         self._is_shutting_down = False
+        self._ssnedam_streaming = False # Skaner wyzwalany zamknięciem świec ze strumienia zamiast timera
         self.banner_pixmap = None
 
         try:
@@ -242,6 +243,9 @@ class MainWindow(QMainWindow):
             self.services.ssnedam.start_worker()
             self._handle_ssnedam_state_changed() # Automatycznie uruchom skaner, jeśli jest włączony w ustawieniach
             asyncio.create_task(self.services.paper_trader.start())
+            asyncio.create_task(self.services.analyzer.market_regime.start())
+            if self.settings_manager.get('ssnedam.context_prefetch_enabled', True):
+                asyncio.create_task(self.services.analyzer.context_prefetcher.start(self._ssnedam_watchlist))
 
         except Exception as e:
             logger.error(f"Błąd podczas sekwencji startowej: {e}", exc_info=True)
@@ -253,12 +257,17 @@ class MainWindow(QMainWindow):
     # --- NOWE METODY DO KONTROLI SKANERA ---
     def _start_ssnedam_timer(self):
         """Uruchamia timer skanera i aktualizuje UI."""
-        if self.ssnedam_timer.isActive():
+        if self.ssnedam_timer.isActive() or self._ssnedam_streaming:
             return
-            
-        interval_ms = self.settings_manager.get('ssnedam.interval_minutes', 15) * 60 * 1000
-        self.ssnedam_timer.start(interval_ms)
-        logger.info(f"Uruchomiono timer Ssnedam. Interwał: {interval_ms / 1000}s.")
+
+        if self.services.market_stream is not None:
+            self._ssnedam_streaming = True
+            self._sync_ssnedam_stream()
+            logger.info("Uruchomiono skaner Ssnedam w trybie strumieniowym (skan po zamknięciu świecy).")
+        else:
+            interval_ms = self.settings_manager.get('ssnedam.interval_minutes', 15) * 60 * 1000
+            self.ssnedam_timer.start(interval_ms)
+            logger.info(f"Uruchomiono timer Ssnedam. Interwał: {interval_ms / 1000}s.")
         
         self._update_scanner_ui_state()
         # Uruchom skanowanie od razu po włączeniu
@@ -266,7 +275,7 @@ class MainWindow(QMainWindow):
 
     def _update_scanner_ui_state(self):
         """Centralna funkcja do aktualizacji UI na podstawie stanu timera."""
-        is_active = self.ssnedam_timer.isActive()
+        is_active = self.ssnedam_timer.isActive() or self._ssnedam_streaming
         
         self.start_scan_btn.setEnabled(not is_active)
         self.stop_scan_btn.setEnabled(is_active)
@@ -279,7 +288,9 @@ class MainWindow(QMainWindow):
     def _stop_ssnedam_timer(self):
         """Zatrzymuje timer skanera, czyści kolejkę i aktualizuje UI."""
         self.ssnedam_timer.stop()
+        self._ssnedam_streaming = False
         if self.services and self.services.ssnedam:
+            self.services.ssnedam.stop_candle_close_scans()
             self.services.ssnedam.clear_analysis_queue()
         
         logger.info("Zatrzymano timer Ssnedam.")
@@ -290,6 +301,7 @@ class MainWindow(QMainWindow):
         logger.info("Odczytuję ustawienia i dostosowuję stan skanera...")
         if self.settings_manager.get('ssnedam.enabled', False):
             self._start_ssnedam_timer()
+            if self._ssnedam_streaming: self._sync_ssnedam_stream() # Grupa lub interwał alertów mogły się zmienić
         else:
             self._stop_ssnedam_timer()
 
@@ -365,15 +377,31 @@ class MainWindow(QMainWindow):
     def _dispatch_telegram_alert(self, alert_data, images: list):
         asyncio.create_task(self.services.ssnedam.send_telegram_alert_with_album(alert_data, images))
 
+    def _ssnedam_watchlist(self) -> list:
+        """Coiny aktywnej grupy Ssnedam dla prefetchera kontekstu (pusta lista, gdy skaner jest wyłączony)."""
+        if not self.settings_manager.get('ssnedam.enabled', False): return []
+        user_groups = self.services.coin_manager.get_user_coin_groups() or {}
+        return user_groups.get(self.settings_manager.get('ssnedam.group', ''), [])
+
     def _ssnedam_scan_loop(self):
         if self._analysis_lock.locked():
             logger.warning("[Ssnedam] Skanowanie pominięte, trwa inna analiza.")
             return
 
+        coins = self._ssnedam_target_coins()
+        if coins:
+            asyncio.create_task(self.services.ssnedam.scan_for_alerts(coins, self.alerts_tab.add_alert_to_list))
+
+    def _sync_ssnedam_stream(self):
+        """Subskrybuje zamknięcia świec monet z aktywnej grupy skanera (tryb strumieniowy)."""
+        self.services.ssnedam.sync_candle_close_scans(self._ssnedam_target_coins(), self.alerts_tab.add_alert_to_list)
+
+    def _ssnedam_target_coins(self) -> list:
+        """Coiny grupy skanera z ustawień (lub pierwszej dostępnej grupy, gdy ustawionej nie ma)."""
         user_groups = self.services.coin_manager.get_user_coin_groups()
         if not user_groups:
             logger.warning("[Ssnedam] Brak jakichkolwiek grup monet do przeskanowania.")
-            return
+            return []
 
         group_from_settings = self.settings_manager.get('ssnedam.group', '')
         
@@ -387,10 +415,9 @@ class MainWindow(QMainWindow):
             target_group_name = group_from_settings
 
         coins = user_groups.get(target_group_name, [])
-        if coins:
-            asyncio.create_task(self.services.ssnedam.scan_for_alerts(coins, self.alerts_tab.add_alert_to_list))
-        else:
+        if not coins:
             logger.warning(f"[Ssnedam] Brak coinów w grupie '{target_group_name}' do przeskanowania.")
+        return coins
 
     def _on_settings_changed(self):
         self.services.ai_client.update_config()